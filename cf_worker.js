@@ -79,7 +79,8 @@ let memoryCache = {
     configCache: {
         uaConfigs: {},
         ipBlacklist: [],
-        lastUpdate: 0
+        lastUpdate: 0,
+        version: 0  // 数据中心配置版本号（0 表示未从数据中心同步过）
     },
     // 环境变量缓存（启动时复制，APP_ID/APP_SECRET除外）
     envCache: {
@@ -109,7 +110,19 @@ let DATA_CENTER_CONFIG = {
     enabled: false,
     initialized: false, // 添加初始化标志
     syncTimer: null, // 添加定时器引用
-    workerApiKey: '' // 数据中心访问Worker时使用的API Key
+    workerApiKey: '', // 数据中心访问Worker时使用的API Key
+    compression: true, // 同步数据 gzip 压缩
+    compressionPausedUntil: 0 // 数据中心无法解压时暂停压缩到该时间（毫秒时间戳），之后重新尝试
+};
+
+// 同步负载压缩配置（与数据中心的 SYNC_COMPRESSION_MIN_BYTES / SYNC_MAX_DECOMPRESSED_BYTES 对应）
+const SYNC_COMPRESSION = {
+    MIN_BYTES: 1024,                         // 小于该大小的请求体不压缩
+    MAX_DECOMPRESSED_BYTES: 16 * 1024 * 1024, // 数据中心推送的请求体解压后上限（防压缩炸弹）
+    RETRY_AFTER_MS: 3600000,                 // 数据中心无法解压时改为明文发送，1小时后重新尝试压缩
+    // 400/422 的错误信息为以下内容时才认为是无法解压：旧版数据中心（FastAPI 把 gzip 数据当作 JSON 解析失败）
+    // 或新版数据中心解压失败；其他 400/422（如数据校验失败）与压缩无关，不改为明文重发
+    REJECTED_DETAIL: /There was an error parsing the body|JSON decode error|json_invalid|解压失败|gzip 数据不完整/
 };
 
 // ========================================
@@ -659,6 +672,32 @@ async function restoreCountersFromDataCenter() {
     }
 }
 
+// 应用数据中心下发的配置（完整快照或增量），返回是否成功
+// 增量要求本地版本等于 base_version，且黑名单为数据中心同步的对象格式
+function applyDataCenterConfig(config) {
+    const cache = memoryCache.configCache;
+
+    if (config.mode === 'delta') {
+        if (config.base_version !== cache.version || Array.isArray(cache.ipBlacklist)) {
+            return false;
+        }
+        const applySection = (target, change) => {
+            (change.remove || []).forEach(key => { delete target[key]; });
+            Object.assign(target, change.upsert || {});
+        };
+        if (config.ua_configs) applySection(cache.uaConfigs, config.ua_configs);
+        if (config.ip_blacklist) applySection(cache.ipBlacklist, config.ip_blacklist);
+    } else {
+        if (config.ua_configs) cache.uaConfigs = config.ua_configs;
+        if (config.ip_blacklist) cache.ipBlacklist = config.ip_blacklist;
+    }
+
+    // 未携带版本号的完整推送（如手动推送）视为未知版本，下次由数据中心发送完整快照
+    cache.version = typeof config.version === 'number' ? config.version : 0;
+    cache.lastUpdate = Date.now();
+    return true;
+}
+
 // 从数据中心同步配置
 async function syncConfigFromDataCenter() {
     if (!DATA_CENTER_CONFIG.enabled) return;
@@ -675,38 +714,49 @@ async function syncConfigFromDataCenter() {
     }
 
     try {
-        const response = await fetch(`${DATA_CENTER_CONFIG.url}/worker-api/config/export`, {
+        // 携带当前版本：未变化时返回 304，落后不多时只返回增量
+        const currentVersion = memoryCache.configCache.version;
+        const headers = {
+            'X-API-Key': DATA_CENTER_CONFIG.apiKey,
+            'Content-Type': 'application/json'
+        };
+        let exportUrl = `${DATA_CENTER_CONFIG.url}/worker-api/config/export`;
+        if (currentVersion > 0) {
+            headers['If-None-Match'] = `"v${currentVersion}"`;
+            exportUrl += `?since=${currentVersion}`;
+        }
+
+        const response = await fetch(exportUrl, {
             method: 'GET',
-            headers: {
-                'X-API-Key': DATA_CENTER_CONFIG.apiKey,
-                'Content-Type': 'application/json'
-            }
+            headers
         });
 
-        if (response.ok) {
+        if (response.status === 304) {
+            DATA_CENTER_CONFIG.lastConfigSync = now;
+            console.log(`✅ 配置未变化 (v${currentVersion})`);
+        } else if (response.ok) {
             const config = await response.json();
-            console.log('📥 从数据中心获取配置成功');
+            console.log(`📥 从数据中心获取配置成功 (${config.mode || 'full'}, v${config.version})`);
 
             // 优先使用数据中心配置，更新内存缓存
-            if (config.ua_configs) {
-                memoryCache.configCache.uaConfigs = config.ua_configs;
-                console.log(`✅ 从数据中心更新UA配置，共${config.ua_configs.length}条`);
-                addMemoryLog('INFO', '从数据中心更新UA配置', {
-                    count: config.ua_configs.length,
-                    data_center_url: DATA_CENTER_CONFIG.url
-                });
+            if (!applyDataCenterConfig(config)) {
+                // 增量无法应用（本地版本已变化），下次同步获取完整快照
+                memoryCache.configCache.version = 0;
+                console.warn('⚠️ 配置增量版本不匹配，下次同步获取完整快照');
+                return;
             }
 
-            if (config.ip_blacklist) {
-                memoryCache.configCache.ipBlacklist = config.ip_blacklist;
-                console.log(`✅ 从数据中心更新IP黑名单，共${config.ip_blacklist.length}条`);
-                addMemoryLog('INFO', '从数据中心更新IP黑名单', {
-                    count: config.ip_blacklist.length,
-                    data_center_url: DATA_CENTER_CONFIG.url
-                });
-            }
+            const uaCount = Object.keys(memoryCache.configCache.uaConfigs || {}).length;
+            const blacklistCount = getIpBlacklistCount();
+            console.log(`✅ 从数据中心更新配置: UA配置${uaCount}条, IP黑名单${blacklistCount}条`);
+            addMemoryLog('INFO', '从数据中心更新配置', {
+                mode: config.mode || 'full',
+                version: config.version,
+                ua_count: uaCount,
+                blacklist_count: blacklistCount,
+                data_center_url: DATA_CENTER_CONFIG.url
+            });
 
-            memoryCache.configCache.lastUpdate = now;
             DATA_CENTER_CONFIG.lastConfigSync = now;
             console.log('✅ 配置同步成功');
             addMemoryLog('INFO', '配置同步成功', {
@@ -734,6 +784,87 @@ async function syncConfigFromDataCenter() {
     }
 }
 
+// 构建发往数据中心的请求体（超过阈值时 gzip 压缩）
+async function buildSyncBody(data) {
+    const json = JSON.stringify(data);
+    if (!DATA_CENTER_CONFIG.compression || Date.now() < DATA_CENTER_CONFIG.compressionPausedUntil ||
+        json.length < SYNC_COMPRESSION.MIN_BYTES || typeof CompressionStream === 'undefined') {
+        return { body: json, encoding: null, rawBytes: json.length };
+    }
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+    const body = await new Response(stream).arrayBuffer();
+    return { body, encoding: 'gzip', rawBytes: json.length };
+}
+
+// POST 同步数据到数据中心（压缩请求体；数据中心无法解压时暂停压缩并明文重发）
+async function postToDataCenter(path, data) {
+    const { body, encoding, rawBytes } = await buildSyncBody(data);
+    const headers = {
+        'X-API-Key': DATA_CENTER_CONFIG.apiKey,
+        'Content-Type': 'application/json'
+    };
+    if (encoding) headers['Content-Encoding'] = encoding;
+
+    const response = await fetch(`${DATA_CENTER_CONFIG.url}${path}`, {
+        method: 'POST',
+        headers,
+        body
+    });
+
+    if (encoding && await isCompressionRejected(response)) {
+        console.warn(`⚠️ 数据中心无法解压 ${encoding} 请求体 (HTTP ${response.status})，改为明文发送，${Math.round(SYNC_COMPRESSION.RETRY_AFTER_MS / 60000)} 分钟后重新尝试压缩`);
+        DATA_CENTER_CONFIG.compressionPausedUntil = Date.now() + SYNC_COMPRESSION.RETRY_AFTER_MS;
+        return postToDataCenter(path, data);
+    }
+    if (encoding && memoryCache.envCache.ENABLE_DETAILED_LOGGING) {
+        console.log(`🗜️ ${path} 请求体已压缩: ${rawBytes} -> ${body.byteLength} 字节`);
+    }
+    return response;
+}
+
+// 压缩的请求是否因为数据中心无法解压而被拒绝（415，或 400/422 且错误信息为解析/解压失败）
+async function isCompressionRejected(response) {
+    if (response.status === 415) return true;
+    if (response.status !== 400 && response.status !== 422) return false;
+    const detail = await response.clone().text().catch(() => '');
+    return SYNC_COMPRESSION.REJECTED_DETAIL.test(detail);
+}
+
+// 读取数据中心推送的JSON请求体（支持 gzip，解压后超过上限时中止）
+async function readDataCenterJson(request) {
+    const encoding = (request.headers.get('Content-Encoding') || 'identity').toLowerCase();
+    if (encoding === 'identity') return request.json();
+    if (encoding !== 'gzip') {
+        const error = new Error(`不支持的压缩编码: ${encoding}`);
+        error.status = 415;
+        throw error;
+    }
+
+    const reader = request.body.pipeThrough(new DecompressionStream('gzip')).getReader();
+    const chunks = [];
+    let total = 0;
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        total += value.byteLength;
+        if (total > SYNC_COMPRESSION.MAX_DECOMPRESSED_BYTES) {
+            await reader.cancel();
+            const error = new Error(`解压后大小超过上限 ${SYNC_COMPRESSION.MAX_DECOMPRESSED_BYTES} 字节`);
+            error.status = 413;
+            throw error;
+        }
+        chunks.push(value);
+    }
+
+    const merged = new Uint8Array(total);
+    let offset = 0;
+    for (const chunk of chunks) {
+        merged.set(chunk, offset);
+        offset += chunk.byteLength;
+    }
+    return JSON.parse(new TextDecoder().decode(merged));
+}
+
 // 向数据中心发送配置数据（带重试机制）
 async function syncConfigToDataCenter(retryCount = 0) {
     if (!DATA_CENTER_CONFIG.enabled) return;
@@ -765,14 +896,7 @@ async function syncConfigToDataCenter(retryCount = 0) {
             }
         };
 
-        const response = await fetch(`${DATA_CENTER_CONFIG.url}/worker-api/sync/config`, {
-            method: 'POST',
-            headers: {
-                'X-API-Key': DATA_CENTER_CONFIG.apiKey,
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(configData)
-        });
+        const response = await postToDataCenter('/worker-api/sync/config', configData);
 
         if (response.ok) {
             console.log('✅ 配置数据同步成功');
@@ -821,14 +945,7 @@ async function syncLogsToDataCenter(retryCount = 0) {
             logs: logsCopy
         };
 
-        const response = await fetch(`${DATA_CENTER_CONFIG.url}/worker-api/sync/logs`, {
-            method: 'POST',
-            headers: {
-                'X-API-Key': DATA_CENTER_CONFIG.apiKey,
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(logsData)
-        });
+        const response = await postToDataCenter('/worker-api/sync/logs', logsData);
 
         if (response.ok) {
             console.log(`✅ 日志数据同步成功 (${logsCopy.length}条日志)`);
@@ -892,14 +1009,7 @@ async function syncRequestStatsToDataCenter(retryCount = 0) {
         console.log('   - 总请求数:', totalRequests);
         console.log('   - 统计的IP数量:', Object.keys(byIp).length);
 
-        const response = await fetch(`${DATA_CENTER_CONFIG.url}/worker-api/sync/request-stats`, {
-            method: 'POST',
-            headers: {
-                'X-API-Key': DATA_CENTER_CONFIG.apiKey,
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(statsData)
-        });
+        const response = await postToDataCenter('/worker-api/sync/request-stats', statsData);
 
         if (response.ok) {
             console.log('✅ IP 请求统计数据同步成功');
@@ -1011,7 +1121,18 @@ async function handleDataCenterAPI(request, urlObj) {
     try {
         // 配置更新端点（接收数据中心主动推送）
         if (path === '/worker-api/config/update' && method === 'POST') {
-            const config = await request.json();
+            // Accept-Encoding：告知数据中心后续推送可以使用 gzip 压缩请求体
+            let config;
+            try {
+                config = await readDataCenterJson(request);
+            } catch (error) {
+                if (!error.status) throw error;
+                console.warn(`⚠️ [${clientIP}] 配置推送请求体无效: ${error.message}`);
+                return new Response(JSON.stringify({ success: false, error: error.message }), {
+                    status: error.status,
+                    headers: { 'Content-Type': 'application/json', 'Accept-Encoding': 'gzip' }
+                });
+            }
 
             console.log(`📦 [${clientIP}] 收到数据中心配置推送`);
             addMemoryLog('INFO', `数据中心配置推送`, {
@@ -1020,33 +1141,37 @@ async function handleDataCenterAPI(request, urlObj) {
                 timestamp: Date.now()
             });
 
-            // 立即更新内存中的配置
-            if (config.ua_configs) {
-                memoryCache.configCache.uaConfigs = config.ua_configs;
-                console.log(`✅ [${clientIP}] 已更新UA配置，共${config.ua_configs.length}条`);
-                addMemoryLog('INFO', `UA配置更新成功`, {
-                    source_ip: clientIP,
-                    count: config.ua_configs.length
-                });
-            }
-
-            if (config.ip_blacklist) {
-                memoryCache.configCache.ipBlacklist = config.ip_blacklist;
-                console.log(`✅ [${clientIP}] 已更新IP黑名单，共${config.ip_blacklist.length}条`);
-                addMemoryLog('INFO', `IP黑名单更新成功`, {
-                    source_ip: clientIP,
-                    count: config.ip_blacklist.length
+            // 立即更新内存中的配置（增量的基础版本不一致时返回 409，数据中心会改发完整快照）
+            if (!applyDataCenterConfig(config)) {
+                console.warn(`⚠️ [${clientIP}] 配置增量版本不匹配: 本地 v${memoryCache.configCache.version}, 基础 v${config.base_version}`);
+                return new Response(JSON.stringify({
+                    success: false,
+                    error: 'version_mismatch',
+                    config_version: memoryCache.configCache.version
+                }), {
+                    status: 409,
+                    headers: { 'Content-Type': 'application/json', 'Accept-Encoding': 'gzip' }
                 });
             }
 
-            memoryCache.configCache.lastUpdate = Date.now();
+            const uaCount = Object.keys(memoryCache.configCache.uaConfigs || {}).length;
+            const blacklistCount = getIpBlacklistCount();
+            console.log(`✅ [${clientIP}] 已更新配置 (${config.mode || 'full'}, v${memoryCache.configCache.version}): UA配置${uaCount}条, IP黑名单${blacklistCount}条`);
+            addMemoryLog('INFO', `配置更新成功`, {
+                source_ip: clientIP,
+                mode: config.mode || 'full',
+                version: memoryCache.configCache.version,
+                ua_count: uaCount,
+                blacklist_count: blacklistCount
+            });
 
             return new Response(JSON.stringify({
                 success: true,
                 message: '配置更新成功',
-                updated_at: memoryCache.configCache.lastUpdate
+                updated_at: memoryCache.configCache.lastUpdate,
+                config_version: memoryCache.configCache.version
             }), {
-                headers: { 'Content-Type': 'application/json' }
+                headers: { 'Content-Type': 'application/json', 'Accept-Encoding': 'gzip' }
             });
         }
 
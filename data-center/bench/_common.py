@@ -0,0 +1,119 @@
+"""
+基准测试公共工具
+
+每个脚本在导入 src 之前调用 setup_environment()：配置目录和 SQLite 数据库放在临时目录中，
+已设置 DATABASE_TYPE / DATABASE_URL 时使用指定的数据库（如 MySQL/PostgreSQL）。
+"""
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+from typing import Dict, List
+
+# data-center 目录（src 包所在目录）
+DATA_CENTER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_environment(log_level: str = "WARNING", **overrides) -> str:
+    """
+    准备基准测试环境，返回临时配置目录
+
+    overrides 为额外的配置项（环境变量，覆盖 src.config.settings 的默认值）
+    """
+    config_dir = tempfile.mkdtemp(prefix="dc-bench-")
+    os.environ["CONFIG_PATH"] = config_dir
+    os.environ["SQLITE_PATH"] = os.path.join(config_dir, "database.db")
+    os.environ["LOG_LEVEL"] = log_level
+    for key, value in overrides.items():
+        os.environ[key] = str(value)
+
+    if DATA_CENTER_DIR not in sys.path:
+        sys.path.insert(0, DATA_CENTER_DIR)
+    # 日志目录为 ./logs
+    os.chdir(config_dir)
+    return config_dir
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """耗时样本（毫秒）的分位数"""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"n": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def pick(ratio: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+    return {
+        "n": len(ordered),
+        "mean": statistics.mean(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1]
+    }
+
+
+def format_summary(samples_ms: List[float]) -> str:
+    """分位数的单行文本"""
+    s = summarize(samples_ms)
+    return (f"n={s['n']} mean={s['mean']:.2f}ms p50={s['p50']:.2f}ms "
+            f"p95={s['p95']:.2f}ms p99={s['p99']:.2f}ms max={s['max']:.2f}ms")
+
+
+# 合成日志的消息模板：(logger, 级别, 权重, 生成函数)
+_LOG_MESSAGES = (
+    ("uvicorn.access", "INFO", 40, lambda r: (
+        f'{r.randint(1, 223)}.{r.randint(0, 255)}.{r.randint(0, 255)}.{r.randint(1, 254)}:{r.randint(1024, 65000)}'
+        f' - "POST /worker-api/sync/logs HTTP/1.1" 202')),
+    ("src.services.worker_sync", "INFO", 20, lambda r: (
+        f"📝 Worker w-{r.randint(1, 8)} 日志流第 {r.randint(1, 400)} 块: 500 条, 提交 {r.random() * 40:.1f}ms")),
+    ("src.services.ingest_queue", "DEBUG", 25, lambda r: (
+        f"📥 写入队列: kind=logs worker=w-{r.randint(1, 8)} records={r.randint(1, 2000)} "
+        f"request_id=req-{r.getrandbits(48):012x}")),
+    ("src.services.worker_sync", "WARNING", 5, lambda r: (
+        f"⚠️ Worker https://w{r.randint(1, 8)}.example.workers.dev 响应超时，第 {r.randint(1, 3)} 次重试")),
+    ("src.tasks.scheduler", "INFO", 1, lambda r: "✅ 旧数据清理完成"),
+    ("src.services.stats_service", "ERROR", 2, lambda r: (
+        f"获取统计快照失败: (psycopg2.OperationalError) server closed the connection unexpectedly "
+        f"id={r.getrandbits(32)}")),
+    ("src.middleware.auth_middleware", "INFO", 7, lambda r: (
+        f"🔐 用户 admin 登录成功 ip=10.0.{r.randint(0, 255)}.{r.randint(0, 255)}")),
+)
+
+_TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "/app/src/services/stats_service.py", line 120, in get_stats_snapshot\n'
+    "    row = db.execute(query).one()\n"
+    "sqlalchemy.exc.OperationalError: server closed the connection\n"
+)
+
+
+def generate_logs(directory: str, segment_mb: float = 10, backups: int = 5, seed: int = 7) -> List[str]:
+    """
+    生成 app.log 及 backups 个轮转文件（app.log.1 ... 最旧的编号最大），每个约 segment_mb MB
+
+    格式与 RotatingFileHandler 写出的 app.log 相同，时间从最旧的文件到 app.log 递增。
+    Returns:
+        文件名列表（从旧到新）
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    weights = [message[2] for message in _LOG_MESSAGES]
+    moment = datetime.datetime(2026, 10, 10)
+    limit = int(segment_mb * 1024 * 1024)
+
+    filenames = [f"app.log.{n}" for n in range(backups, 0, -1)] + ["app.log"]
+    for filename in filenames:
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+            size = 0
+            while size < limit - 300:
+                moment += datetime.timedelta(milliseconds=rng.randint(1, 400))
+                name, level, _, build = rng.choices(_LOG_MESSAGES, weights)[0]
+                line = f"{moment:%Y-%m-%d %H:%M:%S},{moment.microsecond // 1000:03d} - {name} - {level} - {build(rng)}\n"
+                if level == "ERROR":
+                    line += _TRACEBACK
+                f.write(line)
+                size += len(line.encode("utf-8"))
+    return filenames
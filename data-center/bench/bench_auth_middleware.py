@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+认证中间件开销基准测试
+
+登录后对比需要认证的 GET /api/stats/cache-metrics 在两种配置下的延迟：
+- 缓存关闭：每个请求都查询会话表和用户表验证令牌（SESSION_CACHE_SIZE=0，会话缓存之前的实现）
+- 缓存开启：已验证的令牌从会话缓存中取用户（默认配置）
+以不需要认证的 /health 为基准得到认证本身的开销，并统计每个请求执行的 SQL 语句数。
+
+请求通过 ASGI 直接发给应用，不经过网络。
+
+用法（在 data-center 目录下）：
+  python bench/bench_auth_middleware.py
+  python bench/bench_auth_middleware.py --requests 5000 --clients 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from _common import setup_environment, format_summary, summarize
+
+BENCH_PASSWORD = "bench-password-1"
+
+
+async def measure(client, path: str, headers: dict, requests: int, clients: int):
+    """顺序请求的延迟样本（毫秒）和 clients 个并发客户端的吞吐量（请求/秒）"""
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, (path, response.status_code, response.text)
+
+    async def worker():
+        for _ in range(requests // clients):
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(clients)])
+    throughput = (requests // clients) * clients / (time.perf_counter() - started)
+    return samples, throughput
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="认证中间件开销基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="每种配置的请求数")
+    parser.add_argument("--clients", type=int, default=20, help="吞吐量测试的并发客户端数")
+    args = parser.parse_args()
+
+    setup_environment()
+    import httpx
+    from sqlalchemy import event
+    from src.database import engine
+    from src.main import app
+    from src.services.session_cache import get_session_cache
+    from src.utils.reset_password import reset_password
+
+    statements = 0
+
+    def count_statement(*_):
+        nonlocal statements
+        statements += 1
+
+    async with app.router.lifespan_context(app):
+        # 管理员初始密码是随机生成的，重置为已知密码后登录
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert reset_password("admin", BENCH_PASSWORD)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/auth/login", json={"username": "admin", "password": BENCH_PASSWORD})
+            assert response.status_code == 200, response.text
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            # 预热
+            for _ in range(50):
+                await client.get("/health")
+                await client.get("/api/stats/cache-metrics", headers=headers)
+            public, _ = await measure(client, "/health", {}, args.requests, args.clients)
+            public_p50 = summarize(public)["p50"]
+            print(f"/health（无需认证）        {format_summary(public)}")
+
+            event.listen(engine, "before_cursor_execute", count_statement)
+            cache = get_session_cache()
+            default_size = cache.max_entries
+            for label, size in (("缓存关闭", 0), ("缓存开启", default_size)):
+                cache.max_entries = size
+                cache.revoke()
+                statements = 0
+                samples, throughput = await measure(client, "/api/stats/cache-metrics", headers,
+                                                    args.requests, args.clients)
+                total = args.requests + (args.requests // args.clients) * args.clients
+                print(
+                    f"{label} /api/stats/cache-metrics {format_summary(samples)} | "
+                    f"认证开销 p50 {summarize(samples)['p50'] - public_p50:.2f}ms | "
+                    f"{args.clients} 并发 {throughput:.0f} 请求/秒 | 每请求 SQL {statements / total:.2f} 条"
+                )
+            event.remove(engine, "before_cursor_execute", count_statement)
+            print(f"会话缓存指标: {cache.get_metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
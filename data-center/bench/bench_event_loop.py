@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+事件循环阻塞负载测试
+
+后台持续执行一个耗时的统计查询（get_top_violation_ips：对 ip_violation_stats 全表 GROUP BY），
+同时用多个并发客户端请求 /health，统计 /health 的延迟分位数：
+- idle：没有后台查询
+- offloaded：查询通过数据库线程池执行（当前实现）
+- on-loop：直接在事件循环中调用同步查询（迁移到线程池之前的实现）
+
+请求通过 ASGI 直接发给应用（与服务端在同一个事件循环中），不经过网络。
+
+用法（在 data-center 目录下）：
+  python bench/bench_event_loop.py
+  python bench/bench_event_loop.py --rows 1000000 --seconds 10 --clients 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from _common import setup_environment, format_summary, summarize
+
+
+def seed_violations(rows: int):
+    """生成 ip_violation_stats 数据（约 rows/20 个不同IP）"""
+    from src.database import engine
+    from src.models.stats import IPViolationStats
+
+    random.seed(4)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    table = IPViolationStats.__table__
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            batch.append({
+                "worker_id": f"w{i % 8}",
+                "ip_address": f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{i % 20}",
+                "date_hour": now - timedelta(hours=i % (24 * 90)),
+                "violation_count": random.randint(1, 50),
+                "is_banned": "no"
+            })
+            if len(batch) >= 20000:
+                conn.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+
+
+async def run_mode(app, service, mode: str, seconds: float, clients: int):
+    import httpx
+
+    stop = asyncio.Event()
+    heavy_runs = 0
+    heavy_ms = []
+
+    async def heavy():
+        nonlocal heavy_runs
+        while not stop.is_set():
+            started = time.perf_counter()
+            if mode == "offloaded":
+                await service.get_top_violation_ips(limit=10)
+            else:
+                # 同步查询直接在事件循环中执行
+                service.get_top_violation_ips.__wrapped__(service, limit=10)
+            heavy_ms.append((time.perf_counter() - started) * 1000)
+            heavy_runs += 1
+            await asyncio.sleep(0)
+
+    latencies = []
+
+    async def probe(client):
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = await client.get("/health")
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200
+            await asyncio.sleep(0.005)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tasks = [asyncio.create_task(probe(client)) for _ in range(clients)]
+        if mode != "idle":
+            tasks.append(asyncio.create_task(heavy()))
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    heavy_info = ""
+    if heavy_runs:
+        heavy_info = f" | 后台查询 {heavy_runs} 次, 每次 p50={summarize(heavy_ms)['p50']:.0f}ms"
+    print(f"{mode:>9}: /health {format_summary(latencies)}{heavy_info}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="事件循环阻塞负载测试")
+    parser.add_argument("--rows", type=int, default=500000, help="ip_violation_stats 行数")
+    parser.add_argument("--seconds", type=float, default=8, help="每种模式的测试时长")
+    parser.add_argument("--clients", type=int, default=10, help="并发请求 /health 的客户端数")
+    args = parser.parse_args()
+
+    setup_environment()
+    from src.database import init_db
+    from src.main import app
+    from src.services.stats_service import StatsService
+
+    await init_db()
+    started = time.perf_counter()
+    seed_violations(args.rows)
+    print(f"已生成 {args.rows} 行 ip_violation_stats（{time.perf_counter() - started:.1f}s）")
+
+    service = StatsService()
+    for mode in ("idle", "offloaded", "on-loop"):
+        await run_mode(app, service, mode, args.seconds, args.clients)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Worker日志批量写入基准测试
+
+对比逐条去重写入（每条日志一次 SELECT，旧实现）与批量写入（process_worker_logs：
+一次按键查询去重 + executemany）的吞吐量（条/秒）。
+
+用法（在 data-center 目录下）：
+  python bench/bench_log_ingest.py                         SQLite，1k/10k/100k 条
+  python bench/bench_log_ingest.py --sizes 1000,5000       指定批量大小
+  python bench/bench_log_ingest.py --legacy-max 0          不运行逐条写入（大批量时很慢）
+  DATABASE_TYPE=mysql MYSQL_HOST=... python bench/bench_log_ingest.py   使用 MySQL（需要空库）
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from _common import setup_environment
+
+
+def build_logs(prefix: str, count: int):
+    """生成Worker推送格式的日志"""
+    return [
+        {
+            "id": f"{prefix}-{i}",
+            "timestamp": 1760000000000 + i,
+            "level": "info",
+            "message": f"GET /api/v2/comment/{i} 200",
+            "data": {"ip": f"10.0.{i // 256 % 256}.{i % 256}", "userAgent": "bench/1.0"}
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_ingest(worker_id: str, logs_data) -> int:
+    """旧实现：每条日志先按 (request_id, worker_id) 查询是否存在，再逐条 add，最后提交一次"""
+    from src.database import get_db_sync
+    from src.models.logs import SystemLog
+
+    db = get_db_sync()
+    saved = 0
+    for entry in logs_data:
+        log_id = entry.get("id")
+        exists = db.query(SystemLog).filter(
+            SystemLog.request_id == log_id,
+            SystemLog.worker_id == worker_id
+        ).first()
+        if exists:
+            continue
+        data = entry.get("data", {})
+        db.add(SystemLog(
+            worker_id=worker_id,
+            level=entry.get("level", "INFO").upper(),
+            message=entry.get("message", ""),
+            details=data,
+            category="worker_sync",
+            source=f"worker-{worker_id}",
+            request_id=log_id,
+            ip_address=data.get("ip"),
+            user_agent=data.get("userAgent"),
+            created_at=datetime.fromtimestamp(entry["timestamp"] / 1000)
+        ))
+        saved += 1
+    db.commit()
+    db.close()
+    return saved
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Worker日志批量写入基准测试")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="批量大小，逗号分隔")
+    parser.add_argument("--legacy-max", type=int, default=10000, help="逐条写入只运行不超过该大小的批量")
+    args = parser.parse_args()
+
+    setup_environment()
+    from src.config import settings
+    from src.database import init_db, run_db
+    from src.services.worker_sync import WorkerSyncService
+
+    await init_db()
+    service = WorkerSyncService()
+    print(f"数据库: {settings.database_url.split('://')[0]}")
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        if size <= args.legacy_max:
+            logs = build_logs(f"legacy{size}", size)
+            started = time.perf_counter()
+            await run_db(legacy_ingest, "bench-legacy", logs)
+            elapsed = time.perf_counter() - started
+            print(f"逐条写入 {size:>7} 条: {elapsed * 1000:9.1f}ms  {size / elapsed:9.0f} 条/秒")
+
+        logs = build_logs(f"bulk{size}", size)
+        started = time.perf_counter()
+        ok = await service.process_worker_logs("bench-bulk", logs)
+        elapsed = time.perf_counter() - started
+        print(f"批量写入 {size:>7} 条: {elapsed * 1000:9.1f}ms  {size / elapsed:9.0f} 条/秒  ok={ok}")
+
+        # 重推同一批（全部重复）：只有一次按键查询，没有写入
+        started = time.perf_counter()
+        await service.process_worker_logs("bench-bulk", logs)
+        elapsed = time.perf_counter() - started
+        print(f"重复推送 {size:>7} 条: {elapsed * 1000:9.1f}ms  {size / elapsed:9.0f} 条/秒")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
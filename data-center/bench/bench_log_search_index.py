@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+日志全文索引基准测试
+
+生成 app.log + 5 个轮转文件（默认每个 10MB）的合成日志，对比：
+- 逐行扫描：所有文件逐行转小写后查找关键词（索引之前 /api/logs/search 的实现）
+- 全文索引：LogSearchIndex.search 的第一页和较深的一页（每页 200 条）
+并输出建立索引和从磁盘加载索引的耗时。为了单独测量索引的效果，搜索只使用 1 个进程
+（多进程扫描见 bench_log_search_parallel.py）。
+
+用法（在 data-center 目录下）：
+  python bench/bench_log_search_index.py
+  python bench/bench_log_search_index.py --segment-mb 20 --queries "10.0.17,psycopg2"
+"""
+import argparse
+import os
+import time
+
+from _common import setup_environment, generate_logs
+
+DEFAULT_QUERIES = (
+    "10.0.17", "sqlalchemy.exc", "worker-api/sync", "req-3f2a", "psycopg2", "OperationalError",
+    "w-3 日志流", "旧数据清理", "INFO", "zzz-no-match"
+)
+
+
+def legacy_scan(log_dir: str, query: str):
+    """逐行扫描所有 app.log* 文件（不区分大小写），返回 (文件名, 行号) 列表"""
+    needle = query.lower()
+    matches = []
+    for filename in sorted(f for f in os.listdir(log_dir) if f.startswith("app.log")):
+        with open(os.path.join(log_dir, filename), "rt", encoding="utf-8", errors="ignore") as f:
+            for line_num, line in enumerate(f, 1):
+                if needle in line.lower():
+                    matches.append((filename, line_num))
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志全文索引基准测试")
+    parser.add_argument("--segment-mb", type=float, default=10, help="每个日志文件的大小（MB）")
+    parser.add_argument("--queries", default=",".join(DEFAULT_QUERIES), help="搜索关键词，逗号分隔")
+    parser.add_argument("--page", type=int, default=5, help="较深一页的页码（从 0 开始）")
+    parser.add_argument("--verify-max", type=int, default=50000, help="匹配数不超过该值时检查索引结果与扫描一致")
+    args = parser.parse_args()
+
+    config_dir = setup_environment(LOG_SEARCH_WORKERS=1)
+    from src.services.log_index import LogSearchIndex
+
+    log_dir = os.path.join(config_dir, "bench-logs")
+    started = time.perf_counter()
+    generate_logs(log_dir, args.segment_mb)
+    total_mb = sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir)) / 1024 / 1024
+    print(f"已生成 {total_mb:.0f}MB 日志（{time.perf_counter() - started:.1f}s）")
+
+    index = LogSearchIndex(log_dir)
+    started = time.perf_counter()
+    index.refresh()
+    print(f"建立索引: {time.perf_counter() - started:.2f}s")
+
+    index = LogSearchIndex(log_dir)
+    started = time.perf_counter()
+    index.refresh()
+    print(f"从磁盘加载索引: {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    page_size = 200
+    for query in args.queries.split(","):
+        started = time.perf_counter()
+        scanned = legacy_scan(log_dir, query)
+        scan_ms = (time.perf_counter() - started) * 1000
+
+        first = index.search(query, 0, page_size)
+        deep = index.search(query, args.page * page_size, page_size)
+
+        verified = "-"
+        if len(scanned) <= args.verify_max:
+            everything = index.search(query, 0, max(len(scanned), 1))
+            found = sorted((r["file"], r["line_num"]) for r in everything["results"])
+            verified = str(found == sorted(scanned) and not everything["has_more"])
+
+        print(
+            f"{query!r:<20} 匹配 {len(scanned):>7} 行 | 逐行扫描 {scan_ms:7.0f}ms | "
+            f"索引 第1页 {first['took_ms']:7.1f}ms 第{args.page + 1}页 {deep['took_ms']:7.1f}ms | 结果一致 {verified}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+日志多进程搜索基准测试
+
+生成 app.log + 5 个轮转文件（默认每个 10MB）的合成日志，分别以不同的 LOG_SEARCH_WORKERS
+执行需要扫描的查询（正则、索引无法缩小范围的关键词），输出耗时中位数和相对 1 个进程的加速比。
+每次切换进程数前调用 shutdown_search_pool()，之后按新配置重新创建进程池。
+
+最后按 1 个进程逐个扫描每个日志文件，给出理想加速比（各文件扫描耗时之和 / 最慢的文件），
+用于在核数较少的机器上判断结果：进程数超过 CPU 核数时不会再有提升。
+
+用法（在 data-center 目录下）：
+  python bench/bench_log_search_parallel.py
+  python bench/bench_log_search_parallel.py --workers 1,2,4,8 --repeat 5
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+
+from _common import setup_environment, generate_logs
+
+# (查询, 是否正则)
+QUERIES = (
+    ("error", False),
+    ("zzz-no-match", False),
+    ("req-5e54", False),
+    (r"w-\d 日志流第 2\d\d 块", True),
+    (r"timeout|refused|closed", True),
+    (r"id=\d+7$", True),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志多进程搜索基准测试")
+    parser.add_argument("--segment-mb", type=float, default=10, help="每个日志文件的大小（MB）")
+    parser.add_argument("--workers", default="1,2,4", help="LOG_SEARCH_WORKERS 取值，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每个查询重复次数（取中位数）")
+    args = parser.parse_args()
+
+    config_dir = setup_environment()
+    from src.config import settings
+    from src.services import log_index
+    from src.services.log_index import LogSearchIndex, shutdown_search_pool
+
+    log_dir = os.path.join(config_dir, "bench-logs")
+    generate_logs(log_dir, args.segment_mb)
+    index = LogSearchIndex(log_dir)
+    index.refresh()
+    print(f"CPU 核数: {os.cpu_count()}，日志文件 {len(index.list_files())} 个")
+
+    baseline = {}
+    for workers in (int(value) for value in args.workers.split(",")):
+        settings.LOG_SEARCH_WORKERS = workers
+        shutdown_search_pool()
+        # 预热：创建进程池并启动子进程
+        index.search("warmup", 0, 10, True)
+
+        for query, regex in QUERIES:
+            samples = []
+            for _ in range(args.repeat):
+                result = index.search(query, 0, 200, regex)
+                samples.append(result["took_ms"])
+            took = statistics.median(samples)
+            baseline.setdefault((query, regex), took)
+            print(
+                f"workers={workers} {query!r:<28} 正则={regex!s:<5} 中位数 {took:8.1f}ms "
+                f"（实际 {result['workers']} 个进程，{len(result['results'])} 条）"
+                f" 加速比 {baseline[(query, regex)] / took:.2f}x"
+            )
+    shutdown_search_pool()
+
+    print("按文件扫描（1 个进程）:")
+    for query, regex in QUERIES:
+        needle = query.lower()
+        matcher = re.compile(query, re.IGNORECASE | re.MULTILINE) if regex else None
+        per_file = []
+        for _, path, key, ranges in index._scan_plans(needle, not regex):
+            started = time.perf_counter()
+            log_index.scan_segment(path, key, ranges, needle, matcher, 201)
+            per_file.append((time.perf_counter() - started) * 1000)
+        if per_file:
+            print(f"  {query!r:<28} 各文件 {[round(ms) for ms in per_file]}ms "
+                  f"理想加速比 {sum(per_file) / max(per_file):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
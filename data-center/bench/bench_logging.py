@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+日志写入延迟基准测试
+
+在 INFO 和 DEBUG 级别下对比两种日志配置：
+- direct：控制台和 app.log 处理器直接挂在根 logger 上，调用方同步完成格式化、写盘和轮转检查（队列之前的实现）
+- queue：setup_logging 的有界队列，处理器在后台线程中执行（当前实现）
+
+测量两项：
+- 调用方耗时：一次请求处理中典型的 6 条日志（含一条较大的 DEBUG 数据）的耗时分位数
+- 端到端：通过 ASGI 直接向应用发送 POST /worker-api/sync/request-stats 的延迟分位数
+
+控制台输出写入临时目录中的文件（不占用终端），两种配置都不输出结构化日志 app.jsonl。
+
+用法（在 data-center 目录下）：
+  python bench/bench_logging.py
+  python bench/bench_logging.py --calls 5000 --requests 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+
+from _common import setup_environment, format_summary
+
+BY_IP = {f"10.0.{i // 255}.{i % 255}": {"total_count": i, "violation_count": 0} for i in range(200)}
+
+
+def report(text: str):
+    """结果输出到终端（sys.stdout 已重定向到文件）"""
+    print(text, file=sys.__stdout__, flush=True)
+
+
+def configure(mode: str, log_dir: str, level: str):
+    """按模式配置根 logger"""
+    from src.utils import logger_setup
+
+    if mode == "queue":
+        logger_setup.setup_logging(log_dir, level, json_enabled=False)
+        return
+
+    logger_setup.stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(getattr(logging, level))
+    formatter = logging.Formatter(
+        '%(asctime)s,%(msecs)03d - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(getattr(logging, level))
+    console_handler.setFormatter(formatter)
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, logger_setup.LOG_FILE_NAME),
+        maxBytes=logger_setup.DEFAULT_LOG_SIZE_MB * 1024 * 1024,
+        backupCount=logger_setup.DEFAULT_LOG_BACKUPS,
+        encoding='utf-8'
+    )
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+    root.addHandler(console_handler)
+    root.addHandler(file_handler)
+
+
+def measure_calls(calls: int) -> list:
+    """调用方记录一组日志的耗时（毫秒），每组之间间隔 1ms"""
+    logger = logging.getLogger("src.services.worker_sync")
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        logger.info("📊 处理Worker w-1 的IP请求统计数据")
+        logger.debug("📊 接收到的统计数据: %s", {"by_ip": BY_IP})
+        logger.info(f"📊 总请求数: {123}")
+        logger.info(f"📊 by_ip数据类型: {type(BY_IP)}, 数据长度: {len(BY_IP)}")
+        logger.info(f"📊 更新RequestStats: 总请求={1}, 活跃IP={len(BY_IP)}, 违规={0}")
+        logger.info("✅ Worker IP请求统计数据保存成功: w-1, 共upsert 200 条IP统计, 耗时 3ms")
+        samples.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.001)
+    return samples
+
+
+async def measure_requests(client, requests: int) -> list:
+    """POST /worker-api/sync/request-stats 的延迟（毫秒）"""
+    body = {"worker_id": "w-1", "timestamp": 1, "stats": {"by_ip": BY_IP}}
+    headers = {"X-API-Key": "bench"}
+    samples = []
+    for i in range(requests + 50):
+        started = time.perf_counter()
+        response = await client.post("/worker-api/sync/request-stats", json=body, headers=headers)
+        assert response.status_code == 202, response.text
+        # 前 50 次为预热
+        if i >= 50:
+            samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+    return samples
+
+
+async def main():
+    import httpx
+
+    parser = argparse.ArgumentParser(description="日志写入延迟基准测试")
+    parser.add_argument("--calls", type=int, default=3000, help="调用方测量的日志组数")
+    parser.add_argument("--requests", type=int, default=1000, help="端到端测量的请求数")
+    args = parser.parse_args()
+
+    config_dir = setup_environment()
+    log_dir = os.path.join(config_dir, "logs")
+    sys.stdout = open(os.path.join(config_dir, "console.log"), "w", encoding="utf-8")
+    from src.main import app
+    from src.utils.logger_setup import get_logging_stats, stop_logging
+
+    # 应用关闭时会关闭数据库线程池，所有测量都在同一个生命周期内进行
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for level in ("INFO", "DEBUG"):
+                for mode in ("direct", "queue"):
+                    configure(mode, log_dir, level)
+                    samples = measure_calls(args.calls)
+                    dropped = get_logging_stats()["dropped_total"] if mode == "queue" else "-"
+                    report(f"{level:<5} {mode:<6} 调用方（每组 6 条）{format_summary(samples)} 丢弃 {dropped}")
+
+                    configure(mode, log_dir, level)
+                    samples = await measure_requests(client, args.requests)
+                    report(f"{level:<5} {mode:<6} request-stats 请求 {format_summary(samples)}")
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+仪表盘汇总统计基准测试
+
+按天数生成合成的 request_stats / ip_violation_stats 数据（每小时每个Worker一行），对比：
+- 全表聚合：汇总表为空时 get_summary / 统计快照扫描全部原始数据（汇总表之前的实现）
+- 汇总表：compact_stats_rollups 之后只读取汇总表 + 今天的原始数据
+并检查两种方式的结果一致。
+
+用法（在 data-center 目录下）：
+  python bench/bench_stats_rollup.py                     1/30/365 天
+  python bench/bench_stats_rollup.py --days 1,365 --workers 50
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from _common import setup_environment
+
+SNAPSHOT_FIELDS = ("total_requests", "successful_requests", "blocked_requests", "error_requests",
+                   "violation_ips", "temp_banned")
+# get_summary 中的系统资源字段（每次调用都会变化，不参与比较）
+SYSTEM_FIELDS = ("memory_usage", "cpu_usage", "uptime")
+
+
+def reset_and_seed(days: int, workers: int):
+    """清空统计表并生成 days 天的数据"""
+    from src.database import engine
+    from src.models.stats import RequestStats, IPViolationStats, StatsDailyRollup, StatsRollupTotal
+
+    random.seed(days)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    with engine.begin() as conn:
+        for model in (RequestStats, IPViolationStats, StatsDailyRollup, StatsRollupTotal):
+            conn.execute(model.__table__.delete())
+
+        hours = days * 24
+        conn.execute(RequestStats.__table__.insert(), [
+            {
+                "worker_id": f"w{w}", "date_hour": now - timedelta(hours=h),
+                "total_requests": 100, "successful_requests": 90, "blocked_requests": 8, "error_requests": 2,
+                "avg_response_time": float(h % 7 + 1), "active_ips_count": 3
+            }
+            for h in range(hours) for w in range(workers)
+        ])
+        conn.execute(IPViolationStats.__table__.insert(), [
+            {
+                "worker_id": f"w{w}", "ip_address": f"10.{random.randint(0, 40)}.{random.randint(0, 255)}.1",
+                "date_hour": now - timedelta(hours=h), "violation_count": 2,
+                "is_banned": "temp" if random.random() < 0.1 else "no"
+            }
+            for h in range(hours) for w in range(workers)
+        ])
+    return hours * workers
+
+
+async def timed(func, repeat: int):
+    """多次调用的平均耗时（毫秒）和最后一次的结果"""
+    result = None
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = await func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="仪表盘汇总统计基准测试")
+    parser.add_argument("--days", default="1,30,365", help="数据天数，逗号分隔")
+    parser.add_argument("--workers", type=int, default=20, help="Worker数量（每小时每个Worker一行）")
+    parser.add_argument("--repeat", type=int, default=10, help="每种方式重复次数")
+    args = parser.parse_args()
+
+    setup_environment()
+    from src.database import init_db
+    from src.services.stats_service import StatsService
+
+    await init_db()
+    service = StatsService()
+
+    for days in (int(value) for value in args.days.split(",")):
+        rows = reset_and_seed(days, args.workers)
+
+        scan_summary_ms, scan_summary = await timed(service.get_summary, args.repeat)
+        scan_snapshot_ms, scan_snapshot = await timed(service.get_stats_snapshot, args.repeat)
+
+        started = time.perf_counter()
+        await service.compact_stats_rollups()
+        compact_ms = (time.perf_counter() - started) * 1000
+
+        rollup_summary_ms, rollup_summary = await timed(service.get_summary, args.repeat)
+        rollup_snapshot_ms, rollup_snapshot = await timed(service.get_stats_snapshot, args.repeat)
+
+        diffs = [
+            key for key in scan_summary
+            if key not in SYSTEM_FIELDS and scan_summary[key] != rollup_summary.get(key)
+        ] + [
+            field for field in SNAPSHOT_FIELDS
+            if getattr(scan_snapshot, field) != getattr(rollup_snapshot, field)
+        ]
+        print(
+            f"{days:>4} 天（每表 {rows} 行）: get_summary 全表 {scan_summary_ms:7.1f}ms → 汇总表 {rollup_summary_ms:6.1f}ms | "
+            f"统计快照 全表 {scan_snapshot_ms:7.1f}ms → 汇总表 {rollup_snapshot_ms:6.1f}ms | "
+            f"压缩 {compact_ms:.0f}ms | 结果不一致的字段: {diffs or '无'}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
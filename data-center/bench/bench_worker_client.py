@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Worker HTTP客户端基准测试
+
+本地启动一个 HTTPS 替身Worker（自签名证书），用 get_worker_health_status 测量每次调用的耗时：
+- 每次调用新建客户端（未启动共享客户端时的退回路径，即共享客户端之前的实现）：每次都要 TCP + TLS 握手
+- 共享客户端 HTTP/1.1 keep-alive
+- 共享客户端 HTTP/2（替身Worker使用 hypercorn 时才会协商到 HTTP/2，否则退回 HTTP/1.1）
+
+用法（在 data-center 目录下）：
+  python bench/bench_worker_client.py
+  python bench/bench_worker_client.py --calls 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from _common import setup_environment, format_summary
+
+HEALTH_BODY = b'{"status":"ok","worker_id":"bench","requests_total":1}'
+
+
+async def stub_worker(scope, receive, send):
+    """替身Worker：所有请求都返回健康状态"""
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": HEALTH_BODY})
+
+
+def make_certificate(directory: str) -> tuple:
+    """生成 127.0.0.1 的自签名证书，返回 (证书路径, 私钥路径)"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=7))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "worker-cert.pem")
+    key_path = os.path.join(directory, "worker-key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def serve(port: int, cert_path: str, key_path: str):
+    """运行替身Worker（子进程入口）：优先 hypercorn（支持 HTTP/2），否则 uvicorn（HTTP/1.1）"""
+    try:
+        from hypercorn.asyncio import serve as hypercorn_serve
+        from hypercorn.config import Config
+    except ImportError:
+        import uvicorn
+        uvicorn.run(stub_worker, host="127.0.0.1", port=port, log_level="error",
+                    ssl_certfile=cert_path, ssl_keyfile=key_path)
+        return
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.certfile = cert_path
+    config.keyfile = key_path
+    config.loglevel = "ERROR"
+    asyncio.run(hypercorn_serve(stub_worker, config))
+
+
+def wait_for_port(port: int, timeout: float = 15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"替身Worker未能在 {timeout}s 内启动")
+
+
+async def measure(service, endpoint: str, label: str, calls: int, concurrency: int):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        result = await service.get_worker_health_status(endpoint)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert result["status"] == "healthy", result
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[service.get_worker_health_status(endpoint) for _ in range(concurrency)])
+    burst_ms = (time.perf_counter() - started) * 1000
+    assert all(result["status"] == "healthy" for result in results)
+
+    print(f"{label:<26} 顺序 {format_summary(samples)} | {concurrency} 并发 {burst_ms:.0f}ms")
+
+
+async def run(args, endpoint: str):
+    from src.config import settings
+    from src.database import init_db
+    from src.services.http_client import start_worker_client, close_worker_client, _http2_available
+    from src.services.worker_sync import WorkerSyncService
+
+    await init_db()
+    service = WorkerSyncService()
+    # 预热（导入、配置读取）
+    await service.get_worker_health_status(endpoint)
+
+    await measure(service, endpoint, "每次新建客户端", args.calls, args.concurrency)
+
+    settings.WORKER_HTTP2 = False
+    await start_worker_client()
+    await measure(service, endpoint, "共享客户端 HTTP/1.1", args.calls, args.concurrency)
+    await close_worker_client()
+
+    if _http2_available():
+        settings.WORKER_HTTP2 = True
+        await start_worker_client()
+        await measure(service, endpoint, "共享客户端 HTTP/2", args.calls, args.concurrency)
+        await close_worker_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker HTTP客户端基准测试")
+    parser.add_argument("--calls", type=int, default=300, help="顺序调用次数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发调用数")
+    parser.add_argument("--port", type=int, default=18443, help="替身Worker端口")
+    parser.add_argument("--serve", nargs=3, metavar=("PORT", "CERT", "KEY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(int(args.serve[0]), args.serve[1], args.serve[2])
+        return
+
+    config_dir = setup_environment()
+    cert_path, key_path = make_certificate(config_dir)
+    # httpx 通过 SSL_CERT_FILE 信任替身Worker的自签名证书
+    os.environ["SSL_CERT_FILE"] = cert_path
+
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(args.port), cert_path, key_path]
+    )
+    try:
+        wait_for_port(args.port)
+        asyncio.run(run(args, f"https://127.0.0.1:{args.port}"))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
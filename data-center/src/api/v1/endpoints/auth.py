@@ -6,7 +6,9 @@ from fastapi import APIRouter, HTTPException, Depends, Request, Response, Header
 from pydantic import BaseModel
 from datetime import timedelta
 
+from src.config import settings
 from src.services.auth_service import AuthService
+from src.services.password_hasher import PasswordHasherBusy
 from src.models.auth import User
 from src.utils import create_access_token, verify_token
 
@@ -39,11 +41,20 @@ class LoginResponse(BaseModel):
 def get_auth_service() -> AuthService:
     return AuthService()
 
+def _busy_response(error: PasswordHasherBusy) -> HTTPException:
+    """密码哈希线程池繁忙：返回429，并通过 Retry-After 告知重试间隔"""
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
+
 async def get_current_user(
+    request: Request,
     authorization: Optional[str] = Header(None, alias="authorization"),
     auth_service: AuthService = Depends(get_auth_service)
 ) -> User:
-    """获取当前用户（JWT认证）"""
+    """获取当前用户（JWT认证；AuthMiddleware 已验证过会话时直接使用其结果）"""
     import logging
     logger = logging.getLogger(__name__)
 
@@ -67,6 +78,11 @@ async def get_current_user(
         logger.warning(f"🔐 认证失败: JWT令牌缺少用户信息")
         raise HTTPException(status_code=401, detail="令牌格式错误")
 
+    # AuthMiddleware 已经按会话验证过同一个用户，不需要再查询数据库
+    user = getattr(request.state, "current_user", None)
+    if user is not None and user.id == user_id:
+        return user
+
     # 从数据库获取用户信息（验证用户是否仍然存在）
     user = await auth_service.get_user_by_id(user_id)
     if not user:
@@ -121,6 +137,8 @@ async def change_password(
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise _busy_response(e)
     except Exception as e:
         logger.error(f"❌ 修改密码异常: {e}", exc_info=True)
         raise HTTPException(status_code=400, detail=f"修改密码失败: {str(e)}")
@@ -225,6 +243,9 @@ async def login(
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        logger.warning(f"⚠️ 登录请求过多: {login_data.username}")
+        raise _busy_response(e)
     except Exception as e:
         logger.error(f"❌ 登录异常: {e}", exc_info=True)
         # 使用400而不是500，因为这通常是客户端问题
@@ -1,11 +1,12 @@
 """
 配置管理API端点
 """
-from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from src.services.config_service import ConfigService
+from src.services.config_service import ConfigService, config_etag
 from src.models.config import UAConfig, IPBlacklist
 from src.config import settings
 
@@ -256,12 +257,28 @@ async def remove_ip_from_blacklist(
 
 @router.get("/export", response_model=Dict[str, Any])
 async def export_config_for_worker(
+    since: Optional[int] = Query(None, description="Worker当前的配置版本，返回该版本之后的增量"),
+    if_none_match: Optional[str] = Header(None),
     config_service: ConfigService = Depends(get_config_service),
     api_key: str = Depends(verify_api_key)
 ):
-    """导出配置给Worker使用"""
+    """
+    导出配置给Worker使用
+
+    - 响应带 ETag（配置版本号），Worker携带 If-None-Match 且版本未变化时返回 304
+    - 提供 since 且在增量历史范围内时返回增量，否则返回完整快照
+    """
     try:
-        config_data = await config_service.export_config_for_worker()
-        return config_data
+        config_data = await config_service.get_worker_config(since_version=since)
+        if not config_data:
+            raise HTTPException(status_code=500, detail="导出配置失败")
+
+        etag = config_etag(config_data["version"])
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        return JSONResponse(content=config_data, headers={"ETag": etag})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
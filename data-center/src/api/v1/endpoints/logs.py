@@ -2,17 +2,22 @@
 日志管理API端点 - 参考 emby-toolkit 简化版本
 """
 import os
-import re
-import gzip
 import logging
 from typing import List, Dict, Any, Optional
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends, Query, Response
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from src.api.v1.endpoints.auth import get_current_user
 from src.models.auth import User
+from src.services.log_index import get_log_index
+from src.services.log_records import RecordFilter, search_records
+from src.services.log_context_search import MAX_CONTEXT_LINES, MAX_MATCHES_PER_REQUEST, search_context
+from src.services.log_viewer import (
+    MAX_PAGE_LINES, locate_page, iter_page, iter_lines_reversed, follow_log
+)
+from src.utils import logger_setup
 
 logger = logging.getLogger(__name__)
 
@@ -37,11 +42,7 @@ class LogBlock(BaseModel):
 
 def get_log_directory() -> str:
     """获取日志目录路径"""
-    # 在Docker环境中使用/app/config/logs，本地开发使用./logs
-    if os.path.exists("/app/config"):
-        log_dir = "/app/config/logs"
-    else:
-        log_dir = os.path.join(os.getcwd(), "logs")
+    log_dir = logger_setup.get_log_directory()
 
     if not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
@@ -78,12 +79,8 @@ async def list_log_files(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"无法读取日志文件列表: {str(e)}")
 
-@router.get("/view")
-async def view_log_file(
-    filename: str = Query(..., description="日志文件名"),
-    current_user: User = Depends(get_current_user)
-):
-    """查看指定日志文件的内容"""
+def _resolve_log_path(filename: str) -> str:
+    """校验文件名并返回日志文件的完整路径"""
     # 安全检查：防止目录遍历攻击
     if not filename or not filename.startswith('app.log') or '..' in filename:
         raise HTTPException(status_code=403, detail="禁止访问非日志文件")
@@ -97,150 +94,177 @@ async def view_log_file(
     
     if not os.path.exists(full_path):
         raise HTTPException(status_code=404, detail="文件未找到")
-    
+    return full_path
+
+def get_record_filters(
+    level: Optional[str] = Query(None, description="最低日志级别（按结构化日志筛选，下同）"),
+    logger_name: Optional[str] = Query(None, alias="logger", description="模块名（包含子模块）"),
+    request_id: Optional[str] = Query(None, description="请求ID"),
+    worker_id: Optional[str] = Query(None, description="Worker ID"),
+    since: Optional[int] = Query(None, ge=0, description="起始时间（毫秒时间戳）"),
+    until: Optional[int] = Query(None, ge=0, description="结束时间（毫秒时间戳）")
+) -> Dict[str, Any]:
+    """结构化日志的筛选参数"""
+    return {
+        "level": level,
+        "logger_name": logger_name,
+        "request_id": request_id,
+        "worker_id": worker_id,
+        "since": since,
+        "until": until
+    }
+
+def _build_record_filter(filters: Dict[str, Any], q: str = None, regex: bool = False) -> RecordFilter:
     try:
-        # 直接读取文件（不处理.gz压缩文件，简化实现）
-        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-
-        # 反转行顺序（最新的在前）
-        lines.reverse()
-        content = "".join(lines)
+        return RecordFilter(**filters, query=q, regex=regex)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return PlainTextResponse(content)
+@router.get("/view")
+async def view_log_file(
+    filename: str = Query(..., description="日志文件名"),
+    lines: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LINES, description="分页读取的行数（不指定时返回整个文件）"),
+    before: Optional[int] = Query(None, ge=0, description="读取该字节位置之前的行（上一页游标 X-Range-Start）"),
+    after: Optional[int] = Query(None, ge=0, description="读取该字节位置之后的行（下一页游标 X-Range-End）"),
+    start_line: Optional[int] = Query(None, ge=1, description="从该行号开始读取"),
+    reverse: bool = Query(False, description="分页结果按行倒序（最新的在前）"),
+    filters: Dict[str, Any] = Depends(get_record_filters),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    查看指定日志文件的内容
+
+    - 不指定 lines：整个文件，最新的在前（流式返回）
+    - 指定 lines：默认为最后 lines 行（tail）；after=0 为开头 lines 行（head）；
+      before/after 为字节游标翻页；start_line 按行号读取。本页的字节范围见响应头
+    - 指定级别/模块/请求ID/Worker ID/时间范围时，从结构化日志中筛选最新的 lines 行
+      （所有结构化日志文件，最新的在前），是否还有更多见响应头 X-Has-More
+    """
+    record_filter = _build_record_filter(filters)
+    if record_filter.structured:
+        try:
+            result = await run_in_threadpool(search_records, record_filter, 0, lines or MAX_PAGE_LINES)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"筛选日志时发生错误: {str(e)}")
+        content = "".join(f"{item['content']}\n" for item in result["results"]).encode("utf-8")
+        return StreamingResponse(
+            iter_page(content),
+            media_type="text/plain",
+            headers={"X-Has-More": "true" if result["has_more"] else "false"}
+        )
+
+    full_path = _resolve_log_path(filename)
+    
+    try:
+        if lines is None:
+            return StreamingResponse(iter_lines_reversed(full_path), media_type="text/plain")
+
+        page, content = await run_in_threadpool(
+            locate_page, full_path, lines, before=before, after=after, start_line=start_line
+        )
+        return StreamingResponse(
+            iter_page(content, reverse=reverse),
+            media_type="text/plain",
+            headers=page.headers()
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取文件 '{filename}' 时发生错误: {str(e)}")
 
+@router.get("/view/follow")
+async def follow_log_file(
+    request: Request,
+    filename: str = Query("app.log", description="日志文件名"),
+    lines: int = Query(100, ge=0, le=MAX_PAGE_LINES, description="开始跟踪前先发送的最后几行"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    实时跟踪日志文件（Server-Sent Events）
+
+    事件类型：snapshot（最后 lines 行）、append（新追加的行）、rotated（已切换到轮转后的新文件）、
+    truncated（文件被截断）。重连时带上 Last-Event-ID 从断点继续
+    """
+    full_path = _resolve_log_path(filename)
+
+    return StreamingResponse(
+        follow_log(
+            full_path, lines,
+            last_event_id=request.headers.get("last-event-id"),
+            is_disconnected=request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/search", response_model=List[LogSearchResult])
 async def search_logs(
-    q: str = Query(..., description="搜索关键词"),
+    response: Response,
+    q: str = Query("", description="搜索关键词（指定筛选条件时可为空）"),
+    page: int = Query(1, ge=1, description="页码（从1开始）"),
+    page_size: int = Query(200, ge=1, le=1000, description="每页条数"),
+    regex: bool = Query(False, description="按正则表达式匹配（不区分大小写）"),
+    filters: Dict[str, Any] = Depends(get_record_filters),
     current_user: User = Depends(get_current_user)
 ):
-    """在所有日志文件中搜索关键词（筛选模式）"""
-    if not q.strip():
+    """
+    在所有日志文件中搜索关键词（筛选模式）
+
+    通过日志全文索引查询，各日志文件并行扫描，结果按时间从新到旧分页返回；是否还有下一页见响应头 X-Has-More。
+    指定级别/模块/请求ID/Worker ID/时间范围时改为查询结构化日志（关键词匹配消息内容）
+    """
+    record_filter = _build_record_filter(filters, q, regex)
+    if not record_filter.structured and not q.strip():
         raise HTTPException(status_code=400, detail="搜索关键词不能为空")
     
-    TIMESTAMP_REGEX = re.compile(r"^(\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2})")
-    search_results = []
-    
     try:
-        log_dir = get_log_directory()
-        if not os.path.exists(log_dir):
-            return []
-            
-        all_files = os.listdir(log_dir)
-        log_files = [f for f in all_files if f.startswith('app.log')]
-        
-        # 排序文件（从新到旧）
-        def sort_key(filename):
-            if filename == 'app.log':
-                return -1
-            parts = filename.split('.')
-            if len(parts) == 3 and parts[0] == 'app' and parts[1] == 'log':
-                try:
-                    return int(parts[2])
-                except ValueError:
-                    pass
-            return float('inf')
-        
-        log_files.sort(key=sort_key)
-        
-        # 搜索每个文件
-        for filename in log_files:
-            full_path = os.path.join(log_dir, filename)
-            try:
-                # 直接读取文件（简化实现）
-                with open(full_path, 'rt', encoding='utf-8', errors='ignore') as f:
-                    for line_num, line in enumerate(f, 1):
-                        if q.lower() in line.lower():
-                            match = TIMESTAMP_REGEX.search(line)
-                            line_date = match.group(1) if match else ""
-                            
-                            search_results.append(LogSearchResult(
-                                file=filename,
-                                line_num=line_num,
-                                content=line.strip(),
-                                date=line_date
-                            ))
-            except Exception as e:
-                # 单个文件读取失败，记录但继续
-                continue
-        
-        # 按日期排序（最新的在前）
-        search_results.sort(key=lambda x: x.date, reverse=True)
-        return search_results
-        
+        if record_filter.structured:
+            result = await run_in_threadpool(search_records, record_filter, (page - 1) * page_size, page_size)
+        else:
+            result = await run_in_threadpool(
+                get_log_index().search, q, (page - 1) * page_size, page_size, regex
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"搜索过程中发生错误: {str(e)}")
 
+    response.headers["X-Page"] = str(page)
+    response.headers["X-Page-Size"] = str(page_size)
+    response.headers["X-Has-More"] = "true" if result["has_more"] else "false"
+    response.headers["X-Search-Time-Ms"] = str(result["took_ms"])
+    return [LogSearchResult(**item) for item in result["results"]]
+
 @router.get("/search_context", response_model=List[LogBlock])
 async def search_logs_with_context(
+    response: Response,
     q: str = Query(..., description="搜索关键词"),
+    context: int = Query(5, ge=0, le=MAX_CONTEXT_LINES, description="匹配行前后的上下文行数"),
+    limit: int = Query(100, ge=1, le=MAX_MATCHES_PER_REQUEST, description="每页最多返回的匹配数"),
+    cursor: Optional[str] = Query(None, description="翻页游标（上一页响应头 X-Next-Cursor）"),
     current_user: User = Depends(get_current_user)
 ):
-    """在所有日志文件中搜索完整的处理块（定位模式）"""
+    """
+    在所有日志文件中搜索完整的处理块（定位模式）
+
+    结果从新到旧返回，上下文重叠的匹配合并为一个块；还有更多结果时响应头 X-Next-Cursor 为下一页的游标
+    """
     if not q.strip():
         raise HTTPException(status_code=400, detail="搜索关键词不能为空")
     
-    # 这里简化处理，直接返回匹配的行作为块
-    TIMESTAMP_REGEX = re.compile(r"^(\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2})")
-    found_blocks = []
-    
     try:
-        log_dir = get_log_directory()
-        if not os.path.exists(log_dir):
-            return []
-            
-        all_files = os.listdir(log_dir)
-        log_files = [f for f in all_files if f.startswith('app.log')]
-        log_files.sort(reverse=True)  # 从新到旧
-        
-        for filename in log_files:
-            full_path = os.path.join(log_dir, filename)
-            try:
-                # 直接读取文件（简化实现）
-                with open(full_path, 'rt', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-
-                    for i, line in enumerate(lines):
-                        line = line.strip()
-                        if not line:
-                            continue
-
-                        # 如果包含搜索关键词，收集上下文
-                        if q.lower() in line.lower():
-                            # 收集前后各5行作为上下文
-                            start_idx = max(0, i - 5)
-                            end_idx = min(len(lines), i + 6)
-                            context_lines = [lines[j].strip() for j in range(start_idx, end_idx) if lines[j].strip()]
-
-                            # 获取日期
-                            block_date = "Unknown Date"
-                            if context_lines:
-                                match = TIMESTAMP_REGEX.search(context_lines[0])
-                                if match:
-                                    block_date = match.group(1).split(' ')[0]
-
-                            found_blocks.append(LogBlock(
-                                file=filename,
-                                date=block_date,
-                                lines=context_lines
-                            ))
-
-                            # 避免重复添加相近的块
-                            break
-                        
-            except Exception as e:
-                continue
-        
-        # 按日期排序
-        found_blocks.sort(key=lambda x: x.date, reverse=True)
-        return found_blocks
-        
+        result = await run_in_threadpool(search_context, q, context, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"上下文搜索过程中发生错误: {str(e)}")
 
+    response.headers["X-Has-More"] = "true" if result["next_cursor"] else "false"
+    if result["next_cursor"]:
+        response.headers["X-Next-Cursor"] = result["next_cursor"]
+    response.headers["X-Match-Count"] = str(result["matches"])
+    response.headers["X-Search-Time-Ms"] = str(result["took_ms"])
+    return [LogBlock(**block) for block in result["blocks"]]
+
 @router.get("/levels", response_model=List[str])
 async def get_log_levels(
     current_user: User = Depends(get_current_user)
@@ -6,6 +6,8 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 
 from src.services.stats_service import StatsService
+from src.services.stats_cache import get_stats_cache
+from src.config import settings
 from src.api.v1.endpoints.auth import get_current_user
 from src.models.auth import User
 
@@ -40,7 +42,9 @@ async def get_system_overview(
 ):
     """获取系统概览统计"""
     try:
-        overview = await stats_service.get_system_overview()
+        overview = await get_stats_cache().get_or_compute(
+            "overview", stats_service.get_system_overview
+        )
         return overview
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -52,7 +56,9 @@ async def get_performance_metrics(
 ):
     """获取性能指标"""
     try:
-        metrics = await stats_service.get_performance_metrics()
+        metrics = await get_stats_cache().get_or_compute(
+            "performance", stats_service.get_performance_metrics
+        )
         return metrics
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -110,6 +116,7 @@ async def record_worker_stats(
         )
         
         if success:
+            get_stats_cache().invalidate()
             return StatsResponse(
                 success=True,
                 message="Worker统计数据记录成功"
@@ -160,6 +167,7 @@ async def cleanup_old_data(
         success = await stats_service.cleanup_old_data(days)
         
         if success:
+            get_stats_cache().invalidate()
             return StatsResponse(
                 success=True,
                 message=f"成功清理{days}天前的旧数据"
@@ -180,8 +188,11 @@ async def get_stats_summary(
     """获取统计数据摘要"""
     try:
 
-        # 获取基础统计数据
-        summary = await stats_service.get_summary()
+        # 获取基础统计数据（多个页面同时轮询时共享同一次计算）
+        summary = await get_stats_cache().get_or_compute(
+            "summary", stats_service.get_summary,
+            ttl=settings.STATS_SUMMARY_CACHE_TTL_SECONDS
+        )
 
         return {
             "todayRequests": summary.get("today_requests", 0),
@@ -200,4 +211,9 @@ async def get_stats_summary(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-
+@router.get("/cache-metrics", response_model=Dict[str, Any])
+async def get_stats_cache_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """获取统计结果缓存的命中/未命中/合并计数"""
+    return get_stats_cache().get_metrics()
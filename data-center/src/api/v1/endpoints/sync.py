@@ -2,12 +2,17 @@
 同步管理API端点
 """
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 from pydantic import BaseModel
 
 from src.services.worker_sync import WorkerSyncService
 from src.services.config_service import ConfigService
+from src.services.ingest_queue import get_ingest_queue, IngestQueueFull
+from src.services.stats_cache import get_stats_cache
+from src.services.ndjson_ingest import ingest_log_stream, NdjsonLineTooLong, NdjsonChunkWriteError, NdjsonStreamReadError
+from src.services.app_metrics import INGEST_ROWS
 from src.config import settings
+from src.utils.logger_setup import bind_log_context
 from src.api.v1.endpoints.auth import get_current_user
 from src.models.auth import User
 
@@ -54,6 +59,31 @@ def get_worker_sync_service() -> WorkerSyncService:
 def get_config_service() -> ConfigService:
     return ConfigService()
 
+def _enqueue_or_reject(items: List[tuple], request: Request = None, records: int = None):
+    """
+    将Worker推送的数据放入写入队列
+
+    items 为 (类型, worker_id, 数据) 列表，数据为空的项会被跳过；
+    队列已满时返回 429，并通过 Retry-After 告知Worker重试间隔。
+    请求的传输统计（压缩前后字节数）随第一项数据入队，写入后记录到同步日志
+    """
+    ingest_queue = get_ingest_queue()
+    transfer = getattr(request.state, "transfer", None) if request is not None else None
+    transfer_info = transfer.to_dict(records) if transfer is not None else None
+    if items:
+        bind_log_context(worker_id=items[0][1])
+    try:
+        for kind, worker_id, payload in items:
+            if payload:
+                ingest_queue.enqueue(kind, worker_id, payload, transfer=transfer_info)
+                transfer_info = None
+    except IngestQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="写入队列已满，请稍后重试",
+            headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_SECONDS)}
+        )
+
 # API Key认证依赖项
 async def verify_api_key(x_api_key: str = Header(None)):
     """验证API Key"""
@@ -143,49 +173,24 @@ async def push_config_to_all_workers(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/stats", response_model=SyncResponse)
+@router.post("/stats", response_model=SyncResponse, status_code=202)
 async def receive_worker_stats(
     stats_data: StatsData,
-    worker_sync: WorkerSyncService = Depends(get_worker_sync_service),
+    request: Request,
     api_key: str = Depends(verify_api_key)
 ):
-    """接收Worker推送的统计数据和日志"""
-    try:
-        # 处理Worker推送的统计数据
-        success = await worker_sync.process_worker_stats(
-            stats_data.worker_id,
-            stats_data.stats
-        )
-
-        # 处理Worker推送的日志数据
-        if stats_data.logs:
-            log_success = await worker_sync.process_worker_logs(
-                stats_data.worker_id,
-                stats_data.logs
-            )
-            success = success and log_success
-
-        # 处理配置状态
-        if stats_data.config_status:
-            config_success = await worker_sync.process_worker_config_status(
-                stats_data.worker_id,
-                stats_data.config_status
-            )
-            success = success and config_success
-
-        if success:
-            log_count = len(stats_data.logs) if stats_data.logs else 0
-            return SyncResponse(
-                success=True,
-                message=f"接收Worker {stats_data.worker_id} 数据成功 (统计+{log_count}条日志)"
-            )
-        else:
-            return SyncResponse(
-                success=False,
-                message=f"处理Worker {stats_data.worker_id} 数据失败"
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """接收Worker推送的统计数据和日志（放入写入队列后立即返回）"""
+    log_count = len(stats_data.logs) if stats_data.logs else 0
+    _enqueue_or_reject([
+        ("stats", stats_data.worker_id, stats_data.stats),
+        ("logs", stats_data.worker_id, stats_data.logs),
+        ("config_status", stats_data.worker_id, stats_data.config_status)
+    ], request, records=log_count)
+
+    return SyncResponse(
+        success=True,
+        message=f"接收Worker {stats_data.worker_id} 数据成功 (统计+{log_count}条日志)，已加入写入队列"
+    )
 
 @router.post("/pull-stats", response_model=SyncResponse)
 async def pull_stats_from_worker(
@@ -347,72 +352,132 @@ async def receive_worker_config(
         raise HTTPException(status_code=500, detail=str(e))
 
 # 新增：接收日志数据
-@router.post("/logs", response_model=SyncResponse)
+@router.post("/logs", response_model=SyncResponse, status_code=202)
 async def receive_worker_logs(
     logs_data: LogsData,
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """接收Worker推送的日志数据（放入写入队列后立即返回）"""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    logger.info(f"📝 接收Worker {logs_data.worker_id} 的日志数据，共 {len(logs_data.logs)} 条")
+
+    _enqueue_or_reject([("logs", logs_data.worker_id, logs_data.logs)], request, records=len(logs_data.logs))
+
+    return SyncResponse(
+        success=True,
+        message=f"接收Worker {logs_data.worker_id} 日志数据成功 ({len(logs_data.logs)}条)，已加入写入队列"
+    )
+
+# 新增：流式接收日志数据（NDJSON）
+@router.post("/logs/stream", response_model=SyncResponse)
+async def receive_worker_log_stream(
+    request: Request,
+    worker_id: Optional[str] = None,
+    x_worker_id: str = Header(None, alias="X-Worker-ID"),
     worker_sync: WorkerSyncService = Depends(get_worker_sync_service),
     api_key: str = Depends(verify_api_key)
 ):
-    """接收Worker推送的日志数据"""
+    """
+    流式接收Worker推送的日志数据
+
+    请求体为 NDJSON（每行一条日志，格式与 /logs 的 logs 数组元素相同），Worker标识通过
+    X-Worker-ID 头或 worker_id 查询参数传递。日志边解析边按块写入数据库，
+    响应中返回每块的提交耗时。中途失败时已提交的块不会回滚，重发整批不会产生重复日志。
+    """
     import logging
     logger = logging.getLogger(__name__)
 
-    try:
-        logger.info(f"📝 接收Worker {logs_data.worker_id} 的日志数据，共 {len(logs_data.logs)} 条")
+    worker_id = x_worker_id or worker_id
+    if not worker_id:
+        raise HTTPException(status_code=400, detail="缺少Worker标识（X-Worker-ID 头或 worker_id 参数）")
 
-        # 处理日志数据
-        success = await worker_sync.process_worker_logs(
-            logs_data.worker_id,
-            logs_data.logs
-        )
+    logger.info(f"📝 开始接收Worker {worker_id} 的日志流")
 
-        if success:
-            return SyncResponse(
-                success=True,
-                message=f"接收Worker {logs_data.worker_id} 日志数据成功 ({len(logs_data.logs)}条)"
-            )
+    transfer = getattr(request.state, "transfer", None)
+    error_status, error_msg, result = None, None, None
+    try:
+        result = await ingest_log_stream(worker_sync, worker_id, request.stream())
+    except NdjsonLineTooLong as e:
+        error_status, error_msg, result = 413, str(e), e.result
+    except NdjsonChunkWriteError as e:
+        error_status, error_msg, result = 500, str(e), e.result
+    except NdjsonStreamReadError as e:
+        # 压缩中间件在读取请求体时抛出的 413/400 保留原状态码和错误信息
+        cause = e.__cause__
+        if isinstance(cause, HTTPException):
+            error_status, error_msg = cause.status_code, str(cause.detail)
         else:
-            return SyncResponse(
-                success=False,
-                message=f"处理Worker {logs_data.worker_id} 日志数据失败"
-            )
-    except Exception as e:
-        logger.error(f"❌ 接收日志数据失败: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+            error_status, error_msg = 400, str(e)
+        result = e.result
+
+    committed = sum(chunk["records"] for chunk in result["chunks"]) if result else 0
+    if committed:
+        INGEST_ROWS.inc(worker_id, "logs", amount=committed)
+
+    saved = result["saved"] if result else 0
+    await worker_sync.record_stream_ingest(
+        worker_id, saved,
+        transfer.to_dict(result["received"] if result else None) if transfer is not None else None,
+        error_msg
+    )
+    if saved:
+        get_stats_cache().invalidate()
+
+    if error_status is not None:
+        logger.error(
+            f"❌ 接收Worker {worker_id} 日志流失败: {error_msg}"
+            f"（已提交 {len(result['chunks'])} 块, 新增{result['saved']}条）"
+        )
+        raise HTTPException(status_code=error_status, detail=error_msg)
+
+    logger.info(
+        f"✅ 接收Worker {worker_id} 日志流成功: 接收{result['received']}条, 新增{result['saved']}条, "
+        f"{len(result['chunks'])}块, 提交耗时 p50={result['commit_ms']['p50']}ms max={result['commit_ms']['max']}ms"
+    )
+    return SyncResponse(
+        success=True,
+        message=f"接收Worker {worker_id} 日志流成功 ({result['received']}条, 新增{result['saved']}条)",
+        data=result
+    )
 
 # 新增：接收 IP 请求统计数据
-@router.post("/request-stats", response_model=SyncResponse)
+@router.post("/request-stats", response_model=SyncResponse, status_code=202)
 async def receive_worker_request_stats(
     stats_data: RequestStatsData,
-    worker_sync: WorkerSyncService = Depends(get_worker_sync_service),
+    request: Request,
     api_key: str = Depends(verify_api_key)
 ):
-    """接收Worker推送的 IP 请求统计数据"""
+    """
+    接收Worker推送的 IP 请求统计数据（放入写入队列后立即返回）
+
+    写入结果（upsert 行数 rows_upserted 和耗时 elapsed_ms）在写入后记录到
+    /queue-metrics 的 request_stats_reports 中（按Worker保留最近一次）。
+    """
     import logging
     logger = logging.getLogger(__name__)
 
-    try:
-        logger.info(f"📊 接收Worker {stats_data.worker_id} 的 IP 请求统计数据")
+    logger.info(f"📊 接收Worker {stats_data.worker_id} 的 IP 请求统计数据")
 
-        # 处理 IP 请求统计数据
-        success = await worker_sync.process_worker_request_stats(
-            stats_data.worker_id,
-            stats_data.stats
-        )
+    _enqueue_or_reject(
+        [("request_stats", stats_data.worker_id, stats_data.stats)],
+        request, records=len(stats_data.stats.get("by_ip") or {})
+    )
 
-        if success:
-            return SyncResponse(
-                success=True,
-                message=f"接收Worker {stats_data.worker_id} IP 请求统计数据成功"
-            )
-        else:
-            return SyncResponse(
-                success=False,
-                message=f"处理Worker {stats_data.worker_id} IP 请求统计数据失败"
-            )
-    except Exception as e:
-        logger.error(f"❌ 接收 IP 请求统计数据失败: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return SyncResponse(
+        success=True,
+        message=f"接收Worker {stats_data.worker_id} IP 请求统计数据成功，已加入写入队列"
+    )
+
+# 写入队列指标（Web前端使用，需要JWT认证）
+@router.get("/queue-metrics", response_model=Dict[str, Any])
+async def get_ingest_queue_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """获取Worker数据写入队列的深度和延迟指标，以及各Worker最近一次 IP 请求统计的写入结果"""
+    return get_ingest_queue().get_metrics()
 
 # 新增：查询日志数据（Web前端使用，需要JWT认证）
 @router.get("/logs", response_model=Dict[str, Any])
@@ -491,16 +556,18 @@ async def pull_worker_request_stats(
             by_ip = stats_data.get("stats", {}).get("by_ip", {})
 
             # 保存到数据库
-            success = await worker_sync.process_worker_request_stats(
+            result = await worker_sync.process_worker_request_stats(
                 stats_data.get("worker_id", "unknown"),
                 {"by_ip": by_ip}
             )
 
-            if success:
+            if result:
+                get_stats_cache().invalidate()
                 return {
                     "success": True,
                     "message": f"成功从 {worker_data.endpoint} 拉取并保存 IP 请求统计数据",
-                    "data": stats_data
+                    "data": stats_data,
+                    "ingest": result
                 }
             else:
                 return {
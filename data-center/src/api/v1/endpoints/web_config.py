@@ -578,6 +578,7 @@ async def get_worker_stats(
     """获取Worker统计数据"""
     try:
         import httpx
+        from src.services.http_client import worker_client
 
         # 获取Worker配置
         system_settings = await web_config_service.get_system_settings()
@@ -589,14 +590,14 @@ async def get_worker_stats(
             return {"success": False, "message": "Worker端点为空"}
 
         # 请求Worker统计数据
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with worker_client() as client:
             try:
                 stats_url = f"{worker_endpoint.rstrip('/')}/worker-api/stats"
                 headers = {}
                 if system_settings.worker_api_key:
                     headers['X-API-Key'] = system_settings.worker_api_key
 
-                response = await client.get(stats_url, headers=headers)
+                response = await client.get(stats_url, headers=headers, timeout=10.0)
 
                 if response.status_code == 200:
                     stats_data = response.json()
@@ -635,7 +636,7 @@ async def get_worker_realtime_stats(
 ):
     """获取Worker实时统计数据（用于弹窗显示）"""
     try:
-        import httpx
+        from src.services.http_client import worker_client
         import asyncio
 
         # 从系统设置中获取worker配置
@@ -666,13 +667,13 @@ async def get_worker_realtime_stats(
             logger.warning(f"⚠️ API Key为空，将不发送认证头")
 
         # 直接从Worker获取实时统计数据
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with worker_client() as client:
             stats_url = f"{worker_endpoint}/worker-api/stats"
             logger.info(f"📊 数据中心请求Worker实时统计:")
             logger.info(f"   - 请求URL: {stats_url}")
             logger.info(f"   - 请求头: {headers}")
 
-            response = await client.get(stats_url, headers=headers)
+            response = await client.get(stats_url, headers=headers, timeout=10.0)
             logger.info(f"   - 响应状态: {response.status_code}")
 
             if response.status_code == 200:
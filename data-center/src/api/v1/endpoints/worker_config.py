@@ -2,7 +2,7 @@
 Worker配置管理API端点
 """
 from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 import httpx
 import logging
@@ -13,6 +13,7 @@ from datetime import datetime
 from src.services.auth_service import AuthService, get_auth_service
 from src.services.web_config_service import WebConfigService, get_web_config_service
 from src.services.system_stats_service import SystemStatsService, get_system_stats_service
+from src.services.http_client import worker_client
 from src.models.auth import User
 from src.api.v1.endpoints.auth import get_current_user
 
@@ -91,13 +92,14 @@ async def test_worker_connection(
 ):
     """测试Worker连接"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with worker_client() as client:
             response = await client.get(
                 f"{config.worker_url}/api/health",
                 headers={
                     "X-API-Key": config.api_key,
                     "Content-Type": "application/json"
-                }
+                },
+                timeout=10.0
             )
             
             if response.status_code == 200:
@@ -137,14 +139,15 @@ async def push_config_to_worker(
             "ip_blacklist": push_request.ip_blacklist
         }
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with worker_client() as client:
             response = await client.post(
                 f"{push_request.worker_url.rstrip('/')}/worker-api/config/update",
                 headers={
                     "X-API-Key": push_request.api_key,
                     "Content-Type": "application/json"
                 },
-                json=config_data
+                json=config_data,
+                timeout=10.0
             )
             
             if response.status_code == 200:
@@ -244,13 +247,14 @@ async def get_worker_status(
         api_key = worker_api_keys[0] if worker_api_keys else ""
 
         # 调用Worker的健康检查API
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with worker_client() as client:
             response = await client.get(
                 f"{worker_url}/api/health",
                 headers={
                     "X-API-Key": api_key,
                     "Content-Type": "application/json"
-                }
+                },
+                timeout=10.0
             )
 
             if response.status_code == 200:
@@ -325,13 +329,14 @@ async def fetch_worker_stats(
 
         # 从单个Worker获取统计数据
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with worker_client() as client:
                 response = await client.get(
                     f"{worker_url.rstrip('/')}/worker-api/stats",
                     headers={
                         "X-API-Key": worker_api_key,
                         "Content-Type": "application/json"
-                    }
+                    },
+                    timeout=15.0
                 )
 
                 if response.status_code == 200:
@@ -406,13 +411,14 @@ async def fetch_worker_logs(
             api_key = worker_api_keys[i] if i < len(worker_api_keys) else ""
 
             try:
-                async with httpx.AsyncClient(timeout=15.0) as client:
+                async with worker_client() as client:
                     response = await client.get(
                         f"{worker_url.rstrip('/')}/worker-api/logs?limit=100",
                         headers={
                             "X-API-Key": api_key,
                             "Content-Type": "application/json"
-                        }
+                        },
+                        timeout=15.0
                     )
 
                     if response.status_code == 200:
@@ -446,12 +452,13 @@ async def fetch_worker_logs(
 
 @router.get("/system-stats")
 async def get_system_stats(
+    history: int = Query(0, ge=0, description="同时返回最近多少次采样的精简序列（用于趋势图）"),
     current_user: User = Depends(get_current_user),
     system_stats_service: SystemStatsService = Depends(get_system_stats_service)
 ):
     """获取数据中心系统统计"""
     try:
-        stats = await system_stats_service.get_system_stats()
+        stats = await system_stats_service.get_system_stats(history=history)
         return {
             "success": True,
             "message": "系统统计获取成功",
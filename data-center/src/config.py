@@ -47,6 +47,7 @@ class Settings(BaseSettings):
     # 配置文件路径
     CONFIG_PATH: str = "/app/config"
     DATABASE_ECHO: bool = False
+    DB_EXECUTOR_WORKERS: int = 16  # 执行同步数据库操作的线程池大小（应小于连接池大小）
     
     # Telegram机器人配置
     TG_BOT_TOKEN: Optional[str] = None
@@ -61,14 +62,68 @@ class Settings(BaseSettings):
     SYNC_INTERVAL_HOURS: int = 1  # 同步间隔（小时）
     SYNC_RETRY_ATTEMPTS: int = 3  # 同步重试次数
     SYNC_TIMEOUT_SECONDS: int = 30  # 同步超时时间
+    SYNC_CONCURRENCY: int = 50  # 配置同步时同时推送的Worker数量（不超过 WORKER_HTTP_MAX_CONNECTIONS）
+    SYNC_WORKER_DEADLINE_SECONDS: int = 60  # 单个Worker推送的截止时间（包含所有重试）
+    SYNC_RETRY_BACKOFF_SECONDS: float = 1.0  # 重试退避基数（指数增长 + 随机抖动）
+    SYNC_RETRY_BACKOFF_MAX_SECONDS: float = 10.0  # 单次重试退避上限
+    SYNC_BREAKER_FAILURE_THRESHOLD: int = 3  # 连续失败多少次后熔断
+    SYNC_BREAKER_COOLDOWN_SECONDS: int = 300  # 熔断后多久再尝试
+
+    # Worker同步负载压缩配置（gzip 始终可用，安装 zstandard 后支持 zstd）
+    SYNC_COMPRESSION_ENABLED: bool = True  # 压缩 /worker-api 响应和推送给Worker的配置
+    SYNC_COMPRESSION_MIN_BYTES: int = 1024  # 小于该大小的负载不压缩
+    SYNC_COMPRESSION_LEVEL: int = 6  # 压缩级别
+    SYNC_MAX_DECOMPRESSED_BYTES: int = 64 * 1024 * 1024  # 请求体解压后的大小上限（防压缩炸弹）
+
+    # Worker通信HTTP客户端配置（应用级共享连接池）
+    WORKER_HTTP2: bool = True  # 启用HTTP/2（需要安装 h2）
+    WORKER_HTTP_MAX_CONNECTIONS: int = 50  # 最大连接数
+    WORKER_HTTP_MAX_KEEPALIVE: int = 20  # 最大空闲keep-alive连接数
+    WORKER_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # 空闲连接保持时间（秒）
+
+    # Worker数据写入队列配置
+    INGEST_QUEUE_MAXSIZE: int = 1000  # 队列容量（请求数），满时返回429
+    INGEST_QUEUE_CONSUMERS: int = 2  # 后台消费者数量
+    INGEST_BATCH_SIZE: int = 50  # 每批最多合并的请求数
+    INGEST_RETRY_AFTER_SECONDS: int = 5  # 队列满时建议Worker重试的间隔
+    INGEST_STREAM_CHUNK_SIZE: int = 500  # NDJSON 日志流每块写入的条数
+    INGEST_STREAM_MAX_LINE_BYTES: int = 1024 * 1024  # NDJSON 日志流单行长度上限
+
+    # 统计接口结果缓存配置（Worker数据写入后会主动失效）
+    STATS_CACHE_TTL_SECONDS: int = 30  # /overview、/performance 缓存时间
+    STATS_SUMMARY_CACHE_TTL_SECONDS: int = 5  # /summary 缓存时间（包含CPU/内存实时数据）
+    SYSTEM_METRICS_INTERVAL_SECONDS: float = 5.0  # 系统指标（CPU/内存/磁盘/网络/进程）后台采样间隔
+    SYSTEM_METRICS_HISTORY: int = 120  # 保留最近多少次采样（默认 10 分钟），/system-stats?history=N 返回趋势数据
+    SYSTEM_STATUS_LOG_MINUTES: int = 10  # 系统状态写入 SystemLog 的间隔（分钟），0 表示不写入（使用 /metrics 监控）
+
+    # Prometheus 指标
+    METRICS_ENABLED: bool = True  # 提供 Prometheus 指标接口
+    METRICS_PATH: str = "/metrics"  # 指标接口路径（不需要登录）
+    METRICS_TOKEN: Optional[str] = None  # 抓取时需要 Authorization: Bearer <METRICS_TOKEN>；未设置时只允许本机抓取
     
+    # 数据保留与日志表分区配置（分区仅 MySQL/PostgreSQL 生效）
+    DATA_RETENTION_DAYS: int = 30  # 统计和日志数据保留天数
+    PARTITION_ENABLED: bool = True  # 日志表（system_logs/sync_logs）和统计表（request_stats/ip_violation_stats）按时间分区，过期数据整分区删除
+    PARTITION_INTERVAL: str = "day"  # 分区粒度: day/month
+    PARTITION_PREMAKE: int = 7  # 提前创建的未来分区数量
+    PURGE_BATCH_SIZE: int = 5000  # 未分区的表每批（一个事务）最多删除的行数
+    PURGE_BATCH_SLEEP_SECONDS: float = 0.2  # 两批删除之间的暂停时间，让出数据库给Worker写入
+
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FILE: Optional[str] = "/app/config/logs/app.log"
+    LOG_QUEUE_SIZE: int = 10000  # 日志队列容量（积压超过 80% 时丢弃 DEBUG 日志，已满时丢弃 INFO 日志）
+    LOG_JSON_ENABLED: bool = True  # 同时输出结构化日志 app.jsonl（可按级别、模块、请求ID、Worker ID 筛选）
+    LOG_SEARCH_WORKERS: int = 0  # 日志搜索进程数（每个日志文件一个进程），0 表示按CPU核数自动确定，1 表示不使用进程池
     
     # 安全配置
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    SESSION_CACHE_SIZE: int = 1024  # 已验证会话缓存的最大条目数（0 表示不缓存）
+    PASSWORD_HASH_WORKERS: int = 0  # 密码哈希线程数（登录、修改密码，与数据库线程池分开），0 表示取 CPU 核数的一半（1~4）
+    PASSWORD_HASH_MAX_PENDING: int = 32  # 等待中的密码哈希任务上限，超出时登录返回429
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 2  # 密码哈希繁忙时建议客户端重试的间隔
+    SESSION_CACHE_TTL_SECONDS: int = 60  # 已验证会话的缓存时间（进程外的修改，如 reset_password 命令，最多延迟这么久生效）
     
     @validator("TG_ADMIN_USER_ID")
     def parse_admin_user_ids(cls, v):
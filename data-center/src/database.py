@@ -1,19 +1,28 @@
 """
 数据库连接和配置
 """
+import asyncio
+import contextvars
+import functools
 import logging
-from sqlalchemy import create_engine, MetaData, text
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, MetaData, text, event, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
 from src.config import settings
+from src.services.db_telemetry import InstrumentedQueuePool, get_db_telemetry
 
 logger = logging.getLogger(__name__)
 
 # 数据库引擎配置
 if settings.database_url.startswith("sqlite"):
     # SQLite配置
+    # 数据库操作在线程池中执行，文件数据库使用 QueuePool（默认大小，每个线程独立连接），
+    # 只有内存数据库需要 StaticPool 共享同一连接
+    sqlite_pool_class = StaticPool if ":memory:" in settings.database_url else InstrumentedQueuePool
+    sqlite_pool_args = {"poolclass": sqlite_pool_class}
     engine = create_engine(
         settings.database_url,
         echo=settings.DATABASE_ECHO,
@@ -21,14 +30,22 @@ if settings.database_url.startswith("sqlite"):
             "check_same_thread": False,
             "timeout": 20
         },
-        poolclass=StaticPool,
+        **sqlite_pool_args
     )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """启用WAL模式，读操作不再被写事务阻塞"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
 else:
     # MySQL/PostgreSQL 连接池优化配置
     # 参考 misaka_danmu_server 的配置
     engine = create_engine(
         settings.database_url,
         echo=settings.DATABASE_ECHO,
+        poolclass=InstrumentedQueuePool,  # 记录取连接的等待时间（见 db_telemetry）
         pool_pre_ping=True,      # 连接前检查连接是否有效
         pool_recycle=3600,       # 1小时回收连接（misaka_danmu_server 使用 3600）
         pool_size=40,            # 连接池大小（misaka_danmu_server 使用 20）
@@ -36,9 +53,33 @@ else:
         pool_timeout=30,         # 获取连接超时时间（秒）（misaka_danmu_server 使用 30）
     )
 
+# 连接池与查询耗时统计
+get_db_telemetry().install(engine)
+
 # 会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 数据库线程池：同步的 SQLAlchemy 调用在这里执行，避免阻塞事件循环
+db_executor = ThreadPoolExecutor(max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+async def run_db(func, *args, **kwargs):
+    """在数据库线程池中执行同步函数并等待结果（沿用调用方的上下文变量，如日志中的请求ID）"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(db_executor, functools.partial(context.run, func, *args, **kwargs))
+
+def offload_db(func):
+    """
+    装饰器：将同步的数据库方法包装为协程，在数据库线程池中执行
+
+    被装饰的方法内部不能再 await，调用方式与原来的 async 方法一致：
+    result = await service.method(...)
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
 # 基础模型类
 Base = declarative_base()
 
@@ -71,6 +112,10 @@ async def init_db():
         # 执行数据库迁移（添加缺失的列）
         await migrate_database()
 
+        # 日志表时间分区（MySQL/PostgreSQL：空表转换为分区表、补建未来分区）
+        from src.services.partition_service import get_partition_manager
+        await run_db(get_partition_manager().setup)
+
         # 初始化默认数据
         await init_default_data()
 
@@ -98,6 +143,9 @@ async def migrate_database():
             ("worker_configs", "last_update", "BIGINT"),
             # RequestStats 表的新列
             ("request_stats", "active_ips_count", "INTEGER DEFAULT 0"),
+            # SyncLog 表的新列（压缩传输）
+            ("sync_logs", "compressed_size", "INTEGER"),
+            ("sync_logs", "content_encoding", "VARCHAR(20)"),
         ]
 
         # 需要修改列类型的迁移（MySQL 专用）
@@ -112,6 +160,13 @@ async def migrate_database():
             ("worker_configs", "endpoint", "VARCHAR(500)", True),
         ]
 
+        # 需要补建的索引（索引定义在模型的 __table_args__ 中）
+        index_migrations = [
+            # (表名, 索引名)
+            ("system_logs", "uq_system_logs_worker_request"),
+            ("ip_request_stats", "uq_ip_request_stats_worker_ip_hour"),
+        ]
+
         for table_name, column_name, column_type in migrations:
             try:
                 # 检查列是否存在
@@ -183,11 +238,52 @@ async def migrate_database():
                     continue
 
         db.close()
+
+        # 补建索引（create_all 不会为已存在的表添加新索引）
+        for table_name, index_name in index_migrations:
+            table = Base.metadata.tables.get(table_name)
+            index = next((idx for idx in table.indexes if idx.name == index_name), None) if table is not None else None
+            if index is None:
+                continue
+            try:
+                existing = {idx["name"] for idx in inspect(engine).get_indexes(table_name)}
+                if index_name not in existing:
+                    if index.unique:
+                        # 历史数据中的重复记录会导致唯一索引创建失败，先去重（保留每组id最大的记录）
+                        _dedupe_for_unique_index(table, index)
+                    index.create(bind=engine)
+                    logger.info(f"✅ 已创建索引: {table_name}.{index_name}")
+                else:
+                    logger.debug(f"ℹ️ 索引已存在: {table_name}.{index_name}")
+            except Exception as e:
+                # 没有唯一索引时 ON CONFLICT 批量 upsert 会失败，bulk_upsert 改为逐行查询后更新/插入
+                if index.unique:
+                    _missing_unique_keys.add((table_name, tuple(column.name for column in index.columns)))
+                logger.warning(f"⚠️ 索引创建失败 {table_name}.{index_name}，将使用逐行写入: {e}")
+                continue
         logger.info("✅ 数据库迁移检查完成")
 
     except Exception as e:
         logger.error(f"❌ 数据库迁移失败: {e}")
 
+def _dedupe_for_unique_index(table, index):
+    """删除唯一索引键重复的记录，每组只保留id最大（最新）的一条；键中包含NULL的记录不冲突，不删除"""
+    columns = ", ".join(column.name for column in index.columns)
+    not_null = " AND ".join(f"{column.name} IS NOT NULL" for column in index.columns)
+    # 子查询再包一层派生表，MySQL 不允许在 DELETE 的子查询中直接读取同一张表
+    statement = text(f"""
+        DELETE FROM {table.name}
+        WHERE {not_null} AND id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MAX(id) AS keep_id FROM {table.name} WHERE {not_null} GROUP BY {columns}
+            ) AS keep_rows
+        )
+    """)
+    with engine.begin() as connection:
+        deleted = connection.execute(statement).rowcount
+    if deleted:
+        logger.warning(f"⚠️ 创建唯一索引 {index.name} 前删除了 {deleted} 条重复记录")
+
 async def init_default_data():
     """初始化默认数据"""
     try:
@@ -236,6 +332,75 @@ async def init_admin_user():
     except Exception as e:
         logger.error(f"❌ 初始化管理员用户失败: {e}")
 
+# 唯一索引补建失败的 (表名, 列) —— 这些键上不能使用 ON CONFLICT / ON DUPLICATE KEY
+_missing_unique_keys = set()
+
+def get_dialect_name() -> str:
+    """获取当前数据库方言名称（sqlite/mysql/postgresql）"""
+    return engine.dialect.name
+
+def insert_ignore(table):
+    """
+    构建忽略唯一键冲突的批量INSERT语句
+
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT DO NOTHING
+    - MySQL/MariaDB: INSERT IGNORE
+    配合 session.execute(stmt, rows) 以 executemany 方式一次写入整批数据
+    """
+    dialect = get_dialect_name()
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect in ("mysql", "mariadb"):
+        return table.insert().prefix_with("IGNORE")
+    return table.insert()
+
+def bulk_upsert(db: Session, table, rows: list, index_elements: list, update_columns: list) -> int:
+    """
+    按数据库方言批量 upsert，返回写入的行数
+
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT (index_elements) DO UPDATE
+    - MySQL/MariaDB: INSERT ... ON DUPLICATE KEY UPDATE
+    冲突键必须有对应的唯一索引；其他方言或唯一索引补建失败时退化为逐行查询后更新/插入
+    """
+    if not rows:
+        return 0
+
+    dialect = get_dialect_name()
+    if (table.name, tuple(index_elements)) in _missing_unique_keys:
+        dialect = None
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+        db.execute(stmt, rows)
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in update_columns}
+        )
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            condition = [table.c[key] == row[key] for key in index_elements]
+            updated = db.execute(
+                table.update().where(*condition).values({column: row[column] for column in update_columns})
+            ).rowcount
+            if not updated:
+                db.execute(table.insert().values(row))
+
+    return len(rows)
+
 def get_db_sync() -> Session:
     """获取同步数据库会话（用于非异步上下文）"""
     return SessionLocal()
@@ -243,6 +408,7 @@ def get_db_sync() -> Session:
 def close_db_connections():
     """关闭数据库连接"""
     try:
+        db_executor.shutdown(wait=True)
         engine.dispose()
         logger.info("✅ 数据库连接已关闭")
     except Exception as e:
@@ -3,25 +3,32 @@
 FastAPI + TG机器人轮询模式
 """
 import asyncio
+import hmac
 import logging
+import time
+import uuid
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.config import settings
-from src.database import init_db
+from src.database import init_db, close_db_connections
 from src.utils import naive_now
 from src.api.v1.api import web_api_router, worker_api_router
 from src.tasks.scheduler import TaskScheduler
 from src.telegram.bot import TelegramBot
 from src.middleware.auth_middleware import AuthMiddleware
+from src.middleware.compression_middleware import SyncCompressionMiddleware
+from src.services.app_metrics import (
+    HTTP_REQUEST_DURATION, route_label, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+)
 
 # 配置日志系统
-from src.utils.logger_setup import setup_logging
+from src.utils.logger_setup import setup_logging, bind_log_context, stop_logging
 
 # 初始化日志系统
-setup_logging()
+setup_logging(log_level=settings.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # 测试日志生成已禁用
@@ -83,6 +90,23 @@ async def lifespan(app: FastAPI):
         logger.info("ℹ️ TG机器人未配置，请通过Web界面配置后重启服务")
         bot_task = None
     
+    # 创建Worker通信共享HTTP客户端（连接池 + keep-alive + HTTP/2）
+    logger.info("🌐 创建Worker HTTP客户端...")
+    from src.services.http_client import start_worker_client, close_worker_client
+    await start_worker_client()
+
+    # 启动Worker数据写入队列
+    logger.info("📥 启动Worker数据写入队列...")
+    from src.services.ingest_queue import get_ingest_queue
+    ingest_queue = get_ingest_queue()
+    await ingest_queue.start()
+
+    # 启动系统指标后台采样
+    logger.info("📈 启动系统指标采样...")
+    from src.services.metrics_sampler import get_metrics_sampler
+    metrics_sampler = get_metrics_sampler()
+    await metrics_sampler.start()
+
     # 启动定时任务调度器
     logger.info("⏰ 启动任务调度器...")
     task_scheduler = TaskScheduler()
@@ -127,8 +151,32 @@ async def lifespan(app: FastAPI):
         logger.info("⏰ 停止任务调度器...")
         await task_scheduler.stop()
 
+    # 停止系统指标采样
+    await metrics_sampler.stop()
+
+    # 停止写入队列（排空剩余数据，未写入部分落盘）
+    logger.info("📥 停止Worker数据写入队列...")
+    await ingest_queue.stop()
+
+    # 关闭数据库线程池和连接池（写入队列已排空，之后不再访问数据库）
+    close_db_connections()
+
+    # 关闭Worker HTTP客户端
+    await close_worker_client()
+
+    # 关闭日志搜索进程池
+    from src.services.log_index import shutdown_search_pool
+    shutdown_search_pool()
+
+    # 关闭密码哈希线程池
+    from src.services.password_hasher import shutdown_password_hasher
+    shutdown_password_hasher()
+
     logger.info("✅ 数据交互中心已安全关闭")
 
+    # 写完队列中剩余的结构化日志
+    stop_logging()
+
 def create_application() -> FastAPI:
     """创建FastAPI应用"""
     app = FastAPI(
@@ -139,6 +187,9 @@ def create_application() -> FastAPI:
         lifespan=lifespan
     )
 
+    # Worker同步压缩中间件（/worker-api 请求解压、响应压缩）
+    app.add_middleware(SyncCompressionMiddleware)
+
     # 认证中间件
     app.add_middleware(AuthMiddleware)
 
@@ -151,20 +202,31 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # 添加请求日志中间件
+    # 添加请求日志中间件（为每个请求设置请求ID，记录到结构化日志并通过 X-Request-ID 返回）
     @app.middleware("http")
     async def log_requests(request, call_next):
         import logging
         logger = logging.getLogger(__name__)
 
+        request_id = (request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16])[:64]
+        bind_log_context(request_id=request_id, worker_id=request.headers.get("X-Worker-ID"))
+
         if request.url.path.startswith("/api/auth/me"):
             logger.debug(f"🔍 /me请求: {request.method}")
 
-        response = await call_next(request)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        except Exception:
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, request.method, route_label(request), "500")
+            raise
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, request.method, route_label(request),
+                                      response.status_code)
 
         if request.url.path.startswith("/api/auth/me"):
             logger.info(f"🔍 /me响应状态: {response.status_code}")
 
+        response.headers["X-Request-ID"] = request_id
         return response
 
     # Web界面API路由 - 需要JWT认证
@@ -182,6 +244,22 @@ def create_application() -> FastAPI:
             "timestamp": naive_now().isoformat()
         }
 
+    # Prometheus 指标（只读取内存中的统计，不查询数据库）
+    if settings.METRICS_ENABLED:
+        @app.get(settings.METRICS_PATH, include_in_schema=False)
+        async def metrics(request: Request):
+            if settings.METRICS_TOKEN:
+                if not hmac.compare_digest(
+                        request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+                    return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+            else:
+                # 未设置 METRICS_TOKEN 时只允许本机直接抓取（经反向代理转发的请求也拒绝）
+                client_host = request.client.host if request.client else ""
+                forwarded = any(name in request.headers for name in ("forwarded", "x-forwarded-for", "x-real-ip"))
+                if client_host not in ("127.0.0.1", "::1") or forwarded:
+                    return Response(status_code=403)
+            return Response(render_metrics(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
     # 处理可能的日志路由请求
     @app.get("/logs")
     async def logs_redirect():
@@ -282,7 +360,7 @@ def create_application() -> FastAPI:
         final_static_dir = Path("web/dist")
 
     from fastapi.responses import FileResponse
-    from fastapi import Request, HTTPException
+    from fastapi import HTTPException
 
     @app.get("/{full_path:path}", include_in_schema=False)
     async def serve_spa(request: Request, full_path: str):
@@ -290,6 +368,7 @@ def create_application() -> FastAPI:
         if (full_path.startswith("api/") or
             full_path.startswith("worker-api/") or
             full_path.startswith("health") or
+            full_path.startswith(settings.METRICS_PATH.lstrip("/")) or
             full_path.startswith("docs") or
             full_path.startswith("openapi.json") or
             full_path.startswith("redoc") or
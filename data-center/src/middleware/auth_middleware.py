@@ -4,6 +4,7 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from src.config import settings
 from src.services.auth_service import AuthService
 
 class AuthMiddleware(BaseHTTPMiddleware):
@@ -22,7 +23,9 @@ class AuthMiddleware(BaseHTTPMiddleware):
             "/redoc",
             "/api/auth/login",
             "/api/auth/init-status",
-            "/api/auth/init-admin"
+            "/api/auth/init-admin",
+            # Prometheus 指标（由 METRICS_TOKEN 单独保护，未设置时只允许本机访问）
+            settings.METRICS_PATH
         }
 
         # 前端路由路径（需要特殊处理）
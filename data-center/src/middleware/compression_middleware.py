@@ -0,0 +1,174 @@
+"""
+Worker同步压缩中间件
+
+只作用于 /worker-api/ 路径：
+- 请求：按 Content-Encoding（gzip/zstd）流式解压请求体，解压后超过
+  SYNC_MAX_DECOMPRESSED_BYTES 时返回 413；不支持的编码返回 415
+- 响应：按 Accept-Encoding 协商压缩 JSON 响应（如配置导出）
+- 统计：每个请求的压缩前后字节数记录在 request.state.transfer，供同步日志使用
+
+使用纯 ASGI 实现，解压结果逐块交给下游，不在中间件中缓存整个请求体。
+"""
+import logging
+import time
+from typing import Dict, Any
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.config import settings
+from src.utils.compression import (
+    StreamingDecompressor, DecompressionError, DecompressedSizeExceeded,
+    supported_encodings, negotiate_encoding, compress
+)
+
+logger = logging.getLogger(__name__)
+
+# 不压缩的响应类型（流式推送需要逐条送达）
+_UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+class SyncTransfer:
+    """单个同步请求的传输统计"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.received_at = time.time()
+
+    def to_dict(self, records: int = None) -> Dict[str, Any]:
+        return {
+            "encoding": self.encoding,
+            "compressed_bytes": self.compressed_bytes,
+            "uncompressed_bytes": self.uncompressed_bytes,
+            "records": records,
+            "received_at": self.received_at
+        }
+
+
+class SyncCompressionMiddleware:
+    """Worker同步请求/响应压缩中间件"""
+
+    def __init__(self, app, path_prefix: str = "/worker-api/"):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = headers.get("content-encoding", "identity").strip().lower() or "identity"
+        transfer = SyncTransfer(encoding)
+
+        if encoding == "identity":
+            receive = self._counting_receive(receive, transfer)
+        else:
+            if encoding not in supported_encodings():
+                response = JSONResponse(
+                    {"detail": f"不支持的压缩编码: {encoding}"},
+                    status_code=415,
+                    headers={"Accept-Encoding": ", ".join(supported_encodings())}
+                )
+                await response(scope, receive, send)
+                return
+
+            # 下游看到的是解压后的明文，去掉与原始请求体对应的头部
+            scope = dict(scope)
+            scope["headers"] = [
+                (key, value) for key, value in scope["headers"]
+                if key not in (b"content-encoding", b"content-length")
+            ]
+            decompressor = StreamingDecompressor(encoding, settings.SYNC_MAX_DECOMPRESSED_BYTES)
+            receive = self._decompressing_receive(receive, decompressor, transfer)
+
+        scope.setdefault("state", {})["transfer"] = transfer
+
+        response_encoding = None
+        if settings.SYNC_COMPRESSION_ENABLED:
+            response_encoding = negotiate_encoding(headers.get("accept-encoding"))
+
+        if response_encoding:
+            send = self._compressing_send(send, response_encoding)
+
+        await self.app(scope, receive, send)
+
+    def _counting_receive(self, receive, transfer: SyncTransfer):
+        """未压缩请求：只统计字节数"""
+        async def wrapped():
+            message = await receive()
+            if message["type"] == "http.request":
+                size = len(message.get("body", b""))
+                transfer.compressed_bytes += size
+                transfer.uncompressed_bytes += size
+            return message
+        return wrapped
+
+    def _decompressing_receive(self, receive, decompressor: StreamingDecompressor, transfer: SyncTransfer):
+        """压缩请求：逐块解压，超过上限时中止读取"""
+        async def wrapped():
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            more_body = message.get("more_body", False)
+            try:
+                body = decompressor.feed(message.get("body", b""))
+                if not more_body:
+                    body += decompressor.finish()
+            except DecompressedSizeExceeded as e:
+                logger.warning(f"⚠️ 拒绝超大同步请求体: {e}")
+                raise HTTPException(status_code=413, detail=str(e))
+            except DecompressionError as e:
+                logger.warning(f"⚠️ 同步请求体解压失败: {e}")
+                raise HTTPException(status_code=400, detail=str(e))
+            finally:
+                transfer.compressed_bytes = decompressor.compressed_bytes
+                transfer.uncompressed_bytes = decompressor.decompressed_bytes
+
+            return {"type": "http.request", "body": body, "more_body": more_body}
+        return wrapped
+
+    def _compressing_send(self, send, encoding: str):
+        """按协商的编码压缩响应体（小于 SYNC_COMPRESSION_MIN_BYTES 的响应原样返回）"""
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def wrapped(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                content_type = response_headers.get("content-type", "")
+                if "content-encoding" in response_headers or content_type.startswith(_UNCOMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            response_headers = MutableHeaders(raw=start_message["headers"])
+            response_headers.add_vary_header("Accept-Encoding")
+            if len(body) >= settings.SYNC_COMPRESSION_MIN_BYTES:
+                compressed = compress(body, encoding, settings.SYNC_COMPRESSION_LEVEL)
+                if len(compressed) < len(body):
+                    body = compressed
+                    response_headers["Content-Encoding"] = encoding
+                    response_headers["Content-Length"] = str(len(body))
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+        return wrapped
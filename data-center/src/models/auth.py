@@ -23,21 +23,31 @@ class User(Base):
     
     def set_password(self, password: str):
         """设置密码（哈希存储）"""
+        self.password_hash = User.hash_password(password)
+    
+    def verify_password(self, password: str) -> bool:
+        """验证密码"""
+        return User.check_password(self.password_hash, password)
+
+    @staticmethod
+    def hash_password(password: str) -> str:
+        """计算密码哈希（不访问数据库，可以在密码哈希线程池中执行）"""
         # 生成盐值
         salt = secrets.token_hex(16)
         # 使用SHA256哈希密码+盐值
         password_with_salt = f"{password}{salt}"
         hash_object = hashlib.sha256(password_with_salt.encode())
         # 存储格式：盐值$哈希值
-        self.password_hash = f"{salt}${hash_object.hexdigest()}"
-    
-    def verify_password(self, password: str) -> bool:
-        """验证密码"""
+        return f"{salt}${hash_object.hexdigest()}"
+
+    @staticmethod
+    def check_password(password_hash: str, password: str) -> bool:
+        """校验密码与哈希是否匹配"""
         try:
-            if not self.password_hash or '$' not in self.password_hash:
+            if not password_hash or '$' not in password_hash:
                 return False
             
-            salt, stored_hash = self.password_hash.split('$', 1)
+            salt, stored_hash = password_hash.split('$', 1)
             password_with_salt = f"{password}{salt}"
             hash_object = hashlib.sha256(password_with_salt.encode())
             return hash_object.hexdigest() == stored_hash
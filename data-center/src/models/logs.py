@@ -2,7 +2,7 @@
 日志数据模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, JSON, Index
 from sqlalchemy.sql import func
 
 from src.database import Base
@@ -27,6 +27,11 @@ class SystemLog(Base):
     user_agent = Column(String(500), comment="User-Agent")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, comment="创建时间")
+
+    __table_args__ = (
+        # Worker日志去重键：同一Worker的同一request_id只保存一次（NULL不参与唯一性比较）
+        Index("uq_system_logs_worker_request", "worker_id", "request_id", unique=True),
+    )
     
     def __repr__(self):
         return f"<SystemLog(level='{self.level}', message='{self.message[:50]}...', created_at='{self.created_at}')>"
@@ -90,14 +95,16 @@ class SyncLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     worker_id = Column(String(100), index=True, comment="Worker标识")
     sync_type = Column(String(50), comment="同步类型")
-    direction = Column(String(20), comment="同步方向: push/pull")
+    direction = Column(String(20), comment="同步方向: push/pull/receive")
     
     # 同步状态
     status = Column(String(20), default="pending", comment="同步状态")
     error_message = Column(Text, comment="错误消息")
     
     # 同步数据
-    data_size = Column(Integer, comment="数据大小（字节）")
+    data_size = Column(Integer, comment="数据大小（字节，未压缩）")
+    compressed_size = Column(Integer, comment="传输大小（字节，压缩后）")
+    content_encoding = Column(String(20), comment="传输编码: identity/gzip/zstd")
     records_count = Column(Integer, comment="记录数量")
     
     # 时间信息
@@ -120,6 +127,8 @@ class SyncLog(Base):
             "status": self.status,
             "error_message": self.error_message,
             "data_size": self.data_size,
+            "compressed_size": self.compressed_size,
+            "content_encoding": self.content_encoding,
             "records_count": self.records_count,
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
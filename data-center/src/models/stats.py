@@ -2,7 +2,7 @@
 统计数据模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, BigInteger, Index
 from sqlalchemy.sql import func
 
 from src.database import Base
@@ -183,6 +183,11 @@ class IPRequestStats(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
 
+    __table_args__ = (
+        # 批量 upsert 的冲突键：每个Worker每小时每个IP一条记录
+        Index("uq_ip_request_stats_worker_ip_hour", "worker_id", "ip_address", "date_hour", unique=True),
+    )
+
     def __repr__(self):
         return f"<IPRequestStats(ip='{self.ip_address}', total={self.total_count}, violations={self.violations})>"
 
@@ -199,3 +204,86 @@ class IPRequestStats(Base):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
+
+class StatsDailyRollup(Base):
+    """每日统计汇总（由定时任务从 request_stats / ip_violation_stats 压缩生成）"""
+    __tablename__ = "stats_daily_rollup"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(DateTime, unique=True, index=True, nullable=False, comment="统计日期（当天0点）")
+
+    # 请求统计
+    total_requests = Column(BigInteger, default=0, comment="总请求数")
+    successful_requests = Column(BigInteger, default=0, comment="成功请求数")
+    blocked_requests = Column(BigInteger, default=0, comment="被阻止请求数")
+    error_requests = Column(BigInteger, default=0, comment="错误请求数")
+
+    # 响应时间（保存总和与样本数，便于跨天合并平均值）
+    response_time_sum = Column(Float, default=0, comment="平均响应时间之和（毫秒）")
+    response_time_samples = Column(Integer, default=0, comment="响应时间样本数")
+
+    # 违规统计（违规IP按首次出现的日期计入，跨天相加即为去重后的IP数）
+    violation_count = Column(BigInteger, default=0, comment="违规次数")
+    new_violation_ips = Column(Integer, default=0, comment="当天首次出现的违规IP数")
+    temp_banned = Column(Integer, default=0, comment="临时封禁的统计记录数")
+
+    updated_at = Column(DateTime, comment="汇总时间")
+
+    def __repr__(self):
+        return f"<StatsDailyRollup(day='{self.day}', total={self.total_requests})>"
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            "id": self.id,
+            "day": self.day.isoformat() if self.day else None,
+            "total_requests": self.total_requests,
+            "successful_requests": self.successful_requests,
+            "blocked_requests": self.blocked_requests,
+            "error_requests": self.error_requests,
+            "response_time_sum": self.response_time_sum,
+            "response_time_samples": self.response_time_samples,
+            "violation_count": self.violation_count,
+            "new_violation_ips": self.new_violation_ips,
+            "temp_banned": self.temp_banned,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class StatsRollupTotal(Base):
+    """全量统计汇总（单行，覆盖 covered_until 之前所有已压缩的日汇总）"""
+    __tablename__ = "stats_rollup_totals"
+
+    id = Column(Integer, primary_key=True, index=True)
+    covered_until = Column(DateTime, comment="已汇总的截止时间（不含）")
+
+    total_requests = Column(BigInteger, default=0, comment="总请求数")
+    successful_requests = Column(BigInteger, default=0, comment="成功请求数")
+    blocked_requests = Column(BigInteger, default=0, comment="被阻止请求数")
+    error_requests = Column(BigInteger, default=0, comment="错误请求数")
+    response_time_sum = Column(Float, default=0, comment="平均响应时间之和（毫秒）")
+    response_time_samples = Column(BigInteger, default=0, comment="响应时间样本数")
+    violation_count = Column(BigInteger, default=0, comment="违规次数")
+    violation_ips = Column(BigInteger, default=0, comment="违规IP数（去重）")
+    temp_banned = Column(BigInteger, default=0, comment="临时封禁的统计记录数")
+
+    updated_at = Column(DateTime, comment="汇总时间")
+
+    def __repr__(self):
+        return f"<StatsRollupTotal(covered_until='{self.covered_until}', total={self.total_requests})>"
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            "id": self.id,
+            "covered_until": self.covered_until.isoformat() if self.covered_until else None,
+            "total_requests": self.total_requests,
+            "successful_requests": self.successful_requests,
+            "blocked_requests": self.blocked_requests,
+            "error_requests": self.error_requests,
+            "response_time_sum": self.response_time_sum,
+            "response_time_samples": self.response_time_samples,
+            "violation_count": self.violation_count,
+            "violation_ips": self.violation_ips,
+            "temp_banned": self.temp_banned,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
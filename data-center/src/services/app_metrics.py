@@ -0,0 +1,370 @@
+"""
+Prometheus 指标（GET /metrics，文本格式 0.0.4）
+
+原来只能通过 _record_system_status 定时写入 SystemLog 的状态记录查看运行情况，这里提供机器可读的指标：
+
+- 请求耗时直方图（按方法、路由模板、状态码）、Worker数据写入条数（按Worker、类型）和写入延迟、
+  定时任务耗时、Telegram命令耗时：由各模块在处理过程中记录
+- 队列深度（写入队列、日志队列、数据库线程池）、数据库连接池与查询耗时、缓存命中、密码哈希线程池、
+  进程CPU/内存：抓取时从各模块已有的内存统计（get_metrics 等）读取，不查询数据库
+
+计数器和直方图不加锁：每个序列只由一个线程写入（HTTP请求、写入队列、定时任务在主事件循环中，
+Telegram命令在轮询线程中），抓取时读取到的某个序列的 count/sum 最多相差正在记录的那一次。
+"""
+import bisect
+import logging
+import math
+import time
+from typing import Dict, Any, List, Tuple, Iterable
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# 请求/命令耗时的桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 定时任务耗时的桶上界（秒）
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+# 每个指标最多的标签组合数，超出的归入 OTHER_LABEL（Worker ID、路由等来自外部输入）
+MAX_SERIES = 500
+OTHER_LABEL = "other"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_START_TIME = time.time()
+
+
+def _format_value(value: float) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _histogram_lines(name: str, labels: Dict[str, Any], buckets: Iterable[Tuple[float, int]],
+                     count: int, total: float) -> List[str]:
+    """buckets 为 [(上界, 累计计数)]，不包含 +Inf"""
+    lines = []
+    for bound, cumulative in buckets:
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(float(bound))})} {cumulative}")
+    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return lines
+
+
+class _Metric:
+    """带标签的指标（标签值按位置传入）"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Tuple[Any, ...]) -> Tuple[str, ...]:
+        key = tuple(str(value) for value in labels)
+        if key not in self._series and len(self._series) >= MAX_SERIES:
+            return (OTHER_LABEL,) * len(self.labelnames)
+        return key
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = _header(self.name, self.kind, self.help_text)
+        for key, value in list(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """可设置为任意值的指标"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self._series[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """直方图（每个序列保存各桶的非累计计数和总和）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # [桶1, 桶2, ..., +Inf桶, 总和]
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> List[str]:
+        lines = _header(self.name, self.kind, self.help_text)
+        for key, series in list(self._series.items()):
+            counts = series[:-1]
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets, counts):
+                running += count
+                cumulative.append((bound, running))
+            lines.extend(_histogram_lines(self.name, self._labels(key), cumulative, sum(counts), series[-1]))
+        return lines
+
+
+# ---------- 处理过程中记录的指标 ----------
+
+HTTP_REQUEST_DURATION = Histogram(
+    "datacenter_http_request_duration_seconds", "HTTP请求耗时（到响应头返回）",
+    ("method", "route", "status")
+)
+INGEST_ROWS = Counter(
+    "datacenter_ingest_rows_total", "写入数据库的Worker数据条数（日志条数、IP数，统计快照计为1）",
+    ("worker_id", "kind")
+)
+INGEST_LAG = Histogram(
+    "datacenter_ingest_lag_seconds", "Worker数据从入队到写入数据库的延迟",
+    ("kind",), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+SCHEDULER_JOB_DURATION = Histogram(
+    "datacenter_scheduler_job_duration_seconds", "定时任务执行耗时", ("job",), buckets=JOB_BUCKETS
+)
+SCHEDULER_JOB_FAILURES = Counter(
+    "datacenter_scheduler_job_failures_total", "定时任务抛出异常的次数", ("job",)
+)
+SCHEDULER_JOB_LAST_RUN = Gauge(
+    "datacenter_scheduler_job_last_run_timestamp_seconds", "定时任务最近一次完成的时间", ("job",)
+)
+TELEGRAM_COMMAND_DURATION = Histogram(
+    "datacenter_telegram_command_duration_seconds", "Telegram命令/回调处理耗时", ("command",)
+)
+TELEGRAM_COMMAND_ERRORS = Counter(
+    "datacenter_telegram_command_errors_total", "Telegram命令/回调处理异常次数", ("command",)
+)
+
+_REGISTRY: List[_Metric] = [
+    HTTP_REQUEST_DURATION,
+    INGEST_ROWS,
+    INGEST_LAG,
+    SCHEDULER_JOB_DURATION,
+    SCHEDULER_JOB_FAILURES,
+    SCHEDULER_JOB_LAST_RUN,
+    TELEGRAM_COMMAND_DURATION,
+    TELEGRAM_COMMAND_ERRORS,
+]
+
+
+def record_job_run(job_id: str, seconds: float, failed: bool):
+    """记录一次定时任务执行"""
+    SCHEDULER_JOB_DURATION.observe(seconds, job_id)
+    if failed:
+        SCHEDULER_JOB_FAILURES.inc(job_id)
+    SCHEDULER_JOB_LAST_RUN.set(time.time(), job_id)
+
+
+def ingest_row_count(kind: str, payload: Any, requests: int) -> int:
+    """合并后的一组写入数据包含的条数"""
+    if kind == "logs" and isinstance(payload, list):
+        return len(payload)
+    if kind == "request_stats" and isinstance(payload, dict) and isinstance(payload.get("by_ip"), dict):
+        return len(payload["by_ip"])
+    return requests
+
+
+# ---------- 路由模板 ----------
+
+# 路由处理函数 -> 路由模板（路由在启动后不再变化）
+_route_paths: Dict[int, str] = {}
+
+
+def route_label(request) -> str:
+    """请求匹配到的路由模板（如 /api/stats/workers/{worker_id}），避免用实际路径产生大量序列"""
+    app = request.app
+    if not _route_paths:
+        for route in app.routes:
+            endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+            if endpoint is not None and hasattr(route, "path"):
+                _route_paths.setdefault(id(endpoint), route.path)
+
+    endpoint = request.scope.get("endpoint")
+    if endpoint is not None:
+        path = _route_paths.get(id(endpoint))
+        if path is not None:
+            return path
+
+    # 中间件复制了 scope（如解压Worker请求体）时看不到路由结果，重新匹配
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", OTHER_LABEL)
+    return OTHER_LABEL
+
+
+# ---------- 抓取时读取的指标 ----------
+
+def _gauge(name: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], Any]],
+           kind: str = "gauge") -> List[str]:
+    lines = _header(name, kind, help_text)
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+def _ms_histogram(name: str, help_text: str, series: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[str]:
+    """把 db_telemetry 的毫秒直方图（累计计数）转换为以秒为单位的直方图"""
+    lines = _header(name, "histogram", help_text)
+    for labels, histogram in series:
+        buckets = [(float(bound) / 1000, count) for bound, count in histogram["buckets"].items() if bound != "+Inf"]
+        lines.extend(_histogram_lines(name, labels, buckets, histogram["count"], histogram["sum_ms"] / 1000))
+    return lines
+
+
+def _collect_queues() -> List[str]:
+    from src.config import settings
+    from src.database import db_executor
+    from src.services.ingest_queue import get_ingest_queue
+    from src.utils.logger_setup import get_logging_stats
+
+    ingest = get_ingest_queue().get_metrics()
+    logging_stats = get_logging_stats()
+    events = ("enqueued", "processed", "rejected", "failed", "retried", "spilled", "restored")
+    return [
+        *_gauge("datacenter_ingest_queue_depth", "写入队列中等待写入的请求数", [({}, ingest["depth"])]),
+        *_gauge("datacenter_ingest_queue_capacity", "写入队列容量", [({}, ingest["capacity"])]),
+        *_gauge("datacenter_ingest_queue_events_total", "写入队列事件计数（请求数）",
+                [({"event": event}, ingest[event]) for event in events], kind="counter"),
+        *_gauge("datacenter_log_queue_depth", "日志队列中等待写出的日志数", [({}, logging_stats["queue_size"])]),
+        *_gauge("datacenter_log_queue_capacity", "日志队列容量", [({}, logging_stats["queue_capacity"])]),
+        *_gauge("datacenter_log_dropped_total", "因日志队列积压丢弃的日志数",
+                [({"level": level}, count) for level, count in sorted(logging_stats["dropped"].items())],
+                kind="counter"),
+        *_gauge("datacenter_db_executor_queue_depth", "数据库线程池中排队的任务数",
+                [({}, db_executor._work_queue.qsize())]),
+        *_gauge("datacenter_db_executor_workers", "数据库线程池大小", [({}, settings.DB_EXECUTOR_WORKERS)]),
+    ]
+
+
+def _collect_database() -> List[str]:
+    from src.database import engine
+    from src.services.db_telemetry import get_db_telemetry
+
+    telemetry = get_db_telemetry().get_stats(engine.pool)
+    pool = telemetry["pool"]
+    queries = telemetry["queries"]
+    lines = []
+    if "size" in pool:
+        lines += _gauge("datacenter_db_pool_size", "连接池大小（不含溢出连接）", [({}, pool["size"])])
+        lines += _gauge("datacenter_db_pool_max_overflow", "连接池允许的溢出连接数", [({}, pool["max_overflow"])])
+        lines += _gauge("datacenter_db_pool_connections", "连接池中的连接数",
+                        [({"state": state}, pool[state]) for state in ("checked_out", "checked_in", "overflow")])
+    lines += _gauge("datacenter_db_pool_waiting", "正在从连接池取连接的线程数", [({}, pool["waiting"])])
+    lines += _gauge("datacenter_db_pool_events_total", "连接池事件计数",
+                    [({"event": event}, pool[event])
+                     for event in ("checkouts", "checkins", "connects", "invalidations", "timeouts", "checkout_errors")],
+                    kind="counter")
+    lines += _ms_histogram("datacenter_db_pool_checkout_wait_seconds", "从连接池取连接的等待时间",
+                           [({}, pool["checkout_wait"])])
+    lines += _ms_histogram("datacenter_db_query_duration_seconds", "SQL语句执行耗时（按语句类型）",
+                           [({"kind": kind}, histogram) for kind, histogram in queries["by_kind"].items()])
+    lines += _gauge("datacenter_db_query_errors_total", "SQL语句执行出错次数", [({}, queries["errors"])], kind="counter")
+    lines += _gauge("datacenter_db_slow_queries_total", f"耗时超过 {queries['slow_query_ms']}ms 的SQL语句数",
+                    [({}, queries["slow_queries"])], kind="counter")
+    return lines
+
+
+def _collect_caches() -> List[str]:
+    from src.services.password_hasher import get_password_hasher
+    from src.services.session_cache import get_session_cache
+    from src.services.stats_cache import get_stats_cache
+
+    caches = {"stats": get_stats_cache().get_metrics(), "session": get_session_cache().get_metrics()}
+    requests = []
+    for cache, metrics in caches.items():
+        for result in ("hits", "misses", "coalesced"):
+            if result in metrics:
+                requests.append(({"cache": cache, "result": result}, metrics[result]))
+    hasher = get_password_hasher().get_metrics()
+    return [
+        *_gauge("datacenter_cache_requests_total", "缓存查询次数（命中率 = hits / 全部）", requests, kind="counter"),
+        *_gauge("datacenter_cache_entries", "缓存条目数",
+                [({"cache": cache}, metrics["entries"]) for cache, metrics in caches.items()]),
+        *_gauge("datacenter_password_hash_pending", "等待中和执行中的密码哈希任务数", [({}, hasher["pending"])]),
+        *_gauge("datacenter_password_hash_total", "密码哈希任务计数",
+                [({"result": "completed"}, hasher["completed"]), ({"result": "rejected"}, hasher["rejected"])],
+                kind="counter"),
+    ]
+
+
+def _collect_process() -> List[str]:
+    from src.services.metrics_sampler import get_metrics_sampler
+
+    lines = _gauge("datacenter_start_time_seconds", "进程启动时间", [({}, _START_TIME)])
+    sample = get_metrics_sampler().latest()
+    if sample is None:
+        return lines
+    process = sample["process"]
+    lines += _gauge("datacenter_process_cpu_percent", "进程CPU使用率（后台采样）", [({}, process["cpu_percent"])])
+    lines += _gauge("datacenter_process_memory_mb", "进程常驻内存（MB，后台采样）", [({}, process["memory_mb"])])
+    lines += _gauge("datacenter_process_threads", "进程线程数（后台采样）", [({}, process["threads"])])
+    lines += _gauge("datacenter_system_cpu_percent", "系统CPU使用率（后台采样）", [({}, sample["cpu"]["usage_percent"])])
+    lines += _gauge("datacenter_system_memory_percent", "系统内存使用率（后台采样）",
+                    [({}, sample["memory"]["usage_percent"])])
+    return lines
+
+
+_COLLECTORS = (_collect_queues, _collect_database, _collect_caches, _collect_process)
+
+
+def render_metrics() -> str:
+    """生成 Prometheus 文本格式的全部指标"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.collect())
+    for collector in _COLLECTORS:
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            # 某一部分统计不可用时不影响其他指标
+            logger.error(f"❌ 收集指标失败 ({collector.__name__}): {e}")
+            lines.append(f"# {collector.__name__} 失败: {_escape(e)}")
+    return "\n".join(lines) + "\n"
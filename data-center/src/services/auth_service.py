@@ -6,13 +6,15 @@ import secrets
 from datetime import timedelta
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
-from src.database import get_db_sync
+from src.database import get_db_sync, offload_db, run_db
 
 # 依赖注入函数
 def get_auth_service() -> "AuthService":
     """获取AuthService实例"""
     return AuthService()
 from src.models.auth import User, LoginSession
+from src.services.password_hasher import get_password_hasher
+from src.services.session_cache import get_session_cache
 from src.utils import naive_now
 
 logger = logging.getLogger(__name__)
@@ -23,7 +25,8 @@ class AuthService:
     def __init__(self):
         self.db = get_db_sync
     
-    async def create_admin_user(self, username: str = None, password: str = None) -> tuple[User, str]:
+    @offload_db
+    def create_admin_user(self, username: str = None, password: str = None) -> tuple[User, str]:
         """创建管理员用户"""
         try:
             db = self.db()
@@ -77,7 +80,24 @@ class AuthService:
         return password
     
     async def authenticate_user(self, username: str, password: str) -> Optional[User]:
-        """验证用户登录"""
+        """
+        验证用户登录（密码在密码哈希线程池中校验，不占用数据库线程）
+
+        Raises:
+            PasswordHasherBusy: 等待中的密码哈希任务已达上限
+        """
+        user = await run_db(self._get_login_user, username)
+        if not user or not await get_password_hasher().verify_password(password, user.password_hash):
+            logger.warning(f"⚠️ 用户登录失败: {username}")
+            return None
+
+        user = await run_db(self._record_login, user)
+        if user:
+            logger.info(f"✅ 用户登录成功: {username}")
+        return user
+
+    def _get_login_user(self, username: str) -> Optional[User]:
+        """查询可以登录的用户（在数据库线程池中执行）"""
         try:
             db = self.db()
 
@@ -86,29 +106,39 @@ class AuthService:
                 User.is_active == True
             ).first()
 
-            if user and user.verify_password(password):
-                # 更新最后登录时间
-                user.last_login = naive_now()
-                db.commit()
+            db.close()
+            return user
 
-                # 创建一个分离的用户对象，避免会话问题
-                user_data = User(
-                    id=user.id,
-                    username=user.username,
-                    password_hash=user.password_hash,
-                    is_active=user.is_active,
-                    created_at=user.created_at,
-                    last_login=user.last_login
-                )
+        except Exception as e:
+            logger.error(f"用户认证失败: {e}")
+            return None
 
+    def _record_login(self, user: User) -> Optional[User]:
+        """更新最后登录时间，返回分离的用户对象（在数据库线程池中执行）"""
+        try:
+            db = self.db()
+
+            user = db.query(User).filter(User.id == user.id).first()
+            if not user:
                 db.close()
+                return None
+
+            # 更新最后登录时间
+            user.last_login = naive_now()
+            db.commit()
 
-                logger.info(f"✅ 用户登录成功: {username}")
-                return user_data
+            # 创建一个分离的用户对象，避免会话问题
+            user_data = User(
+                id=user.id,
+                username=user.username,
+                password_hash=user.password_hash,
+                is_active=user.is_active,
+                created_at=user.created_at,
+                last_login=user.last_login
+            )
 
             db.close()
-            logger.warning(f"⚠️ 用户登录失败: {username}")
-            return None
+            return user_data
 
         except Exception as e:
             logger.error(f"用户认证失败: {e}")
@@ -117,12 +147,17 @@ class AuthService:
     async def create_session(self, user: User, jwt_token: str = None, ip_address: str = None,
                            user_agent: str = None, expires_hours: int = 24) -> LoginSession:
         """创建登录会话"""
+        # 清理过期会话
+        await self.cleanup_expired_sessions(user.id)
+
+        return await run_db(self._save_session, user, jwt_token, ip_address, user_agent, expires_hours)
+
+    def _save_session(self, user: User, jwt_token: str, ip_address: str,
+                      user_agent: str, expires_hours: int) -> LoginSession:
+        """保存新的登录会话（在数据库线程池中执行）"""
         try:
             db = self.db()
 
-            # 清理过期会话
-            await self.cleanup_expired_sessions(user.id)
-
             # 创建新会话
             expires_at = naive_now() + timedelta(hours=expires_hours)
             session = LoginSession(
@@ -156,7 +191,8 @@ class AuthService:
             logger.error(f"创建会话失败: {e}")
             raise
     
-    async def validate_session(self, session_token: str) -> Optional[User]:
+    @offload_db
+    def validate_session(self, session_token: str) -> Optional[User]:
         """验证会话令牌"""
         try:
             db = self.db()
@@ -184,7 +220,8 @@ class AuthService:
             logger.error(f"验证会话失败: {e}")
             return None
     
-    async def logout_session(self, session_token: str) -> bool:
+    @offload_db
+    def logout_session(self, session_token: str) -> bool:
         """注销会话"""
         try:
             db = self.db()
@@ -196,6 +233,7 @@ class AuthService:
             if session:
                 session.is_active = False
                 db.commit()
+                get_session_cache().revoke()
                 logger.info(f"✅ 会话注销成功")
                 result = True
             else:
@@ -209,7 +247,8 @@ class AuthService:
             logger.error(f"注销会话失败: {e}")
             return False
     
-    async def cleanup_expired_sessions(self, user_id: int = None):
+    @offload_db
+    def cleanup_expired_sessions(self, user_id: int = None):
         """清理过期会话"""
         try:
             db = self.db()
@@ -233,37 +272,76 @@ class AuthService:
             logger.error(f"清理过期会话失败: {e}")
     
     async def change_password(self, user_id: int, old_password: str, new_password: str) -> bool:
-        """修改密码"""
+        """
+        修改密码
+
+        Raises:
+            PasswordHasherBusy: 等待中的密码哈希任务已达上限
+        """
+        hasher = get_password_hasher()
+        user = await self.get_user_by_id(user_id)
+        if not user:
+            return False
+
+        # 验证旧密码
+        if not await hasher.verify_password(old_password, user.password_hash):
+            logger.warning(f"⚠️ 旧密码验证失败: 用户{user.username}")
+            return False
+
+        # 设置新密码（密码在校验后被其他请求修改过时不覆盖）
+        password_hash = await hasher.hash_password(new_password)
+        if not await run_db(self._store_password_hash, user_id, password_hash, user.password_hash):
+            return False
+
+        # 清理该用户的所有会话（强制重新登录）
+        await self.logout_all_sessions(user_id)
+
+        logger.info(f"✅ 密码修改成功: 用户{user.username}")
+        return True
+
+    def _store_password_hash(self, user_id: int, password_hash: str, expected_hash: str = None) -> bool:
+        """
+        写入新的密码哈希（在数据库线程池中执行）
+
+        Args:
+            expected_hash: 不为空时，只有当前哈希仍为该值才写入
+        """
         try:
             db = self.db()
-            
-            user = db.query(User).filter(User.id == user_id).first()
+
+            user = db.query(User).filter(
+                User.id == user_id,
+                User.is_active == True
+            ).first()
+
             if not user:
+                logger.error(f"用户不存在: {user_id}")
                 db.close()
                 return False
-            
-            # 验证旧密码
-            if not user.verify_password(old_password):
+
+            if expected_hash is not None and user.password_hash != expected_hash:
+                logger.warning(f"⚠️ 密码已被修改，放弃本次修改: 用户{user.username}")
                 db.close()
-                logger.warning(f"⚠️ 旧密码验证失败: 用户{user.username}")
                 return False
-            
-            # 设置新密码
-            user.set_password(new_password)
+
+            # 更新密码
+            user.password_hash = password_hash
+            user.updated_at = naive_now()
+
             db.commit()
             db.close()
-            
-            # 清理该用户的所有会话（强制重新登录）
-            await self.logout_all_sessions(user_id)
-            
-            logger.info(f"✅ 密码修改成功: 用户{user.username}")
+            get_session_cache().revoke()
             return True
-            
+
         except Exception as e:
             logger.error(f"修改密码失败: {e}")
+            if 'db' in locals():
+                db.rollback()
+                db.close()
             return False
     
-    async def logout_all_sessions(self, user_id: int) -> bool:
+    @offload_db
+    def logout_all_sessions(self, user_id: int) -> bool:
         """注销用户的所有会话"""
         try:
             db = self.db()
@@ -278,6 +356,7 @@ class AuthService:
             
             db.commit()
             db.close()
+            get_session_cache().revoke()
             
             logger.info(f"✅ 注销所有会话成功: 用户ID{user_id}")
             return True
@@ -286,7 +365,8 @@ class AuthService:
             logger.error(f"注销所有会话失败: {e}")
             return False
     
-    async def get_user_sessions(self, user_id: int) -> list[LoginSession]:
+    @offload_db
+    def get_user_sessions(self, user_id: int) -> list[LoginSession]:
         """获取用户的活跃会话"""
         try:
             db = self.db()
@@ -304,7 +384,8 @@ class AuthService:
             logger.error(f"获取用户会话失败: {e}")
             return []
 
-    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+    @offload_db
+    def get_user_by_id(self, user_id: int) -> Optional[User]:
         """根据用户ID获取用户"""
         try:
             db = self.db()
@@ -322,38 +403,21 @@ class AuthService:
             return None
 
     async def change_user_password(self, user_id: int, new_password: str) -> bool:
-        """修改用户密码"""
-        try:
-            db = self.db()
-
-            user = db.query(User).filter(
-                User.id == user_id,
-                User.is_active == True
-            ).first()
-
-            if not user:
-                logger.error(f"用户不存在: {user_id}")
-                db.close()
-                return False
-
-            # 更新密码
-            user.set_password(new_password)
-            user.updated_at = naive_now()
-
-            db.commit()
-            db.close()
-
-            logger.info(f"用户 {user.username} 密码修改成功")
-            return True
-
-        except Exception as e:
-            logger.error(f"修改密码失败: {e}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
+        """
+        修改用户密码
+
+        Raises:
+            PasswordHasherBusy: 等待中的密码哈希任务已达上限
+        """
+        password_hash = await get_password_hasher().hash_password(new_password)
+        if not await run_db(self._store_password_hash, user_id, password_hash):
             return False
 
-    async def get_session_by_jwt_token(self, jwt_token: str) -> Optional[LoginSession]:
+        logger.info(f"用户ID {user_id} 密码修改成功")
+        return True
+
+    @offload_db
+    def get_session_by_jwt_token(self, jwt_token: str) -> Optional[LoginSession]:
         """根据JWT令牌获取会话"""
         try:
             db = self.db()
@@ -372,8 +436,15 @@ class AuthService:
             return None
 
     async def validate_jwt_session(self, jwt_token: str) -> Optional[User]:
-        """验证JWT令牌并返回用户信息"""
+        """验证JWT令牌并返回用户信息（验证通过的结果缓存在 SessionCache 中，重复请求不访问数据库）"""
         try:
+            cache = get_session_cache()
+            user = cache.get(jwt_token)
+            if user is not None:
+                return user
+            # 在查询之前读取撤销代数，查询期间发生撤销时不缓存结果
+            generation = cache.generation
+
             # 从数据库中查找会话
             session = await self.get_session_by_jwt_token(jwt_token)
             if not session:
@@ -386,13 +457,15 @@ class AuthService:
                 logger.warning(f"🔐 会话对应的用户不存在: user_id={session.user_id}")
                 return None
 
+            cache.put(jwt_token, user, session.expires_at, generation)
             return user
 
         except Exception as e:
             logger.error(f"JWT会话验证失败: {e}")
             return None
 
-    async def revoke_jwt_session(self, jwt_token: str) -> bool:
+    @offload_db
+    def revoke_jwt_session(self, jwt_token: str) -> bool:
         """撤销JWT会话"""
         try:
             db = self.db()
@@ -406,6 +479,7 @@ class AuthService:
             if session:
                 session.is_active = False
                 db.commit()
+                get_session_cache().revoke()
                 logger.info(f"🔐 JWT会话已撤销: session_id={session.id}")
                 db.close()
                 return True
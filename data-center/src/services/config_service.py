@@ -1,22 +1,73 @@
 """
 配置管理服务
 """
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 
-from src.database import get_db_sync
+from src.database import get_db_sync, offload_db, run_db
 from src.models.config import UAConfig, IPBlacklist, WorkerConfig, SystemConfig
 
 logger = logging.getLogger(__name__)
 
+# Worker配置版本号与内容摘要（持久化到 system_configs，保证重启后版本号不回退）
+CONFIG_VERSION_KEY = "worker_config_version"
+CONFIG_DIGEST_KEY = "worker_config_digest"
+
+# 推送给Worker的配置分区
+CONFIG_SECTIONS = ("ua_configs", "ip_blacklist")
+
+# 内存中保留的增量数量，Worker落后更多版本时发送完整快照
+CONFIG_DELTA_HISTORY = 50
+
+# 配置未被本服务修改时，重新检查数据库的间隔（秒），用于发现外部修改
+CONFIG_RECHECK_SECONDS = 60
+
+# Worker配置版本状态（进程内共享）
+_config_version_lock = threading.Lock()
+_config_state: Dict[str, Any] = {
+    "version": None,
+    "digest": None,
+    "snapshot": None,
+    "updated_at": None,
+    "checked_at": 0.0,
+    "dirty": True
+}
+# 版本号 -> 相对上一版本的增量
+_config_deltas: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+
+def invalidate_worker_config():
+    """标记Worker配置已修改，下次导出时重新计算版本"""
+    _config_state["dirty"] = True
+
+
+def config_etag(version: int) -> str:
+    """配置版本对应的 ETag"""
+    return f'"v{version}"'
+
+
+def _diff_section(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """计算一个配置分区的增量：新增/修改的条目和删除的键"""
+    return {
+        "upsert": {key: value for key, value in new.items() if old.get(key) != value},
+        "remove": [key for key in old if key not in new]
+    }
+
 class ConfigService:
     """配置管理服务类"""
     
     def __init__(self):
         self.db = get_db_sync
     
-    async def get_ua_configs(self) -> List[UAConfig]:
+    @offload_db
+    def get_ua_configs(self) -> List[UAConfig]:
         """获取所有UA配置"""
         try:
             db = self.db()
@@ -27,7 +78,8 @@ class ConfigService:
             logger.error(f"获取UA配置失败: {e}")
             return []
     
-    async def get_ua_config_by_name(self, name: str) -> Optional[UAConfig]:
+    @offload_db
+    def get_ua_config_by_name(self, name: str) -> Optional[UAConfig]:
         """根据名称获取UA配置"""
         try:
             db = self.db()
@@ -38,7 +90,8 @@ class ConfigService:
             logger.error(f"获取UA配置失败: {e}")
             return None
     
-    async def create_ua_config(self, name: str, user_agent: str, hourly_limit: int = 100, 
+    @offload_db
+    def create_ua_config(self, name: str, user_agent: str, hourly_limit: int = 100, 
                               enabled: bool = True, path_specific_limits: Dict = None) -> Optional[UAConfig]:
         """创建UA配置"""
         try:
@@ -61,6 +114,7 @@ class ConfigService:
             
             db.add(config)
             db.commit()
+            invalidate_worker_config()
             db.refresh(config)
             db.close()
             
@@ -71,7 +125,8 @@ class ConfigService:
             logger.error(f"创建UA配置失败: {e}")
             return None
     
-    async def update_ua_config(self, name: str, **kwargs) -> bool:
+    @offload_db
+    def update_ua_config(self, name: str, **kwargs) -> bool:
         """更新UA配置"""
         try:
             db = self.db()
@@ -86,6 +141,7 @@ class ConfigService:
                     setattr(config, key, value)
             
             db.commit()
+            invalidate_worker_config()
             db.close()
             
             logger.info(f"更新UA配置成功: {name}")
@@ -95,7 +151,8 @@ class ConfigService:
             logger.error(f"更新UA配置失败: {e}")
             return False
     
-    async def toggle_ua_config(self, name: str) -> bool:
+    @offload_db
+    def toggle_ua_config(self, name: str) -> bool:
         """切换UA配置启用状态"""
         try:
             db = self.db()
@@ -107,6 +164,7 @@ class ConfigService:
             
             config.enabled = not config.enabled
             db.commit()
+            invalidate_worker_config()
             db.close()
             
             logger.info(f"切换UA配置状态成功: {name} -> {config.enabled}")
@@ -116,7 +174,8 @@ class ConfigService:
             logger.error(f"切换UA配置状态失败: {e}")
             return False
     
-    async def delete_ua_config(self, name: str) -> bool:
+    @offload_db
+    def delete_ua_config(self, name: str) -> bool:
         """删除UA配置"""
         try:
             if name == "default":
@@ -132,6 +191,7 @@ class ConfigService:
             
             db.delete(config)
             db.commit()
+            invalidate_worker_config()
             db.close()
             
             logger.info(f"删除UA配置成功: {name}")
@@ -141,7 +201,8 @@ class ConfigService:
             logger.error(f"删除UA配置失败: {e}")
             return False
     
-    async def get_ip_blacklist(self) -> List[IPBlacklist]:
+    @offload_db
+    def get_ip_blacklist(self) -> List[IPBlacklist]:
         """获取IP黑名单"""
         try:
             db = self.db()
@@ -152,7 +213,8 @@ class ConfigService:
             logger.error(f"获取IP黑名单失败: {e}")
             return []
     
-    async def add_ip_to_blacklist(self, ip_address: str, reason: str = None) -> Optional[IPBlacklist]:
+    @offload_db
+    def add_ip_to_blacklist(self, ip_address: str, reason: str = None) -> Optional[IPBlacklist]:
         """添加IP到黑名单"""
         try:
             db = self.db()
@@ -172,6 +234,7 @@ class ConfigService:
             
             db.add(blacklist_entry)
             db.commit()
+            invalidate_worker_config()
             db.refresh(blacklist_entry)
             db.close()
             
@@ -182,7 +245,8 @@ class ConfigService:
             logger.error(f"添加IP到黑名单失败: {e}")
             return None
     
-    async def remove_ip_from_blacklist(self, ip_address: str) -> bool:
+    @offload_db
+    def remove_ip_from_blacklist(self, ip_address: str) -> bool:
         """从黑名单移除IP"""
         try:
             db = self.db()
@@ -194,6 +258,7 @@ class ConfigService:
             
             db.delete(entry)
             db.commit()
+            invalidate_worker_config()
             db.close()
             
             logger.info(f"从黑名单移除IP成功: {ip_address}")
@@ -203,7 +268,8 @@ class ConfigService:
             logger.error(f"从黑名单移除IP失败: {e}")
             return False
     
-    async def get_worker_configs(self) -> List[WorkerConfig]:
+    @offload_db
+    def get_worker_configs(self) -> List[WorkerConfig]:
         """获取Worker配置"""
         try:
             db = self.db()
@@ -214,7 +280,8 @@ class ConfigService:
             logger.error(f"获取Worker配置失败: {e}")
             return []
     
-    async def get_system_config(self, key: str) -> Optional[str]:
+    @offload_db
+    def get_system_config(self, key: str) -> Optional[str]:
         """获取系统配置"""
         try:
             db = self.db()
@@ -225,7 +292,8 @@ class ConfigService:
             logger.error(f"获取系统配置失败: {e}")
             return None
     
-    async def set_system_config(self, key: str, value: str, description: str = None) -> bool:
+    @offload_db
+    def set_system_config(self, key: str, value: str, description: str = None) -> bool:
         """设置系统配置"""
         try:
             db = self.db()
@@ -254,41 +322,188 @@ class ConfigService:
             return False
     
     async def export_config_for_worker(self) -> Dict[str, Any]:
-        """导出配置给Worker使用"""
+        """导出配置给Worker使用（完整快照）"""
+        return await self.get_worker_config()
+
+    async def get_worker_config(self, since_version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取Worker配置（带版本号）
+
+        Args:
+            since_version: Worker已确认的配置版本；在增量历史范围内时返回增量，否则返回完整快照
+
+        Returns:
+            完整快照: {"mode": "full", "version", "ua_configs", "ip_blacklist", "updated_at"}
+            增量: {"mode": "delta", "version", "base_version", "updated_at",
+                   "ua_configs": {"upsert", "remove"}, "ip_blacklist": {"upsert", "remove"}}
+        """
+        return await run_db(self._get_worker_config, since_version)
+
+    def _get_worker_config(self, since_version: Optional[int] = None) -> Dict[str, Any]:
         try:
-            ua_configs = await self.get_ua_configs()
-            blacklist = await self.get_ip_blacklist()
-            
-            # 转换为Worker需要的格式
-            ua_config_dict = {}
-            for config in ua_configs:
-                if config.enabled:
-                    ua_config_dict[config.name] = {
-                        "userAgent": config.user_agent,
-                        "hourlyLimit": config.hourly_limit,
-                        "enabled": config.enabled,
-                        "pathSpecificLimits": config.path_specific_limits or {}
-                    }
-            
-            blacklist_dict = {}
-            for ip_entry in blacklist:
-                if ip_entry.enabled:
-                    blacklist_dict[ip_entry.ip_address] = {
-                        "reason": ip_entry.reason or "Manual blacklist",
-                        "enabled": ip_entry.enabled
-                    }
-            
-            return {
-                "ua_configs": ua_config_dict,
-                "ip_blacklist": blacklist_dict,
-                "updated_at": "now"
-            }
-            
+            with _config_version_lock:
+                self._refresh_worker_config()
+                state = _config_state
+
+                if since_version is not None:
+                    delta = self._collect_config_delta(since_version)
+                    if delta is not None:
+                        return {
+                            "mode": "delta",
+                            "version": state["version"],
+                            "base_version": since_version,
+                            "updated_at": state["updated_at"],
+                            **delta
+                        }
+
+                return {
+                    "mode": "full",
+                    "version": state["version"],
+                    "updated_at": state["updated_at"],
+                    **state["snapshot"]
+                }
+
         except Exception as e:
             logger.error(f"导出配置失败: {e}")
             return {}
 
-    async def save_ua_configs(self, ua_configs: List[Dict[str, Any]]) -> bool:
+    def _build_worker_snapshot(self, db: Session) -> Dict[str, Any]:
+        """从数据库构建Worker需要的配置格式"""
+        ua_config_dict = {}
+        for config in db.query(UAConfig).filter(UAConfig.enabled == True).all():
+            ua_config_dict[config.name] = {
+                "userAgent": config.user_agent,
+                "hourlyLimit": config.hourly_limit,
+                "enabled": config.enabled,
+                "pathSpecificLimits": config.path_specific_limits or {}
+            }
+
+        blacklist_dict = {}
+        for ip_entry in db.query(IPBlacklist).filter(IPBlacklist.enabled == True).all():
+            blacklist_dict[ip_entry.ip_address] = {
+                "reason": ip_entry.reason or "Manual blacklist",
+                "enabled": ip_entry.enabled
+            }
+
+        return {
+            "ua_configs": ua_config_dict,
+            "ip_blacklist": blacklist_dict
+        }
+
+    def _refresh_worker_config(self):
+        """
+        重新读取配置快照（调用方持有 _config_version_lock）
+
+        内容摘要变化时版本号加一，并记录相对上一版本的增量
+        """
+        state = _config_state
+        now = time.monotonic()
+        if not state["dirty"] and state["snapshot"] is not None and now - state["checked_at"] < CONFIG_RECHECK_SECONDS:
+            return
+
+        # 先清除标记：读取期间发生的修改会在下次导出时生效
+        state["dirty"] = False
+
+        db = self.db()
+        try:
+            snapshot = self._build_worker_snapshot(db)
+            digest = hashlib.sha256(
+                json.dumps(snapshot, sort_keys=True, ensure_ascii=False).encode("utf-8")
+            ).hexdigest()
+
+            # 进程启动后首次计算：从数据库恢复版本号
+            if state["version"] is None:
+                stored = {
+                    config.key: config
+                    for config in db.query(SystemConfig).filter(
+                        SystemConfig.key.in_([CONFIG_VERSION_KEY, CONFIG_DIGEST_KEY])
+                    ).all()
+                }
+                version_row = stored.get(CONFIG_VERSION_KEY)
+                digest_row = stored.get(CONFIG_DIGEST_KEY)
+                state["version"] = int(version_row.value) if version_row and version_row.value else 0
+                state["digest"] = digest_row.value if digest_row else None
+                if version_row and (version_row.updated_at or version_row.created_at):
+                    state["updated_at"] = (version_row.updated_at or version_row.created_at).isoformat()
+
+            if digest != state["digest"]:
+                version = state["version"] + 1
+                if state["snapshot"] is not None:
+                    _config_deltas[version] = {
+                        section: _diff_section(state["snapshot"][section], snapshot[section])
+                        for section in CONFIG_SECTIONS
+                    }
+                    while len(_config_deltas) > CONFIG_DELTA_HISTORY:
+                        _config_deltas.popitem(last=False)
+
+                self._save_config_version(db, version, digest)
+                state["version"] = version
+                state["digest"] = digest
+                state["updated_at"] = datetime.now().isoformat()
+                logger.info(f"📦 Worker配置版本更新: v{version}")
+
+            if state["updated_at"] is None:
+                state["updated_at"] = datetime.now().isoformat()
+            state["snapshot"] = snapshot
+            state["checked_at"] = now
+
+        except Exception:
+            state["dirty"] = True
+            raise
+        finally:
+            db.close()
+
+    def _save_config_version(self, db: Session, version: int, digest: str):
+        """持久化配置版本号和内容摘要"""
+        for key, value, description in (
+            (CONFIG_VERSION_KEY, str(version), "Worker配置版本号"),
+            (CONFIG_DIGEST_KEY, digest, "Worker配置内容摘要"),
+        ):
+            config = db.query(SystemConfig).filter(SystemConfig.key == key).first()
+            if config:
+                config.value = value
+            else:
+                db.add(SystemConfig(key=key, value=value, description=description))
+        db.commit()
+
+    def _collect_config_delta(self, since_version: int) -> Optional[Dict[str, Any]]:
+        """
+        合并 since_version 之后的所有增量（调用方持有 _config_version_lock）
+
+        增量历史不完整，或变化条目超过完整快照的一半时返回 None（改为发送完整快照）
+        """
+        version = _config_state["version"]
+        if since_version < 0 or since_version > version:
+            return None
+
+        needed = range(since_version + 1, version + 1)
+        if any(v not in _config_deltas for v in needed):
+            return None
+
+        merged = {section: {"upsert": {}, "remove": set()} for section in CONFIG_SECTIONS}
+        for v in needed:
+            for section in CONFIG_SECTIONS:
+                change = _config_deltas[v][section]
+                target = merged[section]
+                for key in change["remove"]:
+                    target["upsert"].pop(key, None)
+                    target["remove"].add(key)
+                for key, value in change["upsert"].items():
+                    target["upsert"][key] = value
+                    target["remove"].discard(key)
+
+        changes = sum(len(m["upsert"]) + len(m["remove"]) for m in merged.values())
+        total = sum(len(_config_state["snapshot"][section]) for section in CONFIG_SECTIONS)
+        if changes > 0 and changes * 2 > total:
+            return None
+
+        return {
+            section: {"upsert": merged[section]["upsert"], "remove": sorted(merged[section]["remove"])}
+            for section in CONFIG_SECTIONS
+        }
+
+    @offload_db
+    def save_ua_configs(self, ua_configs: List[Dict[str, Any]]) -> bool:
         """保存UA配置"""
         try:
             db = self.db()
@@ -317,6 +532,7 @@ class ConfigService:
                 db.add(ua_config)
 
             db.commit()
+            invalidate_worker_config()
             db.close()
             return True
 
@@ -327,7 +543,8 @@ class ConfigService:
                 db.close()
             return False
 
-    async def save_ip_blacklist(self, ip_list: List[str]) -> bool:
+    @offload_db
+    def save_ip_blacklist(self, ip_list: List[str]) -> bool:
         """保存IP黑名单"""
         try:
             db = self.db()
@@ -346,6 +563,7 @@ class ConfigService:
                     db.add(ip_blacklist)
 
             db.commit()
+            invalidate_worker_config()
             db.close()
             return True
 
@@ -0,0 +1,270 @@
+"""
+数据库连接池与查询耗时统计
+
+系统统计原来只执行一次 SELECT 1，返回写死的连接池大小。这里通过 SQLAlchemy 事件收集真实数据，
+用来判断Worker数据写入变慢是因为连接池耗尽还是SQL本身慢：
+
+- 连接池：checkout/checkin/connect/invalidate 事件计数；取连接的等待时间和正在等待的线程数
+  由 InstrumentedQueuePool.connect() 统计（连接池事件只在取到连接之后触发）
+- 查询：before_cursor_execute/after_cursor_execute 记录每条语句的耗时，按语句类型
+  （SELECT/INSERT/UPDATE/DELETE/OTHER）累计直方图，并按语句文本统计总耗时最高的语句
+"""
+import bisect
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# 直方图的桶上界（毫秒）
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 超过该耗时的语句计为慢查询（毫秒）
+SLOW_QUERY_MS = 500
+
+# 按语句文本统计的语句数上限，以及返回的最慢语句数
+MAX_TRACKED_STATEMENTS = 200
+TOP_STATEMENTS = 10
+
+STATEMENT_TEXT_LENGTH = 200
+
+STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Histogram:
+    """耗时直方图（毫秒）"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.bucket_counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """分位数的估计值（所在桶的上界；落在最后一个桶时为最大值）"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.bucket_counts):
+            cumulative += count
+            if cumulative >= rank:
+                return float(HISTOGRAM_BUCKETS_MS[index]) if index < len(HISTOGRAM_BUCKETS_MS) else round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """buckets 为累计计数（<= 上界），与 Prometheus 直方图一致"""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.bucket_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "avg_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets
+        }
+
+
+class DatabaseTelemetry:
+    """连接池与查询耗时统计（事件在各个数据库线程中触发，用线程锁保护）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool_events = {
+            "checkouts": 0,
+            "checkins": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "timeouts": 0,
+            "checkout_errors": 0
+        }
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkout_wait = Histogram()
+
+        self.statements = {kind: Histogram() for kind in STATEMENT_KINDS + ("OTHER",)}
+        self.slow_queries = 0
+        self.errors = 0
+        # 语句原始文本 -> [次数, 总耗时, 最大耗时]
+        self._by_text: Dict[str, List[float]] = {}
+        self.untracked_statements = 0
+
+    def install(self, engine):
+        """注册连接池和查询事件"""
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._on_error)
+
+    # ---------- 连接池 ----------
+
+    def _count(self, name: str):
+        with self._lock:
+            self.pool_events[name] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._count("checkouts")
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self._count("checkins")
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self._count("connects")
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self._count("invalidations")
+
+    def checkout_started(self):
+        with self._lock:
+            self.waiting += 1
+            if self.waiting > self.max_waiting:
+                self.max_waiting = self.waiting
+
+    def checkout_finished(self, wait_ms: float, error: Optional[str] = None):
+        """取连接结束；error 为 timeouts（等待超时）或 checkout_errors（建立连接失败等）"""
+        with self._lock:
+            self.waiting -= 1
+            if error is None:
+                self.checkout_wait.observe(wait_ms)
+            else:
+                self.pool_events[error] += 1
+
+    # ---------- 查询 ----------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # (语句, 开始时间)：出错时按语句判断开始时间是否由本次执行压入
+        conn.info.setdefault("query_started", []).append((statement, time.perf_counter()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        ms = (time.perf_counter() - started.pop()[1]) * 1000
+
+        kind = statement.lstrip()[:6].upper()
+        with self._lock:
+            self.statements[kind if kind in self.statements else "OTHER"].observe(ms)
+            if ms >= SLOW_QUERY_MS:
+                self.slow_queries += 1
+            # 按原始语句文本累计（编译后的语句文本会被缓存复用），返回结果时再整理格式
+            entry = self._by_text.get(statement)
+            if entry is None:
+                if len(self._by_text) >= MAX_TRACKED_STATEMENTS:
+                    self.untracked_statements += 1
+                    return
+                entry = self._by_text[statement] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += ms
+            if ms > entry[2]:
+                entry[2] = ms
+
+    def _on_error(self, exception_context):
+        # 在 handle_error 中抛出的异常会替换原来的数据库错误，这里不能抛出任何异常
+        try:
+            connection = getattr(exception_context, "connection", None)
+            started = connection.info.get("query_started") if connection is not None else None
+            # 建立连接、编译语句等阶段出错时 before_cursor_execute 没有执行，不弹出
+            if started and started[-1][0] == getattr(exception_context, "statement", None):
+                started.pop()
+            with self._lock:
+                self.errors += 1
+        except Exception:
+            pass
+
+    # ---------- 统计结果 ----------
+
+    def get_stats(self, pool) -> Dict[str, Any]:
+        """连接池当前状态与累计统计"""
+        with self._lock:
+            pool_stats = {
+                **self._pool_state(pool),
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                **self.pool_events,
+                "checkout_wait": self.checkout_wait.to_dict()
+            }
+            top = sorted(self._by_text.items(), key=lambda item: item[1][1], reverse=True)[:TOP_STATEMENTS]
+            queries = {
+                "by_kind": {kind: histogram.to_dict() for kind, histogram in self.statements.items()},
+                "total": sum(histogram.count for histogram in self.statements.values()),
+                "slow_queries": self.slow_queries,
+                "slow_query_ms": SLOW_QUERY_MS,
+                "errors": self.errors,
+                "untracked_statements": self.untracked_statements,
+                "top_statements": [
+                    {
+                        "statement": _WHITESPACE.sub(" ", text.strip())[:STATEMENT_TEXT_LENGTH],
+                        "count": count,
+                        "total_ms": round(total, 3),
+                        "avg_ms": round(total / count, 3) if count else 0.0,
+                        "max_ms": round(maximum, 3)
+                    }
+                    for text, (count, total, maximum) in top
+                ]
+            }
+        return {"pool": pool_stats, "queries": queries}
+
+    @staticmethod
+    def _pool_state(pool) -> Dict[str, Any]:
+        if not isinstance(pool, QueuePool):
+            # SQLite 内存数据库的 StaticPool 等只有一个连接
+            return {"class": type(pool).__name__}
+        return {
+            "class": type(pool).__name__,
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # QueuePool.overflow() 在连接数未达到 size 时为负数
+            "overflow": max(0, pool.overflow())
+        }
+
+
+# 全局实例（database.py 创建引擎时注册事件）
+db_telemetry = DatabaseTelemetry()
+
+def get_db_telemetry() -> DatabaseTelemetry:
+    """获取数据库统计实例"""
+    return db_telemetry
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录取连接等待时间和等待线程数的 QueuePool"""
+
+    def connect(self):
+        db_telemetry.checkout_started()
+        started = time.perf_counter()
+        error = None
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            error = "timeouts"
+            raise
+        except Exception:
+            error = "checkout_errors"
+            raise
+        finally:
+            db_telemetry.checkout_finished((time.perf_counter() - started) * 1000, error)
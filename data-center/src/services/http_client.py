@@ -0,0 +1,101 @@
+"""
+Worker通信共享HTTP客户端
+
+所有与 Cloudflare Worker 的请求共用一个应用级 httpx.AsyncClient：
+- 连接池 + keep-alive：同一个Worker的后续请求复用已建立的 TCP/TLS 连接，不再每次握手
+- HTTP/2（安装 h2 时启用）：同一连接上多路复用并发请求
+
+客户端在 main.lifespan 中创建、关闭时释放。在客户端所属事件循环之外
+（如 Telegram 机器人线程、独立脚本）调用时，自动退回到临时客户端。
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+
+import httpx
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 全局实例
+_worker_client: Optional[httpx.AsyncClient] = None
+_worker_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 依赖 h2 包（httpx[http2]）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _client_options() -> Dict[str, Any]:
+    """Worker客户端参数"""
+    return {
+        "timeout": httpx.Timeout(settings.SYNC_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(
+            max_connections=settings.WORKER_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WORKER_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.WORKER_HTTP_KEEPALIVE_EXPIRY
+        ),
+        "http2": settings.WORKER_HTTP2 and _http2_available()
+    }
+
+
+async def start_worker_client() -> httpx.AsyncClient:
+    """创建共享客户端（应用启动时调用）"""
+    global _worker_client, _worker_client_loop
+
+    if _worker_client is not None and not _worker_client.is_closed:
+        return _worker_client
+
+    options = _client_options()
+    if settings.WORKER_HTTP2 and not options["http2"]:
+        logger.warning("⚠️ 未安装 h2，Worker客户端使用 HTTP/1.1（pip install httpx[http2]）")
+
+    _worker_client = httpx.AsyncClient(**options)
+    _worker_client_loop = asyncio.get_running_loop()
+    logger.info(
+        f"✅ Worker HTTP客户端已创建: HTTP/2={'开启' if options['http2'] else '关闭'}, "
+        f"最大连接={settings.WORKER_HTTP_MAX_CONNECTIONS}, keep-alive={settings.WORKER_HTTP_MAX_KEEPALIVE}"
+    )
+    return _worker_client
+
+
+async def close_worker_client():
+    """关闭共享客户端（应用关闭时调用）"""
+    global _worker_client, _worker_client_loop
+
+    if _worker_client is None:
+        return
+
+    try:
+        await _worker_client.aclose()
+        logger.info("✅ Worker HTTP客户端已关闭")
+    except Exception as e:
+        logger.error(f"❌ 关闭Worker HTTP客户端失败: {e}")
+    finally:
+        _worker_client = None
+        _worker_client_loop = None
+
+
+@asynccontextmanager
+async def worker_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    获取与Worker通信的客户端
+
+    用法与 `async with httpx.AsyncClient() as client` 相同；共享客户端可用时直接复用
+    （退出时不关闭），否则创建临时客户端并在退出时关闭。单次请求的超时通过
+    client.get(..., timeout=...) 指定。
+    """
+    client = _worker_client
+    if client is not None and not client.is_closed and _worker_client_loop is asyncio.get_running_loop():
+        yield client
+        return
+
+    async with httpx.AsyncClient(**_client_options()) as client:
+        yield client
@@ -0,0 +1,557 @@
+"""
+Worker数据写入队列（write-behind）
+
+Worker 推送的统计、日志、IP请求统计先经过校验放入有界的进程内队列，
+接口立即返回 202；后台消费者批量取出、按 (类型, Worker, 小时) 合并后写入数据库（统计数据按接收时间归入小时）。
+
+- 背压：队列满时抛出 IngestQueueFull，接口返回 429 + Retry-After
+- 持久化：入队的数据追加写入日志文件（write-ahead journal），写入数据库（或最终放弃）后追加确认记录；
+  进程崩溃、被 kill 后重启时重放未确认的数据（至少写入一次，各类数据的写入都是幂等的：快照覆盖、upsert、
+  日志按请求ID去重）。序列化、写文件和重写都在 JournalWriter 的后台线程中进行，入队只把记录交给该线程，
+  不阻塞事件循环；每批记录写完后 flush 到操作系统（未 fsync），返回 202 到写入文件之间有毫秒级的窗口
+- 指标：队列深度、入队/写入/拒绝/失败计数、写入延迟（入队到落库）；每个Worker写入的条数记录到 /metrics
+- 同步日志：每个请求的传输统计（压缩前后字节数）在写入完成后批量记录到 SyncLog
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from src.config import settings
+from src.database import run_db
+from src.services.app_metrics import INGEST_LAG, INGEST_ROWS, ingest_row_count
+from src.services.stats_cache import get_stats_cache
+from src.services.stats_service import hour_bucket
+from src.utils.logger_setup import bind_log_context
+
+logger = logging.getLogger(__name__)
+
+# 支持的数据类型
+INGEST_KINDS = ("stats", "logs", "request_stats", "config_status")
+
+# 写入失败时的最大重试次数
+MAX_INGEST_ATTEMPTS = 3
+
+# 关闭时等待队列排空的最长时间（秒）
+DRAIN_TIMEOUT_SECONDS = 10
+
+# 旧版本关闭时写入的溢出文件（启动时仍会恢复）
+SPILL_FILE_NAME = "ingest_spill.jsonl"
+
+JOURNAL_FILE_NAME = "ingest_journal.jsonl"
+
+# 日志文件超过该大小时重写为只包含未确认的数据
+JOURNAL_COMPACT_BYTES = 16 * 1024 * 1024
+
+
+class IngestQueueFull(Exception):
+    """写入队列已满"""
+
+
+class JournalWriter:
+    """
+    写入队列日志文件的后台线程
+
+    追加、确认、重写按提交顺序执行；每次取出当前积压的全部记录写入后只 flush 一次。
+    未确认数据的副本由该线程保存，用于重写日志文件（事件循环线程不读写文件）
+    """
+
+    def __init__(self, path: str, metrics: Dict[str, Any]):
+        self.path = path
+        self.metrics = metrics
+        self._commands: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, items: Dict[int, Dict[str, Any]] = None):
+        """启动写入线程；items 为启动时恢复的未确认数据，先按新序号重写日志文件"""
+        self._items = dict(items or {})
+        self._thread = threading.Thread(target=self._run, name="ingest-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, seq: int, item: Dict[str, Any]):
+        self._commands.put(("append", seq, item))
+
+    def ack(self, seqs: List[int]):
+        self._commands.put(("ack", seqs, None))
+
+    def stop(self):
+        """写完积压的记录，把日志文件重写为只包含未确认的数据后关闭（阻塞直到完成）"""
+        if self._thread is None:
+            return
+        self._commands.put(("stop", None, None))
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        self._compact()
+        while True:
+            commands = [self._commands.get()]
+            while True:
+                try:
+                    commands.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = False
+            try:
+                for command, arg, item in commands:
+                    if command == "append":
+                        self._items[arg] = item
+                        self._write({"seq": arg, "item": item})
+                    elif command == "ack":
+                        for seq in arg:
+                            self._items.pop(seq, None)
+                        if self._items:
+                            self._write({"ack": arg})
+                        else:
+                            # 没有未确认的数据，清空日志文件
+                            self._compact()
+                    else:
+                        stopping = True
+                if self._file is not None:
+                    self._file.flush()
+                    if self._file.tell() > JOURNAL_COMPACT_BYTES:
+                        self._compact()
+            except Exception as e:
+                self.metrics["journal_errors"] += 1
+                logger.error(f"❌ 写入队列日志文件写入失败: {e}")
+
+            if stopping:
+                self._compact()
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, record: Dict[str, Any]):
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def _compact(self):
+        """把日志文件重写为只包含未确认的数据"""
+        try:
+            if self._file is not None:
+                self._file.close()
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for seq, item in self._items.items():
+                    f.write(json.dumps({"seq": seq, "item": item}, ensure_ascii=False, default=str) + "\n")
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            self.metrics["journal_errors"] += 1
+            logger.error(f"❌ 重写写入队列日志文件失败: {e}")
+        try:
+            self._file = open(self.path, "a", encoding="utf-8")
+        except Exception as e:
+            self._file = None
+            self.metrics["journal_errors"] += 1
+            logger.error(f"❌ 打开写入队列日志文件失败，入队数据将不会持久化: {e}")
+
+
+class IngestQueue:
+    """Worker数据写入队列"""
+
+    def __init__(self, maxsize: int = None, consumers: int = None, batch_size: int = None,
+                 spill_path: str = None, journal_path: str = None):
+        self.maxsize = maxsize or settings.INGEST_QUEUE_MAXSIZE
+        self.consumer_count = consumers or settings.INGEST_QUEUE_CONSUMERS
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.spill_path = spill_path or os.path.join(settings.CONFIG_PATH, SPILL_FILE_NAME)
+        self.journal_path = journal_path or os.path.join(settings.CONFIG_PATH, JOURNAL_FILE_NAME)
+
+        # 已入队但还未确认的数据的序号（数据副本由 JournalWriter 保存）
+        self._unacked = set()
+        self._next_seq = 1
+        self._requeue_task: Optional[asyncio.Task] = None
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.maxsize)
+        self._consumers: List[asyncio.Task] = []
+        self._running = False
+
+        self.metrics = {
+            "enqueued": 0,
+            "processed": 0,
+            "rejected": 0,
+            "failed": 0,
+            "retried": 0,
+            "batches": 0,
+            "max_depth": 0,
+            "last_lag_ms": 0,
+            "max_lag_ms": 0,
+            "spilled": 0,
+            "restored": 0,
+            "journal_errors": 0,
+            "request_stats_rows_upserted": 0
+        }
+        # 每个Worker最近一次 IP 请求统计写入的结果（upsert 行数和耗时），接口已改为 202 后在这里查看
+        self.request_stats_reports: Dict[str, Dict[str, Any]] = {}
+        self._journal = JournalWriter(self.journal_path, self.metrics)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def start(self):
+        """启动后台消费者，并恢复上次关闭时落盘的数据"""
+        if self._running:
+            return
+
+        leftover = self._restore_journal()
+        self._restore_spill()
+
+        from src.services.worker_sync import WorkerSyncService
+        worker_sync = WorkerSyncService()
+
+        self._running = True
+        self._consumers = [
+            asyncio.create_task(self._consume(worker_sync, i))
+            for i in range(self.consumer_count)
+        ]
+        if leftover:
+            # 队列放不下的恢复数据等有空位后再放入
+            self._requeue_task = asyncio.create_task(self._requeue(leftover))
+        logger.info(f"✅ 写入队列已启动: 容量={self.maxsize}, 消费者={self.consumer_count}, 批大小={self.batch_size}")
+
+    async def stop(self):
+        """停止消费者：先尽量排空队列，未写入的数据保留在日志文件中，下次启动时重放"""
+        if not self._running:
+            return
+
+        self._running = False
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 写入队列排空超时，剩余 {self.queue.qsize()} 条将落盘")
+
+        tasks = self._consumers + ([self._requeue_task] if self._requeue_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._consumers = []
+        self._requeue_task = None
+
+        await self._close_journal()
+        logger.info("✅ 写入队列已停止")
+
+    def enqueue(self, kind: str, worker_id: str, payload: Any, transfer: Dict[str, Any] = None):
+        """
+        放入一条待写入数据，队列满时抛出 IngestQueueFull
+
+        transfer 为请求的传输统计（SyncTransfer.to_dict()），写入完成后记录到同步日志
+        """
+        if kind not in INGEST_KINDS:
+            raise ValueError(f"未知的数据类型: {kind}")
+
+        seq = self._next_seq
+        item = {
+            "kind": kind,
+            "worker_id": worker_id,
+            "payload": payload,
+            "enqueued_at": time.time(),
+            "attempts": 0,
+            "transfers": [transfer] if transfer else [],
+            "seqs": [seq]
+        }
+
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.metrics["rejected"] += 1
+            raise IngestQueueFull()
+
+        # 追加和确认按提交顺序写入，消费者的确认不会先于这条数据写入日志文件
+        self._next_seq += 1
+        self._unacked.add(seq)
+        self._journal.append(seq, item)
+
+        self.metrics["enqueued"] += 1
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], self.queue.qsize())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取队列指标"""
+        return {
+            "running": self._running,
+            "depth": self.queue.qsize(),
+            "capacity": self.maxsize,
+            "consumers": len(self._consumers),
+            "unacked": len(self._unacked),
+            **self.metrics,
+            "request_stats_reports": dict(self.request_stats_reports)
+        }
+
+    async def _consume(self, worker_sync, index: int):
+        """消费者循环：取一批数据，合并后写入数据库"""
+        while True:
+            item = await self.queue.get()
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                written = False
+                sync_logs = []
+                for group in self._coalesce(batch):
+                    success = await self._write(worker_sync, group)
+                    if success:
+                        written = True
+                        self.metrics["processed"] += group["count"]
+                        lag = time.time() - group["enqueued_at"]
+                        lag_ms = int(lag * 1000)
+                        self.metrics["last_lag_ms"] = lag_ms
+                        self.metrics["max_lag_ms"] = max(self.metrics["max_lag_ms"], lag_ms)
+                        INGEST_LAG.observe(lag, group["kind"])
+                        INGEST_ROWS.inc(group["worker_id"], group["kind"],
+                                        amount=ingest_row_count(group["kind"], group["payload"], group["count"]))
+                        sync_logs.extend(self._build_sync_logs(worker_sync, group, "success"))
+                        self._ack(group["seqs"])
+                    elif not self._retry(group):
+                        sync_logs.extend(self._build_sync_logs(worker_sync, group, "failed"))
+                        # 已放弃的数据也确认，重启后不再重放
+                        self._ack(group["seqs"])
+                self.metrics["batches"] += 1
+
+                if sync_logs:
+                    await run_db(worker_sync._save_sync_logs, sync_logs)
+
+                # 新数据已落库，统计接口缓存失效
+                if written:
+                    get_stats_cache().invalidate()
+            except Exception as e:
+                logger.error(f"❌ 写入队列消费者{index}处理异常: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _coalesce(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按 (类型, Worker, 小时) 合并一批数据
+
+        日志按顺序拼接；统计类数据是按小时覆盖写入的快照，同一小时内保留最新一条即可，
+        不同小时接收的快照分别写入各自的小时（日志带有自己的时间戳，不按小时拆分）
+        """
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for item in batch:
+            hour = None if item["kind"] == "logs" else hour_bucket(item["enqueued_at"])
+            key = (item["kind"], item["worker_id"], hour)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = {
+                    "kind": item["kind"],
+                    "worker_id": item["worker_id"],
+                    "payload": list(item["payload"]) if item["kind"] == "logs" else item["payload"],
+                    "enqueued_at": item["enqueued_at"],
+                    "attempts": item["attempts"],
+                    "transfers": list(item.get("transfers") or []),
+                    "seqs": list(item.get("seqs") or []),
+                    "count": 1
+                }
+                continue
+
+            if item["kind"] == "logs":
+                group["payload"].extend(item["payload"])
+            else:
+                group["payload"] = item["payload"]
+            group["enqueued_at"] = min(group["enqueued_at"], item["enqueued_at"])
+            group["attempts"] = max(group["attempts"], item["attempts"])
+            group["transfers"].extend(item.get("transfers") or [])
+            group["seqs"].extend(item.get("seqs") or [])
+            group["count"] += 1
+
+        return list(groups.values())
+
+    async def _write(self, worker_sync, group: Dict[str, Any]) -> bool:
+        """将合并后的数据写入数据库"""
+        kind = group["kind"]
+        worker_id = group["worker_id"]
+        payload = group["payload"]
+        # 写入过程中的日志记录所属的Worker
+        bind_log_context(worker_id=worker_id)
+
+        # 同一组的数据属于同一小时，按接收时间（而不是写入时间）归入小时
+        if kind == "stats":
+            return await worker_sync.process_worker_stats(worker_id, payload, group["enqueued_at"])
+        if kind == "logs":
+            return await worker_sync.process_worker_logs(worker_id, payload)
+        if kind == "request_stats":
+            report = await worker_sync.process_worker_request_stats(worker_id, payload, group["enqueued_at"])
+            if report:
+                self.metrics["request_stats_rows_upserted"] += report["rows_upserted"]
+                self.request_stats_reports[worker_id] = {
+                    **report,
+                    "written_at": datetime.now().isoformat()
+                }
+            return bool(report)
+        return await worker_sync.process_worker_config_status(worker_id, payload)
+
+    def _retry(self, group: Dict[str, Any]) -> bool:
+        """写入失败的数据重新入队，超过重试次数后丢弃；返回是否已重新入队"""
+        attempts = group["attempts"] + 1
+        if attempts >= MAX_INGEST_ATTEMPTS:
+            self.metrics["failed"] += group["count"]
+            logger.error(f"❌ Worker {group['worker_id']} 的 {group['kind']} 数据写入失败 {attempts} 次，已丢弃")
+            return False
+
+        try:
+            self.queue.put_nowait({
+                "kind": group["kind"],
+                "worker_id": group["worker_id"],
+                "payload": group["payload"],
+                "enqueued_at": group["enqueued_at"],
+                "attempts": attempts,
+                "transfers": group["transfers"],
+                "seqs": group["seqs"]
+            })
+            self.metrics["retried"] += 1
+            return True
+        except asyncio.QueueFull:
+            self.metrics["failed"] += group["count"]
+            logger.error(f"❌ 写入队列已满，Worker {group['worker_id']} 的 {group['kind']} 数据无法重试，已丢弃")
+            return False
+
+    def _build_sync_logs(self, worker_sync, group: Dict[str, Any], status: str) -> List[Dict[str, Any]]:
+        """为合并组中的每个请求构建同步日志（记录压缩前后的字节数）"""
+        error_message = None if status == "success" else "写入数据库失败，已丢弃"
+        return [
+            worker_sync._build_receive_sync_log(group["worker_id"], group["kind"], transfer, status, error_message)
+            for transfer in group["transfers"]
+        ]
+
+    # ---------- 日志文件（write-ahead journal） ----------
+
+    def _ack(self, seqs: List[int]):
+        """确认数据已写入数据库（或已放弃）"""
+        if not seqs:
+            return
+        self._unacked.difference_update(seqs)
+        self._journal.ack(seqs)
+
+    async def _close_journal(self):
+        """关闭时未写入的数据留在日志文件中，下次启动时重放"""
+        # 队列中剩余的数据已经在日志文件中
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+            except asyncio.QueueEmpty:
+                break
+
+        if self._unacked:
+            self.metrics["spilled"] += len(self._unacked)
+            logger.info(f"💾 写入队列剩余 {len(self._unacked)} 条数据保留在日志文件中: {self.journal_path}")
+        await asyncio.to_thread(self._journal.stop)
+
+    def _restore_journal(self) -> List[Dict[str, Any]]:
+        """
+        启动时重放日志文件中未确认的数据（上次关闭或崩溃时没有写入数据库的）
+
+        Returns:
+            队列放不下、需要稍后放入的数据
+        """
+        items: Dict[int, Dict[str, Any]] = {}
+        acked = set()
+        if os.path.exists(self.journal_path):
+            try:
+                with open(self.journal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # 崩溃时写了一半的最后一行
+                            continue
+                        if "ack" in record:
+                            acked.update(record["ack"])
+                        elif "seq" in record:
+                            items[record["seq"]] = record["item"]
+            except Exception as e:
+                logger.error(f"❌ 读取写入队列日志文件失败: {e}")
+
+        leftover = []
+        restored_items = {}
+        for old_seq in sorted(items):
+            if old_seq in acked:
+                continue
+            item = items[old_seq]
+            seq = self._next_seq
+            self._next_seq += 1
+            item["seqs"] = [seq]
+            restored_items[seq] = item
+            try:
+                self.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                leftover.append(item)
+
+        # 写入线程先按新序号重写日志文件，之后继续追加
+        self._unacked.update(restored_items)
+        self._journal.start(restored_items)
+        restored = len(restored_items)
+        if restored:
+            self.metrics["restored"] += restored
+            logger.info(f"💾 从日志文件恢复 {restored} 条待写入数据")
+        return leftover
+
+    async def _requeue(self, items: List[Dict[str, Any]]):
+        for item in items:
+            await self.queue.put(item)
+
+    def _restore_spill(self):
+        """启动时将旧版本溢出文件中的数据重新入队（同时写入日志文件）"""
+        if not os.path.exists(self.spill_path):
+            return
+
+        restored = 0
+        remaining = []
+        try:
+            with open(self.spill_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue
+                    seq = self._next_seq
+                    item["seqs"] = [seq]
+                    try:
+                        self.queue.put_nowait(item)
+                    except asyncio.QueueFull:
+                        remaining.append(line)
+                        continue
+                    self._next_seq += 1
+                    self._unacked.add(seq)
+                    self._journal.append(seq, item)
+                    restored += 1
+
+            # 队列放不下的部分保留在文件中，下次启动继续恢复
+            if remaining:
+                with open(self.spill_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(remaining) + "\n")
+            else:
+                os.remove(self.spill_path)
+
+            self.metrics["restored"] += restored
+            logger.info(f"💾 从溢出文件恢复 {restored} 条待写入数据")
+        except Exception as e:
+            logger.error(f"❌ 恢复写入队列溢出文件失败: {e}")
+
+
+# 全局实例
+_ingest_queue: Optional[IngestQueue] = None
+
+def get_ingest_queue() -> IngestQueue:
+    """获取写入队列实例"""
+    global _ingest_queue
+    if _ingest_queue is None:
+        _ingest_queue = IngestQueue()
+    return _ingest_queue
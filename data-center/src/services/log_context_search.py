@@ -0,0 +1,200 @@
+"""
+日志上下文搜索（定位模式）
+
+/api/logs/search_context 原来把每个文件整个读入内存，并且每个文件只返回第一处匹配。这里改为：
+
+- 每个文件从末尾向前按块读取一次（最新的在前），内存占用与文件大小无关
+- 环形缓冲区保存最近读过的 N 行（即匹配行之后的 N 行），匹配后再向前读 N 行作为之前的上下文
+- 上下文窗口重叠（两处匹配相距不超过 2N 行）的合并为一个块
+- 每次请求最多返回 max_matches 处匹配，用游标 "<inode>-<字节偏移>" 翻页；
+  游标按 inode 定位文件，翻页期间发生轮转（app.log -> app.log.1）也能从断点继续
+"""
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.services.log_index import LOG_FILE_PATTERN, sort_log_files, line_date
+from src.services.log_viewer import read_lines_backward
+from src.utils.logger_setup import get_log_directory
+
+logger = logging.getLogger(__name__)
+
+# 上下文行数上限
+MAX_CONTEXT_LINES = 50
+
+# 每次请求最多返回的匹配数
+MAX_MATCHES_PER_REQUEST = 1000
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="ignore")
+
+
+def _build_block(filename: str, block: List[bytes]) -> Dict[str, Any]:
+    """块内的行按读取顺序（从新到旧）保存，返回时恢复为文件中的顺序"""
+    lines = [text for text in (_decode(line).strip() for line in reversed(block)) if text]
+
+    # 获取日期
+    block_date = "Unknown Date"
+    if lines:
+        timestamp = line_date(lines[0])
+        if timestamp:
+            block_date = timestamp.split(' ')[0]
+
+    return {"file": filename, "date": block_date, "lines": lines}
+
+
+def _chunk_may_match(data: bytes, needle: str, ascii_needle: Optional[bytes]) -> bool:
+    """整块是否包含关键词（匹配不会跨行，块中没有时逐行比较的结果也一定没有）"""
+    if ascii_needle is not None and data.isascii():
+        return ascii_needle in data.lower()
+    return needle in _decode(data).lower()
+
+
+def _scan_file(f, end: int, needle: str, context: int,
+               max_matches: int) -> Tuple[List[List[bytes]], int, Optional[int]]:
+    """
+    从字节位置 end 向前扫描一个文件
+
+    读取顺序是从新到旧，所以环形缓冲区中的行是匹配行之后的上下文，
+    匹配之后继续读取的 context 行是匹配行之前的上下文。
+
+    Returns:
+        (块列表, 匹配数, 停止位置)；达到 max_matches 时停止位置为最后一处匹配行的起始偏移
+        （下一页从这里继续），文件读完时为 None
+    """
+    ascii_needle = needle.encode("ascii") if needle.isascii() else None
+    blocks = []
+    ring = deque(maxlen=context)
+    block = None
+    since_match = 0
+    matches = 0
+    stop_at = None
+
+    for start, data in read_lines_backward(f, end):
+        chunk_has_match = stop_at is None and _chunk_may_match(data, needle, ascii_needle)
+        if block is None and not chunk_has_match:
+            # 没有未完成的块：只需保留这一块最前面的 context 行作为之后匹配的上下文
+            if context:
+                ring.extend(reversed(data.split(b"\n", context)[:context]))
+            continue
+
+        offset = start + len(data) + 1
+        lines = data.split(b"\n")
+        for line in reversed(lines):
+            offset -= len(line) + 1
+            is_match = chunk_has_match and needle in _decode(line).lower()
+
+            if is_match:
+                if block is None:
+                    block = list(ring)
+                else:
+                    # 与上一个窗口重叠，合并为一个块
+                    block.extend(ring)
+                ring.clear()
+                block.append(line)
+                since_match = 0
+                matches += 1
+                if matches >= max_matches:
+                    stop_at = offset
+                    chunk_has_match = False
+                elif context == 0:
+                    # 没有上下文时窗口不会重叠，每处匹配单独成块
+                    blocks.append(block)
+                    block = None
+            elif block is not None:
+                since_match += 1
+                if since_match <= context:
+                    block.append(line)
+                else:
+                    ring.append(line)
+                    if since_match >= 2 * context:
+                        # 之后的匹配窗口不会再与这个块重叠
+                        blocks.append(block)
+                        block = None
+            else:
+                ring.append(line)
+
+            if stop_at is not None and since_match >= context:
+                blocks.append(block)
+                return blocks, matches, stop_at
+
+    if block is not None:
+        blocks.append(block)
+    return blocks, matches, stop_at
+
+
+def _list_files(log_dir: str) -> List[Tuple[str, str]]:
+    """[(文件名, inode)]，从新到旧"""
+    files = []
+    for filename in sort_log_files([f for f in os.listdir(log_dir) if LOG_FILE_PATTERN.match(f)]):
+        try:
+            stat = os.stat(os.path.join(log_dir, filename))
+        except FileNotFoundError:
+            continue
+        files.append((filename, f"{stat.st_dev}-{stat.st_ino}"))
+    return files
+
+
+def search_context(query: str, context: int = 5, max_matches: int = 100,
+                   cursor: str = None) -> Dict[str, Any]:
+    """
+    在所有日志文件中搜索 query（不区分大小写），返回匹配行及其前后 context 行组成的块
+
+    Args:
+        cursor: 上一页返回的 next_cursor，为空时从最新的日志开始
+
+    Returns:
+        {"blocks", "matches", "next_cursor", "took_ms"}；next_cursor 为 None 表示没有更多结果
+
+    Raises:
+        ValueError: 游标格式错误或游标指向的文件已被删除
+    """
+    started = time.perf_counter()
+    needle = query.lower()
+    context = max(0, min(context, MAX_CONTEXT_LINES))
+    max_matches = max(1, min(max_matches, MAX_MATCHES_PER_REQUEST))
+
+    log_dir = get_log_directory()
+    files = _list_files(log_dir) if os.path.isdir(log_dir) else []
+
+    first_index, resume_offset = 0, None
+    if cursor:
+        try:
+            cursor_key, offset = cursor.rsplit("-", 1)
+            resume_offset = int(offset)
+        except ValueError:
+            raise ValueError("无效的游标")
+        keys = [key for _, key in files]
+        if cursor_key not in keys:
+            raise ValueError("游标已失效（日志文件已被删除）")
+        first_index = keys.index(cursor_key)
+
+    blocks = []
+    matches = 0
+    next_cursor = None
+    for position, (filename, key) in enumerate(files[first_index:], start=first_index):
+        try:
+            with open(os.path.join(log_dir, filename), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                end = min(resume_offset, size) if position == first_index and resume_offset is not None else size
+                file_blocks, file_matches, stop_at = _scan_file(
+                    f, end, needle, context, max_matches - matches
+                )
+        except FileNotFoundError:
+            continue
+
+        blocks.extend(_build_block(filename, block) for block in file_blocks)
+        matches += file_matches
+        if stop_at is not None:
+            next_cursor = f"{key}-{stop_at}"
+            break
+
+    return {
+        "blocks": blocks,
+        "matches": matches,
+        "next_cursor": next_cursor,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,707 @@
+"""
+应用日志（app.log*）全文索引
+
+/api/logs/search 原来每次请求都逐行扫描全部日志文件（10MB × 6）并对每一行做 lower()。
+这里为每个日志文件维护一份增量倒排索引：
+
+- 日志按 BLOCK_LINES 行分块，记录每块的起始字节偏移和起始行号（稀疏行偏移索引）
+- 倒排表：词（\\w+ 以及 IP、模块名、路径这类复合词，小写）→ 出现该词的块号。
+  查询中的每个词按子串匹配词表，候选块取交集，再只读取候选块逐行验证，
+  保持原来"不区分大小写的子串匹配"语义
+- 已轮转的文件不再变化，倒排表压缩为连续数组（CSR），内存只有几 MB
+- 文件按 inode 识别：RotatingFileHandler 轮转只是重命名文件，已建立的索引直接沿用；
+  app.log 只索引新追加的完整行，只有新出现的文件才需要从头建立索引
+- 索引保存在日志目录的 .index/ 下，重启后校验文件头后直接加载
+- 查询时每个文件交给搜索进程池中的一个进程扫描（扫描是 CPU 密集的字符串比较，线程受 GIL 限制），
+  每个文件最多取 offset+limit+1 条，结果按时间戳用堆归并；可选正则模式（每次请求只编译一次）
+"""
+import hashlib
+import heapq
+import logging
+import multiprocessing
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.config import settings
+from src.utils.logger_setup import LOG_FILE_NAME, get_log_directory
+
+logger = logging.getLogger(__name__)
+
+# 每块的行数
+BLOCK_LINES = 32
+
+# 索引文件目录（位于日志目录下）
+INDEX_DIR_NAME = ".index"
+
+# 索引文件格式版本，格式变化时旧索引自动重建
+INDEX_FORMAT_VERSION = 1
+
+# app.log 索引未保存的字节数超过该值时写盘
+PERSIST_EVERY_BYTES = 1024 * 1024
+
+# 用于识别文件（inode 复用）的文件头长度
+HEAD_BYTES = 4096
+
+# 单个查询词匹配到的词超过该数量时不用于筛选（如单个字母）
+MAX_TOKEN_EXPANSION = 5000
+
+# 扫描时相邻的候选块合并读取，每次最多读取的字节数
+SCAN_RANGE_BYTES = 1024 * 1024
+
+# 自动确定搜索进程数时的上限（app.log + 5 个备份）
+MAX_SEARCH_WORKERS = 6
+
+# 排序时间戳的初始值（大于任何时间戳）
+MAX_SORT_KEY = "9999-99-99 99:99:99"
+
+LOG_FILE_PATTERN = re.compile(rf"^{re.escape(LOG_FILE_NAME)}(\.\d+)?$")
+TOKEN_PATTERN = re.compile(r"\w+")
+COMPOUND_TOKEN_PATTERN = re.compile(r"\w+(?:[./@-]\w+)+")
+TIMESTAMP_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2})")
+
+
+def sort_log_files(filenames: List[str], base_name: str = LOG_FILE_NAME) -> List[str]:
+    """app.log 在最前，然后是 .1, .2, .3...（从新到旧）"""
+    def sort_key(filename):
+        if filename == base_name:
+            return -1
+        try:
+            return int(filename.rsplit(".", 1)[1])
+        except (IndexError, ValueError):
+            return float("inf")
+    return sorted(filenames, key=sort_key)
+
+
+def tokenize(text: str) -> set:
+    """小写文本中的词与复合词"""
+    return set(TOKEN_PATTERN.findall(text)).union(COMPOUND_TOKEN_PATTERN.findall(text))
+
+
+def line_date(line: str) -> str:
+    """日志行开头的时间戳（没有时为空字符串）"""
+    match = TIMESTAMP_PATTERN.search(line)
+    return match.group(1) if match else ""
+
+
+def scan_segment(path: str, key: str, ranges: List[Tuple[int, int, int]], needle: str,
+                 matcher: Optional[re.Pattern], limit: int) -> List[Tuple[str, int, str]]:
+    """
+    在一个日志文件的候选范围内从新到旧查找匹配行（在搜索进程池中执行）
+
+    Args:
+        ranges: [(起始偏移, 结束偏移, 起始行号)]，升序
+        needle: 关键词（小写，不区分大小写的子串匹配）
+        matcher: 正则模式下已编译的正则（为 None 时按 needle 匹配）
+        limit: 最多返回的条数
+
+    Returns:
+        [(排序时间戳, 行号, 行内容)]，从新到旧；文件已被轮转/替换时返回空列表
+    """
+    # \A、\Z 在整块文本和单行中含义不同，这类正则不按整块预先筛选
+    chunk_filter = matcher is None or not ("\\A" in matcher.pattern or "\\Z" in matcher.pattern)
+    results = []
+    sort_key = MAX_SORT_KEY
+
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return results
+    with f:
+        stat = os.fstat(f.fileno())
+        if f"{stat.st_dev}-{stat.st_ino}" != key:
+            return results
+
+        for start, end, first_line in reversed(ranges):
+            f.seek(start)
+            text = f.read(end - start).decode("utf-8", errors="ignore")
+            if chunk_filter:
+                if matcher is not None and matcher.search(text) is None:
+                    continue
+                if matcher is None and needle not in text.lower():
+                    continue
+
+            lines = text.split("\n")[:-1]
+            for index in range(len(lines) - 1, -1, -1):
+                line = lines[index]
+                if matcher is not None:
+                    if matcher.search(line) is None:
+                        continue
+                elif needle not in line.lower():
+                    continue
+                # 没有时间戳的行（如异常堆栈）取所属记录（之前最近一行带时间戳的行）的时间
+                timestamp = line_date(line)
+                previous = index
+                while not timestamp and previous > 0:
+                    previous -= 1
+                    timestamp = line_date(lines[previous])
+                # 只取不大于上一条的值，保证每个文件的结果按时间单调，可以直接堆归并
+                sort_key = min(timestamp or sort_key, sort_key)
+                results.append((sort_key, first_line + index, line))
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+class LogSegment:
+    """单个日志文件的索引"""
+
+    def __init__(self, key: str, filename: str):
+        self.key = key
+        self.filename = filename
+        self.head_digest = ""
+        self.head_length = 0
+
+        # 已索引到的字节偏移（只索引以换行结尾的完整行）
+        self.indexed_bytes = 0
+        self.line_count = 0
+
+        # 稀疏行偏移索引：第 i 块的起始字节偏移、起始行号（从1开始）
+        self.block_offsets = array("Q")
+        self.block_lines = array("I")
+        self.open_block_lines = 0
+
+        # 词表：拼接文本（每个词后跟换行，用于子串匹配）与每个词的起始位置，词号即加入顺序
+        self.vocab_text = ""
+        self.token_starts = array("I")
+
+        # 倒排表（块号递增）。仍在写入的文件：词 → 词号、每个词一个数组；
+        # 已轮转的文件冻结为 CSR：第 i 个词的块号为 postings[post_offsets[i]:post_offsets[i + 1]]
+        self.frozen = False
+        self.token_ids: Dict[str, int] = {}
+        self.token_postings: List[array] = []
+        self.post_offsets = array("I")
+        self.postings = array("I")
+
+        self.unsaved_bytes = 0
+
+    @property
+    def block_count(self) -> int:
+        return len(self.block_offsets)
+
+    def block_range(self, block: int) -> Tuple[int, int]:
+        """第 block 块的字节范围 [start, end)"""
+        start = self.block_offsets[block]
+        end = self.block_offsets[block + 1] if block + 1 < self.block_count else self.indexed_bytes
+        return start, end
+
+    @property
+    def token_count(self) -> int:
+        return len(self.token_starts)
+
+    def block_of_line(self, line_num: int) -> int:
+        """行号所在的块"""
+        return max(bisect_right(self.block_lines, line_num) - 1, 0)
+
+    def blocks_of_token(self, token_id: int):
+        if self.frozen:
+            return self.postings[self.post_offsets[token_id]:self.post_offsets[token_id + 1]]
+        return self.token_postings[token_id]
+
+    def freeze(self):
+        """文件不再写入：倒排表压缩为 CSR"""
+        if self.frozen:
+            return
+        post_offsets = array("I", (0,))
+        postings = array("I")
+        for blocks in self.token_postings:
+            postings.extend(blocks)
+            post_offsets.append(len(postings))
+        self.post_offsets = post_offsets
+        self.postings = postings
+        self.token_ids = {}
+        self.token_postings = []
+        self.frozen = True
+
+    def thaw(self):
+        """恢复为可追加的倒排表（加载 app.log 的索引后）"""
+        if not self.frozen:
+            return
+        tokens = self.vocab_text.split("\n")[:-1]
+        self.token_ids = {token: token_id for token_id, token in enumerate(tokens)}
+        self.token_postings = [self.blocks_of_token(token_id) for token_id in range(len(tokens))]
+        self.post_offsets = array("I")
+        self.postings = array("I")
+        self.frozen = False
+
+    # ---------- 建立索引 ----------
+
+    def index_data(self, data: bytes):
+        """索引从 indexed_bytes 开始、以换行结尾的数据"""
+        self.thaw()
+        new_tokens = []
+        position = 0
+        length = len(data)
+
+        while position < length:
+            if self.block_count == 0 or self.open_block_lines >= BLOCK_LINES:
+                self.block_offsets.append(self.indexed_bytes + position)
+                self.block_lines.append(self.line_count + 1)
+                self.open_block_lines = 0
+
+            # 当前块还能放入的行
+            end = position
+            lines = 0
+            while lines < BLOCK_LINES - self.open_block_lines and end < length:
+                end = data.index(b"\n", end) + 1
+                lines += 1
+
+            self._index_block(self.block_count - 1, data[position:end], new_tokens)
+            self.open_block_lines += lines
+            self.line_count += lines
+            position = end
+
+        self.indexed_bytes += length
+        self.unsaved_bytes += length
+
+        if new_tokens:
+            offset = len(self.vocab_text)
+            for token in new_tokens:
+                self.token_starts.append(offset)
+                offset += len(token) + 1
+            self.vocab_text += "\n".join(new_tokens) + "\n"
+
+    def _index_block(self, block: int, data: bytes, new_tokens: List[str]):
+        for token in tokenize(data.decode("utf-8", errors="ignore").lower()):
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                self.token_ids[token] = len(self.token_postings)
+                self.token_postings.append(array("I", (block,)))
+                new_tokens.append(token)
+            else:
+                blocks = self.token_postings[token_id]
+                if blocks[-1] != block:
+                    blocks.append(block)
+
+    # ---------- 查询 ----------
+
+    def _match_tokens(self, query_token: str) -> Optional[List[int]]:
+        """词表中包含 query_token 的词；匹配过多时返回 None（不用于筛选）"""
+        matches = []
+        position = self.vocab_text.find(query_token)
+        while position >= 0:
+            token_id = bisect_right(self.token_starts, position) - 1
+            matches.append(token_id)
+            if len(matches) > MAX_TOKEN_EXPANSION:
+                return None
+            next_start = (
+                self.token_starts[token_id + 1] if token_id + 1 < len(self.token_starts)
+                else len(self.vocab_text)
+            )
+            position = self.vocab_text.find(query_token, next_start)
+        return matches
+
+    def candidate_blocks(self, query_tokens: List[str]) -> Optional[List[int]]:
+        """
+        可能包含查询内容的块（升序）
+
+        Returns:
+            块号列表；查询中没有可用于筛选的词时返回 None（需要检查全部块）
+        """
+        candidates = None
+        for query_token in query_tokens:
+            token_ids = self._match_tokens(query_token)
+            if token_ids is None:
+                continue
+            blocks = set()
+            for token_id in token_ids:
+                blocks.update(self.blocks_of_token(token_id))
+            candidates = blocks if candidates is None else candidates & blocks
+            if not candidates:
+                return []
+        return None if candidates is None else sorted(candidates)
+
+    # ---------- 持久化 ----------
+
+    def to_state(self) -> Dict[str, Any]:
+        """可持久化的状态（倒排表统一保存为 CSR）"""
+        frozen = self.frozen
+        self.freeze()
+        state = {
+            "version": INDEX_FORMAT_VERSION,
+            "block_lines_per_block": BLOCK_LINES,
+            "key": self.key,
+            "head_digest": self.head_digest,
+            "head_length": self.head_length,
+            "indexed_bytes": self.indexed_bytes,
+            "line_count": self.line_count,
+            "block_offsets": self.block_offsets,
+            "block_lines": self.block_lines,
+            "open_block_lines": self.open_block_lines,
+            "vocab_text": self.vocab_text,
+            "token_starts": self.token_starts,
+            "post_offsets": self.post_offsets,
+            "postings": self.postings,
+        }
+        if not frozen:
+            self.thaw()
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], filename: str) -> Optional["LogSegment"]:
+        if state.get("version") != INDEX_FORMAT_VERSION or state.get("block_lines_per_block") != BLOCK_LINES:
+            return None
+        segment = cls(state["key"], filename)
+        for field in ("head_digest", "head_length", "indexed_bytes", "line_count", "block_offsets", "block_lines",
+                      "open_block_lines", "vocab_text", "token_starts", "post_offsets", "postings"):
+            setattr(segment, field, state[field])
+        segment.frozen = True
+        return segment
+
+
+class LogSearchIndex:
+    """app.log* 全文索引"""
+
+    def __init__(self, log_dir: str = None):
+        self.log_dir = log_dir or get_log_directory()
+        self.index_dir = os.path.join(self.log_dir, INDEX_DIR_NAME)
+        self.segments: Dict[str, LogSegment] = {}
+        self._lock = threading.RLock()
+        self.last_refresh = 0.0
+        self.metrics = {"built_files": 0, "loaded_files": 0, "indexed_bytes": 0, "last_refresh_ms": 0.0}
+
+    # ---------- 维护 ----------
+
+    def list_files(self) -> List[str]:
+        """日志目录下的 app.log* 文件（从新到旧）"""
+        if not os.path.isdir(self.log_dir):
+            return []
+        return sort_log_files([f for f in os.listdir(self.log_dir) if LOG_FILE_PATTERN.match(f)])
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        与日志目录同步：识别轮转、索引新追加的行、为新文件建立索引、清理已删除文件的索引
+        """
+        with self._lock:
+            started = time.perf_counter()
+            indexed_before = self.metrics["indexed_bytes"]
+            seen = {}
+
+            for filename in self.list_files():
+                path = os.path.join(self.log_dir, filename)
+                try:
+                    with open(path, "rb") as f:
+                        stat = os.fstat(f.fileno())
+                        key = f"{stat.st_dev}-{stat.st_ino}"
+                        segment = self.segments.get(key) or self._load_segment(key, filename, f)
+                        segment = self._catch_up(segment, key, filename, f, stat.st_size)
+                        seen[key] = segment
+                except FileNotFoundError:
+                    # 轮转过程中文件被重命名/删除，下次刷新时再处理
+                    continue
+                except Exception as e:
+                    logger.error(f"❌ 索引日志文件 {filename} 失败: {e}")
+                    continue
+
+                # 已轮转的文件不再写入，压缩后写盘一次；app.log 每积累一定数据写盘一次
+                if filename != LOG_FILE_NAME:
+                    segment.freeze()
+                if segment.unsaved_bytes and (filename != LOG_FILE_NAME or segment.unsaved_bytes >= PERSIST_EVERY_BYTES):
+                    self._save_segment(segment)
+
+            for key in set(self.segments) - set(seen):
+                self._remove_index_file(key)
+            self.segments = seen
+
+            self.last_refresh = time.time()
+            self.metrics["last_refresh_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return {
+                "files": len(seen),
+                "indexed_bytes": self.metrics["indexed_bytes"] - indexed_before,
+                "took_ms": self.metrics["last_refresh_ms"]
+            }
+
+    def _catch_up(self, segment: LogSegment, key: str, filename: str, f, size: int) -> LogSegment:
+        segment.filename = filename
+
+        # 文件被截断或 inode 被新文件复用：重建
+        if size < segment.indexed_bytes or (segment.head_length and self._head_digest(f, segment.head_length) != segment.head_digest):
+            logger.info(f"🔁 日志文件 {filename} 已变化，重建索引")
+            segment = LogSegment(key, filename)
+
+        if size <= segment.indexed_bytes:
+            return segment
+
+        rebuilt = segment.indexed_bytes == 0
+        f.seek(segment.indexed_bytes)
+        data = f.read(size - segment.indexed_bytes)
+        # 只索引完整的行，未写完的最后一行留到下次
+        data = data[:data.rfind(b"\n") + 1]
+        if not data:
+            return segment
+
+        segment.index_data(data)
+        self.metrics["indexed_bytes"] += len(data)
+        if segment.head_length < HEAD_BYTES:
+            segment.head_length = min(HEAD_BYTES, segment.indexed_bytes)
+            segment.head_digest = self._head_digest(f, segment.head_length)
+        if rebuilt:
+            self.metrics["built_files"] += 1
+        return segment
+
+    @staticmethod
+    def _head_digest(f, length: int) -> str:
+        f.seek(0)
+        return hashlib.md5(f.read(length)).hexdigest()
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.index_dir, f"{key}.idx")
+
+    def _load_segment(self, key: str, filename: str, f) -> LogSegment:
+        path = self._index_path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as index_file:
+                    segment = LogSegment.from_state(pickle.load(index_file), filename)
+                if segment and self._head_digest(f, segment.head_length) == segment.head_digest:
+                    self.metrics["loaded_files"] += 1
+                    return segment
+            except Exception as e:
+                logger.warning(f"⚠️ 加载日志索引 {path} 失败，重新建立: {e}")
+        return LogSegment(key, filename)
+
+    def _save_segment(self, segment: LogSegment):
+        path = self._index_path(segment.key)
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                pickle.dump(segment.to_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            segment.unsaved_bytes = 0
+        except Exception as e:
+            logger.warning(f"⚠️ 保存日志索引 {segment.filename} 失败: {e}")
+
+    def _remove_index_file(self, key: str):
+        try:
+            path = self._index_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logger.warning(f"⚠️ 删除日志索引失败: {e}")
+
+    # ---------- 查询 ----------
+
+    def _open_segment(self, segment: LogSegment):
+        """打开索引对应的文件（文件已被轮转/替换时返回 None）"""
+        try:
+            f = open(os.path.join(self.log_dir, segment.filename), "rb")
+        except FileNotFoundError:
+            return None
+        stat = os.fstat(f.fileno())
+        if f"{stat.st_dev}-{stat.st_ino}" != segment.key:
+            f.close()
+            return None
+        return f
+
+    def _scan_plans(self, needle: str, use_index: bool) -> List[Tuple[str, str, str, List[Tuple[int, int, int]]]]:
+        """
+        每个文件需要扫描的字节范围（相邻的候选块合并）
+
+        Returns:
+            [(文件名, 路径, inode, 范围列表)]，从新到旧
+        """
+        query_tokens = []
+        if use_index:
+            # 被更长的查询词包含的词不再单独筛选（如 "10.0.17" 已经包含 "17"）
+            tokens = tokenize(needle)
+            query_tokens = [t for t in tokens if not any(t != other and t in other for other in tokens)]
+
+        with self._lock:
+            order = sort_log_files([segment.filename for segment in self.segments.values()])
+            plans = []
+            for segment in sorted(self.segments.values(), key=lambda segment: order.index(segment.filename)):
+                blocks = segment.candidate_blocks(query_tokens) if query_tokens else None
+                if blocks is None:
+                    blocks = range(segment.block_count)
+
+                ranges = []
+                for block in blocks:
+                    start, end = segment.block_range(block)
+                    if ranges and ranges[-1][1] == start and end - ranges[-1][0] <= SCAN_RANGE_BYTES:
+                        ranges[-1] = (ranges[-1][0], end, ranges[-1][2])
+                    else:
+                        ranges.append((start, end, segment.block_lines[block]))
+                if ranges:
+                    plans.append((segment.filename, os.path.join(self.log_dir, segment.filename), segment.key, ranges))
+            return plans
+
+    def _run_scans(self, plans: list, needle: str, matcher: Optional[re.Pattern],
+                   limit: int) -> Tuple[List[List[Tuple[str, int, str]]], int]:
+        """
+        扫描各文件（每个文件一个进程）
+
+        Returns:
+            (每个文件的结果, 使用的进程数)
+        """
+        pool = get_search_pool() if len(plans) > 1 else None
+        if pool is not None:
+            try:
+                futures = [
+                    pool.submit(scan_segment, path, key, ranges, needle, matcher, limit)
+                    for _, path, key, ranges in plans
+                ]
+                return [future.result() for future in futures], min(len(plans), get_search_workers())
+            except BrokenProcessPool as e:
+                logger.warning(f"⚠️ 日志搜索进程池异常，改为在当前线程扫描: {e}")
+                shutdown_search_pool()
+
+        return [scan_segment(path, key, ranges, needle, matcher, limit) for _, path, key, ranges in plans], 1
+
+    def search(self, query: str, offset: int = 0, limit: int = 200, regex: bool = False) -> Dict[str, Any]:
+        """
+        分页搜索（按时间从新到旧）
+
+        Args:
+            regex: 按正则表达式匹配（不区分大小写，逐行匹配）；不使用倒排索引筛选
+
+        Returns:
+            {"results": [{file, line_num, content, date}], "has_more": bool, "took_ms": float, "workers": int}
+
+        Raises:
+            ValueError: 正则表达式无效
+        """
+        started = time.perf_counter()
+        needle = query.lower()
+        matcher = None
+        if regex:
+            try:
+                matcher = re.compile(query, re.IGNORECASE | re.MULTILINE)
+            except re.error as e:
+                raise ValueError(f"无效的正则表达式: {e}")
+
+        self.refresh()
+        plans = self._scan_plans(needle, use_index=not regex)
+        # 每个文件最多需要 offset+limit+1 条（多 1 条用于判断是否还有下一页）
+        per_file, workers = self._run_scans(plans, needle, matcher, offset + limit + 1)
+
+        # 按时间戳归并；时间相同时较新的文件、较大的行号在前
+        streams = [
+            [(sort_key, -rank, line_num, filename, line) for sort_key, line_num, line in matches]
+            for rank, ((filename, _, _, _), matches) in enumerate(zip(plans, per_file))
+        ]
+        page = list(islice(heapq.merge(*streams, reverse=True), offset, offset + limit + 1))
+
+        results = []
+        for _, _, line_num, filename, line in page[:limit]:
+            content = line.strip()
+            results.append({"file": filename, "line_num": line_num, "content": content, "date": line_date(content)})
+
+        return {
+            "results": results,
+            "has_more": len(page) > limit,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "workers": workers
+        }
+
+    def read_lines(self, filename: str, first_line: int, last_line: int) -> List[str]:
+        """按行号读取 [first_line, last_line]（通过稀疏行偏移索引定位，不读取整个文件）"""
+        with self._lock:
+            segment = next((s for s in self.segments.values() if s.filename == filename), None)
+            if segment is None or segment.block_count == 0:
+                return []
+            first_line = max(first_line, 1)
+            last_line = min(last_line, segment.line_count)
+            if first_line > last_line:
+                return []
+            first_block = segment.block_of_line(first_line)
+            last_block = segment.block_of_line(last_line)
+            start = segment.block_range(first_block)[0]
+            end = segment.block_range(last_block)[1]
+            block_first_line = segment.block_lines[first_block]
+
+        f = self._open_segment(segment)
+        if f is None:
+            return []
+        with f:
+            f.seek(start)
+            lines = f.read(end - start).decode("utf-8", errors="ignore").split("\n")[:-1]
+        return lines[first_line - block_first_line:last_line - block_first_line + 1]
+
+    def locate_line(self, key: str, line_num: int) -> Optional[Tuple[int, int]]:
+        """
+        行号所在块的 (起始字节偏移, 起始行号)
+
+        只使用已建立的索引（不刷新）；文件尚未索引时返回 None
+        """
+        with self._lock:
+            segment = self.segments.get(key)
+            if segment is None or segment.block_count == 0:
+                return None
+            block = segment.block_of_line(line_num)
+            return segment.block_offsets[block], segment.block_lines[block]
+
+    def get_status(self) -> Dict[str, Any]:
+        """索引状态"""
+        with self._lock:
+            return {
+                "log_dir": self.log_dir,
+                "last_refresh": self.last_refresh,
+                "files": [
+                    {
+                        "file": segment.filename,
+                        "indexed_bytes": segment.indexed_bytes,
+                        "lines": segment.line_count,
+                        "blocks": segment.block_count,
+                        "tokens": segment.token_count,
+                        "frozen": segment.frozen
+                    }
+                    for segment in sorted(self.segments.values(), key=lambda s: s.filename)
+                ],
+                **self.metrics
+            }
+
+
+# 全局实例
+_log_index: Optional[LogSearchIndex] = None
+_log_index_lock = threading.Lock()
+
+def get_log_index() -> LogSearchIndex:
+    """获取日志全文索引实例"""
+    global _log_index
+    if _log_index is None:
+        with _log_index_lock:
+            if _log_index is None:
+                _log_index = LogSearchIndex()
+    return _log_index
+
+
+# 搜索进程池
+_search_pool: Optional[ProcessPoolExecutor] = None
+_search_pool_lock = threading.Lock()
+
+def get_search_workers() -> int:
+    """搜索进程数（LOG_SEARCH_WORKERS 为 0 时取 CPU 核数，最多 MAX_SEARCH_WORKERS）"""
+    if settings.LOG_SEARCH_WORKERS > 0:
+        return settings.LOG_SEARCH_WORKERS
+    return min(os.cpu_count() or 1, MAX_SEARCH_WORKERS)
+
+def get_search_pool() -> Optional[ProcessPoolExecutor]:
+    """获取搜索进程池（只有 1 个进程时返回 None，直接在当前线程扫描）"""
+    global _search_pool
+    if _search_pool is None:
+        workers = get_search_workers()
+        if workers <= 1:
+            return None
+        with _search_pool_lock:
+            if _search_pool is None:
+                # 服务进程中有多个线程，使用 spawn 避免 fork 时复制已被持有的锁
+                _search_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"🔍 日志搜索进程池已创建: {workers} 个进程")
+    return _search_pool
+
+def shutdown_search_pool():
+    """关闭搜索进程池"""
+    global _search_pool
+    with _search_pool_lock:
+        pool, _search_pool = _search_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,309 @@
+"""
+结构化日志（app.jsonl*）查询
+
+按级别、模块、请求ID、Worker ID、时间范围筛选日志，直接读取 JSON 字段，不需要用正则解析文本日志：
+
+- 文件从末尾向前按块读取（最新的在前），内存占用与文件大小无关
+- 级别/模块/请求ID/Worker ID 先在原始字节中按 JSON 编码后的字段预筛选：整块不包含时跳过，
+  否则在块中直接搜索定位候选行，只解析候选行
+- 时间范围按每块第一条（最早的）日志的时间跳过整块，早于起始时间后不再读取更早的文件
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from src.services.log_index import sort_log_files
+from src.services.log_viewer import read_lines_backward
+from src.utils.logger_setup import JSON_LOG_FILE_NAME, get_log_directory
+
+logger = logging.getLogger(__name__)
+
+JSON_LOG_FILE_PATTERN = re.compile(rf"^{re.escape(JSON_LOG_FILE_NAME)}(\.\d+)?$")
+
+# 统计行数时每次读取的字节数
+COUNT_CHUNK_BYTES = 1024 * 1024
+
+# 行数缓存最多保存的文件数，以及用来识别 inode 被新文件复用的文件开头字节数
+MAX_CACHED_LINE_COUNTS = 64
+LINE_COUNT_HEAD_BYTES = 64
+
+# 结构化日志中可能出现的级别
+STANDARD_LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+
+# 多个线程同时记录日志时写入顺序与时间戳可能有少量出入，按时间跳过整块时留出的余量
+TIME_SLACK_MS = 5000
+
+
+def _json_field(name: str, value: str) -> bytes:
+    """字段在结构化日志中的原始字节（与 JsonLinesFormatter 的编码方式一致）"""
+    return f'"{name}":{json.dumps(value, ensure_ascii=False)}'.encode("utf-8")
+
+
+class RecordFilter:
+    """结构化日志筛选条件"""
+
+    def __init__(self, level: str = None, logger_name: str = None, request_id: str = None,
+                 worker_id: str = None, since: int = None, until: int = None,
+                 query: str = None, regex: bool = False):
+        """
+        Args:
+            level: 最低日志级别（如 WARNING 包含 WARNING/ERROR/CRITICAL）
+            logger_name: 模块名，包含其子模块（src.services 匹配 src.services.worker_sync）
+            since/until: 时间范围（毫秒时间戳，包含边界）
+            query: 消息中包含的关键词（不区分大小写）；regex 时按正则表达式匹配消息
+
+        Raises:
+            ValueError: 未知的日志级别或无效的正则表达式
+        """
+        self.min_level = None
+        if level:
+            levelno = logging.getLevelName(level.upper())
+            if not isinstance(levelno, int):
+                raise ValueError(f"未知的日志级别: {level}")
+            self.min_level = levelno
+        self.logger_name = logger_name or None
+        self.request_id = request_id or None
+        self.worker_id = worker_id or None
+        self.since = since
+        self.until = until
+        self.needle = None
+        self.matcher = None
+        if query and regex:
+            try:
+                self.matcher = re.compile(query, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"无效的正则表达式: {e}")
+        elif query:
+            self.needle = query.lower()
+
+        # 原始行中必须包含的字节（每组至少包含其中一个；预筛选，不会漏掉匹配的行）
+        self.hints: List[List[bytes]] = []
+        if self.min_level is not None:
+            self.hints.append([
+                _json_field("level", logging.getLevelName(levelno))
+                for levelno in STANDARD_LEVELS if levelno >= self.min_level
+            ])
+        if self.logger_name:
+            # 去掉结尾的引号，子模块（前缀相同）也能通过
+            self.hints.append([_json_field("logger", self.logger_name)[:-1]])
+        if self.request_id:
+            self.hints.append([_json_field("request_id", self.request_id)])
+        if self.worker_id:
+            self.hints.append([_json_field("worker_id", self.worker_id)])
+        # 在块中定位候选行时使用最后一组（通常最有区分度：请求ID > Worker ID > 模块 > 级别）
+        self._locate_pattern = re.compile(b"|".join(re.escape(hint) for hint in self.hints[-1])) if self.hints else None
+        # 关键词中没有需要转义的字符时，也可以在原始行中预筛选
+        self.raw_needle = None
+        if self.needle and json.dumps(self.needle, ensure_ascii=False)[1:-1] == self.needle:
+            self.raw_needle = self.needle
+
+    @property
+    def structured(self) -> bool:
+        """是否指定了按字段筛选的条件"""
+        return any(value is not None for value in (
+            self.min_level, self.logger_name, self.request_id, self.worker_id, self.since, self.until
+        ))
+
+    def chunk_may_match(self, data: bytes) -> bool:
+        return all(any(hint in data for hint in group) for group in self.hints)
+
+    def candidate_lines(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """块中可能匹配的行 [(块内行序号, 行内容)]，按文件中的顺序"""
+        if self._locate_pattern is None:
+            return list(enumerate(data.split(b"\n")))
+
+        candidates = []
+        index = 0
+        counted = 0
+        position = 0
+        while True:
+            match = self._locate_pattern.search(data, position)
+            if match is None:
+                break
+            start = data.rfind(b"\n", 0, match.start()) + 1
+            end = data.find(b"\n", match.end())
+            if end < 0:
+                end = len(data)
+            index += data.count(b"\n", counted, start)
+            counted = start
+            candidates.append((index, data[start:end]))
+            position = end + 1
+        return candidates
+
+    def line_may_match(self, raw: bytes) -> bool:
+        if not self.chunk_may_match(raw):
+            return False
+        if self.raw_needle is not None and self.raw_needle not in raw.decode("utf-8", errors="ignore").lower():
+            return False
+        return True
+
+    def match(self, record: Dict[str, Any]) -> bool:
+        if self.min_level is not None:
+            levelno = logging.getLevelName(record.get("level") or "")
+            if not isinstance(levelno, int) or levelno < self.min_level:
+                return False
+        if self.logger_name is not None:
+            name = record.get("logger") or ""
+            if name != self.logger_name and not name.startswith(self.logger_name + "."):
+                return False
+        if self.request_id is not None and record.get("request_id") != self.request_id:
+            return False
+        if self.worker_id is not None and record.get("worker_id") != self.worker_id:
+            return False
+        ts = record.get("ts") or 0
+        if self.since is not None and ts < self.since:
+            return False
+        if self.until is not None and ts > self.until:
+            return False
+        if self.needle is not None and self.needle not in (record.get("message") or "").lower():
+            return False
+        if self.matcher is not None and self.matcher.search(record.get("message") or "") is None:
+            return False
+        return True
+
+
+def list_json_files(log_dir: str = None) -> List[str]:
+    """日志目录下的 app.jsonl* 文件（从新到旧）"""
+    log_dir = log_dir or get_log_directory()
+    if not os.path.isdir(log_dir):
+        return []
+    return sort_log_files([f for f in os.listdir(log_dir) if JSON_LOG_FILE_PATTERN.match(f)], JSON_LOG_FILE_NAME)
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    """按文本日志的格式显示一条结构化日志"""
+    ts = record.get("ts") or 0
+    timestamp = datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M:%S")
+    line = f"{timestamp},{ts % 1000:03d} - {record.get('logger')} - {record.get('level')} - {record.get('message')}"
+    if record.get("exc"):
+        line = f"{line}\n{record['exc']}"
+    return line
+
+
+# (st_dev, st_ino) -> (已统计的字节数, 其中的换行数, 文件开头的字节)
+# 轮转只重命名文件（inode 不变），轮转后的文件不再重新统计；app.jsonl 只统计新写入的部分
+_line_counts: Dict[Tuple[int, int], Tuple[int, int, bytes]] = {}
+_line_counts_lock = threading.Lock()
+
+
+def _count_lines(f, size: int) -> int:
+    """文件前 size 字节的行数（最后一行没有换行也计入）"""
+    stat = os.fstat(f.fileno())
+    key = (stat.st_dev, stat.st_ino)
+    f.seek(0)
+    head = f.read(min(size, LINE_COUNT_HEAD_BYTES))
+
+    with _line_counts_lock:
+        cached = _line_counts.get(key)
+    counted, newlines = 0, 0
+    # 文件被截断或 inode 被新文件复用时重新统计
+    if cached is not None and cached[0] <= size and head.startswith(cached[2]):
+        counted, newlines = cached[0], cached[1]
+
+    f.seek(counted)
+    remaining = size - counted
+    while remaining > 0:
+        data = f.read(min(COUNT_CHUNK_BYTES, remaining))
+        if not data:
+            break
+        newlines += data.count(b"\n")
+        remaining -= len(data)
+
+    with _line_counts_lock:
+        if key not in _line_counts and len(_line_counts) >= MAX_CACHED_LINE_COUNTS:
+            _line_counts.clear()
+        _line_counts[key] = (size, newlines, head)
+
+    f.seek(size - 1)
+    if f.read(1) != b"\n":
+        newlines += 1
+    return newlines
+
+
+def _record_ts(raw: bytes) -> Optional[int]:
+    try:
+        return json.loads(raw).get("ts")
+    except (ValueError, AttributeError):
+        return None
+
+
+def iter_records(record_filter: RecordFilter) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """
+    逐条返回符合条件的结构化日志
+
+    Yields:
+        (文件名, 行号, 日志记录)，按文件从新到旧、文件内从后往前
+    """
+    log_dir = get_log_directory()
+    for filename in list_json_files(log_dir):
+        try:
+            f = open(os.path.join(log_dir, filename), "rb")
+        except FileNotFoundError:
+            continue
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                continue
+            line_num = _count_lines(f, size)
+            reached_since = False
+
+            for _, data in read_lines_backward(f, size):
+                # line_num 更新为本块之前一行的行号
+                line_num -= data.count(b"\n") + 1
+                if not record_filter.chunk_may_match(data):
+                    continue
+
+                if record_filter.since is not None or record_filter.until is not None:
+                    oldest = _record_ts(data.split(b"\n", 1)[0])
+                    if oldest is not None:
+                        if record_filter.until is not None and oldest > record_filter.until + TIME_SLACK_MS:
+                            continue
+                        if record_filter.since is not None and oldest < record_filter.since - TIME_SLACK_MS:
+                            reached_since = True
+
+                for index, raw in reversed(record_filter.candidate_lines(data)):
+                    if not record_filter.line_may_match(raw):
+                        continue
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        # 正在写入的最后一行
+                        continue
+                    if isinstance(record, dict) and record_filter.match(record):
+                        yield filename, line_num + 1 + index, record
+
+                if reached_since:
+                    # 更早的块和文件都在时间范围之外
+                    return
+
+
+def search_records(record_filter: RecordFilter, offset: int = 0, limit: int = 200) -> Dict[str, Any]:
+    """
+    分页查询结构化日志（从新到旧），返回格式与 LogSearchIndex.search 一致
+
+    Returns:
+        {"results": [{file, line_num, content, date}], "has_more": bool, "took_ms": float}
+    """
+    started = time.perf_counter()
+    results = []
+    has_more = False
+    for index, (filename, line_num, record) in enumerate(iter_records(record_filter)):
+        if index < offset:
+            continue
+        if len(results) >= limit:
+            has_more = True
+            break
+        content = format_record(record)
+        results.append({"file": filename, "line_num": line_num, "content": content, "date": content[:19]})
+
+    return {
+        "results": results,
+        "has_more": has_more,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,287 @@
+"""
+日志文件查看（分页读取与实时跟踪）
+
+/api/logs/view 原来把整个日志文件读成字符串后返回。这里改为：
+
+- 分页：mmap 文件后从指定字节位置向前/向后查找换行，只触及返回的那几行，
+  tail-N、head-N、"上一页/下一页" 的耗时与文件大小无关；按行号读取时通过全文索引中的
+  稀疏行偏移（每块起始字节）定位，最多多扫描一个块
+- 响应头 X-Range-Start / X-Range-End 给出本页的字节范围，作为翻页游标
+  （before=X-Range-Start 取更早的一页，after=X-Range-End 取更新的一页）
+- 整个文件（最新的在前）按块从文件末尾向前读取并流式返回，不再整体载入内存
+- 实时跟踪：SSE 只推送新追加的完整行；事件 id 为 "<inode>-<字节偏移>"，
+  断线重连时带上 Last-Event-ID 即可从断点继续；文件轮转后自动切换到新的 app.log
+"""
+import asyncio
+import codecs
+import logging
+import mmap
+import os
+import time
+from typing import Iterator, Optional, Tuple, Callable, Awaitable
+
+from starlette.concurrency import run_in_threadpool
+
+from src.services.log_index import get_log_index
+
+logger = logging.getLogger(__name__)
+
+# 流式返回时每次发送的字节数
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# 单页最多返回的行数
+MAX_PAGE_LINES = 10000
+
+# 实时跟踪：检查文件变化的间隔、心跳间隔、单个事件最多携带的字节数
+FOLLOW_POLL_SECONDS = 0.5
+FOLLOW_HEARTBEAT_SECONDS = 15
+FOLLOW_MAX_EVENT_BYTES = 256 * 1024
+
+
+class LogPage:
+    """一页日志：文件中 [start, end) 字节范围内的完整行"""
+
+    def __init__(self, start: int, end: int, file_size: int, first_line: Optional[int] = None):
+        self.start = start
+        self.end = end
+        self.file_size = file_size
+        self.first_line = first_line
+
+    def headers(self) -> dict:
+        headers = {
+            "X-Range-Start": str(self.start),
+            "X-Range-End": str(self.end),
+            "X-File-Size": str(self.file_size),
+        }
+        if self.first_line is not None:
+            headers["X-Start-Line"] = str(self.first_line)
+        return headers
+
+
+def _file_key(f) -> str:
+    stat = os.fstat(f.fileno())
+    return f"{stat.st_dev}-{stat.st_ino}"
+
+
+def _complete_end(m) -> int:
+    """最后一个换行之后的位置（未写完的最后一行不返回）"""
+    return m.rfind(b"\n") + 1
+
+
+def _lines_before(m, position: int, count: int) -> int:
+    """position 之前 count 行的起始位置"""
+    for _ in range(count):
+        if position <= 0:
+            return 0
+        newline = m.rfind(b"\n", 0, position - 1)
+        position = newline + 1
+    return position
+
+
+def _lines_after(m, position: int, count: int, limit: int) -> int:
+    """position 之后 count 行的结束位置"""
+    for _ in range(count):
+        if position >= limit:
+            return limit
+        position = m.find(b"\n", position, limit) + 1 or limit
+    return position
+
+
+def _line_start(m, position: int) -> int:
+    """position 所在行的起始位置"""
+    if position <= 0:
+        return 0
+    return m.rfind(b"\n", 0, position) + 1
+
+
+def locate_page(path: str, lines: int, before: int = None, after: int = None,
+                start_line: int = None) -> Tuple[LogPage, bytes]:
+    """
+    读取一页日志
+
+    - start_line：从第 start_line 行开始的 lines 行
+    - after：从字节位置 after 开始的 lines 行
+    - before：字节位置 before 之前的 lines 行（都不指定时为文件末尾，即 tail）
+
+    Returns:
+        (页信息, 本页内容)
+    """
+    lines = max(1, min(lines, MAX_PAGE_LINES))
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return LogPage(0, 0, 0, 1 if start_line else None), b""
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            limit = _complete_end(m)
+            first_line = None
+
+            if start_line is not None:
+                position, current_line = 0, 1
+                hint = get_log_index().locate_line(_file_key(f), start_line)
+                if hint and hint[0] <= limit:
+                    position, current_line = hint
+                start = _lines_after(m, position, start_line - current_line, limit)
+                end = _lines_after(m, start, lines, limit)
+                first_line = start_line
+            elif after is not None:
+                start = _line_start(m, min(max(after, 0), limit))
+                end = _lines_after(m, start, lines, limit)
+            else:
+                end = limit if before is None else _line_start(m, min(max(before, 0), limit))
+                start = _lines_before(m, end, lines)
+
+            return LogPage(start, end, size, first_line), m[start:end]
+
+
+def read_lines_backward(f, end: int, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[Tuple[int, bytes]]:
+    """
+    从字节位置 end 向前按块读取
+
+    Yields:
+        (起始偏移, 内容)：每块中的完整行，保持文件中的顺序，行之间以换行分隔、不含最后的换行；
+        文件末尾没有换行的最后一行也会返回
+    """
+    position = end
+    remainder = b""
+    at_end = True
+    while position > 0:
+        read_size = min(chunk_size, position)
+        position -= read_size
+        f.seek(position)
+        buffer = f.read(read_size) + remainder
+
+        if at_end and buffer.endswith(b"\n"):
+            # 末尾的换行
+            buffer = buffer[:-1]
+        at_end = False
+
+        if position == 0:
+            yield 0, buffer
+            return
+
+        # 第一段可能是不完整的行，留到下一块
+        newline = buffer.find(b"\n")
+        if newline < 0:
+            remainder = buffer
+            continue
+        remainder = buffer[:newline]
+        yield position + newline + 1, buffer[newline + 1:]
+
+
+def iter_lines_reversed(path: str, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """从文件末尾向前按块读取，逐块返回倒序的行（最新的在前）"""
+    with open(path, "rb") as f:
+        for _, data in read_lines_backward(f, os.fstat(f.fileno()).st_size, chunk_size):
+            lines = data.split(b"\n")
+            lines.reverse()
+            yield (b"\n".join(lines) + b"\n").decode("utf-8", errors="ignore").encode("utf-8")
+
+
+def iter_page(content: bytes, reverse: bool = False) -> Iterator[bytes]:
+    """
+    分块返回一页内容，reverse 时按行倒序（最新的在前）
+
+    无效的 UTF-8 字节被丢弃；用增量解码器解码，跨块边界的多字节字符保留在下一块中，不会被截断丢弃
+    """
+    if reverse:
+        lines = content.split(b"\n")[:-1]
+        lines.reverse()
+        content = b"".join(line + b"\n" for line in lines)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    for offset in range(0, len(content), STREAM_CHUNK_BYTES):
+        chunk = decoder.decode(content[offset:offset + STREAM_CHUNK_BYTES])
+        if chunk:
+            yield chunk.encode("utf-8")
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def _format_event(event: str, data: bytes, event_id: str = None) -> bytes:
+    """SSE 事件（每行一个 data 字段，客户端收到后用换行拼接）"""
+    text = data.decode("utf-8", errors="ignore")
+    parts = []
+    if event_id:
+        parts.append(f"id: {event_id}\n")
+    parts.append(f"event: {event}\n")
+    parts.extend(f"data: {line}\n" for line in text.rstrip("\n").split("\n"))
+    parts.append("\n")
+    return "".join(parts).encode("utf-8")
+
+
+def _read_appended(f, offset: int, size: int) -> bytes:
+    """读取 offset 之后新追加的完整行（每次最多 FOLLOW_MAX_EVENT_BYTES）"""
+    f.seek(offset)
+    data = f.read(min(size - offset, FOLLOW_MAX_EVENT_BYTES))
+    if len(data) == FOLLOW_MAX_EVENT_BYTES and b"\n" not in data:
+        # 超长的单行按上限切分发送
+        return data
+    return data[:data.rfind(b"\n") + 1]
+
+
+async def follow_log(path: str, initial_lines: int, last_event_id: str = None,
+                     is_disconnected: Callable[[], Awaitable[bool]] = None):
+    """
+    实时跟踪日志文件（SSE）
+
+    先发送最后 initial_lines 行（带 Last-Event-ID 重连时改为从断点继续），
+    之后每 FOLLOW_POLL_SECONDS 检查一次文件，只推送新追加的完整行
+    """
+    f = open(path, "rb")
+    try:
+        key = _file_key(f)
+        offset = None
+
+        if last_event_id and last_event_id.rsplit("-", 1)[0] == key:
+            try:
+                offset = int(last_event_id.rsplit("-", 1)[1])
+            except ValueError:
+                offset = None
+            if offset is not None and offset > os.fstat(f.fileno()).st_size:
+                offset = None
+
+        if offset is None:
+            page, content = await run_in_threadpool(locate_page, path, initial_lines)
+            offset = page.end
+            yield _format_event("snapshot", content or b"", f"{key}-{offset}")
+
+        last_sent = time.monotonic()
+        while True:
+            if is_disconnected and await is_disconnected():
+                return
+
+            size = os.fstat(f.fileno()).st_size
+            if size < offset:
+                # 文件被截断，从头开始
+                offset = 0
+                yield _format_event("truncated", b"", f"{key}-{offset}")
+
+            if size > offset:
+                data = await run_in_threadpool(_read_appended, f, offset, size)
+                if data:
+                    offset += len(data)
+                    yield _format_event("append", data, f"{key}-{offset}")
+                    last_sent = time.monotonic()
+                    continue
+
+            # 没有新内容时检查是否已轮转（旧文件剩余内容已在上面发送完）
+            try:
+                current = os.stat(path)
+                rotated = f"{current.st_dev}-{current.st_ino}" != key
+            except FileNotFoundError:
+                rotated = False
+            if rotated:
+                f.close()
+                f = open(path, "rb")
+                key = _file_key(f)
+                offset = 0
+                yield _format_event("rotated", b"", f"{key}-{offset}")
+                continue
+
+            if time.monotonic() - last_sent >= FOLLOW_HEARTBEAT_SECONDS:
+                yield b": keepalive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(FOLLOW_POLL_SECONDS)
+    finally:
+        f.close()
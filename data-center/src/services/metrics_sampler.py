@@ -0,0 +1,214 @@
+"""
+系统指标后台采样
+
+/api/worker/system-stats 原来每次请求都调用 psutil.cpu_percent(interval=1)，阻塞事件循环一整秒，
+并且每次都重新遍历进程的网络连接。这里改为：
+
+- 后台任务每 SYSTEM_METRICS_INTERVAL_SECONDS 秒采样一次 CPU、内存、磁盘、网络和进程指标，
+  psutil 调用在线程中执行；CPU 使用率为两次采样之间的平均值，网络流量换算为每秒字节数
+- 进程的网络连接数开销较大，每 CONNECTIONS_SAMPLE_SECONDS 秒才重新统计一次
+- 采样结果保存在固定大小的环形缓冲区（最近 SYSTEM_METRICS_HISTORY 次），接口直接返回最新一次采样，
+  也可以返回最近若干次的精简序列，用于绘制趋势图
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import psutil
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 重新统计进程网络连接数的间隔（秒）
+CONNECTIONS_SAMPLE_SECONDS = 60
+
+# 启动后第一次采样前的等待时间（CPU 使用率需要两次调用之间的间隔）
+FIRST_SAMPLE_DELAY_SECONDS = 1.0
+
+
+def _mb(value: float) -> int:
+    return round(value / 1024 / 1024)
+
+
+class SystemMetricsSampler:
+    """系统指标采样器（后台任务 + 环形缓冲区）"""
+
+    def __init__(self, interval: float = None, history: int = None):
+        self.interval = max(1.0, interval or settings.SYSTEM_METRICS_INTERVAL_SECONDS)
+        self.samples: deque = deque(maxlen=max(1, history or settings.SYSTEM_METRICS_HISTORY))
+
+        self._process = psutil.Process()
+        self._task: Optional[asyncio.Task] = None
+        # 保护 samples（Telegram机器人和数据库线程中也会读取最新采样）
+        self._lock = threading.Lock()
+        # 后台采样和按需采样不能同时计算增量
+        self._collect_lock = threading.Lock()
+
+        self._last_network = None  # (采样时间, net_io_counters)
+        self._connections = 0
+        self._connections_at: Optional[float] = None
+
+    async def start(self):
+        """启动后台采样任务"""
+        if self._task is not None:
+            return
+        # 第一次调用 cpu_percent 只记录基准，返回值没有意义
+        await asyncio.to_thread(self._prime)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"✅ 系统指标采样已启动: 间隔={self.interval}s, 保留最近{self.samples.maxlen}次")
+
+    async def stop(self):
+        """停止后台采样任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        delay = min(FIRST_SAMPLE_DELAY_SECONDS, self.interval)
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.interval
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.error(f"❌ 系统指标采样失败: {e}")
+
+    def _prime(self):
+        with self._collect_lock:
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+
+    def sample(self) -> Dict[str, Any]:
+        """立即采样一次并放入缓冲区（阻塞，在线程中调用）"""
+        with self._collect_lock:
+            sample = self._collect()
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    def _collect(self) -> Dict[str, Any]:
+        now = time.monotonic()
+
+        cpu_freq = psutil.cpu_freq()
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        disk = psutil.disk_usage('/')
+        network = psutil.net_io_counters()
+
+        # 网络流量速率（两次采样之间）
+        sent_per_sec = recv_per_sec = 0
+        if self._last_network is not None:
+            last_at, last = self._last_network
+            elapsed = now - last_at
+            if elapsed > 0:
+                sent_per_sec = max(0, round((network.bytes_sent - last.bytes_sent) / elapsed))
+                recv_per_sec = max(0, round((network.bytes_recv - last.bytes_recv) / elapsed))
+        self._last_network = (now, network)
+
+        process = self._process
+        with process.oneshot():
+            process_cpu = process.cpu_percent(interval=None)
+            process_memory = process.memory_info()
+            process_memory_percent = process.memory_percent()
+            threads = process.num_threads()
+
+        if self._connections_at is None or now - self._connections_at >= CONNECTIONS_SAMPLE_SECONDS:
+            try:
+                # psutil 6.0 之前的名称为 connections()
+                net_connections = getattr(process, "net_connections", None) or process.connections
+                self._connections = len(net_connections())
+            except (psutil.AccessDenied, AttributeError):
+                # 在某些环境下可能没有权限或方法不可用
+                self._connections = 0
+            self._connections_at = now
+
+        return {
+            "timestamp": datetime.now().isoformat(),
+
+            # CPU信息
+            "cpu": {
+                "usage_percent": psutil.cpu_percent(interval=None),
+                "core_count": psutil.cpu_count(),
+                "frequency_mhz": cpu_freq.current if cpu_freq else 0
+            },
+
+            # 内存信息
+            "memory": {
+                "total_mb": _mb(memory.total),
+                "used_mb": _mb(memory.used),
+                "available_mb": _mb(memory.available),
+                "usage_percent": memory.percent,
+                "swap_total_mb": _mb(swap.total),
+                "swap_used_mb": _mb(swap.used),
+                "swap_percent": swap.percent
+            },
+
+            # 磁盘信息
+            "disk": {
+                "total_gb": round(disk.total / 1024 / 1024 / 1024, 2),
+                "used_gb": round(disk.used / 1024 / 1024 / 1024, 2),
+                "free_gb": round(disk.free / 1024 / 1024 / 1024, 2),
+                "usage_percent": round((disk.used / disk.total) * 100, 2) if disk.total else 0
+            },
+
+            # 网络信息
+            "network": {
+                "bytes_sent": network.bytes_sent,
+                "bytes_recv": network.bytes_recv,
+                "packets_sent": network.packets_sent,
+                "packets_recv": network.packets_recv,
+                "sent_per_sec": sent_per_sec,
+                "recv_per_sec": recv_per_sec
+            },
+
+            # 进程信息
+            "process": {
+                "cpu_percent": process_cpu,
+                "memory_mb": _mb(process_memory.rss),
+                "memory_percent": process_memory_percent,
+                "threads": threads,
+                "connections": self._connections
+            }
+        }
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """最新一次采样，还没有采样时返回 None"""
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def history(self, count: int) -> List[Dict[str, Any]]:
+        """最近 count 次采样的精简序列（从旧到新）"""
+        if count <= 0:
+            return []
+        with self._lock:
+            samples = list(self.samples)[-count:]
+        return [
+            {
+                "timestamp": sample["timestamp"],
+                "cpu_percent": sample["cpu"]["usage_percent"],
+                "memory_percent": sample["memory"]["usage_percent"],
+                "process_cpu_percent": sample["process"]["cpu_percent"],
+                "process_memory_mb": sample["process"]["memory_mb"],
+                "network_sent_per_sec": sample["network"]["sent_per_sec"],
+                "network_recv_per_sec": sample["network"]["recv_per_sec"]
+            }
+            for sample in samples
+        ]
+
+
+# 全局实例
+_metrics_sampler: Optional[SystemMetricsSampler] = None
+
+def get_metrics_sampler() -> SystemMetricsSampler:
+    """获取系统指标采样器实例"""
+    global _metrics_sampler
+    if _metrics_sampler is None:
+        _metrics_sampler = SystemMetricsSampler()
+    return _metrics_sampler
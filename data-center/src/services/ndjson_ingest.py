@@ -0,0 +1,223 @@
+"""
+NDJSON 日志流式写入
+
+/worker-api/sync/logs/stream 接收换行分隔的 JSON（每行一条日志），边读边解析，
+每攒满 INGEST_STREAM_CHUNK_SIZE 条就写入数据库一次（一次事务）。
+
+- 内存占用只与块大小和单行长度有关，与整批日志的条数无关
+- 写入期间不再读取请求体，数据库慢时自然对上游形成背压
+- 单行超过 INGEST_STREAM_MAX_LINE_BYTES 时中止（没有换行的超大请求体不会被整体缓存）
+- 日志按 (worker_id, request_id) 去重写入，中途失败后Worker重发整批是安全的
+"""
+import json
+import logging
+import time
+from typing import Dict, Any, List, AsyncIterator, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 响应中最多返回的无效行号数量
+MAX_REPORTED_INVALID_LINES = 20
+
+
+class NdjsonLineTooLong(ValueError):
+    """单行超过长度上限（result 为中止前已提交的块，由 ingest_log_stream 设置）"""
+
+    def __init__(self, message: str, result: Dict[str, Any] = None):
+        super().__init__(message)
+        self.result = result
+
+
+class NdjsonChunkWriteError(Exception):
+    """写入某一块日志失败"""
+
+    def __init__(self, message: str, result: Dict[str, Any]):
+        super().__init__(message)
+        self.result = result
+
+
+class NdjsonStreamReadError(Exception):
+    """
+    读取请求体失败（如压缩中间件解压超过上限时抛出的 413、客户端断开），
+    原始异常见 __cause__
+    """
+
+    def __init__(self, message: str, result: Dict[str, Any]):
+        super().__init__(message)
+        self.result = result
+
+
+async def iter_ndjson_lines(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[tuple]:
+    """
+    从字节流中逐行解析 JSON
+
+    Yields:
+        (行号, 解析结果)；无法解析、不是 JSON 对象或字段类型不对的行，解析结果为 None。空行跳过
+    """
+    buffer = b""
+    line_no = 0
+
+    async for data in stream:
+        if not data:
+            continue
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            line = buffer[start:end].strip()
+            start = end + 1
+            if line:
+                yield line_no, _parse_line(line)
+        buffer = buffer[start:]
+
+        if len(buffer) > max_line_bytes:
+            raise NdjsonLineTooLong(f"第 {line_no + 1} 行超过长度上限 {max_line_bytes} 字节")
+
+    # 最后一行可以没有换行符
+    line = buffer.strip()
+    if line:
+        yield line_no + 1, _parse_line(line)
+
+
+def _parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return normalize_log_entry(entry) if isinstance(entry, dict) else None
+
+
+def normalize_log_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    校验并规范化一条日志，字段类型不对时返回 None（计为无效行，不影响同一块的其他日志）
+
+    - id 为字符串或整数，timestamp 为数字，两者至少有一个（用于去重）
+    - data 为对象，null 或省略时为 {}
+    - level、message 转为字符串，null 时使用默认值（INFO、空字符串）
+    """
+    log_id = entry.get("id")
+    timestamp = entry.get("timestamp")
+    if log_id is not None and (isinstance(log_id, bool) or not isinstance(log_id, (str, int))):
+        return None
+    if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))):
+        return None
+    if not log_id and not timestamp:
+        return None
+
+    data = entry.get("data")
+    if data is None:
+        data = {}
+    elif not isinstance(data, dict):
+        return None
+
+    message = entry.get("message")
+    return {
+        **entry,
+        "level": str(entry.get("level") or "INFO"),
+        "message": "" if message is None else str(message),
+        "data": data
+    }
+
+
+async def ingest_log_stream(worker_sync, worker_id: str, stream: AsyncIterator[bytes],
+                            chunk_size: int = None, max_line_bytes: int = None) -> Dict[str, Any]:
+    """
+    流式解析 NDJSON 日志并分块写入数据库
+
+    Args:
+        worker_sync: WorkerSyncService 实例
+        worker_id: Worker标识
+        stream: 请求体字节流（request.stream()）
+
+    Returns:
+        写入结果：接收/新增条数、无效行、每块的提交耗时
+
+    Raises:
+        NdjsonLineTooLong: 单行超过长度上限
+        NdjsonChunkWriteError: 某一块写入失败
+        NdjsonStreamReadError: 读取请求体失败
+
+        以上异常的 result 为出错前已提交的块，这些块不会回滚
+    """
+    chunk_size = chunk_size or settings.INGEST_STREAM_CHUNK_SIZE
+    max_line_bytes = max_line_bytes or settings.INGEST_STREAM_MAX_LINE_BYTES
+
+    started = time.perf_counter()
+    result = {
+        "worker_id": worker_id,
+        "received": 0,
+        "saved": 0,
+        "invalid_count": 0,
+        "invalid_lines": [],
+        "chunk_size": chunk_size,
+        "chunks": [],
+        "duration_ms": 0
+    }
+
+    async def flush(entries: List[Dict[str, Any]]):
+        commit_started = time.perf_counter()
+        try:
+            saved = await worker_sync.write_log_chunk(worker_id, entries)
+        except Exception as e:
+            raise NdjsonChunkWriteError(f"第 {len(result['chunks']) + 1} 块日志写入失败: {e}", finish())
+
+        commit_ms = round((time.perf_counter() - commit_started) * 1000, 2)
+        result["saved"] += saved
+        result["chunks"].append({
+            "index": len(result["chunks"]) + 1,
+            "records": len(entries),
+            "saved": saved,
+            "commit_ms": commit_ms
+        })
+        logger.debug(f"📝 Worker {worker_id} 日志流第 {len(result['chunks'])} 块: {len(entries)} 条, 提交 {commit_ms}ms")
+
+    def finish() -> Dict[str, Any]:
+        result["duration_ms"] = int((time.perf_counter() - started) * 1000)
+        result["commit_ms"] = _summarize_commit_latency(result["chunks"])
+        return result
+
+    pending: List[Dict[str, Any]] = []
+    try:
+        async for line_no, entry in iter_ndjson_lines(stream, max_line_bytes):
+            if entry is None:
+                result["invalid_count"] += 1
+                if len(result["invalid_lines"]) < MAX_REPORTED_INVALID_LINES:
+                    result["invalid_lines"].append(line_no)
+                continue
+
+            result["received"] += 1
+            pending.append(entry)
+            if len(pending) >= chunk_size:
+                await flush(pending)
+                pending = []
+    except NdjsonLineTooLong as e:
+        e.result = finish()
+        raise
+    except NdjsonChunkWriteError:
+        raise
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+        raise NdjsonStreamReadError(f"读取日志流失败: {detail}", finish()) from e
+
+    if pending:
+        await flush(pending)
+
+    return finish()
+
+
+def _summarize_commit_latency(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """每块提交耗时的汇总"""
+    latencies = sorted(chunk["commit_ms"] for chunk in chunks)
+    if not latencies:
+        return {"avg": 0, "p50": 0, "p95": 0, "max": 0}
+    return {
+        "avg": round(sum(latencies) / len(latencies), 2),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max": latencies[-1]
+    }
@@ -0,0 +1,473 @@
+"""
+日志与统计表时间分区管理
+
+system_logs、sync_logs 是写入量最大的两张表，request_stats、ip_violation_stats 每个Worker
+每小时都有新行，按天删除过期数据时 DELETE 会长时间锁表并产生大量 undo/WAL。
+MySQL/PostgreSQL 上把它们改为按时间范围分区后，过期数据的清理就是删除整个分区（与分区内的行数无关）。
+日志表按 created_at 分区，统计表按 date_hour（统计所属的小时，仪表盘查询也按它过滤）分区。
+
+- MySQL/MariaDB：PARTITION BY RANGE (TO_DAYS(分区列))，分区名 pYYYYMMDD，
+  最后一个分区 pmax 兜底未来数据；新分区通过 REORGANIZE pmax 拆分得到
+- PostgreSQL：声明式分区 PARTITION BY RANGE (分区列)，分区表名 <表名>_pYYYYMMDD，
+  默认分区 <表名>_default 兜底不在任何范围内的数据
+- SQLite：不支持分区，仍按 created_at 索引逐行删除（分片表会破坏 ORM 写入和所有日志查询）
+
+分区表的主键和唯一索引必须包含分区列，迁移时主键改为 (id, 分区列)，
+不含分区列的唯一索引追加分区列。同一条日志的 created_at 来自Worker日志时间戳，去重语义不变。
+
+迁移路径：
+- 新部署（表为空）在启动时自动转换为分区表
+- 已有数据的表需要在维护窗口执行：python -m src.utils.migrate_partitions
+"""
+import logging
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import engine, Base, get_dialect_name
+
+logger = logging.getLogger(__name__)
+
+# 按时间分区的表 -> 分区列
+PARTITIONED_TABLES = {
+    "system_logs": "created_at",
+    "sync_logs": "created_at",
+    "request_stats": "date_hour",
+    "ip_violation_stats": "date_hour",
+}
+
+# MySQL 兜底分区名
+MYSQL_MAX_PARTITION = "pmax"
+
+# PostgreSQL 分区边界表达式，如 FOR VALUES FROM ('2026-10-17 00:00:00+08') TO ('2026-10-18 00:00:00+08')
+_PG_BOUND_PATTERN = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})[^']*'\) TO \('(\d{4}-\d{2}-\d{2})[^']*'\)")
+
+
+class PartitionManager:
+    """日志与统计表分区管理"""
+
+    def __init__(self, interval: str = None, premake: int = None):
+        self.interval = (interval or settings.PARTITION_INTERVAL).lower()
+        if self.interval not in ("day", "month"):
+            raise ValueError(f"不支持的分区间隔: {self.interval}")
+        self.premake = premake if premake is not None else settings.PARTITION_PREMAKE
+        # 分区DDL串行执行（定时任务与手动迁移可能同时触发）
+        self._lock = threading.Lock()
+
+    @property
+    def dialect(self) -> str:
+        return get_dialect_name()
+
+    @property
+    def supported(self) -> bool:
+        return settings.PARTITION_ENABLED and self.dialect in ("mysql", "mariadb", "postgresql")
+
+    # ---------- 分区周期 ----------
+
+    def _period_start(self, day: date) -> date:
+        return day if self.interval == "day" else day.replace(day=1)
+
+    def _next_period(self, day: date) -> date:
+        start = self._period_start(day)
+        if self.interval == "day":
+            return start + timedelta(days=1)
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def _partition_name(self, table: str, start: date) -> str:
+        if self.dialect == "postgresql":
+            return f"{table}_p{start:%Y%m%d}"
+        return f"p{start:%Y%m%d}"
+
+    def _periods(self, first: date, last: date) -> List[tuple]:
+        """[first, last] 范围内的所有分区周期 (开始, 结束)"""
+        periods = []
+        start = self._period_start(first)
+        while start <= last:
+            end = self._next_period(start)
+            periods.append((start, end))
+            start = end
+        return periods
+
+    # ---------- 状态 ----------
+
+    def is_partitioned(self, conn, table: str) -> bool:
+        """表是否已经是分区表"""
+        if self.dialect == "postgresql":
+            row = conn.execute(text(
+                "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+            ), {"table": table}).first()
+            return row is not None
+
+        row = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+        ), {"table": table}).scalar()
+        return bool(row)
+
+    def list_partitions(self, conn, table: str) -> List[Dict[str, Any]]:
+        """
+        列出表的分区（按范围升序）
+
+        每项包含 name、start、end（兜底分区的 start/end 为 None）、rows（数据库统计的估算行数）
+        """
+        partitions = []
+        if self.dialect == "postgresql":
+            rows = conn.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table AND pg_table_is_visible(p.oid)"
+            ), {"table": table}).fetchall()
+            for name, bound, estimate in rows:
+                match = _PG_BOUND_PATTERN.search(bound or "")
+                partitions.append({
+                    "name": name,
+                    "start": date.fromisoformat(match.group(1)) if match else None,
+                    "end": date.fromisoformat(match.group(2)) if match else None,
+                    "rows": max(int(estimate or 0), 0)
+                })
+            # 默认分区排在最后
+            partitions.sort(key=lambda p: (p["start"] is None, p["start"] or date.min))
+            return partitions
+
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"table": table}).fetchall()
+        previous_end = None
+        for name, description, estimate in rows:
+            end = None
+            if description and description.upper() != "MAXVALUE":
+                # TO_DAYS('0001-01-01') = 366，Python 的序数从 0001-01-01 = 1 开始
+                end = date.fromordinal(int(description) - 365)
+            partitions.append({
+                "name": name,
+                "start": previous_end if end else None,
+                "end": end,
+                "rows": int(estimate or 0)
+            })
+            previous_end = end
+        return partitions
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取所有分区表的状态"""
+        status = {
+            "dialect": self.dialect,
+            "enabled": settings.PARTITION_ENABLED,
+            "supported": self.supported,
+            "interval": self.interval,
+            "premake": self.premake,
+            "tables": {}
+        }
+        if not self.supported:
+            return status
+
+        try:
+            with engine.connect() as conn:
+                for table in PARTITIONED_TABLES:
+                    partitioned = self.is_partitioned(conn, table)
+                    partitions = self.list_partitions(conn, table) if partitioned else []
+                    status["tables"][table] = {
+                        "partitioned": partitioned,
+                        "partition_count": len(partitions),
+                        "partitions": [
+                            {**p, "start": p["start"].isoformat() if p["start"] else None,
+                             "end": p["end"].isoformat() if p["end"] else None}
+                            for p in partitions
+                        ]
+                    }
+        except Exception as e:
+            logger.error(f"获取分区状态失败: {e}")
+            status["error"] = str(e)
+        return status
+
+    # ---------- 启动与维护 ----------
+
+    def setup(self) -> Dict[str, str]:
+        """
+        启动时调用：空表自动转换为分区表，已分区的表补建未来分区
+
+        已有数据的未分区表不会自动迁移（需要复制整表），只记录提示
+        """
+        results = {}
+        if not self.supported:
+            return results
+
+        for table in PARTITIONED_TABLES:
+            try:
+                with engine.connect() as conn:
+                    partitioned = self.is_partitioned(conn, table)
+                    has_rows = conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is not None
+
+                if partitioned:
+                    self.ensure_partitions(table)
+                    results[table] = "partitioned"
+                elif not has_rows:
+                    self.migrate_table(table)
+                    results[table] = "migrated"
+                else:
+                    logger.warning(
+                        f"⚠️ {table} 尚未分区，过期数据仍按行删除；"
+                        f"请在维护窗口执行 python -m src.utils.migrate_partitions 完成迁移"
+                    )
+                    results[table] = "unpartitioned"
+            except Exception as e:
+                logger.error(f"❌ 初始化 {table} 分区失败: {e}")
+                results[table] = "error"
+        return results
+
+    def ensure_partitions(self, table: str, today: date = None) -> int:
+        """补建从当前周期起未来 premake 个周期的分区，返回新建的分区数"""
+        today = today or datetime.now().date()
+        target = today
+        for _ in range(self.premake):
+            target = self._next_period(target)
+
+        with self._lock:
+            with engine.begin() as conn:
+                existing = self.list_partitions(conn, table)
+                if self.dialect == "postgresql":
+                    created = self._pg_ensure(conn, table, existing, today, target)
+                else:
+                    created = self._mysql_ensure(conn, table, existing, today, target)
+
+        if created:
+            logger.info(f"📅 {table} 新建 {created} 个分区（至 {target.isoformat()}）")
+        return created
+
+    def _mysql_ensure(self, conn, table: str, existing: List[Dict[str, Any]], today: date, target: date) -> int:
+        """拆分 pmax 得到新分区（MySQL 的范围分区只能在末尾追加）"""
+        bounded = [p for p in existing if p["end"] is not None]
+        start = bounded[-1]["end"] if bounded else self._period_start(today)
+
+        definitions = []
+        while start <= target:
+            end = self._next_period(start)
+            definitions.append(
+                f"PARTITION {self._partition_name(table, start)} VALUES LESS THAN (TO_DAYS('{end.isoformat()}'))"
+            )
+            start = end
+        if not definitions:
+            return 0
+
+        definitions.append(f"PARTITION {MYSQL_MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+        conn.execute(text(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {MYSQL_MAX_PARTITION} INTO ({', '.join(definitions)})"
+        ))
+        return len(definitions) - 1
+
+    def _pg_ensure(self, conn, table: str, existing: List[Dict[str, Any]], today: date, target: date) -> int:
+        """
+        创建缺少的分区
+
+        当前及过去周期的数据可能已经落入默认分区：先建独立表、把默认分区中对应范围的行移过去，
+        再 ATTACH；未来周期直接 CREATE TABLE ... PARTITION OF
+        """
+        column = PARTITIONED_TABLES[table]
+        covered = {p["start"] for p in existing if p["start"] is not None}
+        created = 0
+        for start, end in self._periods(today, target):
+            if start in covered:
+                continue
+            name = self._partition_name(table, start)
+            bound = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            if start > today:
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES {bound}"))
+            else:
+                conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+                conn.execute(text(
+                    f"WITH moved AS (DELETE FROM {table}_default "
+                    f"WHERE {column} >= '{start.isoformat()}' AND {column} < '{end.isoformat()}' RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ))
+                conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bound}"))
+            created += 1
+        return created
+
+    def drop_expired_partitions(self, cutoff: datetime) -> Dict[str, Dict[str, Any]]:
+        """
+        删除整个范围都早于 cutoff 的分区
+
+        跨越 cutoff 的分区保留到下一次清理，因此过期数据最多多保留一个分区周期。
+
+        Returns:
+            已分区的表 -> {"dropped": 分区数, "rows": 估算行数}；未分区的表不在结果中，
+            调用方需要继续按行删除
+        """
+        results = {}
+        if not self.supported:
+            return results
+
+        cutoff_day = cutoff.date()
+        for table in PARTITIONED_TABLES:
+            try:
+                with self._lock:
+                    with engine.begin() as conn:
+                        if not self.is_partitioned(conn, table):
+                            continue
+
+                        expired = [
+                            p for p in self.list_partitions(conn, table)
+                            if p["end"] is not None and p["end"] <= cutoff_day
+                        ]
+                        if expired and self.dialect == "postgresql":
+                            for partition in expired:
+                                conn.execute(text(f"DROP TABLE {partition['name']}"))
+                        elif expired:
+                            names = ", ".join(p["name"] for p in expired)
+                            conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {names}"))
+
+                        # PostgreSQL 默认分区里只有零星的越界数据，按行删除
+                        if self.dialect == "postgresql":
+                            column = PARTITIONED_TABLES[table]
+                            conn.execute(
+                                text(f"DELETE FROM {table}_default WHERE {column} < :cutoff"),
+                                {"cutoff": cutoff}
+                            )
+
+                results[table] = {"dropped": len(expired), "rows": sum(p["rows"] for p in expired)}
+                if expired:
+                    logger.info(
+                        f"🗑️ {table} 删除 {len(expired)} 个过期分区"
+                        f"（{expired[0]['name']} ~ {expired[-1]['name']}，约 {results[table]['rows']} 行）"
+                    )
+            except Exception as e:
+                logger.error(f"❌ 删除 {table} 过期分区失败: {e}")
+        return results
+
+    # ---------- 迁移 ----------
+
+    def migrate_table(self, table: str, retention_days: int = None) -> bool:
+        """
+        将未分区的表转换为分区表
+
+        - MySQL：ALTER TABLE 原地重建（期间表不可写）
+        - PostgreSQL：在一个事务中重命名旧表、建分区表、复制数据、删除旧表；失败时整体回滚
+
+        早于保留期的数据不再建立分区：MySQL 落入最早的分区、PostgreSQL 落入默认分区，
+        下次清理时删除
+        """
+        retention_days = retention_days or settings.DATA_RETENTION_DAYS
+        if not self.supported:
+            logger.warning(f"⚠️ 当前数据库 ({self.dialect}) 不支持分区，跳过 {table}")
+            return False
+
+        with self._lock:
+            with engine.begin() as conn:
+                if self.is_partitioned(conn, table):
+                    logger.info(f"ℹ️ {table} 已经是分区表")
+                    return True
+
+                column = PARTITIONED_TABLES[table]
+                today = datetime.now().date()
+                oldest = conn.execute(text(f"SELECT MIN({column}) FROM {table}")).scalar()
+                first = max(oldest.date() if oldest else today, today - timedelta(days=retention_days))
+                last = today
+                for _ in range(self.premake):
+                    last = self._next_period(last)
+                periods = self._periods(first, last)
+
+                logger.info(f"🔧 开始将 {table} 转换为分区表（{len(periods)} 个分区，{self.interval}）...")
+
+                # 主键列不能为 NULL
+                conn.execute(text(f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL"))
+
+                if self.dialect == "postgresql":
+                    self._pg_migrate(conn, table, column, periods)
+                else:
+                    self._mysql_migrate(conn, table, column, periods)
+
+        logger.info(f"✅ {table} 已转换为分区表")
+        return True
+
+    def _model_table(self, table: str):
+        """模型中的表定义（命令行迁移时模型可能尚未导入）"""
+        from src.models import logs, stats  # noqa: F401
+        return Base.metadata.tables[table]
+
+    def _unique_indexes(self, table: str) -> List[tuple]:
+        """模型中定义的唯一索引 (名称, 列名列表)，不含分区列的追加分区列"""
+        model_table = self._model_table(table)
+        column = PARTITIONED_TABLES[table]
+        indexes = []
+        for index in model_table.indexes:
+            if not index.unique:
+                continue
+            columns = [col.name for col in index.columns]
+            indexes.append((index.name, columns if column in columns else columns + [column]))
+        return indexes
+
+    def _mysql_migrate(self, conn, table: str, column: str, periods: List[tuple]):
+        # 主键、唯一索引追加分区列
+        alters = [f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})"]
+        existing_indexes = {
+            row[0] for row in conn.execute(text(
+                "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ), {"table": table})
+        }
+        for name, columns in self._unique_indexes(table):
+            if name in existing_indexes:
+                alters.append(f"DROP INDEX {name}")
+            alters.append(f"ADD UNIQUE INDEX {name} ({', '.join(columns)})")
+        conn.execute(text(f"ALTER TABLE {table} {', '.join(alters)}"))
+
+        definitions = [
+            f"PARTITION {self._partition_name(table, start)} VALUES LESS THAN (TO_DAYS('{end.isoformat()}'))"
+            for start, end in periods
+        ]
+        definitions.append(f"PARTITION {MYSQL_MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+        conn.execute(text(
+            f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS({column})) ({', '.join(definitions)})"
+        ))
+
+    def _pg_migrate(self, conn, table: str, column: str, periods: List[tuple]):
+        legacy = f"{table}_unpartitioned"
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+
+        conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        conn.execute(text(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"
+        ))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+        for start, end in periods:
+            conn.execute(text(
+                f"CREATE TABLE {self._partition_name(table, start)} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+
+        conn.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+
+        # 自增序列转交给新表，删除旧表时不会被级联删除
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+        # 数据复制完成后再建索引（在分区表上建索引会自动作用到所有分区）
+        conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})"))
+        unique_names = set()
+        for name, columns in self._unique_indexes(table):
+            unique_names.add(name)
+            conn.execute(text(f"CREATE UNIQUE INDEX {name} ON {table} ({', '.join(columns)})"))
+        for index in self._model_table(table).indexes:
+            if index.name not in unique_names:
+                index.create(bind=conn)
+
+
+# 全局实例
+_partition_manager: Optional[PartitionManager] = None
+
+def get_partition_manager() -> PartitionManager:
+    """获取分区管理器实例"""
+    global _partition_manager
+    if _partition_manager is None:
+        _partition_manager = PartitionManager()
+    return _partition_manager
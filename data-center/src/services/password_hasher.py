@@ -0,0 +1,145 @@
+"""
+密码哈希线程池
+
+登录和修改密码时的密码哈希原来在数据库线程池中与查询一起执行，登录请求集中到达时会占满
+数据库线程，Worker数据写入也要排队。这里改为：
+
+- 哈希在独立的线程池中执行（PASSWORD_HASH_WORKERS 个线程，默认为 CPU 核数的一半，
+  大量登录请求最多占用这些核），数据库线程只做查询和更新
+- 等待中（排队 + 执行中）的任务最多 PASSWORD_HASH_MAX_PENDING 个，超出时抛出 PasswordHasherBusy，
+  登录接口返回 429，不会无限积压
+- 指标：完成/拒绝数量、排队等待时间、哈希耗时
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from src.config import settings
+from src.models.auth import User
+
+logger = logging.getLogger(__name__)
+
+# 自动确定线程数时的上限
+MAX_HASH_WORKERS = 4
+
+
+def get_hash_workers() -> int:
+    """密码哈希线程数（PASSWORD_HASH_WORKERS 为 0 时取 CPU 核数的一半，1~MAX_HASH_WORKERS）"""
+    if settings.PASSWORD_HASH_WORKERS > 0:
+        return settings.PASSWORD_HASH_WORKERS
+    return max(1, min((os.cpu_count() or 1) // 2, MAX_HASH_WORKERS))
+
+
+class PasswordHasherBusy(Exception):
+    """等待中的密码哈希任务已达上限"""
+
+
+class PasswordHasher:
+    """有界的密码哈希线程池"""
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or get_hash_workers()
+        self.max_pending = max(1, max_pending or settings.PASSWORD_HASH_MAX_PENDING)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.metrics = {
+            "completed": 0,
+            "rejected": 0,
+            "last_queue_wait_ms": 0.0,
+            "max_queue_wait_ms": 0.0,
+            "total_queue_wait_ms": 0.0,
+            "last_hash_ms": 0.0,
+            "max_hash_ms": 0.0,
+            "total_hash_ms": 0.0
+        }
+
+    async def hash_password(self, password: str) -> str:
+        """计算新密码的哈希"""
+        return await self._submit(User.hash_password, password)
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        """校验密码"""
+        return await self._submit(User.check_password, password_hash, password)
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.metrics["rejected"] += 1
+                raise PasswordHasherBusy("密码验证请求过多，请稍后重试")
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(self._run, time.perf_counter(), func, args)
+        except BaseException:
+            self._release(None)
+            raise
+        # 任务完成或在开始前被取消时都会调用，等待方被取消也不会漏减计数
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, submitted: float, func, args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            wait_ms = (started - submitted) * 1000
+            hash_ms = (finished - started) * 1000
+            with self._lock:
+                self.metrics["completed"] += 1
+                self.metrics["last_queue_wait_ms"] = round(wait_ms, 3)
+                self.metrics["max_queue_wait_ms"] = round(max(self.metrics["max_queue_wait_ms"], wait_ms), 3)
+                self.metrics["total_queue_wait_ms"] += wait_ms
+                self.metrics["last_hash_ms"] = round(hash_ms, 3)
+                self.metrics["max_hash_ms"] = round(max(self.metrics["max_hash_ms"], hash_ms), 3)
+                self.metrics["total_hash_ms"] += hash_ms
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取线程池指标"""
+        with self._lock:
+            metrics = dict(self.metrics)
+            pending = self._pending
+        completed = metrics["completed"]
+        total_wait = metrics.pop("total_queue_wait_ms")
+        total_hash = metrics.pop("total_hash_ms")
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "avg_queue_wait_ms": round(total_wait / completed, 3) if completed else 0.0,
+            "avg_hash_ms": round(total_hash / completed, 3) if completed else 0.0,
+            **metrics
+        }
+
+    def shutdown(self):
+        """关闭线程池（等待执行中的任务完成）"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# 全局实例
+_password_hasher: Optional[PasswordHasher] = None
+
+def get_password_hasher() -> PasswordHasher:
+    """获取密码哈希线程池实例"""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher()
+    return _password_hasher
+
+
+def shutdown_password_hasher():
+    """关闭密码哈希线程池（应用关闭时调用）"""
+    global _password_hasher
+    hasher, _password_hasher = _password_hasher, None
+    if hasher is not None:
+        hasher.shutdown()
@@ -0,0 +1,266 @@
+"""
+过期数据分批清理（purge）
+
+一次性 DELETE 30 天前的全部数据会长时间持有锁，阻塞Worker数据写入。这里改为：
+
+- 按主键范围分批删除，每批最多 PURGE_BATCH_SIZE 行、一个事务
+- 两批之间暂停 PURGE_BATCH_SLEEP_SECONDS，让出数据库给写入请求（暂停期间不占用数据库线程）
+- 每批完成后把进度写入检查点文件，进程重启后从上次的位置继续
+- 进度（已删除行数、每秒删除行数、剩余估算）通过 TaskScheduler.get_job_status 查看
+
+已分区的日志表（MySQL/PostgreSQL）先整分区删除，不再逐行删除。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from sqlalchemy import select, func, delete
+
+from src.config import settings
+from src.database import engine, run_db
+from src.models.stats import RequestStats, IPViolationStats, UAUsageStats
+from src.models.logs import SystemLog, TelegramLog, SyncLog
+from src.services.partition_service import get_partition_manager
+
+logger = logging.getLogger(__name__)
+
+# 按顺序清理的表
+PURGE_MODELS = (RequestStats, IPViolationStats, UAUsageStats, SystemLog, TelegramLog, SyncLog)
+
+CHECKPOINT_FILE_NAME = "purge_checkpoint.json"
+
+
+class PurgeEngine:
+    """过期数据分批清理"""
+
+    def __init__(self, batch_size: int = None, batch_sleep: float = None, checkpoint_path: str = None):
+        self.batch_size = batch_size or settings.PURGE_BATCH_SIZE
+        self.batch_sleep = batch_sleep if batch_sleep is not None else settings.PURGE_BATCH_SLEEP_SECONDS
+        self.checkpoint_path = checkpoint_path or os.path.join(settings.CONFIG_PATH, CHECKPOINT_FILE_NAME)
+
+        self.running = False
+        self._stop_requested = False
+        self.progress: Dict[str, Any] = {"state": "idle"}
+        self._resumed_deleted = 0
+
+    async def run(self, days: int = None) -> bool:
+        """
+        清理 days 天前的数据
+
+        存在同一保留天数的未完成检查点时，沿用检查点中的截止时间继续清理。
+
+        Returns:
+            是否全部清理完成（被停止或失败时返回 False，下次执行时继续）
+        """
+        days = days or settings.DATA_RETENTION_DAYS
+        if self.running:
+            logger.warning("⚠️ 过期数据清理正在执行，跳过本次请求")
+            return False
+
+        self.running = True
+        self._stop_requested = False
+        try:
+            checkpoint = self._load_checkpoint()
+            if checkpoint and checkpoint.get("days") == days:
+                logger.info(f"♻️ 继续上次未完成的清理（截止时间 {checkpoint['cutoff']}）")
+            else:
+                checkpoint = {
+                    "days": days,
+                    "cutoff": (datetime.now() - timedelta(days=days)).isoformat(),
+                    "tables": {}
+                }
+            cutoff = datetime.fromisoformat(checkpoint["cutoff"])
+
+            self.progress = {
+                "state": "running",
+                "days": days,
+                "cutoff": checkpoint["cutoff"],
+                "started_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "current_table": None,
+                "partitions_dropped": {},
+                "deleted": 0,
+                "estimated_total": 0,
+                "remaining_estimate": 0,
+                "rows_per_second": 0.0,
+                "eta_seconds": None,
+                "batches": 0,
+                "last_batch_ms": 0.0,
+                "max_batch_ms": 0.0,
+                "tables": checkpoint["tables"],
+                "error": None
+            }
+            started = time.monotonic()
+            # 继续清理时，速度只按本次删除的行数计算
+            self._resumed_deleted = sum(state["deleted"] for state in checkpoint["tables"].values())
+
+            # 已分区的表：整分区删除
+            dropped = await run_db(get_partition_manager().drop_expired_partitions, cutoff)
+            self.progress["partitions_dropped"] = dropped
+
+            for model in PURGE_MODELS:
+                table = model.__tablename__
+                if table in dropped:
+                    continue
+
+                state = checkpoint["tables"].get(table)
+                if state is None:
+                    count, min_id, max_id = await run_db(self._scan, model, cutoff)
+                    state = {
+                        "estimated": count,
+                        "deleted": 0,
+                        "last_id": (min_id - 1) if min_id is not None else 0,
+                        "max_id": max_id or 0,
+                        "done": count == 0
+                    }
+                    checkpoint["tables"][table] = state
+                    self._save_checkpoint(checkpoint)
+                self._update_estimates(started)
+
+                if state["done"]:
+                    continue
+
+                self.progress["current_table"] = table
+                while not state["done"]:
+                    if self._stop_requested:
+                        self.progress["state"] = "stopped"
+                        logger.info(f"⏸️ 过期数据清理已暂停（{table} 删除到 id={state['last_id']}），下次执行时继续")
+                        return False
+
+                    batch_started = time.perf_counter()
+                    deleted, last_id = await run_db(
+                        self._delete_batch, model, cutoff, state["last_id"], state["max_id"]
+                    )
+                    batch_ms = round((time.perf_counter() - batch_started) * 1000, 2)
+
+                    state["deleted"] += deleted
+                    state["last_id"] = last_id
+                    state["done"] = last_id >= state["max_id"]
+                    self._save_checkpoint(checkpoint)
+
+                    self.progress["batches"] += 1
+                    self.progress["last_batch_ms"] = batch_ms
+                    self.progress["max_batch_ms"] = max(self.progress["max_batch_ms"], batch_ms)
+                    self._update_estimates(started)
+
+                    if not state["done"] and self.batch_sleep > 0:
+                        await asyncio.sleep(self.batch_sleep)
+
+                logger.info(f"🧹 {table} 清理完成: 删除 {state['deleted']} 行")
+
+            self.progress["state"] = "completed"
+            self.progress["current_table"] = None
+            self._remove_checkpoint()
+            return True
+
+        except Exception as e:
+            self.progress["state"] = "failed"
+            self.progress["error"] = str(e)
+            logger.error(f"❌ 过期数据清理失败（进度已保存，下次执行时继续）: {e}")
+            return False
+        finally:
+            self.progress["finished_at"] = datetime.now().isoformat()
+            self.running = False
+
+    def stop(self):
+        """请求在当前批次结束后停止（进度保存在检查点中）"""
+        if self.running:
+            self._stop_requested = True
+
+    def get_progress(self) -> Dict[str, Any]:
+        """当前/最近一次清理的进度"""
+        progress = dict(self.progress)
+        progress["running"] = self.running
+        progress["batch_size"] = self.batch_size
+        progress["batch_sleep_seconds"] = self.batch_sleep
+        return progress
+
+    def _update_estimates(self, started: float):
+        tables = self.progress["tables"].values()
+        deleted = sum(state["deleted"] for state in tables)
+        estimated = sum(state["estimated"] for state in tables)
+        elapsed = time.monotonic() - started
+
+        rate = (deleted - self._resumed_deleted) / elapsed if elapsed > 0 else 0.0
+        remaining = max(estimated - deleted, 0)
+        self.progress["deleted"] = deleted
+        self.progress["estimated_total"] = estimated
+        self.progress["remaining_estimate"] = remaining
+        self.progress["rows_per_second"] = round(rate, 1)
+        self.progress["eta_seconds"] = round(remaining / rate, 1) if rate > 0 else None
+
+    # ---------- 数据库操作（在数据库线程池中执行） ----------
+
+    def _scan(self, model, cutoff: datetime) -> tuple:
+        """过期数据的行数与主键范围"""
+        table = model.__table__
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(func.count(), func.min(table.c.id), func.max(table.c.id))
+                .where(table.c.created_at < cutoff)
+            ).one()
+        return int(row[0] or 0), row[1], row[2]
+
+    def _delete_batch(self, model, cutoff: datetime, last_id: int, max_id: int) -> tuple:
+        """
+        删除主键在 (last_id, 批次终点] 之间的过期数据，一个事务
+
+        批次终点是 last_id 之后第 batch_size 个过期行的主键，找不到时为 max_id。
+
+        Returns:
+            (删除行数, 批次终点)
+        """
+        table = model.__table__
+        expired = (table.c.id > last_id) & (table.c.id <= max_id) & (table.c.created_at < cutoff)
+        with engine.begin() as conn:
+            batch_end = conn.execute(
+                select(table.c.id).where(expired).order_by(table.c.id)
+                .offset(self.batch_size - 1).limit(1)
+            ).scalar()
+            if batch_end is None:
+                batch_end = max_id
+            result = conn.execute(delete(table).where(expired & (table.c.id <= batch_end)))
+        return result.rowcount, batch_end
+
+    # ---------- 检查点 ----------
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 读取清理检查点失败，重新开始: {e}")
+            return None
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        temp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(checkpoint, f)
+            os.replace(temp_path, self.checkpoint_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存清理检查点失败: {e}")
+
+    def _remove_checkpoint(self):
+        try:
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 删除清理检查点失败: {e}")
+
+
+# 全局实例
+_purge_engine: Optional[PurgeEngine] = None
+
+def get_purge_engine() -> PurgeEngine:
+    """获取过期数据清理实例"""
+    global _purge_engine
+    if _purge_engine is None:
+        _purge_engine = PurgeEngine()
+    return _purge_engine
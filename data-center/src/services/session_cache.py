@@ -0,0 +1,130 @@
+"""
+已验证会话缓存
+
+AuthMiddleware 对每个需要认证的请求都调用 validate_jwt_session，查询一次会话表、一次用户表。
+这里缓存验证通过的结果（JWT令牌 -> 用户快照），重复请求不再访问数据库：
+
+- LRU：最多 SESSION_CACHE_SIZE 个令牌，超出时淘汰最久未使用的
+- 过期时间：会话的 expires_at 与 SESSION_CACHE_TTL_SECONDS 中较早的一个
+- 撤销代数：登出、撤销会话、注销全部会话、修改密码时调用 revoke()，代数加一，
+  之前缓存的条目全部失效；验证开始前读取代数，验证期间发生撤销的结果不会写入缓存
+
+缓存的是用户字段的快照，每次命中都构造新的 User 对象，请求之间不共享可变对象。
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from src.config import settings
+from src.models.auth import User
+from src.utils import naive_now
+
+logger = logging.getLogger(__name__)
+
+# 缓存的用户字段
+USER_SNAPSHOT_FIELDS = (
+    "id", "username", "password_hash", "email", "is_active", "is_admin",
+    "last_login", "created_at", "updated_at"
+)
+
+
+class SessionCache:
+    """已验证会话的 LRU 缓存（TTL + 撤销代数）"""
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries if max_entries is not None else settings.SESSION_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.SESSION_CACHE_TTL_SECONDS
+
+        # jwt_token -> (过期时间, 代数, 用户快照)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "revocations": 0
+        }
+
+    @property
+    def generation(self) -> int:
+        """当前撤销代数（验证开始前读取，写入缓存时传回）"""
+        return self._generation
+
+    def get(self, jwt_token: str) -> Optional[User]:
+        """命中时返回用户对象，未命中、已过期或已被撤销时返回 None"""
+        with self._lock:
+            entry = self._entries.get(jwt_token)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] != self._generation:
+                if entry is not None:
+                    del self._entries[jwt_token]
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(jwt_token)
+            self.metrics["hits"] += 1
+            snapshot = entry[2]
+        return User(**snapshot)
+
+    def put(self, jwt_token: str, user: User, expires_at: Optional[datetime], generation: int):
+        """
+        缓存验证通过的会话
+
+        Args:
+            expires_at: 会话的过期时间（与数据库中的 naive 本地时间一致）
+            generation: 验证开始前读取的撤销代数
+        """
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - naive_now()).total_seconds())
+        if ttl <= 0:
+            return
+
+        snapshot = {field: getattr(user, field, None) for field in USER_SNAPSHOT_FIELDS}
+        with self._lock:
+            if generation != self._generation:
+                # 验证期间发生了撤销，结果可能已经过时
+                return
+            self._entries[jwt_token] = (time.monotonic() + ttl, generation, snapshot)
+            self._entries.move_to_end(jwt_token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics["evictions"] += 1
+
+    def revoke(self):
+        """使所有缓存的会话失效（会话被撤销或密码被修改后调用）"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.metrics["revocations"] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取缓存指标"""
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            hit_rate = (self.metrics["hits"] / lookups * 100) if lookups > 0 else 0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "generation": self._generation,
+                "hit_rate": round(hit_rate, 2),
+                **self.metrics
+            }
+
+
+# 全局实例
+_session_cache: Optional[SessionCache] = None
+
+def get_session_cache() -> SessionCache:
+    """获取已验证会话缓存实例"""
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = SessionCache()
+    return _session_cache
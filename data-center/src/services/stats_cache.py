@@ -0,0 +1,147 @@
+"""
+统计结果缓存
+
+仪表盘的 /summary、/overview、/performance 会被多个浏览器标签页和Telegram机器人同时轮询，
+每次都重新查询数据库。这里提供一个进程内的结果缓存：
+
+- 按键设置 TTL：过期后下一次请求重新计算
+- 单飞（single-flight）：同一个键并发未命中时只计算一次，其余请求等待同一个结果；
+  计算在独立的任务中执行，任何一个请求被取消都不会影响其他请求
+- 手动失效：Worker数据写入数据库后调用 invalidate()，下次请求拿到最新数据
+- 指标：命中/未命中/合并/失效计数
+
+Telegram机器人运行在独立线程的事件循环中，因此缓存使用线程锁 +
+concurrent.futures.Future，任何事件循环都可以等待同一个计算结果。
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StatsCache:
+    """统计结果缓存（TTL + 单飞 + 手动失效）"""
+
+    def __init__(self, default_ttl: float = None):
+        self.default_ttl = default_ttl if default_ttl is not None else settings.STATS_CACHE_TTL_SECONDS
+
+        # key -> (过期时间, 结果)
+        self._entries: Dict[str, tuple] = {}
+        # key -> 正在进行的计算
+        self._inflight: Dict[str, Future] = {}
+        # 每次失效递增，失效前开始的计算结果不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+        # 正在执行的计算任务（事件循环只保存任务的弱引用）
+        self._tasks = set()
+
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "invalidations": 0,
+            "errors": 0
+        }
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             ttl: float = None) -> Any:
+        """
+        获取缓存结果，未命中时调用 compute() 计算
+
+        Args:
+            key: 缓存键
+            compute: 计算结果的协程函数
+            ttl: 该键的缓存时间（秒），默认使用 default_ttl
+
+        计算结果为空（{}、None）时视为失败，不写入缓存
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        leader = False
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.metrics["hits"] += 1
+                return entry[1]
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.metrics["coalesced"] += 1
+            else:
+                self.metrics["misses"] += 1
+                inflight = Future()
+                self._inflight[key] = inflight
+                generation = self._generation
+                leader = True
+
+        if leader:
+            # 计算放在独立的任务中执行：发起请求被取消（客户端断开等）时计算继续，
+            # 取消不会传递给合并进来的等待者
+            task = asyncio.ensure_future(self._compute(key, compute, ttl, generation, inflight))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        # 所有请求（包括发起计算的请求）都通过 shield 等待共享的结果，单个请求被取消时不影响计算
+        return await asyncio.shield(asyncio.wrap_future(inflight))
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: float,
+                       generation: int, inflight: Future):
+        """执行计算并把结果或异常交给所有等待者"""
+        try:
+            result = await compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.metrics["errors"] += 1
+            inflight.set_exception(e)
+            # 避免没有等待者时出现 "exception was never retrieved" 警告
+            inflight.exception()
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if result and ttl > 0 and generation == self._generation:
+                self._entries[key] = (time.monotonic() + ttl, result)
+        inflight.set_result(result)
+
+    def invalidate(self, key: str = None):
+        """使缓存失效，key 为空时清空全部"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._generation += 1
+            self.metrics["invalidations"] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取缓存指标"""
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"] + self.metrics["coalesced"]
+            hit_rate = ((self.metrics["hits"] + self.metrics["coalesced"]) / lookups * 100) if lookups > 0 else 0
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "default_ttl": self.default_ttl,
+                "hit_rate": round(hit_rate, 2),
+                **self.metrics
+            }
+
+
+# 全局实例
+_stats_cache: Optional[StatsCache] = None
+
+def get_stats_cache() -> StatsCache:
+    """获取统计结果缓存实例"""
+    global _stats_cache
+    if _stats_cache is None:
+        _stats_cache = StatsCache()
+    return _stats_cache
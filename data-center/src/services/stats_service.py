@@ -4,16 +4,96 @@
 import logging
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, desc, case, exists
 
-from src.database import get_db_sync
-from src.models.stats import RequestStats, IPViolationStats, UAUsageStats
+from src.database import get_db_sync, offload_db
+from src.models.stats import RequestStats, IPViolationStats, UAUsageStats, StatsDailyRollup, StatsRollupTotal
 from src.models.logs import SystemLog, TelegramLog, SyncLog
 from src.models.config import UAConfig, IPBlacklist
+from src.services.purge_service import get_purge_engine
 
 logger = logging.getLogger(__name__)
 
+def hour_bucket(timestamp: float = None) -> datetime:
+    """统计数据所属的小时（timestamp 为接收数据的时间戳，默认当前时间）"""
+    moment = datetime.fromtimestamp(timestamp) if timestamp is not None else datetime.now()
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _first_seen_since(start: datetime):
+    """违规IP在 start 之前没有记录（用于按首次出现的日期去重计数，走 ip_address 索引）"""
+    earlier = aliased(IPViolationStats)
+    return ~exists().where(
+        earlier.ip_address == IPViolationStats.ip_address,
+        earlier.date_hour < start
+    )
+
+class StatsSnapshot:
+    """
+    统计快照
+
+    一次计算得到的系统概览与性能指标，供统计接口、定时任务和Telegram机器人共用
+    """
+
+    def __init__(self, taken_at: datetime, total_requests: int, successful_requests: int,
+                 blocked_requests: int, error_requests: int, recent_requests_1h: int,
+                 requests_24h: int, errors_24h: int, avg_response_time_24h: float,
+                 ua_configs: int, enabled_ua_configs: int, blacklist_count: int,
+                 violation_ips: int, temp_banned: int):
+        self.taken_at = taken_at
+
+        # 转换为 int/float，避免 Decimal 类型导致 JSON 序列化失败
+        self.total_requests = int(total_requests)
+        self.successful_requests = int(successful_requests)
+        self.blocked_requests = int(blocked_requests)
+        self.error_requests = int(error_requests)
+        self.recent_requests_1h = int(recent_requests_1h)
+        self.requests_24h = int(requests_24h)
+        self.errors_24h = int(errors_24h)
+        self.avg_response_time_24h = float(avg_response_time_24h)
+        self.ua_configs = int(ua_configs)
+        self.enabled_ua_configs = int(enabled_ua_configs)
+        self.blacklist_count = int(blacklist_count)
+        self.violation_ips = int(violation_ips)
+        self.temp_banned = int(temp_banned)
+
+    def age_seconds(self) -> float:
+        """快照已存在的秒数"""
+        return (datetime.now() - self.taken_at).total_seconds()
+
+    def overview(self) -> Dict[str, Any]:
+        """系统概览（get_system_overview 的返回格式）"""
+        success_rate = (self.successful_requests / self.total_requests * 100) if self.total_requests > 0 else 0
+        return {
+            "total_requests": self.total_requests,
+            "successful_requests": self.successful_requests,
+            "blocked_requests": self.blocked_requests,
+            "error_requests": self.error_requests,
+            "success_rate": round(success_rate, 2),
+            "ua_configs": self.ua_configs,
+            "enabled_ua_configs": self.enabled_ua_configs,
+            "blacklist_count": self.blacklist_count,
+            "violation_ips": self.violation_ips,
+            "temp_banned": self.temp_banned
+        }
+
+    def performance(self) -> Dict[str, Any]:
+        """性能指标（get_performance_metrics 的返回格式）"""
+        error_rate = (self.errors_24h / self.requests_24h * 100) if self.requests_24h > 0 else 0
+        return {
+            "avg_response_time": round(self.avg_response_time_24h, 2),
+            "recent_requests_per_hour": self.recent_requests_1h,
+            "error_rate_24h": round(error_rate, 2),
+            "timestamp": self.taken_at.isoformat()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（概览 + 性能指标）"""
+        return {**self.overview(), **self.performance()}
+
+# 最近一次计算的统计快照（供定时任务与Telegram机器人复用）
+_latest_snapshot: Optional[StatsSnapshot] = None
+
 class StatsService:
     """统计分析服务类"""
     
@@ -22,49 +102,108 @@ class StatsService:
     
     async def get_system_overview(self) -> Dict[str, Any]:
         """获取系统概览统计"""
+        snapshot = await self.get_stats_snapshot()
+        return snapshot.overview() if snapshot else {}
+
+    async def get_stats_snapshot(self, max_age_seconds: float = 0) -> Optional["StatsSnapshot"]:
+        """
+        获取统计快照（系统概览 + 性能指标）
+
+        Args:
+            max_age_seconds: 允许复用的最近快照的最大年龄，0 表示总是重新计算
+        """
+        latest = _latest_snapshot
+        if latest and max_age_seconds > 0 and latest.age_seconds() <= max_age_seconds:
+            return latest
+        return await self._compute_stats_snapshot()
+
+    @offload_db
+    def _compute_stats_snapshot(self) -> Optional["StatsSnapshot"]:
+        """
+        计算统计快照
+
+        request_stats 只扫描一次：用条件聚合（SUM(CASE WHEN date_hour >= :t ...)）
+        同时得到未汇总部分的全量计数和最近1小时/24小时窗口的性能指标；
+        配置与违规计数合并为一条标量子查询语句，违规IP数和临时封禁数同样只统计未汇总的部分
+        """
+        global _latest_snapshot
+
         try:
             db = self.db()
 
-            # 请求统计（转换为 int，避免 Decimal 类型导致 JSON 序列化失败）
-            total_requests = int(db.query(func.sum(RequestStats.total_requests)).scalar() or 0)
-            successful_requests = int(db.query(func.sum(RequestStats.successful_requests)).scalar() or 0)
-            blocked_requests = int(db.query(func.sum(RequestStats.blocked_requests)).scalar() or 0)
-            error_requests = int(db.query(func.sum(RequestStats.error_requests)).scalar() or 0)
-
-            # 配置统计
-            ua_configs = int(db.query(func.count(UAConfig.id)).scalar() or 0)
-            enabled_ua_configs = int(db.query(func.count(UAConfig.id)).filter(UAConfig.enabled == True).scalar() or 0)
-            blacklist_count = int(db.query(func.count(IPBlacklist.id)).filter(IPBlacklist.enabled == True).scalar() or 0)
+            now = datetime.now()
+            last_hour = now - timedelta(hours=1)
+            last_day = now - timedelta(hours=24)
+
+            # 汇总表覆盖的部分（见 compact_stats_rollups）
+            totals = db.query(StatsRollupTotal).first()
+            live_start = totals.covered_until if totals else None
+
+            def since(start, column):
+                """只累加 start 之后的记录"""
+                if start is None:
+                    return func.sum(column)
+                return func.sum(case((RequestStats.date_hour >= start, column), else_=0))
+
+            request_query = db.query(
+                since(live_start, RequestStats.total_requests),
+                since(live_start, RequestStats.successful_requests),
+                since(live_start, RequestStats.blocked_requests),
+                since(live_start, RequestStats.error_requests),
+                since(last_hour, RequestStats.total_requests),
+                since(last_day, RequestStats.total_requests),
+                since(last_day, RequestStats.error_requests),
+                func.avg(case((RequestStats.date_hour >= last_day, RequestStats.avg_response_time)))
+            )
+            if live_start is not None:
+                request_query = request_query.filter(RequestStats.date_hour >= min(live_start, last_day))
+            row = request_query.one()
+
+            # 违规统计：汇总表之后的部分，违规IP只计汇总截止时间之前没有出现过的
+            violation_ips = db.query(func.count(func.distinct(IPViolationStats.ip_address)))
+            temp_banned = db.query(func.count(IPViolationStats.id)).filter(IPViolationStats.is_banned == "temp")
+            if live_start is not None:
+                violation_ips = violation_ips.filter(
+                    IPViolationStats.date_hour >= live_start, _first_seen_since(live_start)
+                )
+                temp_banned = temp_banned.filter(IPViolationStats.date_hour >= live_start)
 
-            # 违规统计
-            violation_ips = int(db.query(func.count(func.distinct(IPViolationStats.ip_address))).scalar() or 0)
-            temp_banned = int(db.query(func.count(IPViolationStats.id)).filter(
-                IPViolationStats.is_banned == "temp"
-            ).scalar() or 0)
+            # 配置与违规统计（单条语句）
+            counts = db.query(
+                db.query(func.count(UAConfig.id)).scalar_subquery(),
+                db.query(func.count(UAConfig.id)).filter(UAConfig.enabled == True).scalar_subquery(),
+                db.query(func.count(IPBlacklist.id)).filter(IPBlacklist.enabled == True).scalar_subquery(),
+                violation_ips.scalar_subquery(),
+                temp_banned.scalar_subquery()
+            ).one()
 
             db.close()
 
-            # 计算成功率（转换为 float，避免 Decimal 类型）
-            success_rate = float((successful_requests / total_requests * 100) if total_requests > 0 else 0)
-
-            return {
-                "total_requests": total_requests,
-                "successful_requests": successful_requests,
-                "blocked_requests": blocked_requests,
-                "error_requests": error_requests,
-                "success_rate": round(success_rate, 2),
-                "ua_configs": ua_configs,
-                "enabled_ua_configs": enabled_ua_configs,
-                "blacklist_count": blacklist_count,
-                "violation_ips": violation_ips,
-                "temp_banned": temp_banned
-            }
+            snapshot = StatsSnapshot(
+                taken_at=now,
+                total_requests=(totals.total_requests if totals else 0) + (row[0] or 0),
+                successful_requests=(totals.successful_requests if totals else 0) + (row[1] or 0),
+                blocked_requests=(totals.blocked_requests if totals else 0) + (row[2] or 0),
+                error_requests=(totals.error_requests if totals else 0) + (row[3] or 0),
+                recent_requests_1h=row[4] or 0,
+                requests_24h=row[5] or 0,
+                errors_24h=row[6] or 0,
+                avg_response_time_24h=row[7] or 0,
+                ua_configs=counts[0] or 0,
+                enabled_ua_configs=counts[1] or 0,
+                blacklist_count=counts[2] or 0,
+                violation_ips=(totals.violation_ips if totals else 0) + (counts[3] or 0),
+                temp_banned=(totals.temp_banned if totals else 0) + (counts[4] or 0)
+            )
+            _latest_snapshot = snapshot
+            return snapshot
 
         except Exception as e:
-            logger.error(f"获取系统概览失败: {e}")
-            return {}
-    
-    async def get_recent_logs(self, limit: int = 50) -> List[SystemLog]:
+            logger.error(f"获取统计快照失败: {e}")
+            return None
+
+    @offload_db
+    def get_recent_logs(self, limit: int = 50) -> List[SystemLog]:
         """获取最近的系统日志"""
         try:
             db = self.db()
@@ -75,7 +214,8 @@ class StatsService:
             logger.error(f"获取系统日志失败: {e}")
             return []
     
-    async def get_logs_by_level(self, level: str, limit: int = 50) -> List[SystemLog]:
+    @offload_db
+    def get_logs_by_level(self, level: str, limit: int = 50) -> List[SystemLog]:
         """根据级别获取日志"""
         try:
             db = self.db()
@@ -88,7 +228,8 @@ class StatsService:
             logger.error(f"获取{level}级别日志失败: {e}")
             return []
     
-    async def get_request_stats_by_hour(self, hours: int = 24) -> List[RequestStats]:
+    @offload_db
+    def get_request_stats_by_hour(self, hours: int = 24) -> List[RequestStats]:
         """获取按小时的请求统计"""
         try:
             db = self.db()
@@ -104,7 +245,8 @@ class StatsService:
             logger.error(f"获取请求统计失败: {e}")
             return []
     
-    async def get_top_violation_ips(self, limit: int = 10) -> List[Dict[str, Any]]:
+    @offload_db
+    def get_top_violation_ips(self, limit: int = 10) -> List[Dict[str, Any]]:
         """获取违规次数最多的IP"""
         try:
             db = self.db()
@@ -134,7 +276,8 @@ class StatsService:
             logger.error(f"获取违规IP统计失败: {e}")
             return []
     
-    async def get_ua_usage_stats(self, hours: int = 24) -> List[Dict[str, Any]]:
+    @offload_db
+    def get_ua_usage_stats(self, hours: int = 24) -> List[Dict[str, Any]]:
         """获取UA使用统计"""
         try:
             db = self.db()
@@ -169,13 +312,18 @@ class StatsService:
             logger.error(f"获取UA使用统计失败: {e}")
             return []
     
-    async def record_worker_stats(self, worker_id: str, stats_data: Dict[str, Any]) -> bool:
-        """记录Worker统计数据"""
+    @offload_db
+    def record_worker_stats(self, worker_id: str, stats_data: Dict[str, Any], received_at: float = None) -> bool:
+        """
+        记录Worker统计数据
+
+        received_at 为接收数据的时间戳（写入队列延迟或重启后重放时，按接收时间而不是写入时间归入小时）
+        """
         try:
             db = self.db()
 
-            # 获取当前小时
-            current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+            # 数据所属的小时
+            current_hour = hour_bucket(received_at)
 
             # 查找或创建统计记录
             stats = db.query(RequestStats).filter(
@@ -239,7 +387,8 @@ class StatsService:
             logger.error(f"记录Worker统计数据失败: {e}")
             return False
     
-    async def record_system_log(self, level: str, message: str, details: Dict = None,
+    @offload_db
+    def record_system_log(self, level: str, message: str, details: Dict = None,
                                category: str = None, source: str = None, source_ip: str = None) -> bool:
         """记录系统日志"""
         try:
@@ -269,7 +418,8 @@ class StatsService:
             logger.error(f"记录系统日志失败: {e}")
             return False
     
-    async def get_telegram_logs(self, limit: int = 50) -> List[TelegramLog]:
+    @offload_db
+    def get_telegram_logs(self, limit: int = 50) -> List[TelegramLog]:
         """获取Telegram机器人日志"""
         try:
             db = self.db()
@@ -280,7 +430,8 @@ class StatsService:
             logger.error(f"获取TG机器人日志失败: {e}")
             return []
     
-    async def get_sync_logs(self, limit: int = 50) -> List[SyncLog]:
+    @offload_db
+    def get_sync_logs(self, limit: int = 50) -> List[SyncLog]:
         """获取同步日志"""
         try:
             db = self.db()
@@ -292,71 +443,195 @@ class StatsService:
             return []
     
     async def cleanup_old_data(self, days: int = 30) -> bool:
-        """清理旧数据"""
+        """
+        清理旧数据
+
+        已分区的日志表（MySQL/PostgreSQL）直接删除过期分区，其余表按主键分批删除，
+        详见 PurgeEngine
+        """
         try:
-            db = self.db()
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            # 清理旧的统计数据
-            db.query(RequestStats).filter(RequestStats.created_at < cutoff_date).delete()
-            db.query(IPViolationStats).filter(IPViolationStats.created_at < cutoff_date).delete()
-            db.query(UAUsageStats).filter(UAUsageStats.created_at < cutoff_date).delete()
-            
-            # 清理旧的日志数据
-            db.query(SystemLog).filter(SystemLog.created_at < cutoff_date).delete()
-            db.query(TelegramLog).filter(TelegramLog.created_at < cutoff_date).delete()
-            db.query(SyncLog).filter(SyncLog.created_at < cutoff_date).delete()
-            
-            db.commit()
-            db.close()
-            
-            logger.info(f"清理{days}天前的旧数据成功")
-            return True
-            
+            success = await get_purge_engine().run(days)
+            if success:
+                progress = get_purge_engine().get_progress()
+                dropped = ", ".join(progress["partitions_dropped"]) or "无"
+                logger.info(f"清理{days}天前的旧数据成功: 删除 {progress['deleted']} 行（整分区删除: {dropped}）")
+            return success
+
         except Exception as e:
             logger.error(f"清理旧数据失败: {e}")
             return False
     
     async def get_performance_metrics(self) -> Dict[str, Any]:
         """获取性能指标"""
+        snapshot = await self.get_stats_snapshot()
+        return snapshot.performance() if snapshot else {}
+
+    def _get_request_totals(self, db: Session) -> Dict[str, Any]:
+        """
+        获取全量请求统计
+
+        covered_until 之前的数据直接读取汇总表的单行记录，
+        之后尚未压缩的部分（通常只有今天）从原始表实时聚合
+        """
+        totals = db.query(StatsRollupTotal).first()
+        live_start = totals.covered_until if totals else None
+
+        request_query = db.query(
+            func.sum(RequestStats.total_requests),
+            func.sum(RequestStats.successful_requests),
+            func.sum(RequestStats.blocked_requests),
+            func.sum(RequestStats.error_requests),
+            func.sum(RequestStats.avg_response_time),
+            func.count(RequestStats.avg_response_time)
+        )
+        violation_query = db.query(func.sum(IPViolationStats.violation_count))
+        if live_start:
+            request_query = request_query.filter(RequestStats.date_hour >= live_start)
+            violation_query = violation_query.filter(IPViolationStats.date_hour >= live_start)
+
+        live = request_query.one()
+        live_violations = violation_query.scalar() or 0
+
+        # 转换为 int/float，避免 Decimal 类型导致 JSON 序列化失败
+        return {
+            "total_requests": int((totals.total_requests if totals else 0) + (live[0] or 0)),
+            "successful_requests": int((totals.successful_requests if totals else 0) + (live[1] or 0)),
+            "blocked_requests": int((totals.blocked_requests if totals else 0) + (live[2] or 0)),
+            "error_requests": int((totals.error_requests if totals else 0) + (live[3] or 0)),
+            "response_time_sum": float((totals.response_time_sum if totals else 0) + (live[4] or 0)),
+            "response_time_samples": int((totals.response_time_samples if totals else 0) + (live[5] or 0)),
+            "violation_count": int((totals.violation_count if totals else 0) + live_violations)
+        }
+
+    @offload_db
+    def compact_stats_rollups(self) -> int:
+        """
+        压缩统计汇总表
+
+        将今天之前的原始统计按天汇总到 stats_daily_rollup，再累加为 stats_rollup_totals 单行记录。
+        违规IP按首次出现的日期计入当天的 new_violation_ips，累加后即为去重的违规IP数。
+        每次都会重新计算上次截止日的前一天，以包含Worker跨零点补推的数据。
+
+        Returns:
+            本次重新汇总的天数，失败返回-1
+        """
         try:
             db = self.db()
+            now = datetime.now()
+            today_start = datetime.combine(now.date(), datetime.min.time())
 
-            # 最近24小时的平均响应时间（转换为 float，避免 Decimal 类型）
-            avg_response_time = float(db.query(func.avg(RequestStats.avg_response_time)).filter(
-                RequestStats.date_hour >= datetime.now() - timedelta(hours=24)
-            ).scalar() or 0)
-
-            # 最近1小时的请求量（转换为 int，避免 Decimal 类型）
-            recent_requests = int(db.query(func.sum(RequestStats.total_requests)).filter(
-                RequestStats.date_hour >= datetime.now() - timedelta(hours=1)
-            ).scalar() or 0)
-
-            # 错误率（转换为 int，避免 Decimal 类型）
-            recent_errors = int(db.query(func.sum(RequestStats.error_requests)).filter(
-                RequestStats.date_hour >= datetime.now() - timedelta(hours=24)
-            ).scalar() or 0)
-
-            recent_total = int(db.query(func.sum(RequestStats.total_requests)).filter(
-                RequestStats.date_hour >= datetime.now() - timedelta(hours=24)
-            ).scalar() or 0)
+            totals = db.query(StatsRollupTotal).first()
+            if totals and totals.covered_until:
+                start_day = totals.covered_until - timedelta(days=1)
+            else:
+                # 首次压缩：从最早的原始数据开始
+                earliest = [
+                    value for value in (
+                        db.query(func.min(RequestStats.date_hour)).scalar(),
+                        db.query(func.min(IPViolationStats.date_hour)).scalar()
+                    ) if value
+                ]
+                start_day = datetime.combine(min(earliest).date(), datetime.min.time()) if earliest else today_start
+
+            refreshed_days = 0
+            day = start_day
+            while day < today_start:
+                next_day = day + timedelta(days=1)
+
+                row = db.query(
+                    func.sum(RequestStats.total_requests),
+                    func.sum(RequestStats.successful_requests),
+                    func.sum(RequestStats.blocked_requests),
+                    func.sum(RequestStats.error_requests),
+                    func.sum(RequestStats.avg_response_time),
+                    func.count(RequestStats.avg_response_time)
+                ).filter(
+                    RequestStats.date_hour >= day,
+                    RequestStats.date_hour < next_day
+                ).one()
+
+                violations = db.query(
+                    func.sum(IPViolationStats.violation_count),
+                    func.sum(case((IPViolationStats.is_banned == "temp", 1), else_=0))
+                ).filter(
+                    IPViolationStats.date_hour >= day,
+                    IPViolationStats.date_hour < next_day
+                ).one()
+
+                # 当天首次出现的违规IP（之前的日期已经计过的不再计入）
+                new_ips = db.query(func.count(func.distinct(IPViolationStats.ip_address))).filter(
+                    IPViolationStats.date_hour >= day,
+                    IPViolationStats.date_hour < next_day,
+                    _first_seen_since(day)
+                ).scalar() or 0
 
-            error_rate = float((recent_errors / recent_total * 100) if recent_total > 0 else 0)
+                rollup = db.query(StatsDailyRollup).filter(StatsDailyRollup.day == day).first()
+                if not rollup:
+                    rollup = StatsDailyRollup(day=day)
+                    db.add(rollup)
+
+                rollup.total_requests = int(row[0] or 0)
+                rollup.successful_requests = int(row[1] or 0)
+                rollup.blocked_requests = int(row[2] or 0)
+                rollup.error_requests = int(row[3] or 0)
+                rollup.response_time_sum = float(row[4] or 0)
+                rollup.response_time_samples = int(row[5] or 0)
+                rollup.violation_count = int(violations[0] or 0)
+                rollup.new_violation_ips = int(new_ips)
+                rollup.temp_banned = int(violations[1] or 0)
+                rollup.updated_at = now
+
+                refreshed_days += 1
+                day = next_day
+
+            db.flush()
+
+            # 重新累加全量汇总（日汇总表每天一行，数据量很小）
+            agg = db.query(
+                func.sum(StatsDailyRollup.total_requests),
+                func.sum(StatsDailyRollup.successful_requests),
+                func.sum(StatsDailyRollup.blocked_requests),
+                func.sum(StatsDailyRollup.error_requests),
+                func.sum(StatsDailyRollup.response_time_sum),
+                func.sum(StatsDailyRollup.response_time_samples),
+                func.sum(StatsDailyRollup.violation_count),
+                func.sum(StatsDailyRollup.new_violation_ips),
+                func.sum(StatsDailyRollup.temp_banned)
+            ).filter(
+                StatsDailyRollup.day < today_start
+            ).one()
+
+            if not totals:
+                totals = StatsRollupTotal()
+                db.add(totals)
+
+            totals.total_requests = int(agg[0] or 0)
+            totals.successful_requests = int(agg[1] or 0)
+            totals.blocked_requests = int(agg[2] or 0)
+            totals.error_requests = int(agg[3] or 0)
+            totals.response_time_sum = float(agg[4] or 0)
+            totals.response_time_samples = int(agg[5] or 0)
+            totals.violation_count = int(agg[6] or 0)
+            totals.violation_ips = int(agg[7] or 0)
+            totals.temp_banned = int(agg[8] or 0)
+            totals.covered_until = today_start
+            totals.updated_at = now
 
+            db.commit()
             db.close()
 
-            return {
-                "avg_response_time": round(avg_response_time, 2),
-                "recent_requests_per_hour": recent_requests,
-                "error_rate_24h": round(error_rate, 2),
-                "timestamp": datetime.now().isoformat()
-            }
+            logger.info(f"✅ 统计汇总表压缩完成: 重新汇总 {refreshed_days} 天")
+            return refreshed_days
 
         except Exception as e:
-            logger.error(f"获取性能指标失败: {e}")
-            return {}
-
-    async def get_summary(self) -> Dict[str, Any]:
+            logger.error(f"压缩统计汇总表失败: {e}")
+            if 'db' in locals():
+                db.rollback()
+                db.close()
+            return -1
+
+    @offload_db
+    def get_summary(self) -> Dict[str, Any]:
         """获取统计数据摘要（优化版：减少阻塞操作，提升响应速度）"""
         try:
             db = self.db()
@@ -365,16 +640,25 @@ class StatsService:
             today = datetime.now().date()
             today_start = datetime.combine(today, datetime.min.time())
 
-            today_requests = db.query(func.sum(RequestStats.total_requests)).filter(
+            # 今日数据（今日请求数、阻止数、活跃IP）只扫描今天的原始记录
+            today_row = db.query(
+                func.sum(RequestStats.total_requests),
+                func.sum(RequestStats.blocked_requests),
+                func.sum(RequestStats.active_ips_count)
+            ).filter(
                 RequestStats.date_hour >= today_start
-            ).scalar() or 0
+            ).one()
+            today_requests = today_row[0] or 0
+
+            # 全量数据来自汇总表，成本与数据保留时长无关
+            totals = self._get_request_totals(db)
 
             # 总请求数
-            total_requests = db.query(func.sum(RequestStats.total_requests)).scalar() or 0
+            total_requests = totals["total_requests"]
 
             # 成功率 - 基于成功请求数和总请求数
-            successful_requests = db.query(func.sum(RequestStats.successful_requests)).scalar() or 0
-            blocked_requests_total = db.query(func.sum(RequestStats.blocked_requests)).scalar() or 0
+            successful_requests = totals["successful_requests"]
+            blocked_requests_total = totals["blocked_requests"]
 
             # 如果有成功请求数据，使用它计算成功率
             if successful_requests > 0 and total_requests > 0:
@@ -404,32 +688,31 @@ class StatsService:
                 total_workers = 0
 
             # 平均响应时间
-            avg_response_time = db.query(func.avg(RequestStats.avg_response_time)).scalar() or 0
+            if totals["response_time_samples"] > 0:
+                avg_response_time = totals["response_time_sum"] / totals["response_time_samples"]
+            else:
+                avg_response_time = 0
             avg_response_time = round(float(avg_response_time), 2)
 
             # 被阻止的IP数量
             blocked_ips = db.query(func.count(IPBlacklist.id)).scalar() or 0
 
             # 今日阻止的请求数 - 优先从 RequestStats 获取
-            today_blocked = db.query(func.sum(RequestStats.blocked_requests)).filter(
-                RequestStats.date_hour >= today_start
-            ).scalar() or 0
+            today_blocked = today_row[1] or 0
 
             # 如果 RequestStats 没有数据，尝试从 IPViolationStats 获取
             if today_blocked == 0:
                 today_blocked = db.query(func.sum(IPViolationStats.violation_count)).filter(
-                    func.date(IPViolationStats.created_at) == today
+                    IPViolationStats.date_hour >= today_start
                 ).scalar() or 0
 
             # 违规请求数 - 优先从 RequestStats 获取
-            violation_requests = db.query(func.sum(RequestStats.blocked_requests)).scalar() or 0
+            violation_requests = blocked_requests_total
             if violation_requests == 0:
-                violation_requests = db.query(func.sum(IPViolationStats.violation_count)).scalar() or 0
+                violation_requests = totals["violation_count"]
 
             # 活跃IP数量
-            active_ips = db.query(func.sum(RequestStats.active_ips_count)).filter(
-                RequestStats.date_hour >= today_start
-            ).scalar() or 0
+            active_ips = today_row[2] or 0
 
             db.close()
 
@@ -452,10 +735,17 @@ class StatsService:
                     hours = (uptime_minutes % 1440) // 60
                     uptime = f"{days}天{hours}小时"
 
-                # 获取系统资源使用情况（非阻塞）
-                memory_usage = round(psutil.virtual_memory().percent, 1)
-                # cpu_percent(interval=0) 不阻塞，返回上次调用以来的 CPU 使用率
-                cpu_usage = round(psutil.cpu_percent(interval=0), 1)
+                # 获取系统资源使用情况：优先使用后台采样的最新结果
+                # （cpu_percent(interval=0) 的基准是全局的，在这里调用会打乱采样器的 CPU 使用率）
+                from src.services.metrics_sampler import get_metrics_sampler
+                sample = get_metrics_sampler().latest()
+                if sample:
+                    memory_usage = round(sample["memory"]["usage_percent"], 1)
+                    cpu_usage = round(sample["cpu"]["usage_percent"], 1)
+                else:
+                    memory_usage = round(psutil.virtual_memory().percent, 1)
+                    # cpu_percent(interval=0) 不阻塞，返回上次调用以来的 CPU 使用率
+                    cpu_usage = round(psutil.cpu_percent(interval=0), 1)
             except ImportError:
                 pass
 
@@ -513,7 +803,7 @@ class StatsService:
     async def _get_real_time_worker_stats(self) -> Dict[str, Any]:
         """从Worker实时获取统计数据"""
         try:
-            import httpx
+            from src.services.http_client import worker_client
             from src.services.web_config_service import WebConfigService
 
             # 从数据库获取Worker配置
@@ -534,7 +824,7 @@ class StatsService:
             # 获取API密钥
             api_key = system_settings.worker_api_key
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with worker_client() as client:
                 for endpoint in endpoints:
                     try:
                         # 构建统计API URL
@@ -544,7 +834,7 @@ class StatsService:
                         if api_key:
                             headers['X-API-Key'] = api_key.strip()
 
-                        response = await client.get(stats_url, headers=headers)
+                        response = await client.get(stats_url, headers=headers, timeout=10.0)
 
                         if response.status_code == 200:
                             stats = response.json()
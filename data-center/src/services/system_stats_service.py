@@ -1,11 +1,18 @@
 """
 系统统计服务 - 获取数据中心的真实系统指标
 """
-import psutil
+import asyncio
 import logging
+import time
 from datetime import datetime
 from typing import Dict, Any
-from src.database import get_db_sync
+from sqlalchemy import text
+from src.config import settings
+from src.database import get_db_sync, run_db, engine, db_executor
+from src.services.db_telemetry import get_db_telemetry
+from src.services.metrics_sampler import get_metrics_sampler
+from src.services.password_hasher import get_password_hasher
+from src.utils.logger_setup import get_logging_stats
 
 logger = logging.getLogger(__name__)
 
@@ -15,89 +22,48 @@ class SystemStatsService:
     def __init__(self):
         self.start_time = datetime.now()
     
-    async def get_system_stats(self) -> Dict[str, Any]:
-        """获取系统统计数据"""
-        try:
-            # CPU统计
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
-            cpu_freq = psutil.cpu_freq()
-
-            # 内存统计
-            memory = psutil.virtual_memory()
-            swap = psutil.swap_memory()
-
-            # 磁盘统计
-            disk = psutil.disk_usage('/')
+    async def get_system_stats(self, history: int = 0) -> Dict[str, Any]:
+        """
+        获取系统统计数据（CPU/内存/磁盘/网络/进程指标取自后台采样的最新结果，不阻塞）
 
-            # 网络统计
-            network = psutil.net_io_counters()
-
-            # 进程统计
-            process = psutil.Process()
-            process_memory = process.memory_info()
-            process_cpu = process.cpu_percent()
-
-            # 安全获取网络连接数
-            try:
-                connections_count = len(process.net_connections())
-            except (psutil.AccessDenied, AttributeError):
-                # 在某些环境下可能没有权限或方法不可用
-                connections_count = 0
+        Args:
+            history: 同时返回最近多少次采样的精简序列（用于趋势图），0 表示不返回
+        """
+        try:
+            sampler = get_metrics_sampler()
+            sample = sampler.latest()
+            if sample is None:
+                # 采样任务还没有产生结果（如刚启动），立即采样一次
+                sample = await asyncio.to_thread(sampler.sample)
 
             # 数据库统计
             db_stats = await self._get_database_stats()
 
-            return {
+            stats = {
                 "timestamp": datetime.now().isoformat(),
+                "sampled_at": sample["timestamp"],
+                "sample_interval_seconds": sampler.interval,
                 "uptime_seconds": (datetime.now() - self.start_time).total_seconds(),
 
-                # CPU信息
-                "cpu": {
-                    "usage_percent": cpu_percent,
-                    "core_count": cpu_count,
-                    "frequency_mhz": cpu_freq.current if cpu_freq else 0
-                },
-
-                # 内存信息
-                "memory": {
-                    "total_mb": round(memory.total / 1024 / 1024),
-                    "used_mb": round(memory.used / 1024 / 1024),
-                    "available_mb": round(memory.available / 1024 / 1024),
-                    "usage_percent": memory.percent,
-                    "swap_total_mb": round(swap.total / 1024 / 1024),
-                    "swap_used_mb": round(swap.used / 1024 / 1024),
-                    "swap_percent": swap.percent
-                },
-
-                # 磁盘信息
-                "disk": {
-                    "total_gb": round(disk.total / 1024 / 1024 / 1024, 2),
-                    "used_gb": round(disk.used / 1024 / 1024 / 1024, 2),
-                    "free_gb": round(disk.free / 1024 / 1024 / 1024, 2),
-                    "usage_percent": round((disk.used / disk.total) * 100, 2)
-                },
+                # CPU、内存、磁盘、网络、进程信息
+                "cpu": sample["cpu"],
+                "memory": sample["memory"],
+                "disk": sample["disk"],
+                "network": sample["network"],
+                "process": sample["process"],
 
-                # 网络信息
-                "network": {
-                    "bytes_sent": network.bytes_sent,
-                    "bytes_recv": network.bytes_recv,
-                    "packets_sent": network.packets_sent,
-                    "packets_recv": network.packets_recv
-                },
+                # 数据库统计
+                "database": db_stats,
 
-                # 进程信息
-                "process": {
-                    "cpu_percent": process_cpu,
-                    "memory_mb": round(process_memory.rss / 1024 / 1024),
-                    "memory_percent": process.memory_percent(),
-                    "threads": process.num_threads(),
-                    "connections": connections_count
-                },
+                # 日志队列
+                "logging": get_logging_stats(),
 
-                # 数据库统计
-                "database": db_stats
+                # 密码哈希线程池
+                "password_hasher": get_password_hasher().get_metrics()
             }
+            if history > 0:
+                stats["history"] = sampler.history(history)
+            return stats
             
         except Exception as e:
             logger.error(f"获取系统统计失败: {e}")
@@ -108,21 +74,26 @@ class SystemStatsService:
             }
     
     async def _get_database_stats(self) -> Dict[str, Any]:
-        """获取数据库统计"""
+        """
+        获取数据库统计：连接测试、连接池实时状态（已借出/空闲/溢出/等待中的线程、取连接等待时间）、
+        数据库线程池积压，以及按语句类型的查询耗时直方图和总耗时最高的语句
+        """
         try:
-            # 使用同步数据库会话进行简单的连接测试
-            from sqlalchemy import text
-            db = get_db_sync()
-            try:
-                # 简单的连接测试 - 使用text()包装原始SQL
-                db.execute(text("SELECT 1"))
-                return {
-                    "status": "connected",
-                    "connection_pool_size": 10,  # 根据实际配置
-                    "active_connections": 1
-                }
-            finally:
-                db.close()
+            started = time.perf_counter()
+            await run_db(self._ping_database)
+            ping_ms = round((time.perf_counter() - started) * 1000, 3)
+
+            telemetry = get_db_telemetry().get_stats(engine.pool)
+            return {
+                "status": "connected",
+                "ping_ms": ping_ms,
+                "pool": telemetry["pool"],
+                "executor": {
+                    "workers": settings.DB_EXECUTOR_WORKERS,
+                    "queued": db_executor._work_queue.qsize()
+                },
+                "queries": telemetry["queries"]
+            }
         except Exception as e:
             logger.error(f"获取数据库统计失败: {e}")
             return {
@@ -130,6 +101,15 @@ class SystemStatsService:
                 "error": str(e)
             }
 
+    @staticmethod
+    def _ping_database():
+        """简单的连接测试（在数据库线程池中执行）"""
+        db = get_db_sync()
+        try:
+            db.execute(text("SELECT 1"))
+        finally:
+            db.close()
+
 # 全局实例
 _system_stats_service = None
 
@@ -11,7 +11,7 @@ import logging
 import threading
 from typing import Dict, Any, Optional, List
 from sqlalchemy.orm import Session
-from src.database import get_db_sync
+from src.database import get_db_sync, offload_db, run_db
 from src.models.web_config import WebConfig, SystemSettings
 
 logger = logging.getLogger(__name__)
@@ -43,13 +43,17 @@ class WebConfigService:
         2. 缓存未命中时加锁从数据库读取
         3. 双重检查防止并发重复加载
         """
-        global _system_settings_cache
-
         # 第一次检查：缓存命中直接返回（无锁，高性能）
         if _system_settings_cache is not None:
             return _system_settings_cache
 
-        # 缓存未命中，加锁从数据库读取
+        # 缓存未命中，在数据库线程池中加载
+        return await run_db(self._load_system_settings)
+
+    def _load_system_settings(self) -> Optional[SystemSettings]:
+        """加锁从数据库读取系统设置并写入缓存"""
+        global _system_settings_cache
+
         with _system_settings_lock:
             # 第二次检查：防止在等待锁的过程中其他线程已经加载了设置
             if _system_settings_cache is not None:
@@ -69,7 +73,8 @@ class WebConfigService:
                 logger.error(f"获取系统设置失败: {e}")
                 return None
     
-    async def create_default_system_settings(self) -> SystemSettings:
+    @offload_db
+    def create_default_system_settings(self) -> SystemSettings:
         """创建默认系统设置"""
         try:
             db = self.db()
@@ -94,7 +99,8 @@ class WebConfigService:
             logger.error(f"创建默认系统设置失败: {e}")
             raise
     
-    async def update_system_settings(self, settings_data: Dict[str, Any]) -> bool:
+    @offload_db
+    def update_system_settings(self, settings_data: Dict[str, Any]) -> bool:
         """更新系统设置"""
         try:
             db = self.db()
@@ -144,7 +150,8 @@ class WebConfigService:
         self.invalidate_system_settings()
         logger.info("🗑️ Web配置服务所有缓存已清空")
     
-    async def get_config_by_category(self, category: str) -> List[WebConfig]:
+    @offload_db
+    def get_config_by_category(self, category: str) -> List[WebConfig]:
         """根据分类获取配置"""
         try:
             db = self.db()
@@ -155,7 +162,8 @@ class WebConfigService:
             logger.error(f"获取配置失败: {e}")
             return []
     
-    async def get_config_value(self, category: str, key: str) -> Optional[Any]:
+    @offload_db
+    def get_config_value(self, category: str, key: str) -> Optional[Any]:
         """获取配置值"""
         try:
             db = self.db()
@@ -186,7 +194,8 @@ class WebConfigService:
             logger.error(f"获取配置值失败: {e}")
             return None
     
-    async def set_config_value(self, category: str, key: str, value: Any, 
+    @offload_db
+    def set_config_value(self, category: str, key: str, value: Any, 
                               value_type: str = "string", description: str = None,
                               is_sensitive: bool = False) -> bool:
         """设置配置值"""
@@ -235,7 +244,8 @@ class WebConfigService:
             logger.error(f"设置配置值失败: {e}")
             return False
     
-    async def delete_config(self, category: str, key: str) -> bool:
+    @offload_db
+    def delete_config(self, category: str, key: str) -> bool:
         """删除配置"""
         try:
             db = self.db()
@@ -261,7 +271,8 @@ class WebConfigService:
             logger.error(f"删除配置失败: {e}")
             return False
     
-    async def get_all_configs(self) -> Dict[str, List[Dict]]:
+    @offload_db
+    def get_all_configs(self) -> Dict[str, List[Dict]]:
         """获取所有配置（按分类分组）"""
         try:
             db = self.db()
@@ -2,102 +2,136 @@
 Worker同步服务
 """
 import asyncio
+import json
 import logging
+import random
+import time
 from typing import Dict, Any, List, Optional
 import httpx
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 from src.config import settings
-from src.services.stats_service import StatsService
+from src.services.stats_service import StatsService, hour_bucket
+from src.services.config_service import ConfigService
+from src.services.http_client import worker_client
+from src.utils.compression import compress, negotiate_encoding
 from src.models.logs import SyncLog
-from src.database import get_db_sync
+from src.database import get_db_sync, insert_ignore, bulk_upsert, offload_db, run_db
 
 logger = logging.getLogger(__name__)
 
+# 批量日志去重时单次 IN 查询的最大键数量（SQLite 旧版本参数上限为 999）
+LOG_LOOKUP_CHUNK_SIZE = 500
+
+
+class WorkerCircuitBreaker:
+    """
+    单个Worker的熔断器
+
+    连续失败达到阈值后进入熔断（open），冷却期内跳过该Worker；
+    冷却期结束后放行一次尝试（half_open），成功则恢复，失败则重新熔断
+    """
+
+    def __init__(self, failure_threshold: int = None, cooldown_seconds: float = None):
+        self.failure_threshold = failure_threshold or settings.SYNC_BREAKER_FAILURE_THRESHOLD
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else settings.SYNC_BREAKER_COOLDOWN_SECONDS
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """是否允许向该Worker发起请求"""
+        return self.state != "open"
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures
+        }
+
+
+# Worker端点 -> 熔断器（进程内共享）
+_worker_breakers: Dict[str, WorkerCircuitBreaker] = {}
+
+# Worker端点 -> Worker已确认的配置版本（只记录支持版本协议的Worker）
+_worker_config_acks: Dict[str, int] = {}
+
+# Worker端点 -> Worker可接受的请求体压缩编码（来自Worker响应的 Accept-Encoding 头）
+_worker_content_encodings: Dict[str, str] = {}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回需要等待的秒数，无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now().astimezone()).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def get_worker_breaker(endpoint: str) -> WorkerCircuitBreaker:
+    """获取Worker端点的熔断器"""
+    breaker = _worker_breakers.get(endpoint)
+    if breaker is None:
+        breaker = _worker_breakers[endpoint] = WorkerCircuitBreaker()
+    return breaker
+
 class WorkerSyncService:
     """Worker同步服务类"""
     
     def __init__(self):
         self.stats_service = StatsService()
+        self.config_service = ConfigService()
         self.db = get_db_sync
-        
-        # HTTP客户端配置
-        self.client_config = {
-            "timeout": httpx.Timeout(settings.SYNC_TIMEOUT_SECONDS),
-            "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5)
-        }
     
     async def push_config_to_worker(self, worker_endpoint: str, config_data: Dict[str, Any]) -> bool:
         """推送配置到Worker"""
         sync_log = None
         
         try:
+            payload = self._build_config_payload(config_data)
+            bodies = {id(payload): self._encode_payload(payload)}
+
             # 创建同步日志
             sync_log = await self._create_sync_log(
-                worker_endpoint, "config", "push", len(str(config_data))
+                worker_endpoint, "config", "push", len(bodies[id(payload)])
             )
             
             logger.info(f"🔄 开始推送配置到Worker: {worker_endpoint}")
-            
-            async with httpx.AsyncClient(**self.client_config) as client:
-                # 构建推送URL
-                push_url = f"{worker_endpoint.rstrip('/')}/worker-api/config/update"
-                
-                # 获取API密钥
-                from src.services.config_manager import config_manager
-                api_key = config_manager.get_data_center_api_key()
 
-                logger.info(f"🔑 数据中心向Worker推送配置:")
-                logger.info(f"   - Worker端点: {worker_endpoint}")
-                logger.info(f"   - API Key: {api_key[:8] + '...' if api_key else '未配置'}")
-                logger.info(f"   - API Key长度: {len(api_key) if api_key else 0}")
+            headers = self._build_push_headers()
+            logger.info(f"🔑 数据中心向Worker推送配置: {worker_endpoint} (API Key: {'已配置' if 'X-API-Key' in headers else '未配置'})")
 
-                # 构建请求头
-                headers = {
-                    "Content-Type": "application/json",
-                    "User-Agent": "DataCenter-Sync/1.0"
-                }
+            body, encoding = self._prepare_push_body(worker_endpoint, payload, bodies)
+            status, error_msg, _, result = await self._send_config(worker_endpoint, body, headers, encoding)
 
-                if api_key:
-                    headers["X-API-Key"] = api_key
-                    logger.info(f"✅ 已添加X-API-Key头部")
-                else:
-                    logger.warning(f"⚠️ 未配置API Key，请求将不包含X-API-Key头部")
-
-                # 发送配置数据
-                response = await client.post(
-                    push_url,
-                    json={
-                        "ua_configs": config_data.get("ua_configs", {}),
-                        "ip_blacklist": config_data.get("ip_blacklist", {}),
-                        "timestamp": datetime.now().isoformat()
-                    },
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get("success"):
-                        logger.info(f"✅ 配置推送成功: {worker_endpoint}")
-                        await self._complete_sync_log(sync_log, "success")
-                        return True
-                    else:
-                        error_msg = result.get("error", "Unknown error")
-                        logger.error(f"❌ Worker返回错误: {error_msg}")
-                        await self._complete_sync_log(sync_log, "failed", error_msg)
-                        return False
-                else:
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-                    logger.error(f"❌ 配置推送失败: {error_msg}")
-                    await self._complete_sync_log(sync_log, "failed", error_msg)
-                    return False
-                    
-        except httpx.TimeoutException:
-            error_msg = f"推送配置超时: {worker_endpoint}"
-            logger.error(f"❌ {error_msg}")
-            if sync_log:
-                await self._complete_sync_log(sync_log, "timeout", error_msg)
-            return False
+            if status == "success":
+                self._record_config_ack(worker_endpoint, result)
+                logger.info(f"✅ 配置推送成功: {worker_endpoint} ({encoding}, {len(body)}/{len(bodies[id(payload)])} 字节)")
+            else:
+                logger.error(f"❌ 配置推送失败: {error_msg}")
+            await self._complete_sync_log(sync_log, status, error_msg, compressed_size=len(body), content_encoding=encoding)
+            return status == "success"
             
         except Exception as e:
             error_msg = f"推送配置异常: {str(e)}"
@@ -105,6 +139,309 @@ class WorkerSyncService:
             if sync_log:
                 await self._complete_sync_log(sync_log, "error", error_msg)
             return False
+
+    async def push_config_to_workers(self, worker_endpoints: List[str], config_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        并发推送配置到多个Worker
+
+        - 同时推送的Worker数量受 SYNC_CONCURRENCY 限制
+        - 每个Worker有独立的截止时间（包含所有重试），慢Worker不会拖慢其他Worker
+        - 超时、连接失败、5xx/429 按指数退避 + 随机抖动重试，429 至少等待 Retry-After 指定的时间
+        - 熔断中的Worker直接跳过
+        - 已确认过配置版本的Worker只推送增量，版本不匹配时自动改为完整快照
+        - Worker声明支持压缩后，请求体按协商的编码压缩（同一负载每种编码只压缩一次）
+        - 所有结果汇总后一次性批量写入同步日志
+        """
+        results = {
+            "total_workers": len(worker_endpoints),
+            "success_count": 0,
+            "failed_count": 0,
+            "skipped_count": 0,
+            "duration_ms": 0,
+            "results": []
+        }
+        if not worker_endpoints:
+            return results
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(settings.SYNC_CONCURRENCY)
+
+        # 负载和请求头只构建一次；增量按Worker已确认的版本分组构建
+        full_payload = self._build_config_payload(config_data)
+        headers = self._build_push_headers()
+        payloads = await self._build_delta_payloads(worker_endpoints, config_data, full_payload)
+
+        # 每个不同的负载只序列化一次，所有Worker共用同一份请求体
+        bodies = {id(payload): self._encode_payload(payload) for payload in [full_payload, *payloads.values()]}
+
+        async def push_one(endpoint: str) -> Dict[str, Any]:
+            breaker = get_worker_breaker(endpoint)
+            if not breaker.allow():
+                now = datetime.now()
+                return {
+                    "endpoint": endpoint, "status": "skipped", "attempts": 0, "mode": None, "bytes": 0,
+                    "wire_bytes": 0, "encoding": None,
+                    "error": f"熔断中（连续失败 {breaker.consecutive_failures} 次）",
+                    "started_at": now, "completed_at": now
+                }
+
+            async with semaphore:
+                state = {"attempts": 0, "reachable": True, "result": None, "payload_bytes": 0,
+                         "wire_bytes": 0, "encoding": None, "payload": payloads.get(endpoint, full_payload),
+                         "deadline": time.monotonic() + settings.SYNC_WORKER_DEADLINE_SECONDS}
+                started_at = datetime.now()
+                try:
+                    status, error_msg = await asyncio.wait_for(
+                        self._push_with_retry(endpoint, full_payload, bodies, headers, state),
+                        timeout=settings.SYNC_WORKER_DEADLINE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    status = "timeout"
+                    error_msg = f"推送配置超过截止时间 {settings.SYNC_WORKER_DEADLINE_SECONDS} 秒: {endpoint}"
+                    state["reachable"] = False
+                except Exception as e:
+                    status = "error"
+                    error_msg = f"推送配置异常: {str(e)}"
+
+                # 熔断器只统计不可达类失败（超时、连接失败、5xx），限流（429）的Worker是可达的
+                if state["reachable"]:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+
+                if status == "success":
+                    self._record_config_ack(endpoint, state["result"])
+
+                return {
+                    "endpoint": endpoint, "status": status, "attempts": state["attempts"],
+                    "mode": state["payload"].get("mode", "full"), "bytes": state["payload_bytes"],
+                    "wire_bytes": state["wire_bytes"], "encoding": state["encoding"], "error": error_msg, "started_at": started_at, "completed_at": datetime.now()
+                }
+
+        outcomes = await asyncio.gather(*[push_one(endpoint) for endpoint in worker_endpoints])
+
+        sync_logs = []
+        for outcome in outcomes:
+            if outcome["status"] == "success":
+                results["success_count"] += 1
+            elif outcome["status"] == "skipped":
+                results["skipped_count"] += 1
+            else:
+                results["failed_count"] += 1
+                logger.error(f"❌ 配置同步到 {outcome['endpoint']} 失败: {outcome['error']}")
+
+            duration = int((outcome["completed_at"] - outcome["started_at"]).total_seconds() * 1000)
+            sync_logs.append({
+                "worker_id": outcome["endpoint"].split("//")[-1].split("/")[0],
+                "sync_type": "config",
+                "direction": "push",
+                "status": outcome["status"],
+                "error_message": outcome["error"],
+                "data_size": outcome["bytes"],
+                "compressed_size": outcome["wire_bytes"],
+                "content_encoding": outcome["encoding"],
+                "started_at": outcome["started_at"],
+                "completed_at": outcome["completed_at"],
+                "duration": duration
+            })
+            results["results"].append({
+                "endpoint": outcome["endpoint"],
+                "success": outcome["status"] == "success",
+                "status": outcome["status"],
+                "attempts": outcome["attempts"],
+                "mode": outcome["mode"],
+                "bytes": outcome["bytes"],
+                "wire_bytes": outcome["wire_bytes"],
+                "encoding": outcome["encoding"],
+                "duration_ms": duration,
+                "error": outcome["error"],
+                "circuit": get_worker_breaker(outcome["endpoint"]).state
+            })
+
+        await run_db(self._save_sync_logs, sync_logs)
+
+        results["duration_ms"] = int((time.perf_counter() - started) * 1000)
+        logger.info(
+            f"📊 配置并发同步完成: {results['success_count']}/{results['total_workers']} 成功, "
+            f"{results['skipped_count']} 跳过, 耗时 {results['duration_ms']}ms"
+        )
+        return results
+
+    async def _push_with_retry(self, endpoint: str, full_payload: Dict[str, Any], bodies: Dict[int, bytes],
+                               headers: Dict[str, str], state: Dict[str, Any]) -> tuple:
+        """
+        推送配置，可重试的失败按指数退避 + 随机抖动（full jitter）重试
+
+        state["payload"] 为首次发送的负载（完整快照或增量）；Worker返回版本不匹配时
+        立即改为发送完整快照。Worker限流（429）时按 Retry-After 等待，
+        等待时间超过截止时间则直接放弃（不计为熔断失败）
+        """
+        max_attempts = max(1, settings.SYNC_RETRY_ATTEMPTS)
+        attempt = 1
+        while True:
+            state["attempts"] = attempt
+            payload = state["payload"]
+            body, encoding = self._prepare_push_body(endpoint, payload, bodies)
+            state["payload_bytes"] = len(bodies[id(payload)])
+            state["wire_bytes"] = len(body)
+            state["encoding"] = encoding
+            status, error_msg, retryable, result = await self._send_config(endpoint, body, headers, encoding)
+            state["reachable"] = status in ("success", "throttled") or not retryable
+            state["result"] = result
+
+            # 增量被拒绝时立即改发完整快照，不占用重试次数（之后发送的都是完整快照，只会发生一次）
+            if status == "conflict" and payload is not full_payload:
+                logger.info(f"🔁 Worker {endpoint} 配置版本不匹配，改为推送完整快照")
+                state["payload"] = full_payload
+                continue
+
+            if status == "success" or not retryable or attempt >= max_attempts:
+                return status, error_msg
+
+            backoff = min(settings.SYNC_RETRY_BACKOFF_MAX_SECONDS, settings.SYNC_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+            delay = random.uniform(0, backoff)
+            if status == "throttled":
+                retry_after = result.get("retry_after") if result else None
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if time.monotonic() + delay >= state["deadline"]:
+                    return status, f"{error_msg}（Retry-After 超过截止时间，不再重试）"
+            logger.warning(f"⚠️ 推送配置到 {endpoint} 失败（第 {attempt} 次），{delay:.1f}s 后重试: {error_msg}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _build_delta_payloads(self, worker_endpoints: List[str], config_data: Dict[str, Any],
+                                    full_payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """为已确认过配置版本的Worker构建增量负载（相同基础版本只计算一次）"""
+        version = config_data.get("version")
+        if version is None:
+            return {}
+
+        by_base: Dict[int, Dict[str, Any]] = {}
+        payloads = {}
+        for endpoint in worker_endpoints:
+            base_version = _worker_config_acks.get(endpoint)
+            if base_version is None:
+                continue
+            if base_version not in by_base:
+                delta = await self.config_service.get_worker_config(since_version=base_version)
+                # 增量基于的最新版本必须与本次完整快照一致，否则退回完整快照
+                if delta.get("mode") == "delta" and delta.get("version") == version:
+                    by_base[base_version] = self._build_config_payload(delta)
+                else:
+                    by_base[base_version] = full_payload
+            payloads[endpoint] = by_base[base_version]
+        return payloads
+
+    def _record_config_ack(self, endpoint: str, result: Optional[Dict[str, Any]]):
+        """记录Worker确认的配置版本；未返回版本号的旧版Worker始终推送完整快照"""
+        config_version = result.get("config_version") if isinstance(result, dict) else None
+        if isinstance(config_version, int):
+            _worker_config_acks[endpoint] = config_version
+        else:
+            _worker_config_acks.pop(endpoint, None)
+
+    def _build_config_payload(self, config_data: Dict[str, Any]) -> Dict[str, Any]:
+        """构建推送给Worker的配置数据（完整快照或增量）"""
+        payload = {
+            "ua_configs": config_data.get("ua_configs", {}),
+            "ip_blacklist": config_data.get("ip_blacklist", {}),
+            "timestamp": datetime.now().isoformat()
+        }
+        if config_data.get("version") is not None:
+            payload["mode"] = config_data.get("mode", "full")
+            payload["version"] = config_data["version"]
+            if payload["mode"] == "delta":
+                payload["base_version"] = config_data["base_version"]
+        return payload
+
+    def _encode_payload(self, payload: Dict[str, Any]) -> bytes:
+        """序列化推送负载"""
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def _prepare_push_body(self, endpoint: str, payload: Dict[str, Any], bodies: Dict[Any, bytes]) -> tuple:
+        """
+        获取发送给指定Worker的请求体
+
+        bodies 以 id(payload) 保存未压缩的请求体，压缩结果以 (id(payload), 编码) 缓存在同一个字典中。
+        Returns:
+            (请求体, 编码)；Worker未声明支持压缩或负载太小时编码为 identity
+        """
+        raw = bodies[id(payload)]
+        encoding = _worker_content_encodings.get(endpoint)
+        if not settings.SYNC_COMPRESSION_ENABLED or not encoding or len(raw) < settings.SYNC_COMPRESSION_MIN_BYTES:
+            return raw, "identity"
+
+        key = (id(payload), encoding)
+        if key not in bodies:
+            bodies[key] = compress(raw, encoding, settings.SYNC_COMPRESSION_LEVEL)
+        return bodies[key], encoding
+
+    def _record_content_encoding(self, endpoint: str, response: httpx.Response):
+        """根据Worker响应的 Accept-Encoding 头记录后续推送可使用的压缩编码"""
+        encoding = negotiate_encoding(response.headers.get("accept-encoding"))
+        if encoding:
+            _worker_content_encodings[endpoint] = encoding
+        else:
+            _worker_content_encodings.pop(endpoint, None)
+
+    def _build_push_headers(self) -> Dict[str, str]:
+        """构建推送请求头"""
+        from src.services.config_manager import config_manager
+        api_key = config_manager.get_data_center_api_key()
+
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "DataCenter-Sync/1.0"
+        }
+        if api_key:
+            headers["X-API-Key"] = api_key
+        else:
+            logger.warning(f"⚠️ 未配置API Key，请求将不包含X-API-Key头部")
+        return headers
+
+    async def _send_config(self, worker_endpoint: str, body: bytes, headers: Dict[str, str],
+                           encoding: str = "identity") -> tuple:
+        """
+        发送一次配置推送请求
+
+        Returns:
+            (状态, 错误信息, 是否可重试, Worker响应)；超时、连接失败、5xx、429 视为可重试，
+            429 的状态为 throttled，Worker响应为 {"retry_after": Retry-After 秒数或None}，
+            409 表示Worker的配置版本与增量的基础版本不一致（状态为 conflict），
+            415 表示Worker不支持该压缩编码（之后改为发送未压缩的请求体并重试）
+        """
+        push_url = f"{worker_endpoint.rstrip('/')}/worker-api/config/update"
+        if encoding != "identity":
+            headers = {**headers, "Content-Encoding": encoding}
+        try:
+            async with worker_client() as client:
+                response = await client.post(push_url, content=body, headers=headers)
+
+            if response.status_code == 415 and encoding != "identity":
+                _worker_content_encodings.pop(worker_endpoint, None)
+                return "failed", f"Worker不支持 {encoding} 压缩: {response.text}", True, None
+
+            self._record_content_encoding(worker_endpoint, response)
+
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("success"):
+                    return "success", None, False, result
+                return "failed", f"Worker返回错误: {result.get('error', 'Unknown error')}", False, result
+
+            if response.status_code == 409:
+                return "conflict", f"Worker配置版本不匹配: {response.text}", False, None
+
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+            if response.status_code == 429:
+                return "throttled", error_msg, True, {"retry_after": parse_retry_after(response.headers.get("retry-after"))}
+            return "failed", error_msg, response.status_code >= 500, None
+
+        except httpx.TimeoutException:
+            return "timeout", f"推送配置超时: {worker_endpoint}", True, None
+        except httpx.TransportError as e:
+            return "error", f"连接Worker失败: {str(e)}", True, None
     
     async def pull_stats_from_worker(self, worker_endpoint: str) -> Optional[Dict[str, Any]]:
         """从Worker拉取统计数据"""
@@ -118,7 +455,7 @@ class WorkerSyncService:
             
             logger.info(f"📊 开始从Worker拉取统计: {worker_endpoint}")
             
-            async with httpx.AsyncClient(**self.client_config) as client:
+            async with worker_client() as client:
                 # 构建拉取URL
                 stats_url = f"{worker_endpoint.rstrip('/')}/worker-api/stats"
 
@@ -148,7 +485,11 @@ class WorkerSyncService:
                     # 更新同步日志
                     data_size = len(response.content)
                     records_count = len(stats_data.get("request_stats", []))
-                    await self._complete_sync_log(sync_log, "success", data_size=data_size, records_count=records_count)
+                    await self._complete_sync_log(
+                        sync_log, "success", data_size=data_size, records_count=records_count,
+                        compressed_size=response.num_bytes_downloaded,
+                        content_encoding=response.headers.get("content-encoding", "identity")
+                    )
                     
                     return stats_data
                 else:
@@ -264,7 +605,8 @@ class WorkerSyncService:
             logger.error(f"❌ 保存Worker统计数据失败: {e}")
             return False
     
-    async def _create_sync_log(self, worker_endpoint: str, sync_type: str, direction: str, data_size: int = 0) -> Optional[SyncLog]:
+    @offload_db
+    def _create_sync_log(self, worker_endpoint: str, sync_type: str, direction: str, data_size: int = 0) -> Optional[SyncLog]:
         """创建同步日志"""
         try:
             db = self.db()
@@ -292,8 +634,10 @@ class WorkerSyncService:
             logger.error(f"创建同步日志失败: {e}")
             return None
     
-    async def _complete_sync_log(self, sync_log: SyncLog, status: str, error_message: str = None, 
-                                data_size: int = None, records_count: int = None):
+    @offload_db
+    def _complete_sync_log(self, sync_log: SyncLog, status: str, error_message: str = None, 
+                                data_size: int = None, records_count: int = None,
+                                compressed_size: int = None, content_encoding: str = None):
         """完成同步日志"""
         try:
             if not sync_log:
@@ -320,6 +664,12 @@ class WorkerSyncService:
             
             if records_count is not None:
                 log.records_count = records_count
+
+            if compressed_size is not None:
+                log.compressed_size = compressed_size
+
+            if content_encoding is not None:
+                log.content_encoding = content_encoding
             
             db.commit()
             db.close()
@@ -327,85 +677,75 @@ class WorkerSyncService:
         except Exception as e:
             logger.error(f"完成同步日志失败: {e}")
 
+    def _build_receive_sync_log(self, worker_id: str, sync_type: str, transfer: Dict[str, Any],
+                                status: str, error_message: str = None) -> Dict[str, Any]:
+        """构建Worker推送数据的同步日志行（transfer 为 SyncTransfer.to_dict()）"""
+        completed_at = datetime.now()
+        started_at = datetime.fromtimestamp(transfer["received_at"])
+        return {
+            "worker_id": worker_id,
+            "sync_type": sync_type,
+            "direction": "receive",
+            "status": status,
+            "error_message": error_message,
+            "data_size": transfer["uncompressed_bytes"],
+            "compressed_size": transfer["compressed_bytes"],
+            "content_encoding": transfer["encoding"],
+            "records_count": transfer.get("records"),
+            "started_at": started_at,
+            "completed_at": completed_at,
+            "duration": int((completed_at - started_at).total_seconds() * 1000)
+        }
+
+    def _save_sync_logs(self, rows: List[Dict[str, Any]]) -> bool:
+        """批量写入同步日志（一次事务）"""
+        if not rows:
+            return True
+
+        try:
+            db = self.db()
+            db.execute(SyncLog.__table__.insert(), rows)
+            db.commit()
+            db.close()
+            return True
+
+        except Exception as e:
+            logger.error(f"批量写入同步日志失败: {e}")
+            return False
+
+    async def record_stream_ingest(self, worker_id: str, saved: int, transfer: Optional[Dict[str, Any]],
+                                   error_message: str = None) -> None:
+        """
+        记录一次日志流接收的结果
+
+        有新增日志时更新 Worker 最后同步时间；transfer（SyncTransfer.to_dict()）不为空时
+        写入一条接收方向的同步日志，error_message 不为空即记为失败。
+        """
+        if saved > 0:
+            await self._update_worker_sync_time(worker_id)
+
+        if transfer is not None:
+            sync_log = self._build_receive_sync_log(
+                worker_id, "logs", transfer, "success" if error_message is None else "failed", error_message
+            )
+            await run_db(self._save_sync_logs, [sync_log])
+
     async def process_worker_logs(self, worker_id: str, logs_data: List[Dict[str, Any]]) -> bool:
-        """处理Worker推送的日志数据"""
+        """
+        处理Worker推送的日志数据（批量去重写入）
+
+        整批日志只做一次按 (worker_id, request_id) 的键查询来剔除已存在的记录，
+        再以 executemany 方式一次性写入；唯一索引兜底并发重复推送。
+        """
         try:
             if not logs_data:
                 logger.info(f"Worker {worker_id} 没有日志数据")
                 return True
 
             logger.info(f"开始处理Worker {worker_id} 的 {len(logs_data)} 条日志")
-            logger.debug(f"日志数据示例: {logs_data[:2] if len(logs_data) > 0 else '无'}")
+            logger.debug("日志数据示例: %s", logs_data[:2] if len(logs_data) > 0 else '无')
 
-            db = self.db()
-
-            # 导入SystemLog模型
-            from src.models.logs import SystemLog
-            from datetime import datetime
-
-            # 批量保存日志（增量保存，避免重复）
-            saved_count = 0
-            for log_entry in logs_data:
-                # 使用 id 或 timestamp 作为唯一标识符
-                log_id = log_entry.get('id')
-                log_timestamp = log_entry.get('timestamp')
-
-                # 如果没有 id，使用 timestamp 作为唯一标识符
-                if not log_id and log_timestamp:
-                    log_id = f"{worker_id}-{log_timestamp}"
-
-                if not log_id:
-                    logger.warning(f"日志缺少id和timestamp，跳过: {log_entry}")
-                    continue
-
-                # 检查是否已存在相同ID的日志（避免重复保存）
-                existing_log = db.query(SystemLog).filter(
-                    SystemLog.request_id == log_id,
-                    SystemLog.worker_id == worker_id
-                ).first()
-
-                if existing_log:
-                    continue  # 跳过已存在的日志
-
-                # 获取日志数据
-                log_data = log_entry.get('data', {})
-
-                # 处理IP地址字段（Worker可能使用ip或source_ip）
-                ip_address = log_data.get('ip') or log_data.get('source_ip')
-
-                # 处理User-Agent字段（Worker可能使用userAgent或user_agent）
-                user_agent = log_data.get('userAgent') or log_data.get('user_agent')
-
-                # 转换时间戳为 datetime（如果是毫秒时间戳）
-                created_at = None
-                if log_timestamp:
-                    try:
-                        # 假设时间戳是毫秒
-                        created_at = datetime.fromtimestamp(log_timestamp / 1000)
-                    except Exception as e:
-                        logger.warning(f"转换时间戳失败: {e}")
-
-                system_log = SystemLog(
-                    worker_id=worker_id,
-                    level=log_entry.get('level', 'INFO').upper(),
-                    message=log_entry.get('message', ''),
-                    details=log_data,
-                    category='worker_sync',
-                    source=f'worker-{worker_id}',
-                    request_id=log_id,
-                    ip_address=ip_address,
-                    user_agent=user_agent
-                )
-
-                # 如果有时间戳，设置创建时间
-                if created_at:
-                    system_log.created_at = created_at
-
-                db.add(system_log)
-                saved_count += 1
-
-            db.commit()
-            db.close()
+            saved_count = await self.write_log_chunk(worker_id, logs_data)
 
             logger.info(f"✅ 处理Worker日志成功: {worker_id}, 接收{len(logs_data)}条, 新增{saved_count}条")
 
@@ -418,11 +758,105 @@ class WorkerSyncService:
             logger.error(f"❌ 处理Worker日志失败: {e}")
             return False
 
-    async def process_worker_stats(self, worker_id: str, stats_data: Dict[str, Any]) -> bool:
-        """处理Worker推送的统计数据"""
+    async def write_log_chunk(self, worker_id: str, logs_data: List[Dict[str, Any]]) -> int:
+        """
+        去重写入一块日志（一次事务），返回新增条数；写入失败时抛出异常
+
+        不更新Worker同步时间，流式写入时由调用方在全部写完后更新一次
+        """
+        # 构建待写入行（批内按 request_id 去重，保留首条）
+        rows: Dict[str, Dict[str, Any]] = {}
+        for log_entry in logs_data:
+            row = self._build_log_row(worker_id, log_entry)
+            if row and row["request_id"] not in rows:
+                rows[row["request_id"]] = row
+
+        if not rows:
+            return 0
+        return await run_db(self._save_log_rows, worker_id, rows)
+
+    def _save_log_rows(self, worker_id: str, rows: Dict[str, Dict[str, Any]]) -> int:
+        """剔除已存在的日志并批量写入，返回新增条数（在数据库线程池中执行）"""
+        from src.models.logs import SystemLog
+
+        db = self.db()
+        try:
+            # 一次键查询找出已存在的日志（按块拆分 IN 列表，避免超出数据库参数上限）
+            request_ids = list(rows.keys())
+            existing_ids = set()
+            for i in range(0, len(request_ids), LOG_LOOKUP_CHUNK_SIZE):
+                chunk = request_ids[i:i + LOG_LOOKUP_CHUNK_SIZE]
+                existing_ids.update(
+                    request_id for (request_id,) in db.query(SystemLog.request_id).filter(
+                        SystemLog.worker_id == worker_id,
+                        SystemLog.request_id.in_(chunk)
+                    )
+                )
+
+            new_rows = [row for request_id, row in rows.items() if request_id not in existing_ids]
+
+            # executemany 要求每行的列一致：有时间戳的行和使用数据库默认时间的行分开写入
+            with_time = [row for row in new_rows if "created_at" in row]
+            without_time = [row for row in new_rows if "created_at" not in row]
+            stmt = insert_ignore(SystemLog.__table__)
+            for batch in (with_time, without_time):
+                if batch:
+                    db.execute(stmt, batch)
+
+            db.commit()
+        finally:
+            db.close()
+
+        return len(new_rows)
+
+    def _build_log_row(self, worker_id: str, log_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """将Worker日志条目转换为 system_logs 表的行数据，缺少唯一标识时返回None"""
+        # 使用 id 或 timestamp 作为唯一标识符
+        log_id = log_entry.get('id')
+        log_timestamp = log_entry.get('timestamp')
+
+        # 如果没有 id，使用 timestamp 作为唯一标识符
+        if not log_id and log_timestamp:
+            log_id = f"{worker_id}-{log_timestamp}"
+
+        if not log_id:
+            logger.warning(f"日志缺少id和timestamp，跳过: {log_entry}")
+            return None
+
+        # 获取日志数据（字段为 null 或类型不对时使用默认值，避免一条日志导致整块写入失败）
+        log_data = log_entry.get('data')
+        if not isinstance(log_data, dict):
+            log_data = {}
+        message = log_entry.get('message')
+
+        row = {
+            "worker_id": worker_id,
+            "level": str(log_entry.get('level') or 'INFO').upper(),
+            "message": '' if message is None else str(message),
+            "details": log_data,
+            "category": 'worker_sync',
+            "source": f'worker-{worker_id}',
+            "request_id": str(log_id),
+            # 处理IP地址字段（Worker可能使用ip或source_ip）
+            "ip_address": log_data.get('ip') or log_data.get('source_ip'),
+            # 处理User-Agent字段（Worker可能使用userAgent或user_agent）
+            "user_agent": log_data.get('userAgent') or log_data.get('user_agent'),
+        }
+
+        # 转换时间戳为 datetime（假设时间戳是毫秒）
+        if log_timestamp:
+            try:
+                row["created_at"] = datetime.fromtimestamp(log_timestamp / 1000)
+            except Exception as e:
+                logger.warning(f"转换时间戳失败: {e}")
+
+        return row
+
+    async def process_worker_stats(self, worker_id: str, stats_data: Dict[str, Any], received_at: float = None) -> bool:
+        """处理Worker推送的统计数据（received_at 为接收时间戳，决定数据所属的小时）"""
         try:
             # 使用统计服务记录数据
-            success = await self.stats_service.record_worker_stats(worker_id, stats_data)
+            success = await self.stats_service.record_worker_stats(worker_id, stats_data, received_at)
 
             if success:
                 logger.info(f"✅ 处理Worker统计数据成功: {worker_id}")
@@ -440,7 +874,7 @@ class WorkerSyncService:
         try:
             # 这里可以记录配置同步状态
             logger.info(f"✅ 收到Worker配置状态: {worker_id}")
-            logger.debug(f"配置状态详情: {config_status}")
+            logger.debug("配置状态详情: %s", config_status)
 
             # 可以在这里保存配置状态到数据库
             # 暂时只记录日志
@@ -450,7 +884,8 @@ class WorkerSyncService:
             logger.error(f"❌ 处理Worker配置状态失败: {e}")
             return False
 
-    async def process_worker_config(self, worker_id: str, config_data: Dict[str, Any]) -> bool:
+    @offload_db
+    def process_worker_config(self, worker_id: str, config_data: Dict[str, Any]) -> bool:
         """处理Worker推送的配置数据"""
         try:
             from src.models.config import WorkerConfig
@@ -486,16 +921,22 @@ class WorkerSyncService:
             logger.error(f"❌ 处理Worker配置数据失败: {e}")
             return False
 
-    async def process_worker_request_stats(self, worker_id: str, stats_data: Dict[str, Any]) -> bool:
-        """处理Worker推送的IP请求统计数据"""
+    async def process_worker_request_stats(self, worker_id: str, stats_data: Dict[str, Any],
+                                           received_at: float = None) -> Optional[Dict[str, Any]]:
+        """
+        处理Worker推送的IP请求统计数据
+
+        by_ip 中的全部IP以一条按方言生成的批量 upsert 写入（冲突键为 worker_id+ip_address+date_hour）。
+        date_hour 按接收时间 received_at（时间戳，默认当前时间）计算。
+
+        Returns:
+            成功时返回 {"rows_upserted": 写入行数, "elapsed_ms": 耗时毫秒}，失败返回None
+        """
         try:
-            from src.models.stats import IPRequestStats, RequestStats
-            from datetime import datetime
+            started = time.perf_counter()
 
             logger.info(f"📊 处理Worker {worker_id} 的IP请求统计数据")
-            logger.debug(f"📊 接收到的统计数据: {stats_data}")
-
-            db = self.db()
+            logger.debug("📊 接收到的统计数据: %s", stats_data)
 
             # 获取统计数据
             by_ip = stats_data.get("by_ip", {})
@@ -503,8 +944,33 @@ class WorkerSyncService:
 
             logger.info(f"📊 总请求数: {total_requests}")
             logger.info(f"📊 by_ip数据类型: {type(by_ip)}, 数据长度: {len(by_ip) if isinstance(by_ip, dict) else 'N/A'}")
-            current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
 
+            saved_count = await run_db(self._save_request_stats, worker_id, by_ip, total_requests, received_at)
+
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.info(f"✅ Worker IP请求统计数据保存成功: {worker_id}, 共upsert {saved_count} 条IP统计, 耗时 {elapsed_ms}ms")
+
+            # 更新 Worker 最后同步时间
+            await self._update_worker_sync_time(worker_id)
+
+            return {
+                "rows_upserted": saved_count,
+                "elapsed_ms": elapsed_ms
+            }
+
+        except Exception as e:
+            logger.error(f"❌ 处理Worker IP请求统计数据失败: {e}")
+            return None
+
+    def _save_request_stats(self, worker_id: str, by_ip: Dict[str, Any], total_requests: int,
+                            received_at: float = None) -> int:
+        """更新数据所属小时的汇总统计并批量 upsert IP统计，返回写入行数（在数据库线程池中执行）"""
+        from src.models.stats import IPRequestStats, RequestStats
+
+        current_hour = hour_bucket(received_at)
+
+        db = self.db()
+        try:
             # 更新 RequestStats 表的总请求数（用于仪表盘统计）
             request_stats = db.query(RequestStats).filter(
                 RequestStats.worker_id == worker_id,
@@ -531,51 +997,37 @@ class WorkerSyncService:
 
             logger.info(f"📊 更新RequestStats: 总请求={total_requests}, 活跃IP={len(by_ip)}, 违规={total_violations}")
 
-            # 批量保存IP请求统计
-            saved_count = 0
-            for ip_address, ip_stats in by_ip.items():
-                try:
-                    # 查找或创建IP统计记录
-                    ip_request_stat = db.query(IPRequestStats).filter(
-                        IPRequestStats.worker_id == worker_id,
-                        IPRequestStats.ip_address == ip_address,
-                        IPRequestStats.date_hour == current_hour
-                    ).first()
-
-                    if not ip_request_stat:
-                        ip_request_stat = IPRequestStats(
-                            worker_id=worker_id,
-                            ip_address=ip_address,
-                            date_hour=current_hour
-                        )
-
-                    # 更新统计数据
-                    ip_request_stat.total_count = ip_stats.get("total_count", 0)
-                    ip_request_stat.violations = ip_stats.get("violations", 0)
-                    ip_request_stat.paths = ip_stats.get("paths", {})
-
-                    db.add(ip_request_stat)
-                    saved_count += 1
-
-                except Exception as e:
-                    logger.error(f"❌ 保存IP {ip_address} 的统计数据失败: {e}")
-                    continue
-
+            # 批量 upsert IP请求统计
+            now = datetime.now()
+            rows = [
+                {
+                    "worker_id": worker_id,
+                    "ip_address": ip_address,
+                    "date_hour": current_hour,
+                    "total_count": ip_stats.get("total_count", 0),
+                    "violations": ip_stats.get("violations", 0),
+                    "paths": ip_stats.get("paths", {}),
+                    "updated_at": now
+                }
+                for ip_address, ip_stats in by_ip.items()
+            ]
+
+            db.flush()
+            saved_count = bulk_upsert(
+                db,
+                IPRequestStats.__table__,
+                rows,
+                index_elements=["worker_id", "ip_address", "date_hour"],
+                update_columns=["total_count", "violations", "paths", "updated_at"]
+            )
             db.commit()
+        finally:
             db.close()
 
-            logger.info(f"✅ Worker IP请求统计数据保存成功: {worker_id}, 共保存 {saved_count} 条IP统计")
-
-            # 更新 Worker 最后同步时间
-            await self._update_worker_sync_time(worker_id)
-
-            return True
-
-        except Exception as e:
-            logger.error(f"❌ 处理Worker IP请求统计数据失败: {e}")
-            return False
+        return saved_count
 
-    async def query_worker_logs(self, worker_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+    @offload_db
+    def query_worker_logs(self, worker_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
         """查询Worker推送的日志数据"""
         try:
             from src.models.logs import SystemLog
@@ -612,7 +1064,8 @@ class WorkerSyncService:
             logger.error(f"❌ 查询Worker日志失败: {e}")
             return []
 
-    async def query_worker_request_stats(self, worker_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+    @offload_db
+    def query_worker_request_stats(self, worker_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
         """查询Worker推送的 IP 请求统计数据"""
         try:
             from src.models.stats import IPRequestStats
@@ -653,7 +1106,7 @@ class WorkerSyncService:
     async def get_worker_health_status(self, worker_endpoint: str) -> Dict[str, Any]:
         """获取Worker健康状态"""
         try:
-            async with httpx.AsyncClient(**self.client_config) as client:
+            async with worker_client() as client:
                 health_url = f"{worker_endpoint.rstrip('/')}/health"
 
                 # 获取API密钥
@@ -688,7 +1141,8 @@ class WorkerSyncService:
                 "error": str(e)
             }
 
-    async def _update_worker_sync_time(self, worker_id: str) -> None:
+    @offload_db
+    def _update_worker_sync_time(self, worker_id: str) -> None:
         """更新 Worker 最后同步时间"""
         try:
             from src.models.config import WorkerConfig
@@ -2,7 +2,9 @@
 任务调度器
 """
 import asyncio
+import functools
 import logging
+import time
 from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -12,6 +14,12 @@ from src.config import settings
 from src.services.stats_service import StatsService
 from src.services.config_service import ConfigService
 from src.services.worker_sync import WorkerSyncService
+from src.services.partition_service import get_partition_manager
+from src.services.purge_service import get_purge_engine
+from src.services.log_index import get_log_index
+from src.services.app_metrics import record_job_run
+from starlette.concurrency import run_in_threadpool
+from src.database import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +52,12 @@ class TaskScheduler:
             
             # 启动调度器
             self.scheduler.start()
+
+            # 启动时立即压缩一次统计汇总表，避免首次压缩前仪表盘回退到全表聚合
+            asyncio.create_task(self._compact_stats_rollups())
+
+            # 启动时建立/加载日志全文索引，避免第一次搜索时等待
+            asyncio.create_task(self._refresh_log_index())
             
             logger.info("✅ 任务调度器启动成功")
             
@@ -55,6 +69,8 @@ class TaskScheduler:
         """停止调度器"""
         try:
             logger.info("🛑 停止任务调度器...")
+            # 正在执行的过期数据清理在当前批次结束后停止，下次从检查点继续
+            get_purge_engine().stop()
             self.scheduler.shutdown(wait=True)
             logger.info("✅ 任务调度器已停止")
         except Exception as e:
@@ -65,7 +81,7 @@ class TaskScheduler:
         
         # 1. 数据清理任务 - 每天凌晨2点执行
         self.scheduler.add_job(
-            self._cleanup_old_data,
+            self._timed('cleanup_old_data', self._cleanup_old_data),
             trigger=CronTrigger(hour=2, minute=0),
             id='cleanup_old_data',
             name='清理旧数据',
@@ -74,7 +90,7 @@ class TaskScheduler:
         
         # 2. 配置同步任务 - 每小时执行
         self.scheduler.add_job(
-            self._sync_config_to_workers,
+            self._timed('sync_config_to_workers', self._sync_config_to_workers),
             trigger=IntervalTrigger(hours=settings.SYNC_INTERVAL_HOURS),
             id='sync_config_to_workers',
             name='同步配置到Worker',
@@ -85,43 +101,96 @@ class TaskScheduler:
         
         # 4. 统计数据汇总任务 - 每小时执行
         self.scheduler.add_job(
-            self._aggregate_stats,
+            self._timed('aggregate_stats', self._aggregate_stats),
             trigger=CronTrigger(minute=5),  # 每小时的第5分钟执行
             id='aggregate_stats',
             name='统计数据汇总',
             replace_existing=True
         )
         
-        # 5. 系统状态记录任务 - 每10分钟执行
+        # 5. 系统状态记录任务 - 默认每10分钟执行（SYSTEM_STATUS_LOG_MINUTES 为 0 时不写入，使用 /metrics 监控）
+        if settings.SYSTEM_STATUS_LOG_MINUTES > 0:
+            self.scheduler.add_job(
+                self._timed('record_system_status', self._record_system_status),
+                trigger=IntervalTrigger(minutes=settings.SYSTEM_STATUS_LOG_MINUTES),
+                id='record_system_status',
+                name='记录系统状态',
+                replace_existing=True
+            )
+
+        # 6. 统计汇总表压缩任务 - 每小时执行（零点后把前一天并入汇总表）
+        self.scheduler.add_job(
+            self._timed('compact_stats_rollups', self._compact_stats_rollups),
+            trigger=CronTrigger(minute=1),
+            id='compact_stats_rollups',
+            name='压缩统计汇总表',
+            replace_existing=True
+        )
+        
+        # 7. 日志表分区维护 - 每天执行（提前创建未来分区，MySQL/PostgreSQL）
         self.scheduler.add_job(
-            self._record_system_status,
-            trigger=IntervalTrigger(minutes=10),
-            id='record_system_status',
-            name='记录系统状态',
+            self._timed('maintain_partitions', self._maintain_partitions),
+            trigger=CronTrigger(hour=1, minute=30),
+            id='maintain_partitions',
+            name='维护日志表分区',
             replace_existing=True
         )
         
-        logger.info("📋 已添加 4 个定时任务")
+        # 8. 日志全文索引 - 每分钟索引 app.log 新追加的内容
+        self.scheduler.add_job(
+            self._timed('refresh_log_index', self._refresh_log_index),
+            trigger=IntervalTrigger(minutes=1),
+            id='refresh_log_index',
+            name='更新日志全文索引',
+            replace_existing=True
+        )
+        
+        logger.info(f"📋 已添加 {len(self.scheduler.get_jobs())} 个定时任务")
+
+    def _timed(self, job_id: str, func):
+        """
+        包装定时任务，记录执行耗时和失败次数（/metrics）
+
+        任务自己捕获并记录异常，失败时返回 False
+        """
+        @functools.wraps(func)
+        async def wrapper():
+            started = time.perf_counter()
+            failed = False
+            try:
+                failed = await func() is False
+            except Exception:
+                failed = True
+                raise
+            finally:
+                record_job_run(job_id, time.perf_counter() - started, failed)
+        return wrapper
     
     async def _cleanup_old_data(self):
         """清理旧数据任务"""
         try:
             logger.info("🧹 开始清理旧数据...")
             
-            success = await self.stats_service.cleanup_old_data(days=30)
+            success = await self.stats_service.cleanup_old_data(days=settings.DATA_RETENTION_DAYS)
             
+            progress = get_purge_engine().get_progress()
+            details = {
+                key: progress.get(key)
+                for key in ("cutoff", "deleted", "rows_per_second", "batches", "max_batch_ms", "partitions_dropped")
+            }
             if success:
                 logger.info("✅ 旧数据清理完成")
                 await self.stats_service.record_system_log(
-                    "INFO", "定时清理旧数据完成", 
+                    "INFO", "定时清理旧数据完成", details=details,
                     category="maintenance", source="scheduler"
                 )
             else:
                 logger.error("❌ 旧数据清理失败")
                 await self.stats_service.record_system_log(
-                    "ERROR", "定时清理旧数据失败", 
+                    "ERROR", "定时清理旧数据失败", details=details,
                     category="maintenance", source="scheduler"
                 )
+                return False
                 
         except Exception as e:
             logger.error(f"❌ 清理旧数据任务异常: {e}")
@@ -129,6 +198,7 @@ class TaskScheduler:
                 "ERROR", f"清理旧数据任务异常: {str(e)}", 
                 category="maintenance", source="scheduler"
             )
+            return False
     
     async def _sync_config_to_workers(self):
         """同步配置到Worker任务"""
@@ -145,23 +215,19 @@ class TaskScheduler:
             # 导出当前配置
             config_data = await self.config_service.export_config_for_worker()
             
-            # 同步到每个Worker
-            success_count = 0
-            for endpoint in worker_endpoints:
-                try:
-                    result = await self.worker_sync.push_config_to_worker(endpoint, config_data)
-                    if result:
-                        success_count += 1
-                        logger.info(f"✅ 配置同步到 {endpoint} 成功")
-                    else:
-                        logger.error(f"❌ 配置同步到 {endpoint} 失败")
-                except Exception as e:
-                    logger.error(f"❌ 同步到 {endpoint} 异常: {e}")
+            # 并发同步到所有Worker（有界并发 + 截止时间 + 重试 + 熔断）
+            results = await self.worker_sync.push_config_to_workers(worker_endpoints, config_data)
             
             # 记录同步结果
             await self.stats_service.record_system_log(
-                "INFO", f"配置同步完成: {success_count}/{len(worker_endpoints)} 成功", 
-                details={"success_count": success_count, "total_workers": len(worker_endpoints)},
+                "INFO", f"配置同步完成: {results['success_count']}/{results['total_workers']} 成功", 
+                details={
+                    "success_count": results["success_count"],
+                    "failed_count": results["failed_count"],
+                    "skipped_count": results["skipped_count"],
+                    "total_workers": results["total_workers"],
+                    "duration_ms": results["duration_ms"]
+                },
                 category="sync", source="scheduler"
             )
             
@@ -171,6 +237,7 @@ class TaskScheduler:
                 "ERROR", f"配置同步任务异常: {str(e)}", 
                 category="sync", source="scheduler"
             )
+            return False
     
     # 健康检查任务已移除
     
@@ -179,8 +246,9 @@ class TaskScheduler:
         try:
             logger.debug("📊 执行统计数据汇总...")
             
-            # 获取系统概览统计
-            overview = await self.stats_service.get_system_overview()
+            # 获取统计快照（与状态记录任务、Telegram /status 共用）
+            snapshot = await self.stats_service.get_stats_snapshot()
+            overview = snapshot.overview() if snapshot else {}
             
             # 记录汇总统计
             await self.stats_service.record_system_log(
@@ -195,22 +263,56 @@ class TaskScheduler:
                 "ERROR", f"统计汇总任务异常: {str(e)}", 
                 category="stats", source="scheduler"
             )
+            return False
     
+    async def _compact_stats_rollups(self):
+        """统计汇总表压缩任务"""
+        try:
+            logger.debug("📊 压缩统计汇总表...")
+
+            refreshed_days = await self.stats_service.compact_stats_rollups()
+            if refreshed_days < 0:
+                logger.error("❌ 统计汇总表压缩失败")
+                return False
+
+        except Exception as e:
+            logger.error(f"❌ 统计汇总表压缩任务异常: {e}")
+            return False
+
+    async def _maintain_partitions(self):
+        """日志表分区维护任务"""
+        try:
+            partition_manager = get_partition_manager()
+            if not partition_manager.supported:
+                return
+
+            logger.debug("📅 维护日志表分区...")
+            await run_db(partition_manager.setup)
+
+        except Exception as e:
+            logger.error(f"❌ 日志表分区维护任务异常: {e}")
+            return False
+
+    async def _refresh_log_index(self):
+        """日志全文索引更新任务"""
+        try:
+            result = await run_in_threadpool(get_log_index().refresh)
+            if result["indexed_bytes"]:
+                logger.debug(f"🔎 日志索引已更新: 新增 {result['indexed_bytes']} 字节, 耗时 {result['took_ms']}ms")
+
+        except Exception as e:
+            logger.error(f"❌ 日志索引更新任务异常: {e}")
+            return False
+
     async def _record_system_status(self):
         """记录系统状态任务"""
         try:
             logger.debug("📝 记录系统状态...")
             
-            # 获取系统状态
-            status = await self.stats_service.get_system_overview()
-            performance = await self.stats_service.get_performance_metrics()
-            
-            # 合并状态信息
-            system_status = {
-                **status,
-                **performance,
-                "timestamp": datetime.now().isoformat()
-            }
+            # 获取系统状态（一次快照同时包含概览与性能指标）
+            snapshot = await self.stats_service.get_stats_snapshot()
+            system_status = snapshot.to_dict() if snapshot else {}
+            system_status["timestamp"] = datetime.now().isoformat()
             
             # 记录状态日志
             await self.stats_service.record_system_log(
@@ -221,6 +323,7 @@ class TaskScheduler:
             
         except Exception as e:
             logger.error(f"❌ 系统状态记录任务异常: {e}")
+            return False
     
     def get_job_status(self) -> dict:
         """获取任务状态"""
@@ -237,7 +340,8 @@ class TaskScheduler:
             return {
                 "scheduler_running": self.scheduler.running,
                 "jobs": jobs,
-                "total_jobs": len(jobs)
+                "total_jobs": len(jobs),
+                "purge": get_purge_engine().get_progress()
             }
             
         except Exception as e:
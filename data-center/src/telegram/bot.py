@@ -3,8 +3,10 @@ Telegram机器人核心类 - 轮询模式
 参考MoviePilot项目的实现优化
 """
 import asyncio
+import functools
 import logging
 import threading
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -28,10 +30,14 @@ from src.config import settings
 from src.database import get_db_sync
 from src.services.config_service import ConfigService
 from src.services.stats_service import StatsService
+from src.services.app_metrics import TELEGRAM_COMMAND_DURATION, TELEGRAM_COMMAND_ERRORS
 from src.models.logs import TelegramLog
 
 logger = logging.getLogger(__name__)
 
+# /status 命令复用统计快照的最长时间（秒）
+STATUS_SNAPSHOT_MAX_AGE = 60
+
 # 禁用httpx的INFO日志，避免暴露API密钥
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
@@ -156,15 +162,15 @@ class TelegramBot:
     async def _register_handlers(self):
         """注册命令处理器（参考MoviePilot的处理器注册）"""
         handlers = [
-            CommandHandler("start", self.start_command),
-            CommandHandler("status", self.status_command),
-            CommandHandler("ua", self.ua_command),
-            CommandHandler("blacklist", self.blacklist_command),
-            CommandHandler("logs", self.logs_command),
-            CommandHandler("help", self.help_command),
+            CommandHandler("start", self._timed("start", self.start_command)),
+            CommandHandler("status", self._timed("status", self.status_command)),
+            CommandHandler("ua", self._timed("ua", self.ua_command)),
+            CommandHandler("blacklist", self._timed("blacklist", self.blacklist_command)),
+            CommandHandler("logs", self._timed("logs", self.logs_command)),
+            CommandHandler("help", self._timed("help", self.help_command)),
             # 消息处理器 - 用于处理用户输入（添加UA/IP时的文本输入）
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text_input),
-            CallbackQueryHandler(self.handle_callback)
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self._timed("text", self.handle_text_input)),
+            CallbackQueryHandler(self._timed("callback", self.handle_callback))
         ]
 
         for handler in handlers:
@@ -186,6 +192,20 @@ class TelegramBot:
 
         logger.info(f"✅ 注册了 {len(handlers)} 个命令处理器和1个错误处理器")
 
+    def _timed(self, command: str, callback):
+        """包装命令处理器，记录处理耗时和异常次数（/metrics）"""
+        @functools.wraps(callback)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            except Exception:
+                TELEGRAM_COMMAND_ERRORS.inc(command)
+                raise
+            finally:
+                TELEGRAM_COMMAND_DURATION.observe(time.perf_counter() - started, command)
+        return wrapper
+
     async def _setup_bot_commands(self):
         """设置机器人命令菜单"""
         commands = [
@@ -209,6 +229,10 @@ class TelegramBot:
 
     async def _log_command(self, user_id: int, username: str, command: str, response: str, status: str = "success", error: str = None):
         """记录命令执行日志"""
+        if status == "error":
+            # 命令处理器自己捕获异常并回复错误信息，异常不会传到 _timed，在这里计数
+            # （标签与 _timed 一致："/status" -> status，"callback:xxx" -> callback）
+            TELEGRAM_COMMAND_ERRORS.inc(command.lstrip("/").split(":", 1)[0])
         try:
             db = get_db_sync()
             log = TelegramLog(
@@ -272,8 +296,9 @@ class TelegramBot:
             return
 
         try:
-            # 获取系统统计信息
-            stats = await self.stats_service.get_system_overview()
+            # 获取系统统计信息（复用1分钟内的统计快照）
+            snapshot = await self.stats_service.get_stats_snapshot(max_age_seconds=STATUS_SNAPSHOT_MAX_AGE)
+            stats = snapshot.to_dict() if snapshot else {}
 
             message = f"""📊 **系统状态报告**
 
@@ -284,6 +309,11 @@ class TelegramBot:
 • 成功请求: {stats.get('successful_requests', 0):,} 次
 • 被阻止请求: {stats.get('blocked_requests', 0):,} 次
 
+⚡ **性能指标**
+• 近1小时请求: {stats.get('recent_requests_per_hour', 0):,} 次
+• 平均响应时间: {stats.get('avg_response_time', 0)} ms
+• 24小时错误率: {stats.get('error_rate_24h', 0)}%
+
 🚫 **安全统计**
 • IP黑名单: {stats.get('blacklist_count', 0)} 个
 • 违规IP数: {stats.get('violation_ips', 0)} 个
@@ -773,7 +803,8 @@ class TelegramBot:
     async def _handle_status_callback(self, query):
         """处理状态回调"""
         try:
-            stats = await self.stats_service.get_system_overview()
+            snapshot = await self.stats_service.get_stats_snapshot(max_age_seconds=STATUS_SNAPSHOT_MAX_AGE)
+            stats = snapshot.to_dict() if snapshot else {}
 
             message = f"""📊 **系统状态详情**
 
@@ -784,6 +815,11 @@ class TelegramBot:
 • 成功请求: {stats.get('successful_requests', 0):,} 次
 • 被阻止请求: {stats.get('blocked_requests', 0):,} 次
 
+⚡ **性能指标**
+• 近1小时请求: {stats.get('recent_requests_per_hour', 0):,} 次
+• 平均响应时间: {stats.get('avg_response_time', 0)} ms
+• 24小时错误率: {stats.get('error_rate_24h', 0)}%
+
 🚫 **安全统计**
 • IP黑名单: {stats.get('blacklist_count', 0)} 个
 • 违规IP数: {stats.get('violation_ips', 0)} 个
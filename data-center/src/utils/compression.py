@@ -0,0 +1,159 @@
+"""
+同步负载压缩工具模块
+
+Worker 与数据中心之间的同步数据（日志、IP请求统计、配置推送）使用 HTTP
+Content-Encoding / Accept-Encoding 协商压缩：
+- gzip：标准库实现，始终可用（Cloudflare Worker 的 CompressionStream 也只支持 gzip/deflate）
+- zstd：安装 zstandard 包后可用
+
+解压是流式的：逐块解压并累计输出大小，超过上限立即中止（防压缩炸弹），
+不会先把整个解压结果放进内存再检查。
+"""
+import logging
+import zlib
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd 为可选依赖
+    zstandard = None
+
+# 单次解压调用的输入切片大小，限制每次调用可能产生的输出量
+_DECOMPRESS_SLICE_BYTES = 16 * 1024
+
+
+class DecompressionError(ValueError):
+    """压缩数据损坏或编码不支持"""
+
+
+class DecompressedSizeExceeded(DecompressionError):
+    """解压后的大小超过上限"""
+
+
+def supported_encodings() -> List[str]:
+    """本进程支持的压缩编码（按优先级排序）"""
+    encodings = ["gzip"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择响应压缩编码
+
+    按 q 值从高到低选择本进程支持的编码，q=0 的编码视为拒绝；没有可用编码时返回 None
+    """
+    if not accept_encoding:
+        return None
+
+    candidates = []
+    for index, part in enumerate(accept_encoding.split(",")):
+        fields = part.strip().split(";")
+        name = fields[0].strip().lower()
+        quality = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            candidates.append((quality, index, name))
+
+    supported = supported_encodings()
+    for _, _, name in sorted(candidates, key=lambda c: (-c[0], c[1])):
+        if name in supported:
+            return name
+        if name == "*":
+            return supported[0]
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    """按指定编码压缩数据"""
+    if encoding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=min(level, 19)).compress(data)
+    raise DecompressionError(f"不支持的压缩编码: {encoding}")
+
+
+class StreamingDecompressor:
+    """
+    流式解压器
+
+    用法：对每个收到的数据块调用 feed()，结束时调用 finish()；解压后总大小超过
+    max_size 时抛出 DecompressedSizeExceeded。同时统计压缩前后的字节数。
+    """
+
+    def __init__(self, encoding: str, max_size: int):
+        self.encoding = encoding
+        self.max_size = max_size
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+
+        if encoding == "gzip":
+            # 32 + MAX_WBITS：自动识别 gzip / zlib 头
+            self._gzip = zlib.decompressobj(32 + zlib.MAX_WBITS)
+            self._zstd = None
+        elif encoding == "zstd" and zstandard is not None:
+            self._gzip = None
+            self._zstd = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise DecompressionError(f"不支持的压缩编码: {encoding}")
+
+    def feed(self, chunk: bytes) -> bytes:
+        """解压一个数据块，返回本次产生的明文"""
+        self.compressed_bytes += len(chunk)
+        try:
+            if self._gzip is not None:
+                return self._feed_gzip(chunk)
+            return self._feed_zstd(chunk)
+        except DecompressionError:
+            raise
+        except Exception as e:
+            raise DecompressionError(f"解压失败: {e}")
+
+    def finish(self) -> bytes:
+        """输入结束，返回剩余明文并检查数据完整性"""
+        if self._gzip is not None:
+            output = self._feed_gzip(b"")
+            if not self._gzip.eof:
+                raise DecompressionError("gzip 数据不完整")
+            return output
+        return b""
+
+    def _feed_gzip(self, chunk: bytes) -> bytes:
+        # 用 max_length 限制单次输出，超过上限时不会先分配出整个解压结果
+        output = []
+        data = chunk
+        while True:
+            remaining = self.max_size - self.decompressed_bytes
+            piece = self._gzip.decompress(data, remaining + 1)
+            self._account(piece)
+            output.append(piece)
+            data = self._gzip.unconsumed_tail
+            if not data:
+                break
+        return b"".join(output)
+
+    def _feed_zstd(self, chunk: bytes) -> bytes:
+        # zstd 的 decompressobj 不支持限制输出长度，按小切片输入限制单次输出量
+        output = []
+        for start in range(0, len(chunk), _DECOMPRESS_SLICE_BYTES):
+            piece = self._zstd.decompress(chunk[start:start + _DECOMPRESS_SLICE_BYTES])
+            self._account(piece)
+            output.append(piece)
+        return b"".join(output)
+
+    def _account(self, piece: bytes):
+        self.decompressed_bytes += len(piece)
+        if self.decompressed_bytes > self.max_size:
+            raise DecompressedSizeExceeded(
+                f"解压后大小超过上限 {self.max_size} 字节（已接收压缩数据 {self.compressed_bytes} 字节）"
+            )
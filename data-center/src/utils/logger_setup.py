@@ -1,31 +1,201 @@
 """
 日志配置模块 - 参考 emby-toolkit 简化版本
+
+除文本日志 app.log 外，可选输出结构化日志 app.jsonl（每行一个 JSON 对象：
+ts（毫秒时间戳）、level、logger、message、request_id、worker_id、exc），
+日志查看和搜索接口可以直接按这些字段筛选，不需要用正则解析文本。
+
+所有处理器（控制台、app.log、app.jsonl）都在 QueueListener 的后台线程中执行，根 logger 上只有一个
+BoundedQueueHandler：记录日志时只计算消息文本并放入有界队列，不做格式化、写盘和轮转检查。
+队列占用超过 LOG_QUEUE_PRESSURE_RATIO 时丢弃 DEBUG 日志；队列已满时 INFO 也丢弃，
+WARNING 及以上在其他线程中最多等待 LOG_QUEUE_BLOCK_SECONDS，在事件循环线程中不等待直接丢弃
+（等待会卡住所有请求）。丢弃数量通过 get_logging_stats() 查看。
 """
+import asyncio
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Optional, Dict, Any
 from datetime import datetime
 
 # 日志配置常量
 LOG_FILE_NAME = "app.log"
+JSON_LOG_FILE_NAME = "app.jsonl"
 DEFAULT_LOG_SIZE_MB = 10
 DEFAULT_LOG_BACKUPS = 5
 
-def setup_logging(log_directory: str = None, log_level: str = "INFO"):
+# 日志队列：默认容量、丢弃 DEBUG 日志的队列占用比例、队列已满时 WARNING 及以上日志的最长等待秒数（事件循环线程不等待）
+DEFAULT_LOG_QUEUE_SIZE = 10000
+LOG_QUEUE_PRESSURE_RATIO = 0.8
+LOG_QUEUE_BLOCK_SECONDS = 1.0
+
+# 当前请求/Worker（由请求中间件和写入队列设置，记录日志时附加到结构化日志中）
+_request_id: ContextVar[Optional[str]] = ContextVar("log_request_id", default=None)
+_worker_id: ContextVar[Optional[str]] = ContextVar("log_worker_id", default=None)
+
+# 日志队列处理器和后台写入线程
+_queue_handler: Optional["BoundedQueueHandler"] = None
+_listener: Optional[QueueListener] = None
+
+def bind_log_context(request_id: Optional[str] = None, worker_id: Optional[str] = None):
+    """设置当前上下文（请求/任务）的请求ID和Worker ID，只更新传入的字段"""
+    if request_id is not None:
+        _request_id.set(request_id)
+    if worker_id is not None:
+        _worker_id.set(worker_id)
+
+def get_request_id() -> Optional[str]:
+    """当前请求的请求ID"""
+    return _request_id.get()
+
+class LogContextFilter(logging.Filter):
+    """在记录日志的线程中把请求ID和Worker ID附加到日志记录上（extra 中已指定的不覆盖）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = _request_id.get()
+        if getattr(record, "worker_id", None) is None:
+            record.worker_id = _worker_id.get()
+        return True
+
+class JsonLinesFormatter(logging.Formatter):
+    """结构化日志格式：每条日志一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": int(record.created * 1000),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "worker_id": getattr(record, "worker_id", None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+def _in_event_loop() -> bool:
+    """当前线程是否正在运行事件循环"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    有界队列处理器：放入队列前只计算消息文本和异常堆栈（参数可能在之后被修改），
+    格式化和写盘在 QueueListener 线程中进行；队列积压时按级别丢弃并计数
+    """
+
+    def __init__(self, log_queue: queue.Queue, capacity: int):
+        super().__init__(log_queue)
+        self.capacity = capacity
+        self.pressure_size = max(1, int(capacity * LOG_QUEUE_PRESSURE_RATIO))
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.high_water = 0
+        self.dropped: Dict[str, int] = {}
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # 队列本身是线程安全的，不获取处理器锁（否则一个线程等待队列空位时会阻塞其他线程记录日志）
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            size = self.queue.qsize()
+            if record.levelno < logging.INFO and size >= self.pressure_size:
+                self._drop(record)
+                return
+
+            prepared = self.prepare(record)
+            try:
+                self.queue.put_nowait(prepared)
+            except queue.Full:
+                if record.levelno < logging.WARNING or _in_event_loop():
+                    self._drop(record)
+                    return
+                try:
+                    self.queue.put(prepared, timeout=LOG_QUEUE_BLOCK_SECONDS)
+                except queue.Full:
+                    self._drop(record)
+                    return
+
+            with self._stats_lock:
+                self.enqueued += 1
+                if size + 1 > self.high_water:
+                    self.high_water = size + 1
+        except Exception:
+            self.handleError(record)
+
+    def _drop(self, record: logging.LogRecord):
+        with self._stats_lock:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            dropped = dict(self.dropped)
+            enqueued = self.enqueued
+            high_water = self.high_water
+        return {
+            "queue_size": self.queue.qsize(),
+            "queue_capacity": self.capacity,
+            "queue_high_water": high_water,
+            "enqueued": enqueued,
+            "dropped": dropped,
+            "dropped_total": sum(dropped.values())
+        }
+
+def get_log_directory() -> str:
+    """获取日志目录路径（在Docker环境中使用/app/config/logs，本地开发使用./logs）"""
+    if os.path.exists("/app/config"):
+        return "/app/config/logs"
+    return os.path.join(os.getcwd(), "logs")
+
+def setup_logging(log_directory: str = None, log_level: str = "INFO", json_enabled: bool = None,
+                  queue_size: int = None):
     """
     设置日志系统
 
     Args:
         log_directory: 日志目录路径，默认为/app/config/logs
         log_level: 日志级别，默认为INFO
+        json_enabled: 是否输出结构化日志 app.jsonl，默认取配置 LOG_JSON_ENABLED
+        queue_size: 日志队列容量，默认取配置 LOG_QUEUE_SIZE
     """
+    global _queue_handler, _listener
+
     if log_directory is None:
-        # 在Docker环境中使用/app/config/logs，本地开发使用./logs
-        if os.path.exists("/app/config"):
-            log_directory = "/app/config/logs"
-        else:
-            log_directory = os.path.join(os.getcwd(), "logs")
+        log_directory = get_log_directory()
+    if json_enabled is None or queue_size is None:
+        from src.config import settings
+        if json_enabled is None:
+            json_enabled = settings.LOG_JSON_ENABLED
+        if queue_size is None:
+            queue_size = settings.LOG_QUEUE_SIZE
+    queue_size = queue_size if queue_size > 0 else DEFAULT_LOG_QUEUE_SIZE
     
     # 确保日志目录存在
     if not os.path.exists(log_directory):
@@ -37,6 +207,7 @@ def setup_logging(log_directory: str = None, log_level: str = "INFO"):
     # 清除现有的处理器
     if logger.hasHandlers():
         logger.handlers.clear()
+    stop_logging()
     
     # 设置日志级别
     level = getattr(logging, log_level.upper(), logging.INFO)
@@ -48,11 +219,15 @@ def setup_logging(log_directory: str = None, log_level: str = "INFO"):
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
+    # 以下处理器都由后台线程执行
+    handlers = []
+    errors = []
+
     # 1. 控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # 2. 文件处理器（带轮转）
     log_file_path = os.path.join(log_directory, LOG_FILE_NAME)
@@ -65,27 +240,76 @@ def setup_logging(log_directory: str = None, log_level: str = "INFO"):
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
+        handlers.append(file_handler)
+    except Exception as e:
+        file_handler = None
+        errors.append(f"配置文件日志处理器失败: {e}")
+
+    # 3. 结构化日志
+    json_path = os.path.join(log_directory, JSON_LOG_FILE_NAME)
+    if json_enabled:
+        try:
+            json_handler = RotatingFileHandler(
+                json_path,
+                maxBytes=DEFAULT_LOG_SIZE_MB * 1024 * 1024,
+                backupCount=DEFAULT_LOG_BACKUPS,
+                encoding='utf-8'
+            )
+            json_handler.setLevel(logging.DEBUG)
+            json_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(json_handler)
+        except Exception as e:
+            json_enabled = False
+            errors.append(f"配置结构化日志处理器失败: {e}")
+
+    # 根logger上只有队列处理器
+    _queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size), queue_size)
+    _queue_handler.setLevel(logging.DEBUG)
+    # 过滤器在记录日志的线程中执行，此时才能取到当前请求的上下文
+    _queue_handler.addFilter(LogContextFilter())
+    logger.addHandler(_queue_handler)
+
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    for error in errors:
+        logger.error(error)
+    if file_handler is not None:
         # 记录日志系统启动信息
         logger.info(f"日志系统已初始化 - 文件路径: {log_file_path}")
         logger.info(f"日志轮转配置: {DEFAULT_LOG_SIZE_MB}MB * {DEFAULT_LOG_BACKUPS}个备份")
-        
-    except Exception as e:
-        logger.error(f"配置文件日志处理器失败: {e}")
+    if json_enabled:
+        logger.info(f"结构化日志已启用 - 文件路径: {json_path}")
+    logger.info(f"日志队列容量: {queue_size}")
     
     return logger
 
+def stop_logging():
+    """停止日志后台线程（写完队列中剩余的日志）"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        # 之后的日志不再放入无人处理的队列
+        logging.getLogger().removeHandler(_queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(stop_logging)
+
+def get_logging_stats() -> Dict[str, Any]:
+    """日志队列统计（当前长度、最高长度、按级别的丢弃数量）"""
+    if _queue_handler is None:
+        return {"queue_size": 0, "queue_capacity": 0, "queue_high_water": 0,
+                "enqueued": 0, "dropped": {}, "dropped_total": 0}
+    return _queue_handler.get_stats()
+
 def create_test_logs(log_directory: str = None):
     """
     创建一些测试日志数据
     """
     if log_directory is None:
-        # 在Docker环境中使用/app/config/logs，本地开发使用./logs
-        if os.path.exists("/app/config"):
-            log_directory = "/app/config/logs"
-        else:
-            log_directory = os.path.join(os.getcwd(), "logs")
+        log_directory = get_log_directory()
     
     logger = logging.getLogger(__name__)
     
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+日志与统计表分区迁移工具 - 容器内使用（MySQL/PostgreSQL）
+
+将已有数据的 system_logs、sync_logs、request_stats、ip_violation_stats 转换为按时间分区的表。迁移期间表不可写，
+请在维护窗口执行（Worker推送的数据会在写入队列中等待或由Worker重试）。
+
+用法：
+  python -m src.utils.migrate_partitions            迁移所有未分区的表
+  python -m src.utils.migrate_partitions <表名>     只迁移指定的表
+  python -m src.utils.migrate_partitions --status   查看分区状态
+"""
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, '/app')
+
+
+def show_status():
+    """打印分区状态"""
+    from src.services.partition_service import get_partition_manager
+
+    status = get_partition_manager().get_status()
+    print(f"数据库: {status['dialect']}, 分区粒度: {status['interval']}, 提前创建: {status['premake']}")
+    if not status["supported"]:
+        print("ℹ️ 当前数据库不支持分区或分区已关闭（PARTITION_ENABLED）")
+        return True
+
+    for table, info in status["tables"].items():
+        if not info["partitioned"]:
+            print(f"  {table}: 未分区")
+            continue
+        partitions = info["partitions"]
+        bounded = [p for p in partitions if p["start"]]
+        span = f"{bounded[0]['start']} ~ {bounded[-1]['end']}" if bounded else "-"
+        rows = sum(p["rows"] for p in partitions)
+        print(f"  {table}: {info['partition_count']} 个分区, 范围 {span}, 约 {rows} 行")
+    return "error" not in status
+
+
+def migrate(tables):
+    """迁移指定的表"""
+    from src.services.partition_service import get_partition_manager
+
+    manager = get_partition_manager()
+    if not manager.supported:
+        print(f"❌ 当前数据库 ({manager.dialect}) 不支持分区或分区已关闭（PARTITION_ENABLED）")
+        return False
+
+    success = True
+    for table in tables:
+        print(f"🔧 正在迁移 {table} ...")
+        started = time.time()
+        try:
+            manager.migrate_table(table)
+            manager.ensure_partitions(table)
+            print(f"✅ {table} 迁移完成，耗时 {time.time() - started:.1f} 秒")
+        except Exception as e:
+            print(f"❌ {table} 迁移失败: {e}")
+            success = False
+    return success
+
+
+def main():
+    """主函数"""
+    from src.services.partition_service import PARTITIONED_TABLES
+
+    args = sys.argv[1:]
+    if args and args[0] == "--status":
+        sys.exit(0 if show_status() else 1)
+
+    unknown = [table for table in args if table not in PARTITIONED_TABLES]
+    if unknown:
+        print(f"❌ 不支持分区的表: {', '.join(unknown)}")
+        print(f"可分区的表: {', '.join(PARTITIONED_TABLES)}")
+        sys.exit(1)
+
+    success = migrate(args or list(PARTITIONED_TABLES))
+    print("")
+    show_status()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()